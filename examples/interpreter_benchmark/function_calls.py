@@ -0,0 +1,75 @@
+"""Microbenchmark of user-defined function calls in the local Python interpreter.
+
+Runs a recursive Fibonacci and a helper called in a 10k-iteration loop, on top of an agent state holding many
+variables, to measure the cost of a function call relative to the size of the state.
+
+Usage:
+    python examples/interpreter_benchmark/function_calls.py --state-size 1000
+"""
+
+import argparse
+import time
+from textwrap import dedent
+
+from smolagents.local_python_executor import EXECUTION_ENGINES, LocalPythonExecutor
+
+
+BENCHMARKS = {
+    "recursive_fib": dedent(
+        """\
+        def fib(n):
+            if n < 2:
+                return n
+            return fib(n - 1) + fib(n - 2)
+
+        result = fib(18)
+        """
+    ),
+    "helper_in_loop": dedent(
+        """\
+        def helper(x, offset=1):
+            return x * 2 + offset
+
+        total = 0
+        for i in range(10_000):
+            total += helper(i)
+        """
+    ),
+}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmarks user-defined function calls in the local interpreter.")
+    parser.add_argument(
+        "--state-size",
+        type=int,
+        default=1000,
+        help="Number of variables already defined in the agent state.",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of each benchmark, the best is kept.")
+    return parser.parse_args()
+
+
+def run_benchmark(code: str, engine: str, state_size: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        executor = LocalPythonExecutor([], engine=engine)
+        executor.send_tools({})
+        executor.send_variables({f"variable_{i}": list(range(10)) for i in range(state_size)})
+        start = time.perf_counter()
+        executor(code)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    args = parse_arguments()
+    print(f"State size: {args.state_size} variables")
+    for name, code in BENCHMARKS.items():
+        for engine in EXECUTION_ENGINES:
+            duration = run_benchmark(code, engine, args.state_size, args.repeat)
+            print(f"{name:<16} engine={engine:<9} {duration * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
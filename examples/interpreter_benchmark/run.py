@@ -0,0 +1,303 @@
+"""Benchmark suite of the local Python interpreter, with regression tracking.
+
+Runs code snippets typical of agent actions (loops, comprehensions, function calls, class definitions, imports,
+f-strings, exception handling, large prints) through `evaluate_python_code` with each execution engine, and reports
+for each of them the interpreter operations per second, the runs per second and the peak memory allocated.
+Operations per second are only comparable within an engine, since the engines count operations differently.
+
+The `fast_path` engine runs the snippets with `fast_path=True`: the ones verified to stay within the safe subset of
+Python run natively as bytecode, the others (here function and class definitions and `try` statements) fall back to the
+tree-walking interpreter, so comparing its time to the one of `ast` shows the speedup of the fast path.
+
+Results can be saved as JSON, then compared to a previous run to catch regressions in the hot path:
+
+Usage:
+    python examples/interpreter_benchmark/run.py --output baseline.json
+    python examples/interpreter_benchmark/run.py --output new.json --compare baseline.json --max-regression 0.1
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from textwrap import dedent
+
+from smolagents.local_python_executor import (
+    BASE_PYTHON_TOOLS,
+    EXECUTION_ENGINES,
+    OperationsCounter,
+    evaluate_python_code,
+)
+from smolagents.utils import BASE_BUILTIN_MODULES
+
+
+# Execution engines, and the tree-walking interpreter with the fast path enabled
+ENGINES = (*EXECUTION_ENGINES, "fast_path")
+
+
+@dataclass
+class Benchmark:
+    code: str
+    authorized_imports: tuple[str, ...] = ()
+
+
+BENCHMARKS = {
+    "for_loop": Benchmark(
+        dedent(
+            """\
+            total = 0
+            for i in range(20_000):
+                if i % 3 == 0:
+                    total += i
+                else:
+                    total -= 1
+            """
+        )
+    ),
+    "while_loop": Benchmark(
+        dedent(
+            """\
+            i = 0
+            while i < 20_000:
+                i += 1
+            """
+        )
+    ),
+    "list_comprehension": Benchmark("squares = [x * x for x in range(20_000) if x % 2 == 0]"),
+    "nested_comprehensions": Benchmark(
+        dedent(
+            """\
+            pairs = {(x, y): x * y for x in range(100) for y in range(100)}
+            total = sum(value for value in pairs.values() if value % 7 == 0)
+            """
+        )
+    ),
+    "function_calls": Benchmark(
+        dedent(
+            """\
+            def fib(n):
+                if n < 2:
+                    return n
+                return fib(n - 1) + fib(n - 2)
+
+            result = fib(16)
+            """
+        )
+    ),
+    "class_definitions": Benchmark(
+        dedent(
+            """\
+            class Point:
+                def __init__(self, x, y):
+                    self.x = x
+                    self.y = y
+
+                def norm2(self):
+                    return self.x * self.x + self.y * self.y
+
+            total = 0
+            for i in range(2_000):
+                total += Point(i, i + 1).norm2()
+            """
+        )
+    ),
+    "numpy_pandas_imports": Benchmark(
+        dedent(
+            """\
+            import numpy as np
+            import pandas as pd
+            from numpy.linalg import norm
+
+            frame = pd.DataFrame({"a": np.arange(10)})
+            """
+        ),
+        authorized_imports=("numpy.*", "pandas.*"),
+    ),
+    "f_strings": Benchmark(
+        dedent(
+            """\
+            lines = []
+            for i in range(5_000):
+                lines.append(f"item {i:05d}: {i / 7:.3f} {'even' if i % 2 == 0 else 'odd'}")
+            """
+        )
+    ),
+    "try_except": Benchmark(
+        dedent(
+            """\
+            errors = 0
+            for i in range(5_000):
+                try:
+                    if i % 2:
+                        raise ValueError(i)
+                except ValueError:
+                    errors += 1
+                finally:
+                    last = i
+            """
+        )
+    ),
+    "large_prints": Benchmark(
+        dedent(
+            """\
+            for i in range(5_000):
+                print("line", i, "of the execution logs")
+            """
+        )
+    ),
+}
+
+
+@dataclass
+class BenchmarkResult:
+    benchmark: str
+    engine: str
+    runs: int
+    best_seconds: float
+    median_seconds: float
+    operations: int
+    operations_per_second: float
+    runs_per_second: float
+    peak_memory_kib: float
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmarks the local Python interpreter.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs of each benchmark.")
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        default=list(ENGINES),
+        choices=ENGINES,
+        help="Execution engines to benchmark.",
+    )
+    parser.add_argument(
+        "--benchmarks",
+        nargs="+",
+        default=list(BENCHMARKS),
+        choices=list(BENCHMARKS),
+        help="Benchmarks to run, all of them by default.",
+    )
+    parser.add_argument("--output", type=str, default=None, help="Path of the JSON file to save the results to.")
+    parser.add_argument(
+        "--compare", type=str, default=None, help="Path of the JSON results of a previous run to compare to."
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.1,
+        help="With --compare, exit with an error if a benchmark is slower than this fraction of the previous run.",
+    )
+    return parser.parse_args()
+
+
+def run_once(benchmark: Benchmark, engine: str) -> tuple[float, int]:
+    operations_counter = OperationsCounter()
+    start = time.perf_counter()
+    evaluate_python_code(
+        benchmark.code,
+        static_tools=BASE_PYTHON_TOOLS.copy(),
+        state={},
+        authorized_imports=list(BASE_BUILTIN_MODULES) + list(benchmark.authorized_imports),
+        engine="ast" if engine == "fast_path" else engine,
+        operations_counter=operations_counter,
+        fast_path=engine == "fast_path",
+    )
+    return time.perf_counter() - start, operations_counter.count
+
+
+def run_benchmark(name: str, engine: str, repeat: int) -> BenchmarkResult:
+    benchmark = BENCHMARKS[name]
+    # Warm-up run: parses the snippet into the cache and imports the modules it needs
+    run_once(benchmark, engine)
+    durations = []
+    for _ in range(repeat):
+        duration, operations = run_once(benchmark, engine)
+        durations.append(duration)
+    # Memory is measured in a separate run, as tracing allocations slows down the interpreter
+    tracemalloc.start()
+    try:
+        run_once(benchmark, engine)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best = min(durations)
+    return BenchmarkResult(
+        benchmark=name,
+        engine=engine,
+        runs=repeat,
+        best_seconds=best,
+        median_seconds=statistics.median(durations),
+        operations=operations,
+        operations_per_second=operations / best,
+        runs_per_second=1 / best,
+        peak_memory_kib=peak_memory / 1024,
+    )
+
+
+def get_metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(results: list[BenchmarkResult], baseline_path: str, max_regression: float) -> list[str]:
+    """Print the speed of each benchmark relative to the baseline and return the ones that regressed."""
+    with open(baseline_path) as f:
+        baseline = {(result["benchmark"], result["engine"]): result for result in json.load(f)["results"]}
+    regressions = []
+    print(f"\nComparison with {baseline_path} (speedup > 1 is faster):")
+    for result in results:
+        previous = baseline.get((result.benchmark, result.engine))
+        if previous is None:
+            continue
+        speedup = previous["best_seconds"] / result.best_seconds
+        memory_ratio = result.peak_memory_kib / previous["peak_memory_kib"] if previous["peak_memory_kib"] else 1.0
+        flag = ""
+        if speedup < 1 / (1 + max_regression):
+            regressions.append(f"{result.benchmark} ({result.engine})")
+            flag = "  <- REGRESSION"
+        print(f"{result.benchmark:<24} {result.engine:<9} speedup {speedup:6.2f}x  memory {memory_ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    args = parse_arguments()
+    results = []
+    print(f"{'Benchmark':<24} {'Engine':<9} {'Best (ms)':>10} {'Ops/s':>12} {'Runs/s':>10} {'Peak (KiB)':>11}")
+    for name in args.benchmarks:
+        for engine in args.engines:
+            result = run_benchmark(name, engine, args.repeat)
+            results.append(result)
+            print(
+                f"{name:<24} {engine:<9} {result.best_seconds * 1000:10.2f} {result.operations_per_second:12,.0f}"
+                f" {result.runs_per_second:10.1f} {result.peak_memory_kib:11.1f}"
+            )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"metadata": get_metadata(), "results": [asdict(result) for result in results]}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.max_regression)
+        if regressions:
+            print(f"\nRegressions of more than {args.max_regression:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,7 +25,9 @@ from .mcp_client import *
 from .memory import *
 from .models import *
 from .monitoring import *
+from .process_executor import *
 from .remote_executors import *
+from .state_store import *
 from .tools import *
 from .utils import *
 from .cli import *
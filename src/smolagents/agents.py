@@ -14,6 +14,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import importlib
 import inspect
 import json
@@ -23,7 +24,9 @@ import tempfile
 import textwrap
 import time
 from abc import ABC, abstractmethod
-from collections.abc import Callable, Generator
+from collections.abc import AsyncGenerator, Callable, Generator
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from logging import getLogger
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, TypedDict
@@ -45,24 +48,39 @@ if TYPE_CHECKING:
 
 from .agent_types import AgentAudio, AgentImage, handle_agent_output_types
 from .default_tools import TOOL_MAPPING, FinalAnswerTool
-from .local_python_executor import BASE_BUILTIN_MODULES, LocalPythonExecutor, PythonExecutor, fix_final_answer_code
+from .local_python_executor import (
+    BASE_BUILTIN_MODULES,
+    ExecutionLogsStreamDelta,
+    LocalPythonExecutor,
+    PythonExecutor,
+    fix_final_answer_code,
+)
 from .memory import (
     ActionStep,
     AgentMemory,
     FinalAnswerStep,
+    MemoryCompaction,
     Message,
     PlanningStep,
     SystemPromptStep,
     TaskStep,
     ToolCall,
 )
-from .models import ChatMessage, ChatMessageStreamDelta, MessageRole, Model, parse_json_if_needed
+from .models import (
+    ChatMessage,
+    ChatMessageStreamDelta,
+    MessageRole,
+    Model,
+    add_stream_delta,
+    parse_json_if_needed,
+)
 from .monitoring import (
     YELLOW_HEX,
     AgentLogger,
     LogLevel,
     Monitor,
 )
+from .process_executor import ProcessPythonExecutor
 from .remote_executors import DockerExecutor, E2BExecutor
 from .tools import Tool
 from .utils import (
@@ -74,8 +92,10 @@ from .utils import (
     AgentToolCallError,
     AgentToolExecutionError,
     is_valid_name,
+    iterate_in_thread,
     make_init_file,
     parse_code_blobs,
+    run_awaitable,
     truncate_content,
 )
 
@@ -186,6 +206,10 @@ class MultiStepAgent(ABC):
         description (`str`, *optional*): Necessary for a managed agent only - the description of this agent.
         provide_run_summary (`bool`, *optional*): Whether to provide a run summary when called as a managed agent.
         final_answer_checks (`list`, *optional*): List of Callables to run before returning a final answer for checking validity.
+        memory_compaction ([`MemoryCompaction`], *optional*): Policy compacting the memory before a step when it exceeds a token budget.
+        stable_prompt_prefix (`bool`, default `False`): Whether to keep the prefix of the model inputs byte-identical
+            across calls and runs, so that providers can reuse their prompt cache: tools and managed agents are
+            listed sorted by name, and the rendered system prompt is reused for as long as its text is unchanged.
     """
 
     def __init__(
@@ -205,6 +229,8 @@ class MultiStepAgent(ABC):
         provide_run_summary: bool = False,
         final_answer_checks: list[Callable] | None = None,
         logger: AgentLogger | None = None,
+        memory_compaction: MemoryCompaction | None = None,
+        stable_prompt_prefix: bool = False,
     ):
         self.agent_name = self.__class__.__name__
         self.model = model
@@ -230,14 +256,17 @@ class MultiStepAgent(ABC):
         self.description = description
         self.provide_run_summary = provide_run_summary
         self.final_answer_checks = final_answer_checks
+        self.stable_prompt_prefix = stable_prompt_prefix
 
         self._setup_managed_agents(managed_agents)
         self._setup_tools(tools, add_base_tools)
         self._validate_tools_and_managed_agents(tools, managed_agents)
+        if self.stable_prompt_prefix:
+            self._sort_tools_and_managed_agents()
 
         self.system_prompt = self.initialize_system_prompt()
         self.task: str | None = None
-        self.memory = AgentMemory(self.system_prompt)
+        self.memory = AgentMemory(self.system_prompt, compaction=memory_compaction)
 
         if logger is None:
             self.logger = AgentLogger(level=verbosity_level)
@@ -276,6 +305,11 @@ class MultiStepAgent(ABC):
             )
         self.tools.setdefault("final_answer", FinalAnswerTool())
 
+    def _sort_tools_and_managed_agents(self) -> None:
+        """Sort the tools and managed agents by name, so that the prompts list them in a canonical order."""
+        self.tools = dict(sorted(self.tools.items()))
+        self.managed_agents = dict(sorted(self.managed_agents.items()))
+
     def _validate_tools_and_managed_agents(self, tools, managed_agents):
         tool_and_managed_agent_names = [tool.name for tool in tools]
         if managed_agents is not None:
@@ -318,6 +352,80 @@ class MultiStepAgent(ABC):
         ```
         """
         max_steps = max_steps or self.max_steps
+        self._setup_run(task, reset=reset, images=images, additional_args=additional_args)
+        if stream:
+            # The steps are returned as they are executed through a generator to iterate on.
+            return self._run_stream(task=self.task, max_steps=max_steps, images=images)
+        # Outputs are returned only at the end. We only look at the last step.
+        return list(self._run_stream(task=self.task, max_steps=max_steps, images=images))[-1].final_answer
+
+    async def arun(
+        self,
+        task: str,
+        reset: bool = True,
+        images: list["PIL.Image.Image"] | None = None,
+        additional_args: dict | None = None,
+        max_steps: int | None = None,
+    ) -> Any:
+        """
+        Asynchronous version of [`~MultiStepAgent.run`], returning the final answer.
+
+        The model is called with `Model.agenerate` and the tools with an `async def forward` are awaited, so that a
+        single event loop can drive many runs concurrently, as long as each of them uses its own agent. Synchronous tools
+        and code actions run in worker threads.
+
+        Args:
+            task (`str`): Task to perform.
+            reset (`bool`): Whether to reset the conversation or keep it going from previous run.
+            images (`list[PIL.Image.Image]`, *optional*): Image(s) objects.
+            additional_args (`dict`, *optional*): Any other variables that you want to pass to the agent run, for instance images or dataframes. Give them clear names!
+            max_steps (`int`, *optional*): Maximum number of steps the agent can take to solve the task. if not provided, will use the agent's default value.
+
+        Example:
+        ```py
+        import asyncio
+        from smolagents import CodeAgent
+        agent = CodeAgent(tools=[])
+        asyncio.run(agent.arun("What is the result of 2 power 3.7384?"))
+        ```
+        """
+        async for step in self.astream(
+            task, reset=reset, images=images, additional_args=additional_args, max_steps=max_steps
+        ):
+            pass
+        return step.final_answer
+
+    async def astream(
+        self,
+        task: str,
+        reset: bool = True,
+        images: list["PIL.Image.Image"] | None = None,
+        additional_args: dict | None = None,
+        max_steps: int | None = None,
+    ) -> AsyncGenerator[ActionStep | PlanningStep | FinalAnswerStep | ChatMessageStreamDelta]:
+        """
+        Asynchronous version of [`~MultiStepAgent.run`] in streaming mode: runs the agent for the given task, yielding
+        each step as it is executed, and the final answer in a last [`FinalAnswerStep`].
+
+        Args:
+            task (`str`): Task to perform.
+            reset (`bool`): Whether to reset the conversation or keep it going from previous run.
+            images (`list[PIL.Image.Image]`, *optional*): Image(s) objects.
+            additional_args (`dict`, *optional*): Any other variables that you want to pass to the agent run, for instance images or dataframes. Give them clear names!
+            max_steps (`int`, *optional*): Maximum number of steps the agent can take to solve the task. if not provided, will use the agent's default value.
+        """
+        max_steps = max_steps or self.max_steps
+        self._setup_run(task, reset=reset, images=images, additional_args=additional_args)
+        async for element in self._arun_stream(task=self.task, max_steps=max_steps, images=images):
+            yield element
+
+    def _setup_run(
+        self,
+        task: str,
+        reset: bool,
+        images: list["PIL.Image.Image"] | None,
+        additional_args: dict | None,
+    ) -> None:
         self.task = task
         self.interrupt_switch = False
         if additional_args is not None:
@@ -326,8 +434,13 @@ class MultiStepAgent(ABC):
 You have been provided with these additional arguments, that you can access using the keys as variables in your python code:
 {str(additional_args)}."""
 
-        self.system_prompt = self.initialize_system_prompt()
-        self.memory.system_prompt = SystemPromptStep(system_prompt=self.system_prompt)
+        if self.stable_prompt_prefix:
+            # Tools may have been added since the last run
+            self._sort_tools_and_managed_agents()
+        system_prompt = self.initialize_system_prompt()
+        if not (self.stable_prompt_prefix and system_prompt == self.memory.system_prompt.system_prompt):
+            self.system_prompt = system_prompt
+            self.memory.system_prompt = SystemPromptStep(system_prompt=self.system_prompt)
         if reset:
             self.memory.reset()
             self.monitor.reset()
@@ -344,24 +457,17 @@ You have been provided with these additional arguments, that you can access usin
             self.python_executor.send_variables(variables=self.state)
             self.python_executor.send_tools({**self.tools, **self.managed_agents})
 
-        if stream:
-            # The steps are returned as they are executed through a generator to iterate on.
-            return self._run_stream(task=self.task, max_steps=max_steps, images=images)
-        # Outputs are returned only at the end. We only look at the last step.
-        return list(self._run_stream(task=self.task, max_steps=max_steps, images=images))[-1].final_answer
-
     def _run_stream(
         self, task: str, max_steps: int, images: list["PIL.Image.Image"] | None = None
     ) -> Generator[ActionStep | PlanningStep | FinalAnswerStep]:
+        # The bookkeeping of the steps is shared with `_arun_stream`: only the calls to the model and tools differ
         final_answer = None
         self.step_number = 1
         while final_answer is None and self.step_number <= max_steps:
-            if self.interrupt_switch:
-                raise AgentError("Agent interrupted.", self.logger)
-            step_start_time = time.time()
-            if self.planning_interval is not None and (
-                self.step_number == 1 or (self.step_number - 1) % self.planning_interval == 0
-            ):
+            step_start_time = self._start_step()
+            if self.memory.compaction is not None:
+                self._log_memory_compaction(self.memory.compaction.compact(self.memory, self.model))
+            if self._is_planning_step():
                 for element in self._generate_planning_step(
                     task, is_first_step=(self.step_number == 1), step=self.step_number
                 ):
@@ -374,19 +480,14 @@ You have been provided with these additional arguments, that you can access usin
                 for el in self._execute_step(action_step):
                     yield el
                 final_answer = el
-            except AgentGenerationError as e:
-                # Agent generation errors are not caused by a Model error but an implementation error: so we should raise them and exit.
-                raise e
             except AgentError as e:
-                # Other AgentError types are caused by the Model, so we should log them and iterate.
-                action_step.error = e
+                self._handle_step_error(action_step, e)
             finally:
-                self._finalize_step(action_step, step_start_time)
-                self.memory.steps.append(action_step)
+                self._end_step(action_step, step_start_time)
                 yield action_step
                 self.step_number += 1
 
-        if final_answer is None and self.step_number == max_steps + 1:
+        if self._is_max_steps_reached(final_answer, max_steps):
             final_answer = self._handle_max_steps_reached(task, images, step_start_time)
             yield action_step
         yield FinalAnswerStep(handle_agent_output_types(final_answer))
@@ -397,9 +498,88 @@ You have been provided with these additional arguments, that you can access usin
         for el in self._step_stream(memory_step):
             final_answer = el
             yield el
+        self._check_final_answer(final_answer)
+        yield final_answer
+
+    async def _arun_stream(
+        self, task: str, max_steps: int, images: list["PIL.Image.Image"] | None = None
+    ) -> AsyncGenerator[ActionStep | PlanningStep | FinalAnswerStep]:
+        final_answer = None
+        self.step_number = 1
+        while final_answer is None and self.step_number <= max_steps:
+            step_start_time = self._start_step()
+            if self.memory.compaction is not None:
+                self._log_memory_compaction(await self.memory.compaction.acompact(self.memory, self.model))
+            if self._is_planning_step():
+                async for element in self._agenerate_planning_step(
+                    task, is_first_step=(self.step_number == 1), step=self.step_number
+                ):
+                    yield element
+                self.memory.steps.append(element)
+            action_step = ActionStep(
+                step_number=self.step_number, start_time=step_start_time, observations_images=images
+            )
+            try:
+                async for el in self._aexecute_step(action_step):
+                    yield el
+                final_answer = el
+            except AgentError as e:
+                self._handle_step_error(action_step, e)
+            finally:
+                self._end_step(action_step, step_start_time)
+                yield action_step
+                self.step_number += 1
+
+        if self._is_max_steps_reached(final_answer, max_steps):
+            final_answer = await self.aprovide_final_answer(task, images)
+            self._record_max_steps_reached(final_answer, step_start_time)
+            yield action_step
+        yield FinalAnswerStep(handle_agent_output_types(final_answer))
+
+    async def _aexecute_step(self, memory_step: ActionStep) -> AsyncGenerator[Any]:
+        self.logger.log_rule(f"Step {self.step_number}", level=LogLevel.INFO)
+        final_answer = None
+        async for el in self._astep_stream(memory_step):
+            final_answer = el
+            yield el
+        self._check_final_answer(final_answer)
+        yield final_answer
+
+    def _start_step(self) -> float:
+        """Check that the run was not interrupted, and return the start time of the step."""
+        if self.interrupt_switch:
+            raise AgentError("Agent interrupted.", self.logger)
+        return time.time()
+
+    def _is_planning_step(self) -> bool:
+        return self.planning_interval is not None and (
+            self.step_number == 1 or (self.step_number - 1) % self.planning_interval == 0
+        )
+
+    def _handle_step_error(self, action_step: ActionStep, error: AgentError) -> None:
+        if isinstance(error, AgentGenerationError):
+            # Agent generation errors are not caused by a Model error but an implementation error: so we should raise them and exit.
+            raise error
+        # Other AgentError types are caused by the Model, so we should log them and iterate.
+        action_step.error = error
+
+    def _end_step(self, action_step: ActionStep, step_start_time: float) -> None:
+        self._finalize_step(action_step, step_start_time)
+        self.memory.steps.append(action_step)
+
+    def _check_final_answer(self, final_answer: Any) -> None:
         if final_answer is not None and self.final_answer_checks:
             self._validate_final_answer(final_answer)
-        yield final_answer
+
+    def _is_max_steps_reached(self, final_answer: Any, max_steps: int) -> bool:
+        return final_answer is None and self.step_number == max_steps + 1
+
+    def _log_memory_compaction(self, token_counts: tuple[int, int] | None) -> None:
+        if token_counts is not None:
+            self.logger.log(
+                f"[bold]Compacted the memory from {token_counts[0]:,} to {token_counts[1]:,} tokens.",
+                level=LogLevel.INFO,
+            )
 
     def _validate_final_answer(self, final_answer: Any):
         for check_function in self.final_answer_checks:
@@ -419,6 +599,10 @@ You have been provided with these additional arguments, that you can access usin
 
     def _handle_max_steps_reached(self, task: str, images: list["PIL.Image.Image"], step_start_time: float) -> Any:
         final_answer = self.provide_final_answer(task, images)
+        self._record_max_steps_reached(final_answer, step_start_time)
+        return final_answer
+
+    def _record_max_steps_reached(self, final_answer: Any, step_start_time: float) -> None:
         final_memory_step = ActionStep(
             step_number=self.step_number, error=AgentMaxStepsError("Reached max steps.", self.logger)
         )
@@ -430,13 +614,36 @@ You have been provided with these additional arguments, that you can access usin
             callback(final_memory_step) if len(inspect.signature(callback).parameters) == 1 else callback(
                 final_memory_step, agent=self
             )
-        return final_answer
 
     def _generate_planning_step(
         self, task, is_first_step: bool, step: int
     ) -> Generator[ChatMessageStreamDelta, PlanningStep]:
+        input_messages = self._planning_input_messages(task, is_first_step, step)
+        if self.stream_outputs and hasattr(self.model, "generate_stream"):
+            plan_message = ChatMessage(role=MessageRole.ASSISTANT, content="")
+            for completion_delta in self.model.generate_stream(input_messages, stop_sequences=["<end_plan>"]):  # type: ignore
+                add_stream_delta(plan_message, completion_delta)
+                yield completion_delta
+        else:
+            plan_message = self.model.generate(input_messages, stop_sequences=["<end_plan>"])
+        yield self._planning_step(input_messages, plan_message, is_first_step)
+
+    async def _agenerate_planning_step(
+        self, task, is_first_step: bool, step: int
+    ) -> AsyncGenerator[ChatMessageStreamDelta | PlanningStep]:
+        input_messages = self._planning_input_messages(task, is_first_step, step)
+        if self.stream_outputs and hasattr(self.model, "generate_stream"):
+            plan_message = ChatMessage(role=MessageRole.ASSISTANT, content="")
+            async for completion_delta in self.model.agenerate_stream(input_messages, stop_sequences=["<end_plan>"]):
+                add_stream_delta(plan_message, completion_delta)
+                yield completion_delta
+        else:
+            plan_message = await self.model.agenerate(input_messages, stop_sequences=["<end_plan>"])
+        yield self._planning_step(input_messages, plan_message, is_first_step)
+
+    def _planning_input_messages(self, task, is_first_step: bool, step: int) -> list[Message]:
         if is_first_step:
-            input_messages = [
+            return [
                 {
                     "role": MessageRole.USER,
                     "content": [
@@ -450,65 +657,59 @@ You have been provided with these additional arguments, that you can access usin
                     ],
                 }
             ]
-            if self.stream_outputs and hasattr(self.model, "generate_stream"):
-                plan_message_content = ""
-                for completion_delta in self.model.generate_stream(input_messages, stop_sequences=["<end_plan>"]):  # type: ignore
-                    plan_message_content += completion_delta.content
-                    yield completion_delta
-            else:
-                plan_message_content = self.model.generate(input_messages, stop_sequences=["<end_plan>"]).content
+        # Summary mode removes the system prompt and previous planning messages output by the model.
+        # Removing previous planning messages avoids influencing too much the new plan.
+        memory_messages = self.write_memory_to_messages(summary_mode=True)
+        plan_update_pre = {
+            "role": MessageRole.SYSTEM,
+            "content": [
+                {
+                    "type": "text",
+                    "text": populate_template(
+                        self.prompt_templates["planning"]["update_plan_pre_messages"], variables={"task": task}
+                    ),
+                }
+            ],
+        }
+        plan_update_post = {
+            "role": MessageRole.USER,
+            "content": [
+                {
+                    "type": "text",
+                    "text": populate_template(
+                        self.prompt_templates["planning"]["update_plan_post_messages"],
+                        variables={
+                            "task": task,
+                            "tools": self.tools,
+                            "managed_agents": self.managed_agents,
+                            "remaining_steps": (self.max_steps - step),
+                        },
+                    ),
+                }
+            ],
+        }
+        return [plan_update_pre] + memory_messages + [plan_update_post]
+
+    def _planning_step(
+        self, input_messages: list[Message], plan_message: ChatMessage, is_first_step: bool
+    ) -> PlanningStep:
+        plan_message_content = plan_message.content
+        if is_first_step:
             plan = textwrap.dedent(
                 f"""Here are the facts I know and the plan of action that I will follow to solve the task:\n```\n{plan_message_content}\n```"""
             )
         else:
-            # Summary mode removes the system prompt and previous planning messages output by the model.
-            # Removing previous planning messages avoids influencing too much the new plan.
-            memory_messages = self.write_memory_to_messages(summary_mode=True)
-            plan_update_pre = {
-                "role": MessageRole.SYSTEM,
-                "content": [
-                    {
-                        "type": "text",
-                        "text": populate_template(
-                            self.prompt_templates["planning"]["update_plan_pre_messages"], variables={"task": task}
-                        ),
-                    }
-                ],
-            }
-            plan_update_post = {
-                "role": MessageRole.USER,
-                "content": [
-                    {
-                        "type": "text",
-                        "text": populate_template(
-                            self.prompt_templates["planning"]["update_plan_post_messages"],
-                            variables={
-                                "task": task,
-                                "tools": self.tools,
-                                "managed_agents": self.managed_agents,
-                                "remaining_steps": (self.max_steps - step),
-                            },
-                        ),
-                    }
-                ],
-            }
-            input_messages = [plan_update_pre] + memory_messages + [plan_update_post]
-            if self.stream_outputs and hasattr(self.model, "generate_stream"):
-                plan_message_content = ""
-                for completion_delta in self.model.generate_stream(input_messages, stop_sequences=["<end_plan>"]):  # type: ignore
-                    plan_message_content += completion_delta.content
-                    yield completion_delta
-            else:
-                plan_message_content = self.model.generate(input_messages, stop_sequences=["<end_plan>"]).content
             plan = textwrap.dedent(
                 f"""I still need to solve the task I was given:\n```\n{self.task}\n```\n\nHere are the facts I know and my new/updated plan of action to solve the task:\n```\n{plan_message_content}\n```"""
             )
         log_headline = "Initial plan" if is_first_step else "Updated plan"
         self.logger.log(Rule(f"[bold]{log_headline}", style="orange"), Text(plan), level=LogLevel.INFO)
-        yield PlanningStep(
+        return PlanningStep(
             model_input_messages=input_messages,
             plan=plan,
-            model_output_message=ChatMessage(role=MessageRole.ASSISTANT, content=plan_message_content),
+            model_output_message=ChatMessage(
+                role=MessageRole.ASSISTANT, content=plan_message_content, token_usage=plan_message.token_usage
+            ),
         )
 
     @property
@@ -536,10 +737,7 @@ You have been provided with these additional arguments, that you can access usin
         that can be used as input to the LLM. Adds a number of keywords (such as PLAN, error, etc) to help
         the LLM.
         """
-        messages = self.memory.system_prompt.to_messages(summary_mode=summary_mode)
-        for memory_step in self.memory.steps:
-            messages.extend(memory_step.to_messages(summary_mode=summary_mode))
-        return messages
+        return self.memory.to_messages(summary_mode=bool(summary_mode))
 
     def _step_stream(self, memory_step: ActionStep) -> Generator[Any]:
         """
@@ -548,6 +746,14 @@ You have been provided with these additional arguments, that you can access usin
         """
         raise NotImplementedError("This method should be implemented in child classes")
 
+    async def _astep_stream(self, memory_step: ActionStep) -> AsyncGenerator[Any]:
+        """
+        Asynchronous version of `_step_stream`. By default, `_step_stream` runs in a worker thread, for agents that do
+        not implement it.
+        """
+        async for element in iterate_in_thread(self._step_stream(memory_step)):
+            yield element
+
     def step(self, memory_step: ActionStep) -> Any:
         """
         Perform one step in the ReAct framework: the agent thinks, acts, and observes the result.
@@ -587,6 +793,23 @@ You have been provided with these additional arguments, that you can access usin
         Returns:
             `str`: Final answer to the task.
         """
+        messages = self._final_answer_messages(task, images)
+        try:
+            chat_message: ChatMessage = self.model(messages)
+            return chat_message.content
+        except Exception as e:
+            return f"Error in generating final LLM output:\n{e}"
+
+    async def aprovide_final_answer(self, task: str, images: list["PIL.Image.Image"] | None = None) -> str:
+        """Asynchronous version of [`~MultiStepAgent.provide_final_answer`]."""
+        messages = self._final_answer_messages(task, images)
+        try:
+            chat_message: ChatMessage = await self.model.agenerate(messages)
+            return chat_message.content
+        except Exception as e:
+            return f"Error in generating final LLM output:\n{e}"
+
+    def _final_answer_messages(self, task: str, images: list["PIL.Image.Image"] | None) -> list[Message]:
         messages = [
             {
                 "role": MessageRole.SYSTEM,
@@ -614,11 +837,7 @@ You have been provided with these additional arguments, that you can access usin
                 ],
             }
         ]
-        try:
-            chat_message: ChatMessage = self.model(messages)
-            return chat_message.content
-        except Exception as e:
-            return f"Error in generating final LLM output:\n{e}"
+        return messages
 
     def visualize(self):
         """Creates a rich tree visualization of the agent's structure."""
@@ -809,6 +1028,7 @@ You have been provided with these additional arguments, that you can access usin
             "planning_interval": self.planning_interval,
             "name": self.name,
             "description": self.description,
+            "stable_prompt_prefix": self.stable_prompt_prefix,
             "requirements": sorted(requirements),
         }
         return agent_dict
@@ -848,6 +1068,7 @@ You have been provided with these additional arguments, that you can access usin
             "planning_interval": agent_dict.get("planning_interval"),
             "name": agent_dict.get("name"),
             "description": agent_dict.get("description"),
+            "stable_prompt_prefix": agent_dict.get("stable_prompt_prefix"),
         }
         # Filter out None values to use defaults from __init__
         agent_args = {k: v for k, v in agent_args.items() if v is not None}
@@ -1006,6 +1227,10 @@ class ToolCallingAgent(MultiStepAgent):
         model (`Callable[[list[dict[str, str]]], ChatMessage]`): Model that will generate the agent's actions.
         prompt_templates ([`~agents.PromptTemplates`], *optional*): Prompt templates.
         planning_interval (`int`, *optional*): Interval at which the agent will run a planning step.
+        max_tool_threads (`int`, *optional*): Maximum number of threads running the tool calls of a step concurrently,
+            when the model returns several calls to tools flagged as `side_effect_free`. Defaults to the default number
+            of workers of a `ThreadPoolExecutor`. Set it to 1 to run the tool calls one after the other. Calls to
+            managed agents and to the other tools always run one after the other.
         **kwargs: Additional keyword arguments.
     """
 
@@ -1015,8 +1240,11 @@ class ToolCallingAgent(MultiStepAgent):
         model: Callable[[list[dict[str, str]]], ChatMessage],
         prompt_templates: PromptTemplates | None = None,
         planning_interval: int | None = None,
+        max_tool_threads: int | None = None,
         **kwargs,
     ):
+        if max_tool_threads is not None and max_tool_threads < 1:
+            raise ValueError(f"max_tool_threads must be at least 1, got {max_tool_threads}")
         prompt_templates = prompt_templates or yaml.safe_load(
             importlib.resources.files("smolagents.prompts").joinpath("toolcalling_agent.yaml").read_text()
         )
@@ -1027,6 +1255,7 @@ class ToolCallingAgent(MultiStepAgent):
             planning_interval=planning_interval,
             **kwargs,
         )
+        self.max_tool_threads = max_tool_threads
 
     def initialize_system_prompt(self) -> str:
         system_prompt = populate_template(
@@ -1035,6 +1264,32 @@ class ToolCallingAgent(MultiStepAgent):
         )
         return system_prompt
 
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the agent to a dictionary representation.
+
+        Returns:
+            `dict`: Dictionary representation of the agent.
+        """
+        agent_dict = super().to_dict()
+        agent_dict["max_tool_threads"] = self.max_tool_threads
+        return agent_dict
+
+    @classmethod
+    def from_dict(cls, agent_dict: dict[str, Any], **kwargs) -> "ToolCallingAgent":
+        """Create ToolCallingAgent from a dictionary representation.
+
+        Args:
+            agent_dict (`dict[str, Any]`): Dictionary representation of the agent.
+            **kwargs: Additional keyword arguments that will override agent_dict values.
+
+        Returns:
+            `ToolCallingAgent`: Instance of the ToolCallingAgent class.
+        """
+        tool_calling_agent_kwargs = {"max_tool_threads": agent_dict.get("max_tool_threads")}
+        tool_calling_agent_kwargs = {k: v for k, v in tool_calling_agent_kwargs.items() if v is not None}
+        tool_calling_agent_kwargs.update(kwargs)
+        return super().from_dict(agent_dict, **tool_calling_agent_kwargs)
+
     def _step_stream(self, memory_step: ActionStep) -> Generator[Any]:
         """
         Perform one step in the ReAct framework: the agent thinks, acts, and observes the result.
@@ -1053,19 +1308,46 @@ class ToolCallingAgent(MultiStepAgent):
                 stop_sequences=["Observation:", "Calling tools:"],
                 tools_to_call_from=list(self.tools.values()),
             )
-            memory_step.model_output_message = chat_message
-            model_output = chat_message.content
-            self.logger.log_markdown(
-                content=model_output if model_output else str(chat_message.raw),
-                title="Output message of the LLM:",
-                level=LogLevel.DEBUG,
-            )
+            self._record_model_output(memory_step, chat_message)
+        except Exception as e:
+            raise AgentGenerationError(f"Error while generating output:\n{e}", self.logger) from e
 
-            memory_step.model_output_message.content = model_output
-            memory_step.model_output = model_output
+        tool_calls = self._parse_tool_calls(memory_step, chat_message)
+        other_calls = [tool_call for tool_call in tool_calls if tool_call.name != "final_answer"]
+        outcomes = self.execute_tool_calls(other_calls) if other_calls else []
+        yield self._process_tool_outcomes(memory_step, tool_calls, outcomes)
+
+    async def _astep_stream(self, memory_step: ActionStep) -> AsyncGenerator[Any]:
+        memory_step.model_input_messages = self.write_memory_to_messages()
+        try:
+            chat_message: ChatMessage = await self.model.agenerate(
+                memory_step.model_input_messages,
+                stop_sequences=["Observation:", "Calling tools:"],
+                tools_to_call_from=list(self.tools.values()),
+            )
+            self._record_model_output(memory_step, chat_message)
         except Exception as e:
             raise AgentGenerationError(f"Error while generating output:\n{e}", self.logger) from e
 
+        tool_calls = self._parse_tool_calls(memory_step, chat_message)
+        other_calls = [tool_call for tool_call in tool_calls if tool_call.name != "final_answer"]
+        outcomes = await self.aexecute_tool_calls(other_calls) if other_calls else []
+        yield self._process_tool_outcomes(memory_step, tool_calls, outcomes)
+
+    def _record_model_output(self, memory_step: ActionStep, chat_message: ChatMessage) -> None:
+        memory_step.model_output_message = chat_message
+        model_output = chat_message.content
+        self.logger.log_markdown(
+            content=model_output if model_output else str(chat_message.raw),
+            title="Output message of the LLM:",
+            level=LogLevel.DEBUG,
+        )
+
+        memory_step.model_output_message.content = model_output
+        memory_step.model_output = model_output
+
+    def _parse_tool_calls(self, memory_step: ActionStep, chat_message: ChatMessage) -> list[ToolCall]:
+        """Return the tool calls of a model output, recording them in the memory step."""
         if chat_message.tool_calls is None or len(chat_message.tool_calls) == 0:
             try:
                 chat_message = self.model.parse_tool_calls(chat_message)
@@ -1074,64 +1356,164 @@ class ToolCallingAgent(MultiStepAgent):
         else:
             for tool_call in chat_message.tool_calls:
                 tool_call.function.arguments = parse_json_if_needed(tool_call.function.arguments)
-        tool_call = chat_message.tool_calls[0]  # type: ignore
-        tool_name, tool_call_id = tool_call.function.name, tool_call.id
-        tool_arguments = tool_call.function.arguments
-        memory_step.model_output = str(f"Called Tool: '{tool_name}' with arguments: {tool_arguments}")
-        memory_step.tool_calls = [ToolCall(name=tool_name, arguments=tool_arguments, id=tool_call_id)]
+        tool_calls = [
+            ToolCall(name=tool_call.function.name, arguments=tool_call.function.arguments, id=tool_call.id)
+            for tool_call in chat_message.tool_calls  # type: ignore
+        ]
+        memory_step.model_output = "\n".join(
+            f"Called Tool: '{tool_call.name}' with arguments: {tool_call.arguments}" for tool_call in tool_calls
+        )
+        memory_step.tool_calls = tool_calls
+        final_answer_calls = [tool_call for tool_call in tool_calls if tool_call.name == "final_answer"]
+        if len(final_answer_calls) > 1:
+            raise AgentToolCallError(
+                f"The final_answer tool was called {len(final_answer_calls)} times in the same step: call it only once.",
+                self.logger,
+            )
 
         # Execute
-        self.logger.log(
-            Panel(Text(f"Calling tool: '{tool_name}' with arguments: {tool_arguments}")),
-            level=LogLevel.INFO,
-        )
-        if tool_name == "final_answer":
-            if isinstance(tool_arguments, dict):
-                if "answer" in tool_arguments:
-                    answer = tool_arguments["answer"]
-                else:
-                    answer = tool_arguments
+        for tool_call in tool_calls:
+            self.logger.log(
+                Panel(Text(f"Calling tool: '{tool_call.name}' with arguments: {tool_call.arguments}")),
+                level=LogLevel.INFO,
+            )
+        return tool_calls
+
+    def _process_tool_outcomes(
+        self, memory_step: ActionStep, tool_calls: list[ToolCall], outcomes: list[tuple[bool, Any]]
+    ) -> Any:
+        """
+        Record the observations of the executed tool calls in the memory step, raising the first error if any, then
+        return the final answer if the final_answer tool was called, else None.
+        """
+        other_calls = [tool_call for tool_call in tool_calls if tool_call.name != "final_answer"]
+        observations, first_error = [], None
+        for tool_call, (succeeded, outcome) in zip(other_calls, outcomes):
+            if not succeeded:
+                if first_error is None:
+                    first_error = outcome
+                    if len(tool_calls) > 1:
+                        # As for the observations, name the failed call among the others
+                        first_error.message = f"Call id: {tool_call.id}\n{first_error.message}"
+                        first_error.args = (first_error.message,)
+                continue
+            updated_information = self._store_observation(outcome)
+            self.logger.log(
+                f"Observations: {updated_information.replace('[', '|')}",  # escape potential rich-tag-like components
+                level=LogLevel.INFO,
+            )
+            # With several tool calls, each observation is labelled with the id of its call
+            if len(tool_calls) > 1:
+                updated_information = f"Call id: {tool_call.id}\n{updated_information}"
+            observations.append(updated_information)
+        if observations:
+            memory_step.observations = "\n\n".join(observations)
+        if first_error is not None:
+            raise first_error
+
+        final_answer_calls = [tool_call for tool_call in tool_calls if tool_call.name == "final_answer"]
+        if not final_answer_calls:
+            return None
+        # The final answer is computed once the other calls are done, since it may refer to their outputs
+        final_answer = self._get_final_answer(final_answer_calls[0].arguments)
+        memory_step.action_output = final_answer
+        return final_answer
+
+    def _runs_concurrently(self, tool_call: ToolCall) -> bool:
+        """
+        Whether a tool call may run concurrently with the other calls of its step: only calls to tools flagged as
+        `side_effect_free` do, since a managed agent or another tool may not support concurrent calls.
+        """
+        return getattr(self.tools.get(tool_call.name), "side_effect_free", False)
+
+    def execute_tool_calls(self, tool_calls: list[ToolCall]) -> list[tuple[bool, Any]]:
+        """
+        Execute tool calls, those to tools flagged as `side_effect_free` concurrently in a pool of at most
+        `max_tool_threads` threads, while the others run one after the other.
+
+        Args:
+            tool_calls (`list[ToolCall]`): The tool calls to execute.
+
+        Returns:
+            `list[tuple[bool, Any]]`: For each tool call in order, whether it succeeded, with its output if it did or
+            the `AgentError` it raised otherwise. All the calls are executed even if some of them fail.
+        """
+
+        def execute(tool_call: ToolCall) -> tuple[bool, Any]:
+            try:
+                return True, self.execute_tool_call(tool_call.name, tool_call.arguments or {})
+            except AgentError as e:
+                return False, e
+
+        concurrent_indices = [
+            index for index, tool_call in enumerate(tool_calls) if self._runs_concurrently(tool_call)
+        ]
+        if len(concurrent_indices) < 2 or self.max_tool_threads == 1:
+            return [execute(tool_call) for tool_call in tool_calls]
+        with ThreadPoolExecutor(max_workers=self.max_tool_threads) as pool:
+            futures = {
+                index: pool.submit(copy_context().run, execute, tool_calls[index]) for index in concurrent_indices
+            }
+            # The other calls run one after the other in the meantime
+            outcomes = [None if index in futures else execute(tool_call) for index, tool_call in enumerate(tool_calls)]
+            return [futures[index].result() if index in futures else outcome for index, outcome in enumerate(outcomes)]
+
+    async def aexecute_tool_calls(self, tool_calls: list[ToolCall]) -> list[tuple[bool, Any]]:
+        """
+        Asynchronous version of [`~ToolCallingAgent.execute_tool_calls`]: the calls to tools flagged as
+        `side_effect_free` are executed concurrently, at most `max_tool_threads` at a time if it is set, while the
+        others are executed one after the other.
+        """
+        semaphore = asyncio.Semaphore(self.max_tool_threads or len(tool_calls))
+        lock = asyncio.Lock()
+
+        async def execute(tool_call: ToolCall) -> tuple[bool, Any]:
+            async with semaphore if self._runs_concurrently(tool_call) else lock:
+                try:
+                    return True, await self.aexecute_tool_call(tool_call.name, tool_call.arguments or {})
+                except AgentError as e:
+                    return False, e
+
+        return list(await asyncio.gather(*(execute(tool_call) for tool_call in tool_calls)))
+
+    def _store_observation(self, observation: Any) -> str:
+        """Return the text of a tool output, storing it in the state first if it is an image or an audio."""
+        observation_type = type(observation)
+        if observation_type in [AgentImage, AgentAudio]:
+            if observation_type == AgentImage:
+                observation_name = "image.png"
+            elif observation_type == AgentAudio:
+                observation_name = "audio.mp3"
+            # TODO: observation naming could allow for different names of same type
+
+            self.state[observation_name] = observation
+            return f"Stored '{observation_name}' in memory."
+        return str(observation).strip()
+
+    def _get_final_answer(self, tool_arguments: Any) -> Any:
+        """Return the final answer given by the arguments of a call to the final_answer tool."""
+        if isinstance(tool_arguments, dict):
+            if "answer" in tool_arguments:
+                answer = tool_arguments["answer"]
             else:
                 answer = tool_arguments
-            if isinstance(answer, str) and answer in self.state.keys():
-                # if the answer is a state variable, return the value
-                # State variables are not JSON-serializable (AgentImage, AgentAudio) so can't be passed as arguments to execute_tool_call
-                final_answer = self.state[answer]
-                self.logger.log(
-                    f"[bold {YELLOW_HEX}]Final answer:[/bold {YELLOW_HEX}] Extracting key '{answer}' from state to return value '{final_answer}'.",
-                    level=LogLevel.INFO,
-                )
-            else:
-                final_answer = self.execute_tool_call("final_answer", {"answer": answer})
-                self.logger.log(
-                    Text(f"Final answer: {final_answer}", style=f"bold {YELLOW_HEX}"),
-                    level=LogLevel.INFO,
-                )
-
-            memory_step.action_output = final_answer
-            yield final_answer
         else:
-            if tool_arguments is None:
-                tool_arguments = {}
-            observation = self.execute_tool_call(tool_name, tool_arguments)
-            observation_type = type(observation)
-            if observation_type in [AgentImage, AgentAudio]:
-                if observation_type == AgentImage:
-                    observation_name = "image.png"
-                elif observation_type == AgentAudio:
-                    observation_name = "audio.mp3"
-                # TODO: observation naming could allow for different names of same type
-
-                self.state[observation_name] = observation
-                updated_information = f"Stored '{observation_name}' in memory."
-            else:
-                updated_information = str(observation).strip()
+            answer = tool_arguments
+        if isinstance(answer, str) and answer in self.state.keys():
+            # if the answer is a state variable, return the value
+            # State variables are not JSON-serializable (AgentImage, AgentAudio) so can't be passed as arguments to execute_tool_call
+            final_answer = self.state[answer]
             self.logger.log(
-                f"Observations: {updated_information.replace('[', '|')}",  # escape potential rich-tag-like components
+                f"[bold {YELLOW_HEX}]Final answer:[/bold {YELLOW_HEX}] Extracting key '{answer}' from state to return value '{final_answer}'.",
                 level=LogLevel.INFO,
             )
-            memory_step.observations = updated_information
-            yield None
+        else:
+            final_answer = self.execute_tool_call("final_answer", {"answer": answer})
+            self.logger.log(
+                Text(f"Final answer: {final_answer}", style=f"bold {YELLOW_HEX}"),
+                level=LogLevel.INFO,
+            )
+        return final_answer
 
     def _substitute_state_variables(self, arguments: dict[str, str] | str) -> dict[str, Any] | str:
         """Replace string values in arguments with their corresponding state values if they exist."""
@@ -1152,6 +1534,33 @@ class ToolCallingAgent(MultiStepAgent):
             tool_name (`str`): Name of the tool or managed agent to execute.
             arguments (dict[str, str] | str): Arguments passed to the tool call.
         """
+        tool, arguments, is_managed_agent = self._prepare_tool_call(tool_name, arguments)
+        try:
+            result = self._call_tool(tool, arguments, is_managed_agent)
+            # Tools with an `async def forward` return a coroutine
+            return run_awaitable(result) if inspect.isawaitable(result) else result
+        except Exception as e:
+            raise self._tool_call_error(e, tool_name, tool, arguments, is_managed_agent) from e
+
+    async def aexecute_tool_call(self, tool_name: str, arguments: dict[str, str] | str) -> Any:
+        """
+        Asynchronous version of [`~ToolCallingAgent.execute_tool_call`]: tools with an `async def forward` are awaited,
+        while other tools and managed agents run in a worker thread.
+        """
+        tool, arguments, is_managed_agent = self._prepare_tool_call(tool_name, arguments)
+        try:
+            if getattr(tool, "is_async", False):
+                result = self._call_tool(tool, arguments, is_managed_agent)
+            else:
+                result = await asyncio.to_thread(self._call_tool, tool, arguments, is_managed_agent)
+            return await result if inspect.isawaitable(result) else result
+        except Exception as e:
+            raise self._tool_call_error(e, tool_name, tool, arguments, is_managed_agent) from e
+
+    def _prepare_tool_call(
+        self, tool_name: str, arguments: dict[str, str] | str
+    ) -> tuple[Tool | MultiStepAgent, dict[str, Any] | str, bool]:
+        """Return the tool or managed agent to call, its arguments with state variables substituted, and whether it is a managed agent."""
         # Check if the tool exists
         available_tools = {**self.tools, **self.managed_agents}
         if tool_name not in available_tools:
@@ -1162,49 +1571,57 @@ class ToolCallingAgent(MultiStepAgent):
         # Get the tool and substitute state variables in arguments
         tool = available_tools[tool_name]
         arguments = self._substitute_state_variables(arguments)
-        is_managed_agent = tool_name in self.managed_agents
+        return tool, arguments, tool_name in self.managed_agents
 
-        try:
-            # Call tool with appropriate arguments
-            if isinstance(arguments, dict):
-                return tool(**arguments) if is_managed_agent else tool(**arguments, sanitize_inputs_outputs=True)
-            elif isinstance(arguments, str):
-                return tool(arguments) if is_managed_agent else tool(arguments, sanitize_inputs_outputs=True)
-            else:
-                raise TypeError(f"Unsupported arguments type: {type(arguments)}")
+    @staticmethod
+    def _call_tool(tool: Tool | MultiStepAgent, arguments: dict[str, Any] | str, is_managed_agent: bool) -> Any:
+        # Call tool with appropriate arguments
+        if isinstance(arguments, dict):
+            return tool(**arguments) if is_managed_agent else tool(**arguments, sanitize_inputs_outputs=True)
+        elif isinstance(arguments, str):
+            return tool(arguments) if is_managed_agent else tool(arguments, sanitize_inputs_outputs=True)
+        raise TypeError(f"Unsupported arguments type: {type(arguments)}")
 
-        except TypeError as e:
+    def _tool_call_error(
+        self,
+        error: Exception,
+        tool_name: str,
+        tool: Tool | MultiStepAgent,
+        arguments: dict[str, Any] | str,
+        is_managed_agent: bool,
+    ) -> AgentError:
+        """Return the agent error to raise for an exception raised by a tool call."""
+        if isinstance(error, TypeError):
             # Handle invalid arguments
             description = getattr(tool, "description", "No description")
             if is_managed_agent:
                 error_msg = (
-                    f"Invalid request to team member '{tool_name}' with arguments {json.dumps(arguments)}: {e}\n"
+                    f"Invalid request to team member '{tool_name}' with arguments {json.dumps(arguments)}: {error}\n"
                     "You should call this team member with a valid request.\n"
                     f"Team member description: {description}"
                 )
             else:
                 error_msg = (
-                    f"Invalid call to tool '{tool_name}' with arguments {json.dumps(arguments)}: {e}\n"
+                    f"Invalid call to tool '{tool_name}' with arguments {json.dumps(arguments)}: {error}\n"
                     "You should call this tool with correct input arguments.\n"
                     f"Expected inputs: {json.dumps(tool.inputs)}\n"
                     f"Returns output type: {tool.output_type}\n"
                     f"Tool description: '{description}'"
                 )
-            raise AgentToolCallError(error_msg, self.logger) from e
+            return AgentToolCallError(error_msg, self.logger)
 
-        except Exception as e:
-            # Handle execution errors
-            if is_managed_agent:
-                error_msg = (
-                    f"Error executing request to team member '{tool_name}' with arguments {json.dumps(arguments)}: {e}\n"
-                    "Please try again or request to another team member"
-                )
-            else:
-                error_msg = (
-                    f"Error executing tool '{tool_name}' with arguments {json.dumps(arguments)}: {type(e).__name__}: {e}\n"
-                    "Please try again or use another tool"
-                )
-            raise AgentToolExecutionError(error_msg, self.logger) from e
+        # Handle execution errors
+        if is_managed_agent:
+            error_msg = (
+                f"Error executing request to team member '{tool_name}' with arguments {json.dumps(arguments)}: {error}\n"
+                "Please try again or request to another team member"
+            )
+        else:
+            error_msg = (
+                f"Error executing tool '{tool_name}' with arguments {json.dumps(arguments)}: {type(error).__name__}: {error}\n"
+                "Please try again or use another tool"
+            )
+        return AgentToolExecutionError(error_msg, self.logger)
 
 
 class CodeAgent(MultiStepAgent):
@@ -1218,10 +1635,12 @@ class CodeAgent(MultiStepAgent):
         grammar (`dict[str, str]`, *optional*): Grammar used to parse the LLM output.
         additional_authorized_imports (`list[str]`, *optional*): Additional authorized imports for the agent.
         planning_interval (`int`, *optional*): Interval at which the agent will run a planning step.
-        executor_type (`str`, default `"local"`): Which executor type to use between `"local"`, `"e2b"`, or `"docker"`.
+        executor_type (`str`, default `"local"`): Which executor type to use between `"local"`, `"process"`, `"e2b"`, or `"docker"`.
         executor_kwargs (`dict`, *optional*): Additional arguments to pass to initialize the executor.
         max_print_outputs_length (`int`, *optional*): Maximum length of the print outputs.
-        stream_outputs (`bool`, *optional*, default `False`): Whether to stream outputs during execution.
+        stream_outputs (`bool`, *optional*, default `False`): Whether to stream outputs during execution: the model
+            outputs as they are generated, as well as the execution logs as the code prints them with the `"local"`
+            executor, which are yielded as [`ExecutionLogsStreamDelta`] when running with `stream=True`.
         **kwargs: Additional keyword arguments.
     """
 
@@ -1281,6 +1700,11 @@ class CodeAgent(MultiStepAgent):
                     self.additional_authorized_imports,
                     **{"max_print_outputs_length": self.max_print_outputs_length} | self.executor_kwargs,
                 )
+            case "process":
+                return ProcessPythonExecutor(
+                    self.additional_authorized_imports,
+                    **{"max_print_outputs_length": self.max_print_outputs_length} | self.executor_kwargs,
+                )
             case _:  # if applicable
                 raise ValueError(f"Unsupported executor type: {self.executor_type}")
 
@@ -1317,42 +1741,86 @@ class CodeAgent(MultiStepAgent):
                     stop_sequences=["<end_code>", "Observation:", "Calling tools:"],
                     **additional_args,
                 )
-                output_text = ""
+                output_message = ChatMessage(role="assistant", content="")
                 with Live("", console=self.logger.console, vertical_overflow="visible") as live:
                     for event in output_stream:
+                        add_stream_delta(output_message, event)
                         if event.content is not None:
-                            output_text += event.content
-                            live.update(Markdown(output_text))
+                            live.update(Markdown(output_message.content))
                         yield event
 
-                model_output = output_text
-                chat_message = ChatMessage(role="assistant", content=model_output)
-                memory_step.model_output_message = chat_message
-                model_output = chat_message.content
+                memory_step.model_output_message = output_message
             else:
-                chat_message: ChatMessage = self.model.generate(
+                memory_step.model_output_message = self.model.generate(
                     input_messages,
                     stop_sequences=["<end_code>", "Observation:", "Calling tools:"],
                     **additional_args,
                 )
-                memory_step.model_output_message = chat_message
-                model_output = chat_message.content
                 self.logger.log_markdown(
-                    content=model_output,
+                    content=memory_step.model_output_message.content,
                     title="Output message of the LLM:",
                     level=LogLevel.DEBUG,
                 )
+            self._record_model_output(memory_step)
+        except Exception as e:
+            raise AgentGenerationError(f"Error in generating model output:\n{e}", self.logger) from e
+
+        yield from self._execute_model_output(memory_step)
 
-            # This adds <end_code> sequence to the history.
-            # This will nudge ulterior LLM calls to finish with <end_code>, thus efficiently stopping generation.
-            if model_output and model_output.strip().endswith("```"):
-                model_output += "<end_code>"
-                memory_step.model_output_message.content = model_output
+    async def _astep_stream(self, memory_step: ActionStep) -> AsyncGenerator[Any]:
+        memory_step.model_input_messages = self.write_memory_to_messages()
+        try:
+            additional_args = {"grammar": self.grammar} if self.grammar is not None else {}
+            if self.stream_outputs:
+                output_stream = self.model.agenerate_stream(
+                    memory_step.model_input_messages,
+                    stop_sequences=["<end_code>", "Observation:", "Calling tools:"],
+                    **additional_args,
+                )
+                output_message = ChatMessage(role="assistant", content="")
+                with Live("", console=self.logger.console, vertical_overflow="visible") as live:
+                    async for event in output_stream:
+                        add_stream_delta(output_message, event)
+                        if event.content is not None:
+                            live.update(Markdown(output_message.content))
+                        yield event
 
-            memory_step.model_output = model_output
+                memory_step.model_output_message = output_message
+            else:
+                memory_step.model_output_message = await self.model.agenerate(
+                    memory_step.model_input_messages,
+                    stop_sequences=["<end_code>", "Observation:", "Calling tools:"],
+                    **additional_args,
+                )
+                self.logger.log_markdown(
+                    content=memory_step.model_output_message.content,
+                    title="Output message of the LLM:",
+                    level=LogLevel.DEBUG,
+                )
+            self._record_model_output(memory_step)
         except Exception as e:
             raise AgentGenerationError(f"Error in generating model output:\n{e}", self.logger) from e
 
+        # The code action runs in a worker thread, where its synchronous tools do not block the event loop
+        async for element in iterate_in_thread(self._execute_model_output(memory_step)):
+            yield element
+
+    def _record_model_output(self, memory_step: ActionStep) -> None:
+        model_output = memory_step.model_output_message.content
+        # This adds <end_code> sequence to the history.
+        # This will nudge ulterior LLM calls to finish with <end_code>, thus efficiently stopping generation.
+        if model_output and model_output.strip().endswith("```"):
+            model_output += "<end_code>"
+            memory_step.model_output_message.content = model_output
+
+        memory_step.model_output = model_output
+
+    def _execute_model_output(self, memory_step: ActionStep) -> Generator[Any]:
+        """
+        Parse the code action of the model output and execute it, yielding its execution logs if they are streamed,
+        then either None if the step is not final, or the final answer.
+        """
+        model_output = memory_step.model_output
         ### Parse output ###
         try:
             code_action = fix_final_answer_code(parse_code_blobs(model_output))
@@ -1371,10 +1839,14 @@ class CodeAgent(MultiStepAgent):
         ### Execute action ###
         self.logger.log_code(title="Executing parsed code:", content=code_action, level=LogLevel.INFO)
         is_final_answer = False
+        stream_execution_logs = self.stream_outputs and isinstance(self.python_executor, LocalPythonExecutor)
         try:
-            output, execution_logs, is_final_answer = self.python_executor(code_action)
+            if stream_execution_logs:
+                output, execution_logs, is_final_answer = yield from self._stream_code_action(code_action)
+            else:
+                output, execution_logs, is_final_answer = self.python_executor(code_action)
             execution_outputs_console = []
-            if len(execution_logs) > 0:
+            if len(execution_logs) > 0 and not stream_execution_logs:
                 execution_outputs_console += [
                     Text("Execution logs:", style="bold"),
                     Text(execution_logs),
@@ -1389,7 +1861,8 @@ class CodeAgent(MultiStepAgent):
                         Text(execution_logs),
                     ]
                     memory_step.observations = "Execution logs:\n" + execution_logs
-                    self.logger.log(Group(*execution_outputs_console), level=LogLevel.INFO)
+                    if not stream_execution_logs:
+                        self.logger.log(Group(*execution_outputs_console), level=LogLevel.INFO)
             error_msg = str(e)
             if "Import of " in error_msg and " is not allowed" in error_msg:
                 self.logger.log(
@@ -1397,6 +1870,8 @@ class CodeAgent(MultiStepAgent):
                     level=LogLevel.INFO,
                 )
             raise AgentExecutionError(error_msg, self.logger)
+        finally:
+            memory_step.execution_profile = getattr(self.python_executor, "last_profile", None)
 
         truncated_output = truncate_content(str(output))
         observation += "Last output from code snippet:\n" + truncated_output
@@ -1412,6 +1887,22 @@ class CodeAgent(MultiStepAgent):
         memory_step.action_output = output
         yield output if is_final_answer else None
 
+    def _stream_code_action(
+        self, code_action: str
+    ) -> Generator[ExecutionLogsStreamDelta, None, tuple[Any, str, bool]]:
+        """Run a code action, displaying and yielding its execution logs while it runs, and return its results."""
+        execution_stream = self.python_executor.stream(code_action)
+        execution_logs = ""
+        with Live("", console=self.logger.console, vertical_overflow="visible") as live:
+            while True:
+                try:
+                    delta = next(execution_stream)
+                except StopIteration as result:
+                    return result.value
+                execution_logs += delta.content
+                live.update(Group(Text("Execution logs:", style="bold"), Text(execution_logs)))
+                yield delta
+
     def to_dict(self) -> dict[str, Any]:
         """Convert the agent to a dictionary representation.
 
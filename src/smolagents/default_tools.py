@@ -103,6 +103,7 @@ class DuckDuckGoSearchTool(Tool):
     description = """Performs a duckduckgo web search based on your query (think a Google search) then returns the top search results."""
     inputs = {"query": {"type": "string", "description": "The search query to perform."}}
     output_type = "string"
+    side_effect_free = True
 
     def __init__(self, max_results=10, **kwargs):
         super().__init__()
@@ -135,6 +136,7 @@ class GoogleSearchTool(Tool):
         },
     }
     output_type = "string"
+    side_effect_free = True
 
     def __init__(self, provider: str = "serpapi"):
         super().__init__()
@@ -215,6 +217,7 @@ class WebSearchTool(Tool):
     description = "Performs a web search for a query and returns a string of the top search results formatted as markdown with titles, links, and descriptions."
     inputs = {"query": {"type": "string", "description": "The search query to perform."}}
     output_type = "string"
+    side_effect_free = True
 
     def __init__(self, max_results: int = 10, engine: str = "duckduckgo"):
         super().__init__()
@@ -334,6 +337,7 @@ class VisitWebpageTool(Tool):
         }
     }
     output_type = "string"
+    side_effect_free = True
 
     def __init__(self, max_output_length: int = 40000):
         super().__init__()
@@ -416,6 +420,7 @@ class WikipediaSearchTool(Tool):
         }
     }
     output_type = "string"
+    side_effect_free = True
 
     def __init__(
         self,
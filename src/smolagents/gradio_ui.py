@@ -21,6 +21,7 @@ from typing import Generator
 
 from smolagents.agent_types import AgentAudio, AgentImage, AgentText
 from smolagents.agents import MultiStepAgent, PlanningStep
+from smolagents.local_python_executor import ExecutionLogsStreamDelta
 from smolagents.memory import ActionStep, FinalAnswerStep, MemoryStep
 from smolagents.models import ChatMessageStreamDelta
 from smolagents.utils import _is_package_available
@@ -257,6 +258,7 @@ def stream_to_gradio(
             "Please install 'gradio' extra to use the GradioUI: `pip install 'smolagents[gradio]'`"
         )
     intermediate_text = ""
+    execution_logs = ""
     for step_log in agent.run(
         task, images=task_images, stream=True, reset=reset_agent_memory, additional_args=additional_args
     ):
@@ -268,6 +270,7 @@ def stream_to_gradio(
 
         if isinstance(step_log, MemoryStep):
             intermediate_text = ""
+            execution_logs = ""
             for message in pull_messages_from_step(
                 step_log,
                 # If we're streaming model outputs, no need to display them twice
@@ -277,6 +280,9 @@ def stream_to_gradio(
         elif isinstance(step_log, ChatMessageStreamDelta):
             intermediate_text += step_log.content or ""
             yield intermediate_text
+        elif isinstance(step_log, ExecutionLogsStreamDelta):
+            execution_logs += step_log.content
+            yield f"{intermediate_text}\n\n📝 Execution logs:\n```bash\n{execution_logs}\n```"
 
 
 class GradioUI:
@@ -15,20 +15,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import ast
+import asyncio
 import builtins
+import copy
 import difflib
+import hashlib
 import inspect
 import logging
 import math
+import operator
+import os
+import queue
 import re
-from collections.abc import Callable, Mapping
-from functools import wraps
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import Callable, Generator, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
+from ctypes import c_ulong, py_object, pythonapi
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache, partial, wraps
 from importlib import import_module
 from types import BuiltinFunctionType, FunctionType, ModuleType
 from typing import Any
 
+from .state_store import LazyState, StateStore
 from .tools import Tool
-from .utils import BASE_BUILTIN_MODULES, truncate_content
+from .utils import BASE_BUILTIN_MODULES, _is_package_available, truncate_content
 
 
 logger = logging.getLogger(__name__)
@@ -52,15 +69,34 @@ ERRORS = {
 DEFAULT_MAX_LEN_OUTPUT = 50000
 MAX_OPERATIONS = 10000000
 MAX_WHILE_ITERATIONS = 1000000
+# Number of operations between two cooperative checks of the execution limits
+LIMITS_CHECK_INTERVAL = 1024
+# Seconds between two checks of the execution limits while the code awaits a coroutine
+AWAIT_CHECK_INTERVAL_SECONDS = 0.05
+EXECUTION_ENGINES = ("ast", "compiled")
 
 
 def custom_print(*args):
     return None
 
 
-def nodunder_getattr(obj, name, default=None):
+# Attributes of generators, coroutines, frames and tracebacks, which lead to the frames and globals of the interpreter
+# itself
+FORBIDDEN_ATTRIBUTES = frozenset(
+    {"gi_frame", "gi_code", "cr_frame", "ag_frame", "tb_frame", "f_back", "f_globals", "f_locals"}
+)
+
+
+def check_attribute_name(name: str) -> None:
+    """Raise an error if the code is not allowed to access the attribute with the given name."""
     if name.startswith("__") and name.endswith("__"):
         raise InterpreterError(f"Forbidden access to dunder attribute: {name}")
+    if name in FORBIDDEN_ATTRIBUTES:
+        raise InterpreterError(f"Forbidden access to attribute: {name}")
+
+
+def nodunder_getattr(obj, name, default=None):
+    check_attribute_name(name)
     return getattr(obj, name, default)
 
 
@@ -147,17 +183,77 @@ DANGEROUS_FUNCTIONS = [
 
 
 class PrintContainer:
-    def __init__(self):
-        self.value = ""
+    """
+    Buffer of the print outputs of the code, stored as a list of chunks so that printing in a loop stays linear.
+
+    Args:
+        max_length (`int`, *optional*): If set, the buffer only keeps the head and the tail of the outputs that
+            `truncate_content(outputs, max_length)` would keep, so that its memory stays bounded however much the code
+            prints. Its value is then the truncated outputs.
+        callback (`Callable[[str], None]`, *optional*): Function called with each chunk of outputs as it is printed,
+            to stream the outputs while the code runs.
+    """
+
+    def __init__(self, max_length: int | None = None, callback: Callable[[str], None] | None = None):
+        self.max_length = max_length
+        self.callback = callback
+        self._head = ""
+        self._chunks: deque[str] = deque()
+        self._chunks_length = 0
+        self._value: str | None = ""
+
+    @property
+    def value(self) -> str:
+        if self._value is None:
+            text = "".join(self._chunks)
+            if self.max_length is None:
+                self._chunks = deque([text])
+                self._value = text
+            else:
+                self._value = truncate_content(self._head + text, max_length=self.max_length)
+        return self._value
+
+    @value.setter
+    def value(self, text: str) -> None:
+        self._head, self._value = "", ""
+        self._chunks.clear()
+        self._chunks_length = 0
+        self._append(text)
+
+    def _append(self, text: str) -> None:
+        if not text:
+            return
+        self._value = None
+        if self.max_length is None:
+            self._chunks.append(text)
+            return
+        # Fill the head first, then keep just over the length of the tail kept by `truncate_content`
+        head_length = self.max_length // 2
+        if len(self._head) < head_length:
+            missing = head_length - len(self._head)
+            self._head += text[:missing]
+            text = text[missing:]
+            if not text:
+                return
+        self._chunks.append(text)
+        self._chunks_length += len(text)
+        tail_length = self.max_length - head_length + 1
+        while self._chunks_length - len(self._chunks[0]) >= tail_length:
+            self._chunks_length -= len(self._chunks.popleft())
+        if self._chunks_length > 2 * tail_length:
+            # The first chunk is much longer than the tail: only keep its end
+            self._chunks = deque(["".join(self._chunks)[-tail_length:]])
+            self._chunks_length = tail_length
 
     def append(self, text):
-        self.value += text
+        self._append(text)
+        if self.callback is not None and text:
+            self.callback(text)
         return self
 
     def __iadd__(self, other):
         """Implements the += operator"""
-        self.value += str(other)
-        return self
+        return self.append(str(other))
 
     def __str__(self):
         """String representation"""
@@ -172,6 +268,247 @@ class PrintContainer:
         return len(self.value)
 
 
+@dataclass
+class ExecutionLogsStreamDelta:
+    """Chunk of the print outputs of a code action, yielded while it runs by [`LocalPythonExecutor.stream`]."""
+
+    content: str
+
+
+class Scope(dict):
+    """
+    Local variables of a function call, chained to the scope the function was defined in.
+
+    The scope itself only holds the local variables, so that creating it costs O(locals) instead of a copy of the
+    whole state. Reads that miss the local variables fall back to the enclosing scopes, up to the global state, while
+    writes always stay local.
+
+    Args:
+        parent (`dict[str, Any]`): The enclosing scope, or the global state.
+    """
+
+    __slots__ = ("parent", "root")
+
+    def __init__(self, parent: dict[str, Any], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parent = parent
+        self.root = parent.root if isinstance(parent, Scope) else parent
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Bind the print outputs of the current run of the global state locally, so that they are looked up in one
+        dictionary access and never taken from a previous run by functions or generators outliving it.
+        """
+        root = self.root
+        if "_print_outputs" in root:
+            dict.__setitem__(self, "_print_outputs", root["_print_outputs"])
+
+    def __missing__(self, key: str) -> Any:
+        return self.parent[key]
+
+    def __contains__(self, key: object) -> bool:
+        return dict.__contains__(self, key) or key in self.parent
+
+    def has_local(self, key: str) -> bool:
+        """Return whether the name is a local variable of this scope."""
+        return dict.__contains__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+    def copy(self) -> "Scope":
+        return Scope(self.parent, self)
+
+    def visible_names(self) -> list[str]:
+        """Return the names visible from this scope, local variables first."""
+        parent_names = self.parent.visible_names() if isinstance(self.parent, Scope) else list(self.parent)
+        return list(self) + [name for name in parent_names if not dict.__contains__(self, name)]
+
+    def __repr__(self) -> str:
+        return f"Scope({dict.__repr__(self)})"
+
+
+class NameIndex:
+    """
+    Index of the variable names of a state, to suggest the close matches of an undefined name in its error message.
+
+    Two names can only be close matches if their lengths are close enough, so the names are bucketed by length and
+    only the buckets of compatible lengths are compared with `difflib`. The state is indexed in full on the first
+    lookup only: after that, the index is kept up to date with the names that the code binds or deletes, see
+    [`NameIndex.track`], and the ones sent with [`NameIndex.sync`]. The matches found are memoized until the indexed
+    names change. Names that resolve never reach the index, so it costs nothing when evaluating valid code.
+
+    Args:
+        strict (`bool`, defaults to `False`): Whether an undefined name raises an error without looking for its close
+            matches.
+    """
+
+    # Minimum similarity ratio of a close match, as in `difflib.get_close_matches`
+    CUTOFF = 0.6
+
+    def __init__(self, strict: bool = False):
+        self.strict = strict
+        self._names: set[str] | None = None
+        self._names_by_length: dict[int, set[str]] = {}
+        self._matches: dict[str, list[str]] = {}
+        self._tracked_code: ParsedCode | None = None
+
+    def _add(self, name: str) -> None:
+        if name not in self._names:
+            self._names.add(name)
+            self._names_by_length.setdefault(len(name), set()).add(name)
+            self._matches.clear()
+
+    def _discard(self, name: str) -> None:
+        if name in self._names:
+            self._names.discard(name)
+            self._names_by_length[len(name)].discard(name)
+            self._matches.clear()
+
+    def sync(self, names: Iterable[str], state: dict[str, Any]) -> None:
+        """Update the index for the given names, adding the ones defined in the state and removing the others."""
+        if self._names is None:
+            return
+        for name in names:
+            if name in state:
+                self._add(name)
+            else:
+                self._discard(name)
+
+    def track(self, parsed_code: "ParsedCode | None", state: dict[str, Any]) -> None:
+        """
+        Keep track of the names bound or deleted by the code about to run on the state, or stop tracking them with
+        `None` once it ran, updating the index for them.
+        """
+        if self._tracked_code is not None:
+            self.sync(self._tracked_code.analysis.bound_names, state)
+        self._tracked_code = parsed_code
+
+    def close_matches(self, name: str, state: dict[str, Any], n: int = 3) -> list[str]:
+        """
+        Return the variables of a state whose names are the closest matches of a name, best match first.
+
+        Args:
+            name (`str`): The undefined name.
+            state (`dict[str, Any]`): The state, or the scope of the function call the name is evaluated in.
+            n (`int`, defaults to `3`): Maximum number of matches.
+        """
+        local_names = []
+        root = state
+        while isinstance(root, Scope):
+            local_names.extend(root)
+            root = root.parent
+        if self._names is None:
+            self._names = set()
+            self.sync(root.keys() | root.pending if isinstance(root, LazyState) else root.keys(), root)
+        elif self._tracked_code is not None:
+            # The code running may have bound or deleted names since the index was last updated
+            self.sync(self._tracked_code.analysis.bound_names, root)
+        matches = self._matches.get(name)
+        if matches is None:
+            # A ratio 2 * matching_characters / total_length above the cutoff needs lengths close enough. The bounds
+            # are rounded outwards, so that float rounding never excludes a match.
+            min_length = math.floor(len(name) * self.CUTOFF / (2 - self.CUTOFF))
+            max_length = math.ceil(len(name) * (2 - self.CUTOFF) / self.CUTOFF)
+            candidates = [
+                candidate
+                for length, bucket in self._names_by_length.items()
+                if min_length <= length <= max_length
+                for candidate in bucket
+            ]
+            matches = self._matches[name] = difflib.get_close_matches(name, candidates, n, self.CUTOFF)
+        if local_names:
+            matches = difflib.get_close_matches(name, list(dict.fromkeys(local_names + matches)), n, self.CUTOFF)
+        return matches
+
+
+class LazyErrorMessage:
+    """
+    Error message only built when it is rendered, for errors that the code may catch without ever showing them.
+
+    Args:
+        build (`Callable[[], str]`): Function building the message.
+    """
+
+    __slots__ = ("build", "_message")
+
+    def __init__(self, build: Callable[[], str]):
+        self.build = build
+        self._message = None
+
+    def __str__(self) -> str:
+        if self._message is None:
+            self._message = self.build()
+        return self._message
+
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+
+class GeneratorExpression:
+    """
+    Lazy iterator returned by generator expressions in the interpreted code.
+
+    Elements are evaluated one at a time, when requested, and count towards `MAX_OPERATIONS` as they are produced.
+    The underlying Python generator is kept out of reach of the code, since its frame gives access to the
+    interpreter internals.
+    """
+
+    __slots__ = ("__generator__",)
+
+    def __init__(self, generator: Generator[Any, None, None]):
+        self.__generator__ = generator
+
+    def __iter__(self) -> "GeneratorExpression":
+        return self
+
+    def __next__(self) -> Any:
+        return next(self.__generator__)
+
+    def __repr__(self) -> str:
+        return f"<generator object <genexpr> at {hex(id(self))}>"
+
+
+class InterpretedCoroutine:
+    """
+    Coroutine returned by the async functions defined in the interpreted code.
+
+    The body of the function runs in a worker thread of the event loop, so that it can itself await coroutines while
+    the loop keeps running the ones awaited concurrently, e.g. with `asyncio.gather`. As for `GeneratorExpression`,
+    the underlying Python coroutine is kept out of reach of the code.
+    """
+
+    __slots__ = ("__coroutine__",)
+
+    def __init__(self, function: Callable, args: tuple, kwargs: dict[str, Any]):
+        self.__coroutine__ = self._run(function, args, kwargs)
+
+    @staticmethod
+    async def _run(function: Callable, args: tuple, kwargs: dict[str, Any]) -> Any:
+        context = copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, partial(context.run, function, *args, **kwargs))
+
+    def __await__(self) -> Generator[Any, None, Any]:
+        return self.__coroutine__.__await__()
+
+    def close(self) -> None:
+        self.__coroutine__.close()
+
+    def __repr__(self) -> str:
+        return f"<coroutine object at {hex(id(self))}>"
+
+
 class BreakException(Exception):
     pass
 
@@ -234,15 +571,56 @@ def build_import_tree(authorized_imports: list[str]) -> dict[str, Any]:
     return tree
 
 
+class ImportAuthorizer:
+    """
+    Authorization trie for a set of authorized imports, with memoized verdicts per dotted module name.
+
+    The trie is built once, and each module name is only walked through it the first time it is checked: this check
+    runs on every module-typed value produced by the interpreter, e.g. on each `np.linalg` or `pd.api` access.
+
+    Args:
+        authorized_imports (`list[str]`): Authorized imports, possibly dotted or ending with a `"*"` wildcard.
+    """
+
+    def __init__(self, authorized_imports: list[str]):
+        self.authorized_imports = tuple(authorized_imports)
+        self.tree = build_import_tree(self.authorized_imports)
+        self._verdicts: dict[str, bool] = {}
+
+    def is_authorized(self, import_to_check: str) -> bool:
+        """Return whether the given dotted module name can be imported or accessed."""
+        verdict = self._verdicts.get(import_to_check)
+        if verdict is None:
+            verdict = self._verdicts[import_to_check] = self._walk(import_to_check)
+        return verdict
+
+    def _walk(self, import_to_check: str) -> bool:
+        current_node = self.tree
+        for part in import_to_check.split("."):
+            if "*" in current_node:
+                return True
+            if part not in current_node:
+                return False
+            current_node = current_node[part]
+        return True
+
+    @property
+    def verdicts(self) -> dict[str, bool]:
+        """The verdicts computed so far, by dotted module name."""
+        return dict(self._verdicts)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(authorized_imports={list(self.authorized_imports)!r})"
+
+
+@lru_cache(maxsize=64)
+def get_import_authorizer(authorized_imports: tuple[str, ...]) -> ImportAuthorizer:
+    """Return the shared `ImportAuthorizer` for a tuple of authorized imports."""
+    return ImportAuthorizer(authorized_imports)
+
+
 def check_import_authorized(import_to_check: str, authorized_imports: list[str]) -> bool:
-    current_node = build_import_tree(authorized_imports)
-    for part in import_to_check.split("."):
-        if "*" in current_node:
-            return True
-        if part not in current_node:
-            return False
-        current_node = current_node[part]
-    return True
+    return get_import_authorizer(tuple(authorized_imports)).is_authorized(import_to_check)
 
 
 def safer_eval(func: Callable):
@@ -265,26 +643,47 @@ def safer_eval(func: Callable):
         authorized_imports=BASE_BUILTIN_MODULES,
     ):
         result = func(expression, state, static_tools, custom_tools, authorized_imports=authorized_imports)
-        if isinstance(result, ModuleType):
-            if not check_import_authorized(result.__name__, authorized_imports):
-                raise InterpreterError(f"Forbidden access to module: {result.__name__}")
-        elif isinstance(result, dict) and result.get("__spec__"):
-            if not check_import_authorized(result["__name__"], authorized_imports):
-                raise InterpreterError(f"Forbidden access to module: {result['__name__']}")
-        elif isinstance(result, (FunctionType, BuiltinFunctionType)):
-            for qualified_function_name in DANGEROUS_FUNCTIONS:
-                module_name, function_name = qualified_function_name.rsplit(".", 1)
-                if (
-                    function_name not in static_tools
-                    and result.__name__ == function_name
-                    and result.__module__ == module_name
-                ):
-                    raise InterpreterError(f"Forbidden access to function: {function_name}")
+        check_safe_result(result, static_tools, authorized_imports)
         return result
 
     return _check_return
 
 
+# Result types that can never be a module, a module dict or a function, so they skip the safety checks
+SAFE_RESULT_TYPES = frozenset({type(None), bool, int, float, complex, str, bytes, list, tuple, set, frozenset, range})
+
+
+def check_safe_result(result: Any, static_tools: dict[str, Callable], authorized_imports: list[str]) -> None:
+    """
+    Check that an evaluated value does not give access to an unauthorized module or a dangerous function.
+
+    Args:
+        result (`Any`): Value to check.
+        static_tools (`dict[str, Callable]`): Static tools: dangerous functions explicitly passed as tools are allowed.
+        authorized_imports (`list[str]`): Authorized imports.
+
+    Raises:
+        InterpreterError: If the value is forbidden.
+    """
+    if type(result) in SAFE_RESULT_TYPES:
+        return
+    if isinstance(result, ModuleType):
+        if not check_import_authorized(result.__name__, authorized_imports):
+            raise InterpreterError(f"Forbidden access to module: {result.__name__}")
+    elif isinstance(result, dict) and result.get("__spec__"):
+        if not check_import_authorized(result["__name__"], authorized_imports):
+            raise InterpreterError(f"Forbidden access to module: {result['__name__']}")
+    elif isinstance(result, (FunctionType, BuiltinFunctionType)):
+        for qualified_function_name in DANGEROUS_FUNCTIONS:
+            module_name, function_name = qualified_function_name.rsplit(".", 1)
+            if (
+                function_name not in static_tools
+                and result.__name__ == function_name
+                and result.__module__ == module_name
+            ):
+                raise InterpreterError(f"Forbidden access to function: {function_name}")
+
+
 def evaluate_attribute(
     expression: ast.Attribute,
     state: dict[str, Any],
@@ -295,6 +694,9 @@ def evaluate_attribute(
     if expression.attr.startswith("__") and expression.attr.endswith("__"):
         raise InterpreterError(f"Forbidden access to dunder attribute: {expression.attr}")
     value = evaluate_ast(expression.value, state, static_tools, custom_tools, authorized_imports)
+    # Checked once the value is evaluated, so that a dunder attribute accessed earlier in a chain is reported instead
+    if expression.attr in FORBIDDEN_ATTRIBUTES:
+        raise InterpreterError(f"Forbidden access to attribute: {expression.attr}")
     return getattr(value, expression.attr)
 
 
@@ -328,7 +730,7 @@ def evaluate_lambda(
     args = [arg.arg for arg in lambda_expression.args.args]
 
     def lambda_func(*values: Any) -> Any:
-        new_state = state.copy()
+        new_state = Scope(state)
         for arg, value in zip(args, values):
             new_state[arg] = value
         return evaluate_ast(
@@ -364,6 +766,17 @@ def evaluate_while(
     return None
 
 
+_FUNCTION_SOURCES: "weakref.WeakKeyDictionary[ast.FunctionDef, str]" = weakref.WeakKeyDictionary()
+
+
+def get_function_source(func_def: ast.FunctionDef) -> str:
+    """Return the source code of a function definition, unparsing each node only once."""
+    source_code = _FUNCTION_SOURCES.get(func_def)
+    if source_code is None:
+        source_code = _FUNCTION_SOURCES[func_def] = ast.unparse(func_def)
+    return source_code
+
+
 def create_function(
     func_def: ast.FunctionDef,
     state: dict[str, Any],
@@ -371,10 +784,10 @@ def create_function(
     custom_tools: dict[str, Callable],
     authorized_imports: list[str],
 ) -> Callable:
-    source_code = ast.unparse(func_def)
+    source_code = get_function_source(func_def)
 
     def new_func(*args: Any, **kwargs: Any) -> Any:
-        func_state = state.copy()
+        func_state = Scope(state)
         arg_names = [arg.arg for arg in func_def.args.args]
         default_values = [
             evaluate_ast(d, state, static_tools, custom_tools, authorized_imports) for d in func_def.args.defaults
@@ -402,7 +815,7 @@ def create_function(
 
         # Set default values for arguments that were not provided
         for name, value in defaults.items():
-            if name not in func_state:
+            if not func_state.has_local(name):
                 func_state[name] = value
 
         # Update function state with self and __class__
@@ -442,6 +855,100 @@ def evaluate_function_def(
     return custom_tools[func_def.name]
 
 
+def evaluate_async_function_def(
+    func_def: ast.AsyncFunctionDef,
+    state: dict[str, Any],
+    static_tools: dict[str, Callable],
+    custom_tools: dict[str, Callable],
+    authorized_imports: list[str],
+) -> Callable:
+    function = create_function(func_def, state, static_tools, custom_tools, authorized_imports)
+
+    def coroutine_function(*args: Any, **kwargs: Any) -> InterpretedCoroutine:
+        return InterpretedCoroutine(function, args, kwargs)
+
+    coroutine_function.__ast__ = function.__ast__
+    coroutine_function.__source__ = function.__source__
+    coroutine_function.__name__ = function.__name__
+    custom_tools[func_def.name] = coroutine_function
+    return coroutine_function
+
+
+class EventLoopThread:
+    """
+    Event loop running in a daemon thread, on which the interpreted code awaits coroutines, like the ones returned by
+    tools with an `async def forward`.
+
+    The loop and its thread are only started on the first await, and stopped by `close`.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="smolagents-event-loop", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def in_loop_thread(self) -> bool:
+        """Return whether the current thread is the thread of the loop."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def run(self, coroutine: Any) -> Any:
+        """
+        Run a coroutine on the loop and return its result, blocking the current thread until it is done.
+
+        The execution limits of the run in progress are checked while waiting, and the coroutine is cancelled if they
+        are exceeded. The coroutine runs in a copy of the current context, so that the code it evaluates counts
+        towards the limits of the run.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            while not wait_futures([future], timeout=AWAIT_CHECK_INTERVAL_SECONDS).done:
+                check_execution_limits()
+        except BaseException:
+            future.cancel()
+            raise
+        return future.result()
+
+    def close(self) -> None:
+        """Stop the loop and its thread, if they were started."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not threading.current_thread():
+                thread.join()
+                loop.close()
+
+
+# The event loop of the current run, see `evaluate_python_code`
+_EVENT_LOOP: ContextVar[EventLoopThread | None] = ContextVar("event_loop", default=None)
+
+
+def await_in_event_loop(coroutine: Any) -> Any:
+    """Run a coroutine on the event loop of the current run and return its result."""
+    event_loop = _EVENT_LOOP.get()
+    if event_loop is None:
+        coroutine.close()
+        raise InterpreterError("Awaiting requires an event loop: evaluate the code with `evaluate_python_code`.")
+    if event_loop.in_loop_thread():
+        coroutine.close()
+        raise InterpreterError(
+            "An await expression cannot be nested in the value of another one: await it in a separate statement."
+        )
+    return event_loop.run(coroutine)
+
+
 def evaluate_class_def(
     class_def: ast.ClassDef,
     state: dict[str, Any],
@@ -454,7 +961,7 @@ def evaluate_class_def(
     class_dict = {}
 
     for stmt in class_def.body:
-        if isinstance(stmt, ast.FunctionDef):
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
             class_dict[stmt.name] = evaluate_ast(stmt, state, static_tools, custom_tools, authorized_imports)
         elif isinstance(stmt, ast.Assign):
             for target in stmt.targets:
@@ -609,34 +1116,10 @@ def evaluate_binop(
     # Recursively evaluate the left and right operands
     left_val = evaluate_ast(binop.left, state, static_tools, custom_tools, authorized_imports)
     right_val = evaluate_ast(binop.right, state, static_tools, custom_tools, authorized_imports)
-
-    # Determine the operation based on the type of the operator in the BinOp
-    if isinstance(binop.op, ast.Add):
-        return left_val + right_val
-    elif isinstance(binop.op, ast.Sub):
-        return left_val - right_val
-    elif isinstance(binop.op, ast.Mult):
-        return left_val * right_val
-    elif isinstance(binop.op, ast.Div):
-        return left_val / right_val
-    elif isinstance(binop.op, ast.Mod):
-        return left_val % right_val
-    elif isinstance(binop.op, ast.Pow):
-        return left_val**right_val
-    elif isinstance(binop.op, ast.FloorDiv):
-        return left_val // right_val
-    elif isinstance(binop.op, ast.BitAnd):
-        return left_val & right_val
-    elif isinstance(binop.op, ast.BitOr):
-        return left_val | right_val
-    elif isinstance(binop.op, ast.BitXor):
-        return left_val ^ right_val
-    elif isinstance(binop.op, ast.LShift):
-        return left_val << right_val
-    elif isinstance(binop.op, ast.RShift):
-        return left_val >> right_val
-    else:
+    operation = BINARY_OPERATORS.get(type(binop.op))
+    if operation is None:
         raise NotImplementedError(f"Binary operation {type(binop.op).__name__} is not implemented.")
+    return operation(left_val, right_val)
 
 
 def evaluate_assign(
@@ -749,21 +1232,7 @@ def evaluate_call(
     }
 
     if func_name == "super":
-        if not args:
-            if "__class__" in state and "self" in state:
-                return super(state["__class__"], state["self"])
-            else:
-                raise InterpreterError("super() needs at least one argument")
-        cls = args[0]
-        if not isinstance(cls, type):
-            raise InterpreterError("super() argument 1 must be type")
-        if len(args) == 1:
-            return super(cls)
-        elif len(args) == 2:
-            instance = args[1]
-            return super(cls, instance)
-        else:
-            raise InterpreterError("super() takes at most 2 arguments")
+        return evaluate_super(args, state)
     elif func_name == "print":
         state["_print_outputs"] += " ".join(map(str, args)) + "\n"
         return None
@@ -775,6 +1244,41 @@ def evaluate_call(
         return func(*args, **kwargs)
 
 
+def evaluate_super(args: list[Any], state: dict[str, Any]) -> super:
+    if not args:
+        if "__class__" in state and "self" in state:
+            return super(state["__class__"], state["self"])
+        else:
+            raise InterpreterError("super() needs at least one argument")
+    cls = args[0]
+    if not isinstance(cls, type):
+        raise InterpreterError("super() argument 1 must be type")
+    if len(args) == 1:
+        return super(cls)
+    elif len(args) == 2:
+        instance = args[1]
+        return super(cls, instance)
+    else:
+        raise InterpreterError("super() takes at most 2 arguments")
+
+
+def subscript_error(value: Any, index: Any, error: Exception) -> InterpreterError:
+    """
+    Return the error of a failed subscript. Its message, suggesting the close matches of a missing mapping key, is only
+    built when rendered, so that failed lookups caught by the code do not pay for it.
+    """
+
+    def build_message() -> str:
+        message = f"Could not index {value} with '{index}': {type(error).__name__}: {error}"
+        if isinstance(index, str) and isinstance(value, Mapping):
+            close_matches = difflib.get_close_matches(index, list(value.keys()))
+            if len(close_matches) > 0:
+                message += f". Maybe you meant one of these indexes instead: {str(close_matches)}"
+        return message
+
+    return InterpreterError(LazyErrorMessage(build_message))
+
+
 def evaluate_subscript(
     subscript: ast.Subscript,
     state: dict[str, Any],
@@ -787,12 +1291,12 @@ def evaluate_subscript(
     try:
         return value[index]
     except (KeyError, IndexError, TypeError) as e:
-        error_message = f"Could not index {value} with '{index}': {type(e).__name__}: {e}"
-        if isinstance(index, str) and isinstance(value, Mapping):
-            close_matches = difflib.get_close_matches(index, list(value.keys()))
-            if len(close_matches) > 0:
-                error_message += f". Maybe you meant one of these indexes instead: {str(close_matches)}"
-        raise InterpreterError(error_message) from e
+        raise subscript_error(value, index, e) from e
+
+
+# The name index of the current run, used to suggest the close matches of undefined names. Outside of a run, a new
+# index is built for each undefined name.
+_NAME_INDEX: ContextVar[NameIndex | None] = ContextVar("name_index", default=None)
 
 
 def evaluate_name(
@@ -810,10 +1314,17 @@ def evaluate_name(
         return custom_tools[name.id]
     elif name.id in ERRORS:
         return ERRORS[name.id]
-    close_matches = difflib.get_close_matches(name.id, list(state.keys()))
-    if len(close_matches) > 0:
-        return state[close_matches[0]]
-    raise InterpreterError(f"The variable `{name.id}` is not defined.")
+    name_index = _NAME_INDEX.get() or NameIndex()
+    if name_index.strict:
+        raise InterpreterError(f"The variable `{name.id}` is not defined.")
+
+    def build_message() -> str:
+        close_matches = name_index.close_matches(name.id, state)
+        suggestion = f" Did you mean {', '.join(f'`{match}`' for match in close_matches)}?" if close_matches else ""
+        return f"The variable `{name.id}` is not defined.{suggestion}"
+
+    # The close matches are only looked for when the message is rendered, not when the code catches the error
+    raise InterpreterError(LazyErrorMessage(build_message))
 
 
 def evaluate_condition(
@@ -823,34 +1334,15 @@ def evaluate_condition(
     custom_tools: dict[str, Callable],
     authorized_imports: list[str],
 ) -> bool | object:
-    result = True
     left = evaluate_ast(condition.left, state, static_tools, custom_tools, authorized_imports)
+    if len(condition.ops) == 1:
+        # Single comparisons, by far the most frequent, return the result of the operator as is
+        right = evaluate_ast(condition.comparators[0], state, static_tools, custom_tools, authorized_imports)
+        return COMPARISON_OPERATORS[type(condition.ops[0])](left, right)
+    result = True
     for i, (op, comparator) in enumerate(zip(condition.ops, condition.comparators)):
-        op = type(op)
         right = evaluate_ast(comparator, state, static_tools, custom_tools, authorized_imports)
-        if op == ast.Eq:
-            current_result = left == right
-        elif op == ast.NotEq:
-            current_result = left != right
-        elif op == ast.Lt:
-            current_result = left < right
-        elif op == ast.LtE:
-            current_result = left <= right
-        elif op == ast.Gt:
-            current_result = left > right
-        elif op == ast.GtE:
-            current_result = left >= right
-        elif op == ast.Is:
-            current_result = left is right
-        elif op == ast.IsNot:
-            current_result = left is not right
-        elif op == ast.In:
-            current_result = left in right
-        elif op == ast.NotIn:
-            current_result = left not in right
-        else:
-            raise InterpreterError(f"Unsupported comparison operator: {op}")
-
+        current_result = COMPARISON_OPERATORS[type(op)](left, right)
         if current_result is False:
             return False
         result = current_result if i == 0 else (result and current_result)
@@ -880,81 +1372,509 @@ def evaluate_if(
     return result
 
 
-def evaluate_for(
-    for_loop: ast.For,
+# Vectorized execution of numeric loops
+#
+# Simple loops and list comprehensions over numbers, like `for x in data: total += x * x`, can run as a few numpy
+# operations instead of one interpreted iteration per element. Only shapes and operations whose numpy results are
+# identical to Python's are vectorized: arithmetic with `+`, `-`, `*`, `/` and non-negative integer powers, on floats
+# and on integers small enough for every intermediate value to be exact in float64 and int64, with accumulations
+# computed sequentially as in Python. Anything else, including a floating-point error, runs in the interpreter.
+
+_VECTORIZED_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow)
+_VECTORIZED_COMPARISONS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+_VECTORIZED_ACCUMULATIONS = (ast.Add, ast.Sub, ast.Mult)
+# Integers below this bound are exactly represented in float64, and their arithmetic cannot overflow int64
+MAX_EXACT_INTEGER = 2**53
+
+
+@dataclass
+class VectorizedLoop:
+    """
+    Shape of a loop or list comprehension over numbers that can run as vectorized numpy operations, see
+    [`find_vectorized_loop`].
+
+    Args:
+        target (`str`): Name of the loop variable.
+        value (`ast.expr`): Arithmetic expression computed for each element.
+        conditions (`list[ast.expr]`): Conditions selecting the elements for which the value is computed.
+        names (`list[str]`): Names of the variables read by the value and the conditions, besides the loop variable.
+        output (`str`, *optional*): Name of the accumulator updated with the values, or of the list they are appended
+            to. `None` for a list comprehension.
+        operator (`type[ast.operator]`, *optional*): Operator of the accumulation, `None` to append the values.
+    """
+
+    target: str
+    value: ast.expr
+    conditions: list[ast.expr]
+    names: list[str]
+    output: str | None = None
+    operator: type[ast.operator] | None = None
+
+
+def _is_vectorized_arithmetic(node: ast.expr) -> bool:
+    if isinstance(node, ast.Constant):
+        return type(node.value) in (int, float)
+    if isinstance(node, ast.Name):
+        return True
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        return _is_vectorized_arithmetic(node.operand)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, _VECTORIZED_BINARY_OPERATORS):
+        if isinstance(node.op, ast.Pow) and not (
+            isinstance(node.right, ast.Constant) and type(node.right.value) is int and node.right.value >= 0
+        ):
+            return False
+        return _is_vectorized_arithmetic(node.left) and _is_vectorized_arithmetic(node.right)
+    return False
+
+
+def _is_vectorized_condition(node: ast.expr) -> bool:
+    if isinstance(node, ast.Compare):
+        return all(isinstance(op, _VECTORIZED_COMPARISONS) for op in node.ops) and all(
+            _is_vectorized_arithmetic(operand) for operand in [node.left, *node.comparators]
+        )
+    if isinstance(node, ast.BoolOp):
+        return all(_is_vectorized_condition(value) for value in node.values)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return _is_vectorized_condition(node.operand)
+    return False
+
+
+_VECTORIZED_LOOPS: "weakref.WeakKeyDictionary[ast.AST, VectorizedLoop | None]" = weakref.WeakKeyDictionary()
+
+
+def find_vectorized_loop(node: ast.For | ast.ListComp) -> VectorizedLoop | None:
+    """
+    Recognize a loop or list comprehension that can run as vectorized numpy operations, memoizing the result per node.
+
+    The supported shapes are, with `value` an arithmetic expression of the loop variable and `condition` a comparison
+    or a boolean combination of comparisons:
+    - reductions: `for x in data: total += value`, also with `-=` and `*=`;
+    - maps: `for x in data: results.append(value)`;
+    - the same loops filtered by an `if condition:` around their body;
+    - list comprehensions: `[value for x in data]`, optionally with `if condition` clauses.
+
+    Args:
+        node (`ast.For` or `ast.ListComp`): The loop or list comprehension.
+
+    Returns:
+        `VectorizedLoop | None`: The shape of the loop, or `None` if it is not supported.
+    """
+    loop = _VECTORIZED_LOOPS.get(node, _MISSING)
+    if loop is _MISSING:
+        loop = _VECTORIZED_LOOPS[node] = _find_vectorized_loop(node)
+    return loop
+
+
+def _find_vectorized_loop(node: ast.For | ast.ListComp) -> VectorizedLoop | None:
+    output = operator_type = None
+    if isinstance(node, ast.For):
+        if node.orelse or not isinstance(node.target, ast.Name) or len(node.body) != 1:
+            return None
+        target, statement, conditions = node.target.id, node.body[0], []
+        if isinstance(statement, ast.If) and not statement.orelse and len(statement.body) == 1:
+            conditions, statement = [statement.test], statement.body[0]
+        if (
+            isinstance(statement, ast.AugAssign)
+            and isinstance(statement.target, ast.Name)
+            and isinstance(statement.op, _VECTORIZED_ACCUMULATIONS)
+        ):
+            output, operator_type, value = statement.target.id, type(statement.op), statement.value
+        elif (
+            isinstance(statement, ast.Expr)
+            and isinstance(statement.value, ast.Call)
+            and isinstance(statement.value.func, ast.Attribute)
+            and statement.value.func.attr == "append"
+            and isinstance(statement.value.func.value, ast.Name)
+            and len(statement.value.args) == 1
+            and not statement.value.keywords
+        ):
+            output, value = statement.value.func.value.id, statement.value.args[0]
+        else:
+            return None
+    elif isinstance(node, ast.ListComp):
+        if len(node.generators) != 1:
+            return None
+        generator = node.generators[0]
+        if generator.is_async or not isinstance(generator.target, ast.Name):
+            return None
+        target, value, conditions = generator.target.id, node.elt, list(generator.ifs)
+    else:
+        return None
+    if not _is_vectorized_arithmetic(value) or not all(_is_vectorized_condition(c) for c in conditions):
+        return None
+    names = set()
+    for expression in [value, *conditions]:
+        expression_names = {child.id for child in ast.walk(expression) if isinstance(child, ast.Name)}
+        # Expressions that do not depend on the loop variable are not worth vectorizing
+        if target not in expression_names:
+            return None
+        names |= expression_names
+    names.discard(target)
+    if output is not None and (output == target or output in names):
+        return None
+    return VectorizedLoop(target, value, conditions, sorted(names), output, operator_type)
+
+
+def _exact_bound(
+    node: ast.expr, target: str, target_bound: float | None, scalars: dict[str, int | float]
+) -> tuple[float, bool] | None:
+    """
+    Return an upper bound of the absolute value of an expression and whether it is an integer, or `None` if one of its
+    integer values may exceed `MAX_EXACT_INTEGER`. The loop variable is an integer if `target_bound` is not `None`.
+    """
+    if isinstance(node, ast.Name):
+        if node.id == target:
+            bound, is_integer = (math.inf, False) if target_bound is None else (target_bound, True)
+        else:
+            value = scalars[node.id]
+            bound, is_integer = abs(value), isinstance(value, int)
+    elif isinstance(node, ast.Constant):
+        bound, is_integer = abs(node.value), isinstance(node.value, int)
+    elif isinstance(node, ast.UnaryOp):
+        return _exact_bound(node.operand, target, target_bound, scalars)
+    elif isinstance(node, ast.BinOp):
+        left = _exact_bound(node.left, target, target_bound, scalars)
+        right = _exact_bound(node.right, target, target_bound, scalars)
+        if left is None or right is None:
+            return None
+        is_integer = left[1] and right[1] and not isinstance(node.op, ast.Div)
+        if isinstance(node.op, (ast.Add, ast.Sub)):
+            bound = left[0] + right[0]
+        elif isinstance(node.op, ast.Mult):
+            bound = left[0] * right[0]
+        elif isinstance(node.op, ast.Pow):
+            try:
+                bound = float(left[0]) ** right[0]
+            except OverflowError:
+                bound = math.inf
+        else:
+            bound = math.inf
+    elif isinstance(node, ast.Compare):
+        operands = [_exact_bound(operand, target, target_bound, scalars) for operand in [node.left, *node.comparators]]
+        return None if None in operands else (1, False)
+    else:  # BoolOp and Not
+        children = node.values if isinstance(node, ast.BoolOp) else [node.operand]
+        return None if any(_exact_bound(c, target, target_bound, scalars) is None for c in children) else (1, False)
+    if is_integer and bound >= MAX_EXACT_INTEGER:
+        return None
+    return bound, is_integer
+
+
+def _evaluate_vectorized(node: ast.expr, target: str, elements: Any, scalars: dict[str, int | float]) -> Any:
+    import numpy as np
+
+    if isinstance(node, ast.Name):
+        return elements if node.id == target else scalars[node.id]
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.BinOp):
+        left = _evaluate_vectorized(node.left, target, elements, scalars)
+        right = _evaluate_vectorized(node.right, target, elements, scalars)
+        if isinstance(node.op, ast.Pow) and isinstance(left, np.ndarray) and left.dtype == np.float64:
+            # The vectorized power of numpy may differ from the one of the C library in the last bit: use Python's
+            return (left.astype(object) ** right).astype(np.float64)
+        return BINARY_OPERATORS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp):
+        operand = _evaluate_vectorized(node.operand, target, elements, scalars)
+        if isinstance(node.op, ast.Not):
+            return np.logical_not(operand)
+        return -operand if isinstance(node.op, ast.USub) else +operand
+    if isinstance(node, ast.Compare):
+        operands = [
+            _evaluate_vectorized(operand, target, elements, scalars) for operand in [node.left, *node.comparators]
+        ]
+        comparisons = [
+            COMPARISON_OPERATORS[type(op)](left, right) for op, left, right in zip(node.ops, operands, operands[1:])
+        ]
+        return np.logical_and.reduce(comparisons)
+    values = [_evaluate_vectorized(value, target, elements, scalars) for value in node.values]
+    return (np.logical_and if isinstance(node.op, ast.And) else np.logical_or).reduce(values)
+
+
+def run_vectorized_loop(
+    loop: VectorizedLoop,
+    iterable: Any,
     state: dict[str, Any],
     static_tools: dict[str, Callable],
     custom_tools: dict[str, Callable],
     authorized_imports: list[str],
 ) -> Any:
-    result = None
-    iterator = evaluate_ast(for_loop.iter, state, static_tools, custom_tools, authorized_imports)
-    for counter in iterator:
-        set_value(
-            for_loop.target,
-            counter,
-            state,
-            static_tools,
-            custom_tools,
-            authorized_imports,
-        )
-        for node in for_loop.body:
-            try:
-                line_result = evaluate_ast(node, state, static_tools, custom_tools, authorized_imports)
-                if line_result is not None:
-                    result = line_result
-            except BreakException:
-                break
-            except ContinueException:
-                continue
+    """
+    Run a loop or list comprehension found by [`find_vectorized_loop`] as vectorized numpy operations.
+
+    Only lists, tuples and ranges of integers or of floats, and 1-dimensional float64 arrays are supported. The whole
+    loop counts as one operation.
+
+    Args:
+        loop (`VectorizedLoop`): The shape of the loop.
+        iterable (`Any`): The evaluated iterable of the loop.
+        state (`dict[str, Any]`): The state the loop runs in.
+
+    Returns:
+        `Any`: The value of the loop, as evaluated by the interpreter, or `_MISSING` if its data is not supported, in
+        which case nothing was changed and the loop must be run by the interpreter.
+    """
+    import numpy as np
+
+    iterable_type = type(iterable)
+    target_bound = None
+    try:
+        if iterable_type is range:
+            if len(iterable) == 0:
+                return _MISSING
+            elements = np.arange(iterable.start, iterable.stop, iterable.step, dtype=np.int64)
+            target_bound = max(abs(iterable[0]), abs(iterable[-1]))
+        elif iterable_type in (list, tuple):
+            element_types = set(map(type, iterable))
+            if element_types == {float}:
+                elements = np.array(iterable, dtype=np.float64)
+            elif element_types == {int}:
+                target_bound = max(map(abs, iterable))
+                if target_bound >= MAX_EXACT_INTEGER:
+                    return _MISSING
+                elements = np.array(iterable, dtype=np.int64)
+            else:
+                return _MISSING
+        elif iterable_type is np.ndarray and iterable.ndim == 1 and iterable.dtype == np.float64 and len(iterable):
+            elements = iterable
         else:
-            continue
-        break
+            return _MISSING
+    except (OverflowError, ValueError):
+        return _MISSING
+    # Numpy scalars are only allowed with arrays, whose elements are numpy scalars when iterated over
+    scalar_types = (int, float, np.float64) if iterable_type is np.ndarray else (int, float)
+    scalars = {}
+    for name in loop.names:
+        value = state[name] if name in state else None
+        if type(value) not in scalar_types:
+            return _MISSING
+        scalars[name] = value
+    if loop.operator is not None:
+        # The interpreter adds to a missing accumulator as if it was 0
+        accumulator = state.get(loop.output, 0)
+        if type(accumulator) not in scalar_types:
+            return _MISSING
+    elif loop.output is not None:
+        output = state[loop.output] if loop.output in state else None
+        if type(output) is not list:
+            return _MISSING
+    value_bound = _exact_bound(loop.value, loop.target, target_bound, scalars)
+    if value_bound is None or any(
+        _exact_bound(condition, loop.target, target_bound, scalars) is None for condition in loop.conditions
+    ):
+        return _MISSING
+    try:
+        with np.errstate(divide="raise", over="raise", invalid="raise", under="ignore"):
+            values = _evaluate_vectorized(loop.value, loop.target, elements, scalars)
+            if loop.conditions:
+                mask = np.logical_and.reduce(
+                    [_evaluate_vectorized(condition, loop.target, elements, scalars) for condition in loop.conditions]
+                )
+                values = values[mask]
+            if loop.operator is not None and len(values):
+                if isinstance(accumulator, int) and value_bound[1]:
+                    # Integer accumulations must stay exact
+                    if loop.operator is ast.Mult:
+                        try:
+                            bound = abs(accumulator) * float(value_bound[0]) ** len(values)
+                        except OverflowError:
+                            bound = math.inf
+                    else:
+                        bound = abs(accumulator) + value_bound[0] * len(values)
+                    if bound >= MAX_EXACT_INTEGER:
+                        return _MISSING
+                # Accumulations are computed sequentially, in the same order and with the same rounding as in Python
+                terms = np.concatenate(([accumulator], -values if loop.operator is ast.Sub else values))
+                accumulated = (np.multiply if loop.operator is ast.Mult else np.add).accumulate(terms)[-1]
+    except (ArithmeticError, TypeError, ValueError):
+        return _MISSING
+    count_operation()
+    # Python scalars are returned for lists, tuples and ranges, numpy scalars for arrays
+    values = list(values) if iterable_type is np.ndarray else values.tolist()
+    if loop.output is None:
+        return values
+    set_value(ast.Name(id=loop.target), iterable[-1], state, static_tools, custom_tools, authorized_imports)
+    if loop.operator is None:
+        output.extend(values)
+        return None
+    if not values:
+        return None
+    result = accumulated if iterable_type is np.ndarray else accumulated.item()
+    set_value(ast.Name(id=loop.output), result, state, static_tools, custom_tools, authorized_imports)
     return result
 
 
-def evaluate_listcomp(
-    listcomp: ast.ListComp,
+# Whether loops are vectorized in the current run, see `evaluate_python_code`
+_VECTORIZE_LOOPS: ContextVar[bool] = ContextVar("vectorize_loops", default=False)
+
+
+def evaluate_for(
+    for_loop: ast.For,
     state: dict[str, Any],
     static_tools: dict[str, Callable],
     custom_tools: dict[str, Callable],
     authorized_imports: list[str],
-) -> list[Any]:
-    def inner_evaluate(generators: list[ast.comprehension], index: int, current_state: dict[str, Any]) -> list[Any]:
-        if index >= len(generators):
-            return [
-                evaluate_ast(
-                    listcomp.elt,
-                    current_state,
-                    static_tools,
-                    custom_tools,
-                    authorized_imports,
-                )
-            ]
-        generator = generators[index]
-        iter_value = evaluate_ast(
-            generator.iter,
-            current_state,
+) -> Any:
+    iterator = evaluate_ast(for_loop.iter, state, static_tools, custom_tools, authorized_imports)
+    if _VECTORIZE_LOOPS.get() and (loop := find_vectorized_loop(for_loop)) is not None:
+        result = run_vectorized_loop(loop, iterator, state, static_tools, custom_tools, authorized_imports)
+        if result is not _MISSING:
+            return result
+    return run_for_loop(for_loop, iterator, state, static_tools, custom_tools, authorized_imports)
+
+
+def evaluate_async_for(
+    for_loop: ast.AsyncFor,
+    state: dict[str, Any],
+    static_tools: dict[str, Callable],
+    custom_tools: dict[str, Callable],
+    authorized_imports: list[str],
+) -> Any:
+    iterable = evaluate_ast(for_loop.iter, state, static_tools, custom_tools, authorized_imports)
+    if not hasattr(type(iterable), "__aiter__"):
+        raise InterpreterError(f"'async for' requires an object with __aiter__ method, got {type(iterable).__name__}")
+
+    async def next_element(iterator):
+        try:
+            return True, await anext(iterator)
+        except StopAsyncIteration:
+            return False, None
+
+    def iterate(iterator):
+        while True:
+            has_element, element = await_in_event_loop(next_element(iterator))
+            if not has_element:
+                return
+            yield element
+
+    return run_for_loop(for_loop, iterate(aiter(iterable)), state, static_tools, custom_tools, authorized_imports)
+
+
+def run_for_loop(
+    for_loop: ast.For | ast.AsyncFor,
+    iterator: Iterable[Any],
+    state: dict[str, Any],
+    static_tools: dict[str, Callable],
+    custom_tools: dict[str, Callable],
+    authorized_imports: list[str],
+) -> Any:
+    """Run the body of a for loop for each element of an iterator."""
+    result = None
+    for counter in iterator:
+        set_value(
+            for_loop.target,
+            counter,
+            state,
             static_tools,
             custom_tools,
             authorized_imports,
         )
-        result = []
-        for value in iter_value:
-            new_state = current_state.copy()
-            if isinstance(generator.target, ast.Tuple):
-                for idx, elem in enumerate(generator.target.elts):
-                    new_state[elem.id] = value[idx]
+        try:
+            for node in for_loop.body:
+                line_result = evaluate_ast(node, state, static_tools, custom_tools, authorized_imports)
+                if line_result is not None:
+                    result = line_result
+        except BreakException:
+            break
+        except ContinueException:
+            continue
+    return result
+
+
+def evaluate_await(
+    await_node: ast.Await,
+    state: dict[str, Any],
+    static_tools: dict[str, Callable],
+    custom_tools: dict[str, Callable],
+    authorized_imports: list[str],
+) -> Any:
+    # The awaited value is evaluated in the loop, where functions like `asyncio.gather` find it running
+    async def evaluate_and_await():
+        awaitable = evaluate_ast(await_node.value, state, static_tools, custom_tools, authorized_imports)
+        if not inspect.isawaitable(awaitable):
+            raise InterpreterError(f"object {type(awaitable).__name__} can't be used in 'await' expression")
+        return await awaitable
+
+    return await_in_event_loop(evaluate_and_await())
+
+
+def iterate_comprehension(
+    generators: list[ast.comprehension],
+    first_iterable: Iterable[Any],
+    scope: Scope,
+    static_tools: dict[str, Callable],
+    custom_tools: dict[str, Callable],
+    authorized_imports: list[str],
+    index: int = 0,
+) -> Generator[None, None, None]:
+    """
+    Bind the loop variables of the generators of a comprehension in `scope`, yielding once per element.
+
+    The loop variables of all generators are bound in the same child scope, that is reused for every element, as in
+    Python: the comprehension does not copy the state, nor leak its variables out.
+    """
+    generator = generators[index]
+    is_last = index == len(generators) - 1
+    iterable = (
+        first_iterable
+        if index == 0
+        else evaluate_ast(generator.iter, scope, static_tools, custom_tools, authorized_imports)
+    )
+    for value in iterable:
+        set_value(generator.target, value, scope, static_tools, custom_tools, authorized_imports)
+        if all(
+            evaluate_ast(if_clause, scope, static_tools, custom_tools, authorized_imports)
+            for if_clause in generator.ifs
+        ):
+            if is_last:
+                yield
             else:
-                new_state[generator.target.id] = value
-            if all(
-                evaluate_ast(if_clause, new_state, static_tools, custom_tools, authorized_imports)
-                for if_clause in generator.ifs
-            ):
-                result.extend(inner_evaluate(generators, index + 1, new_state))
-        return result
+                yield from iterate_comprehension(
+                    generators, None, scope, static_tools, custom_tools, authorized_imports, index + 1
+                )
+
+
+def evaluate_listcomp(
+    listcomp: ast.ListComp,
+    state: dict[str, Any],
+    static_tools: dict[str, Callable],
+    custom_tools: dict[str, Callable],
+    authorized_imports: list[str],
+) -> list[Any]:
+    first_iterable = evaluate_ast(listcomp.generators[0].iter, state, static_tools, custom_tools, authorized_imports)
+    if _VECTORIZE_LOOPS.get() and (loop := find_vectorized_loop(listcomp)) is not None:
+        result = run_vectorized_loop(loop, first_iterable, state, static_tools, custom_tools, authorized_imports)
+        if result is not _MISSING:
+            return result
+    scope = Scope(state)
+    return [
+        evaluate_ast(listcomp.elt, scope, static_tools, custom_tools, authorized_imports)
+        for _ in iterate_comprehension(
+            listcomp.generators, first_iterable, scope, static_tools, custom_tools, authorized_imports
+        )
+    ]
+
+
+def evaluate_generatorexp(
+    genexp: ast.GeneratorExp,
+    state: dict[str, Any],
+    static_tools: dict[str, Callable],
+    custom_tools: dict[str, Callable],
+    authorized_imports: list[str],
+) -> GeneratorExpression:
+    # As in Python, the first iterable is evaluated right away, and the rest when iterating
+    first_iterable = evaluate_ast(genexp.generators[0].iter, state, static_tools, custom_tools, authorized_imports)
+    scope = Scope(state)
+
+    def generate() -> Generator[Any, None, None]:
+        scope.refresh()
+        for _ in iterate_comprehension(
+            genexp.generators, first_iterable, scope, static_tools, custom_tools, authorized_imports
+        ):
+            yield evaluate_ast(genexp.elt, scope, static_tools, custom_tools, authorized_imports)
+            scope.refresh()
 
-    return inner_evaluate(listcomp.generators, 0, state)
+    return GeneratorExpression(generate())
 
 
 def evaluate_setcomp(
@@ -964,32 +1884,14 @@ def evaluate_setcomp(
     custom_tools: dict[str, Callable],
     authorized_imports: list[str],
 ) -> set[Any]:
-    result = set()
-    for gen in setcomp.generators:
-        iter_value = evaluate_ast(gen.iter, state, static_tools, custom_tools, authorized_imports)
-        for value in iter_value:
-            new_state = state.copy()
-            set_value(
-                gen.target,
-                value,
-                new_state,
-                static_tools,
-                custom_tools,
-                authorized_imports,
-            )
-            if all(
-                evaluate_ast(if_clause, new_state, static_tools, custom_tools, authorized_imports)
-                for if_clause in gen.ifs
-            ):
-                element = evaluate_ast(
-                    setcomp.elt,
-                    new_state,
-                    static_tools,
-                    custom_tools,
-                    authorized_imports,
-                )
-                result.add(element)
-    return result
+    first_iterable = evaluate_ast(setcomp.generators[0].iter, state, static_tools, custom_tools, authorized_imports)
+    scope = Scope(state)
+    return {
+        evaluate_ast(setcomp.elt, scope, static_tools, custom_tools, authorized_imports)
+        for _ in iterate_comprehension(
+            setcomp.generators, first_iterable, scope, static_tools, custom_tools, authorized_imports
+        )
+    }
 
 
 def evaluate_try(
@@ -1098,41 +2000,69 @@ def evaluate_with(
             context.__exit__(None, None, None)
 
 
-def get_safe_module(raw_module, authorized_imports, visited=None):
-    """Creates a safe copy of a module or returns the original if it's a function"""
-    # If it's a function or non-module object, return it directly
-    if not isinstance(raw_module, ModuleType):
-        return raw_module
+class SafeModule(ModuleType):
+    """
+    Lazy proxy of a module, made available to the interpreted code instead of the module itself.
 
-    # Handle circular references: Initialize visited set for the first call
-    if visited is None:
-        visited = set()
+    Attributes are read through from the wrapped module when accessed, so that importing a large package does not copy
+    its whole namespace. Submodules are wrapped in turn, and accessing a submodule outside of the authorized imports
+    raises an `InterpreterError`. Attributes assigned by the code are set on the proxy only, leaving the wrapped module
+    untouched.
 
-    module_id = id(raw_module)
-    if module_id in visited:
-        return raw_module  # Return original for circular refs
+    Args:
+        raw_module (`ModuleType`): The module to wrap.
+        authorized_imports (`list[str]`): Authorized imports.
+        safe_modules (`dict[int, SafeModule]`): Cache of the proxies already created, by id of the wrapped module,
+            shared by the proxy to wrap its submodules.
+    """
 
-    visited.add(module_id)
+    __slots__ = ("__raw_module__", "__authorized_imports__", "__safe_modules__")
 
-    # Create new module for actual modules
-    safe_module = ModuleType(raw_module.__name__)
+    def __init__(self, raw_module: ModuleType, authorized_imports: list[str], safe_modules: dict[int, "SafeModule"]):
+        super().__init__(raw_module.__name__, raw_module.__doc__)
+        # Let the import metadata be read through from the wrapped module
+        for name in ("__package__", "__loader__", "__spec__"):
+            del self.__dict__[name]
+        self.__raw_module__ = raw_module
+        self.__authorized_imports__ = authorized_imports
+        self.__safe_modules__ = safe_modules
 
-    # Copy all attributes by reference, recursively checking modules
-    for attr_name in dir(raw_module):
+    def __getattr__(self, name: str) -> Any:
         try:
-            attr_value = getattr(raw_module, attr_name)
-        except (ImportError, AttributeError) as e:
-            # lazy / dynamic loading module -> INFO log and skip
-            logger.info(
-                f"Skipping import error while copying {raw_module.__name__}.{attr_name}: {type(e).__name__} - {e}"
-            )
-            continue
-        # Recursively process nested modules, passing visited set
-        if isinstance(attr_value, ModuleType):
-            attr_value = get_safe_module(attr_value, authorized_imports, visited=visited)
+            value = getattr(self.__raw_module__, name)
+        except ImportError as e:
+            # Lazy / dynamic loading module: expose the failure as a missing attribute
+            raise AttributeError(f"module '{self.__name__}' has no attribute '{name}': {e}") from e
+        if isinstance(value, ModuleType):
+            if not check_import_authorized(value.__name__, self.__authorized_imports__):
+                raise InterpreterError(f"Forbidden access to module: {value.__name__}")
+            value = get_safe_module(value, self.__authorized_imports__, self.__safe_modules__)
+        return value
 
-        setattr(safe_module, attr_name, attr_value)
+    def __dir__(self) -> list[str]:
+        return sorted(set(dir(self.__raw_module__)) | set(self.__dict__))
 
+
+# Proxies already created during the current evaluation, see `evaluate_python_code`
+_SAFE_MODULES: ContextVar[dict[int, SafeModule] | None] = ContextVar("safe_modules", default=None)
+
+
+def get_safe_module(raw_module, authorized_imports, safe_modules=None):
+    """
+    Returns a lazy `SafeModule` proxy of a module, or the object itself if it's not a module.
+
+    Proxies are cached in `safe_modules` if given, else in the cache of the current evaluation, so that importing the
+    same module again returns the same proxy.
+    """
+    if not isinstance(raw_module, ModuleType) or isinstance(raw_module, SafeModule):
+        return raw_module
+    if safe_modules is None:
+        safe_modules = _SAFE_MODULES.get()
+        if safe_modules is None:
+            safe_modules = {}
+    safe_module = safe_modules.get(id(raw_module))
+    if safe_module is None:
+        safe_module = safe_modules[id(raw_module)] = SafeModule(raw_module, authorized_imports, safe_modules)
     return safe_module
 
 
@@ -1153,12 +2083,14 @@ def evaluate_import(expression, state, authorized_imports):
             module = get_safe_module(raw_module, authorized_imports)
             if expression.names[0].name == "*":  # Handle "from module import *"
                 if hasattr(module, "__all__"):  # If module has __all__, import only those names
-                    for name in module.__all__:
-                        state[name] = getattr(module, name)
+                    names = module.__all__
                 else:  # If no __all__, import all public names (those not starting with '_')
-                    for name in dir(module):
-                        if not name.startswith("_"):
-                            state[name] = getattr(module, name)
+                    names = [name for name in dir(module) if not name.startswith("_")]
+                for name in names:
+                    try:
+                        state[name] = getattr(module, name)
+                    except InterpreterError:  # Skip unauthorized submodules
+                        continue
             else:  # regular from imports
                 for alias in expression.names:
                     if hasattr(module, alias.name):
@@ -1179,38 +2111,14 @@ def evaluate_dictcomp(
     custom_tools: dict[str, Callable],
     authorized_imports: list[str],
 ) -> dict[Any, Any]:
+    first_iterable = evaluate_ast(dictcomp.generators[0].iter, state, static_tools, custom_tools, authorized_imports)
+    scope = Scope(state)
     result = {}
-    for gen in dictcomp.generators:
-        iter_value = evaluate_ast(gen.iter, state, static_tools, custom_tools, authorized_imports)
-        for value in iter_value:
-            new_state = state.copy()
-            set_value(
-                gen.target,
-                value,
-                new_state,
-                static_tools,
-                custom_tools,
-                authorized_imports,
-            )
-            if all(
-                evaluate_ast(if_clause, new_state, static_tools, custom_tools, authorized_imports)
-                for if_clause in gen.ifs
-            ):
-                key = evaluate_ast(
-                    dictcomp.key,
-                    new_state,
-                    static_tools,
-                    custom_tools,
-                    authorized_imports,
-                )
-                val = evaluate_ast(
-                    dictcomp.value,
-                    new_state,
-                    static_tools,
-                    custom_tools,
-                    authorized_imports,
-                )
-                result[key] = val
+    for _ in iterate_comprehension(
+        dictcomp.generators, first_iterable, scope, static_tools, custom_tools, authorized_imports
+    ):
+        key = evaluate_ast(dictcomp.key, scope, static_tools, custom_tools, authorized_imports)
+        result[key] = evaluate_ast(dictcomp.value, scope, static_tools, custom_tools, authorized_imports)
     return result
 
 
@@ -1250,7 +2158,39 @@ def evaluate_delete(
             raise InterpreterError(f"Deletion of {type(target).__name__} targets is not supported")
 
 
-@safer_eval
+class OperationsCounter:
+    """
+    Counter of the operations evaluated by the interpreter during a run.
+
+    It raises an error once the maximum number of operations is exceeded, and checks the execution limits every
+    `LIMITS_CHECK_INTERVAL` operations. The counter of the current run is kept out of the state of the code, in a
+    context variable set by [`evaluate_python_code`], and the evaluation of each node only increments `count` and
+    compares it to `next_check`.
+
+    Args:
+        max_operations (`int`, *optional*): Maximum number of operations, defaults to `MAX_OPERATIONS`.
+    """
+
+    __slots__ = ("count", "max_operations", "next_check", "evaluators", "profiler")
+
+    def __init__(self, max_operations: int | None = None):
+        self.count = 0
+        self.max_operations = MAX_OPERATIONS if max_operations is None else max_operations
+        self.next_check = min(LIMITS_CHECK_INTERVAL, self.max_operations + 1)
+        # Evaluators used by `evaluate_ast` and profiler of the run, both swapped by `ExecutionProfiler.activate`
+        self.evaluators: dict[type[ast.AST], Callable] = EVALUATORS
+        self.profiler: ExecutionProfiler | None = None
+
+    def check(self) -> None:
+        """Check the limits once `count` reached `next_check`, and schedule the next check."""
+        if self.count > self.max_operations:
+            raise InterpreterError(
+                f"Reached the max number of operations of {self.max_operations}. Maybe there is an infinite loop somewhere in the code, or you're just asking too many calculations."
+            )
+        check_execution_limits()
+        self.next_check = min(self.count + LIMITS_CHECK_INTERVAL, self.max_operations + 1)
+
+
 def evaluate_ast(
     expression: ast.AST,
     state: dict[str, Any],
@@ -1262,7 +2202,10 @@ def evaluate_ast(
     Evaluate an abstract syntax tree using the content of the variables stored in a state and only evaluating a given
     set of functions.
 
-    This function will recurse through the nodes of the tree provided.
+    This function will recurse through the nodes of the tree provided. Each node is evaluated by the function of
+    `EVALUATORS` for its type, except names and constants, which are the most frequent nodes and are evaluated inline.
+    The result is then checked as with `safer_eval`. The evaluators are read from the operations counter of the run,
+    which holds the ones of its profiler if the run is profiled, see [`ExecutionProfiler.activate`].
 
     Args:
         expression (`ast.AST`):
@@ -1278,271 +2221,2936 @@ def evaluate_ast(
             The list of modules that can be imported by the code. By default, only a few safe modules are allowed.
             If it contains "*", it will authorize any import. Use this at your own risk!
     """
-    if state.setdefault("_operations_count", {"counter": 0})["counter"] >= MAX_OPERATIONS:
-        raise InterpreterError(
-            f"Reached the max number of operations of {MAX_OPERATIONS}. Maybe there is an infinite loop somewhere in the code, or you're just asking too many calculations."
-        )
-    state["_operations_count"]["counter"] += 1
-    common_params = (state, static_tools, custom_tools, authorized_imports)
-    if isinstance(expression, ast.Assign):
-        # Assignment -> we evaluate the assignment which should update the state
-        # We return the variable assigned as it may be used to determine the final result.
-        return evaluate_assign(expression, *common_params)
-    elif isinstance(expression, ast.AnnAssign):
-        return evaluate_annassign(expression, *common_params)
-    elif isinstance(expression, ast.AugAssign):
-        return evaluate_augassign(expression, *common_params)
-    elif isinstance(expression, ast.Call):
-        # Function call -> we return the value of the function call
-        return evaluate_call(expression, *common_params)
-    elif isinstance(expression, ast.Constant):
-        # Constant -> just return the value
+    counter = _OPERATIONS_COUNTER.get()
+    counter.count += 1
+    if counter.count >= counter.next_check:
+        counter.check()
+    expression_type = type(expression)
+    if expression_type is ast.Constant:
+        # Literals never need the safety checks
         return expression.value
-    elif isinstance(expression, ast.Tuple):
-        return tuple((evaluate_ast(elt, *common_params) for elt in expression.elts))
-    elif isinstance(expression, (ast.ListComp, ast.GeneratorExp)):
-        return evaluate_listcomp(expression, *common_params)
-    elif isinstance(expression, ast.DictComp):
-        return evaluate_dictcomp(expression, *common_params)
-    elif isinstance(expression, ast.SetComp):
-        return evaluate_setcomp(expression, *common_params)
-    elif isinstance(expression, ast.UnaryOp):
-        return evaluate_unaryop(expression, *common_params)
-    elif isinstance(expression, ast.Starred):
-        return evaluate_ast(expression.value, *common_params)
-    elif isinstance(expression, ast.BoolOp):
-        # Boolean operation -> evaluate the operation
-        return evaluate_boolop(expression, *common_params)
-    elif isinstance(expression, ast.Break):
-        raise BreakException()
-    elif isinstance(expression, ast.Continue):
-        raise ContinueException()
-    elif isinstance(expression, ast.BinOp):
-        # Binary operation -> execute operation
-        return evaluate_binop(expression, *common_params)
-    elif isinstance(expression, ast.Compare):
-        # Comparison -> evaluate the comparison
-        return evaluate_condition(expression, *common_params)
-    elif isinstance(expression, ast.Lambda):
-        return evaluate_lambda(expression, *common_params)
-    elif isinstance(expression, ast.FunctionDef):
-        return evaluate_function_def(expression, *common_params)
-    elif isinstance(expression, ast.Dict):
-        # Dict -> evaluate all keys and values
-        keys = (evaluate_ast(k, *common_params) for k in expression.keys)
-        values = (evaluate_ast(v, *common_params) for v in expression.values)
-        return dict(zip(keys, values))
-    elif isinstance(expression, ast.Expr):
-        # Expression -> evaluate the content
-        return evaluate_ast(expression.value, *common_params)
-    elif isinstance(expression, ast.For):
-        # For loop -> execute the loop
-        return evaluate_for(expression, *common_params)
-    elif isinstance(expression, ast.FormattedValue):
-        # Formatted value (part of f-string) -> evaluate the content and format it
-        value = evaluate_ast(expression.value, *common_params)
-        # Early return if no format spec
-        if not expression.format_spec:
-            return value
-        # Apply format specification
-        format_spec = evaluate_ast(expression.format_spec, *common_params)
-        return format(value, format_spec)
-    elif isinstance(expression, ast.If):
-        # If -> execute the right branch
-        return evaluate_if(expression, *common_params)
-    elif hasattr(ast, "Index") and isinstance(expression, ast.Index):
-        return evaluate_ast(expression.value, *common_params)
-    elif isinstance(expression, ast.JoinedStr):
-        return "".join([str(evaluate_ast(v, *common_params)) for v in expression.values])
-    elif isinstance(expression, ast.List):
-        # List -> evaluate all elements
-        return [evaluate_ast(elt, *common_params) for elt in expression.elts]
-    elif isinstance(expression, ast.Name):
-        # Name -> pick up the value in the state
-        return evaluate_name(expression, *common_params)
-    elif isinstance(expression, ast.Subscript):
-        # Subscript -> return the value of the indexing
-        return evaluate_subscript(expression, *common_params)
-    elif isinstance(expression, ast.IfExp):
-        test_val = evaluate_ast(expression.test, *common_params)
-        if test_val:
-            return evaluate_ast(expression.body, *common_params)
+    if expression_type is ast.Name:
+        name = expression.id
+        if name in state:
+            result = state[name]
         else:
-            return evaluate_ast(expression.orelse, *common_params)
-    elif isinstance(expression, ast.Attribute):
-        return evaluate_attribute(expression, *common_params)
-    elif isinstance(expression, ast.Slice):
-        return slice(
-            evaluate_ast(expression.lower, *common_params) if expression.lower is not None else None,
-            evaluate_ast(expression.upper, *common_params) if expression.upper is not None else None,
-            evaluate_ast(expression.step, *common_params) if expression.step is not None else None,
-        )
-    elif isinstance(expression, ast.While):
-        return evaluate_while(expression, *common_params)
-    elif isinstance(expression, (ast.Import, ast.ImportFrom)):
-        return evaluate_import(expression, state, authorized_imports)
-    elif isinstance(expression, ast.ClassDef):
-        return evaluate_class_def(expression, *common_params)
-    elif isinstance(expression, ast.Try):
-        return evaluate_try(expression, *common_params)
-    elif isinstance(expression, ast.Raise):
-        return evaluate_raise(expression, *common_params)
-    elif isinstance(expression, ast.Assert):
-        return evaluate_assert(expression, *common_params)
-    elif isinstance(expression, ast.With):
-        return evaluate_with(expression, *common_params)
-    elif isinstance(expression, ast.Set):
-        return set((evaluate_ast(elt, *common_params) for elt in expression.elts))
-    elif isinstance(expression, ast.Return):
-        raise ReturnException(evaluate_ast(expression.value, *common_params) if expression.value else None)
-    elif isinstance(expression, ast.Pass):
-        return None
-    elif isinstance(expression, ast.Delete):
-        return evaluate_delete(expression, *common_params)
+            result = evaluate_name(expression, state, static_tools, custom_tools, authorized_imports)
     else:
-        # For now we refuse anything else. Let's add things as we need them.
-        raise InterpreterError(f"{expression.__class__.__name__} is not supported.")
+        evaluator = counter.evaluators.get(expression_type)
+        if evaluator is None:
+            # For now we refuse anything else. Let's add things as we need them.
+            raise InterpreterError(f"{expression_type.__name__} is not supported.")
+        result = evaluator(expression, state, static_tools, custom_tools, authorized_imports)
+    if type(result) not in SAFE_RESULT_TYPES:
+        check_safe_result(result, static_tools, authorized_imports)
+    return result
 
 
-class FinalAnswerException(Exception):
-    def __init__(self, value):
-        self.value = value
+def evaluate_constant(constant: ast.Constant, *args) -> Any:
+    return constant.value
 
 
-def evaluate_python_code(
-    code: str,
-    static_tools: dict[str, Callable] | None = None,
-    custom_tools: dict[str, Callable] | None = None,
-    state: dict[str, Any] | None = None,
-    authorized_imports: list[str] = BASE_BUILTIN_MODULES,
-    max_print_outputs_length: int = DEFAULT_MAX_LEN_OUTPUT,
-):
-    """
-    Evaluate a python expression using the content of the variables stored in a state and only evaluating a given set
-    of functions.
+def evaluate_expr(expression: ast.Expr | ast.Starred, state, static_tools, custom_tools, authorized_imports) -> Any:
+    return evaluate_ast(expression.value, state, static_tools, custom_tools, authorized_imports)
 
-    This function will recurse through the nodes of the tree provided.
 
-    Args:
-        code (`str`):
-            The code to evaluate.
-        static_tools (`Dict[str, Callable]`):
-            The functions that may be called during the evaluation. These can also be agents in a multiagent setting.
-            These tools cannot be overwritten in the code: any assignment to their name will raise an error.
-        custom_tools (`Dict[str, Callable]`):
-            The functions that may be called during the evaluation.
-            These tools can be overwritten in the code: any assignment to their name will overwrite them.
-        state (`Dict[str, Any]`):
-            A dictionary mapping variable names to values. The `state` should contain the initial inputs but will be
-            updated by this function to contain all variables as they are evaluated.
-            The print outputs will be stored in the state under the key "_print_outputs".
-    """
-    try:
-        expression = ast.parse(code)
-    except SyntaxError as e:
-        raise InterpreterError(
-            f"Code parsing failed on line {e.lineno} due to: {type(e).__name__}\n"
-            f"{e.text}"
-            f"{' ' * (e.offset or 0)}^\n"
-            f"Error: {str(e)}"
-        )
+def evaluate_tuple(expression: ast.Tuple, state, static_tools, custom_tools, authorized_imports) -> tuple:
+    return tuple(evaluate_ast(elt, state, static_tools, custom_tools, authorized_imports) for elt in expression.elts)
 
-    if state is None:
-        state = {}
-    static_tools = static_tools.copy() if static_tools is not None else {}
-    custom_tools = custom_tools if custom_tools is not None else {}
-    result = None
-    state["_print_outputs"] = PrintContainer()
-    state["_operations_count"] = {"counter": 0}
 
-    if "final_answer" in static_tools:
-        previous_final_answer = static_tools["final_answer"]
+def evaluate_list(expression: ast.List, state, static_tools, custom_tools, authorized_imports) -> list:
+    return [evaluate_ast(elt, state, static_tools, custom_tools, authorized_imports) for elt in expression.elts]
 
-        def final_answer(answer):  # Using 'answer' as the argument like in the original function
-            raise FinalAnswerException(previous_final_answer(answer))
 
-        static_tools["final_answer"] = final_answer
+def evaluate_set(expression: ast.Set, state, static_tools, custom_tools, authorized_imports) -> set:
+    return {evaluate_ast(elt, state, static_tools, custom_tools, authorized_imports) for elt in expression.elts}
 
-    try:
-        for node in expression.body:
-            result = evaluate_ast(node, state, static_tools, custom_tools, authorized_imports)
-        state["_print_outputs"].value = truncate_content(
-            str(state["_print_outputs"]), max_length=max_print_outputs_length
-        )
-        is_final_answer = False
-        return result, is_final_answer
-    except FinalAnswerException as e:
-        state["_print_outputs"].value = truncate_content(
-            str(state["_print_outputs"]), max_length=max_print_outputs_length
-        )
-        is_final_answer = True
-        return e.value, is_final_answer
-    except Exception as e:
-        state["_print_outputs"].value = truncate_content(
-            str(state["_print_outputs"]), max_length=max_print_outputs_length
-        )
-        raise InterpreterError(
-            f"Code execution failed at line '{ast.get_source_segment(code, node)}' due to: {type(e).__name__}: {e}"
+
+def evaluate_dict(expression: ast.Dict, state, static_tools, custom_tools, authorized_imports) -> dict:
+    keys = (evaluate_ast(k, state, static_tools, custom_tools, authorized_imports) for k in expression.keys)
+    values = (evaluate_ast(v, state, static_tools, custom_tools, authorized_imports) for v in expression.values)
+    return dict(zip(keys, values))
+
+
+def evaluate_break(*args) -> None:
+    raise BreakException()
+
+
+def evaluate_continue(*args) -> None:
+    raise ContinueException()
+
+
+def evaluate_pass(*args) -> None:
+    return None
+
+
+def evaluate_return(expression: ast.Return, state, static_tools, custom_tools, authorized_imports) -> None:
+    raise ReturnException(
+        evaluate_ast(expression.value, state, static_tools, custom_tools, authorized_imports)
+        if expression.value
+        else None
+    )
+
+
+def evaluate_formatted_value(
+    expression: ast.FormattedValue, state, static_tools, custom_tools, authorized_imports
+) -> Any:
+    # Formatted value (part of f-string) -> evaluate the content and format it
+    value = evaluate_ast(expression.value, state, static_tools, custom_tools, authorized_imports)
+    # Early return if no format spec
+    if not expression.format_spec:
+        return value
+    # Apply format specification
+    format_spec = evaluate_ast(expression.format_spec, state, static_tools, custom_tools, authorized_imports)
+    return format(value, format_spec)
+
+
+def evaluate_joined_str(expression: ast.JoinedStr, state, static_tools, custom_tools, authorized_imports) -> str:
+    return "".join(
+        [str(evaluate_ast(v, state, static_tools, custom_tools, authorized_imports)) for v in expression.values]
+    )
+
+
+def evaluate_ifexp(expression: ast.IfExp, state, static_tools, custom_tools, authorized_imports) -> Any:
+    if evaluate_ast(expression.test, state, static_tools, custom_tools, authorized_imports):
+        return evaluate_ast(expression.body, state, static_tools, custom_tools, authorized_imports)
+    return evaluate_ast(expression.orelse, state, static_tools, custom_tools, authorized_imports)
+
+
+def evaluate_slice(expression: ast.Slice, state, static_tools, custom_tools, authorized_imports) -> slice:
+    return slice(
+        *(
+            evaluate_ast(bound, state, static_tools, custom_tools, authorized_imports) if bound is not None else None
+            for bound in (expression.lower, expression.upper, expression.step)
         )
+    )
 
 
-class PythonExecutor:
-    pass
+def evaluate_import_statement(
+    expression: ast.Import | ast.ImportFrom, state, static_tools, custom_tools, authorized_imports
+) -> None:
+    return evaluate_import(expression, state, authorized_imports)
+
+
+# The function evaluating each type of node, called by `evaluate_ast` with the node and the evaluation parameters.
+# Its keys are the node types supported by the interpreter.
+EVALUATORS: dict[type[ast.AST], Callable] = {
+    ast.Assign: evaluate_assign,
+    ast.AnnAssign: evaluate_annassign,
+    ast.AugAssign: evaluate_augassign,
+    ast.Call: evaluate_call,
+    ast.Constant: evaluate_constant,
+    ast.Tuple: evaluate_tuple,
+    ast.ListComp: evaluate_listcomp,
+    ast.GeneratorExp: evaluate_generatorexp,
+    ast.DictComp: evaluate_dictcomp,
+    ast.SetComp: evaluate_setcomp,
+    ast.UnaryOp: evaluate_unaryop,
+    ast.Starred: evaluate_expr,
+    ast.BoolOp: evaluate_boolop,
+    ast.Break: evaluate_break,
+    ast.Continue: evaluate_continue,
+    ast.BinOp: evaluate_binop,
+    ast.Compare: evaluate_condition,
+    ast.Lambda: evaluate_lambda,
+    ast.FunctionDef: evaluate_function_def,
+    ast.AsyncFunctionDef: evaluate_async_function_def,
+    ast.Await: evaluate_await,
+    ast.Dict: evaluate_dict,
+    ast.Expr: evaluate_expr,
+    ast.For: evaluate_for,
+    ast.AsyncFor: evaluate_async_for,
+    ast.FormattedValue: evaluate_formatted_value,
+    ast.If: evaluate_if,
+    ast.JoinedStr: evaluate_joined_str,
+    ast.List: evaluate_list,
+    ast.Name: evaluate_name,
+    ast.Subscript: evaluate_subscript,
+    ast.IfExp: evaluate_ifexp,
+    ast.Attribute: evaluate_attribute,
+    ast.Slice: evaluate_slice,
+    ast.While: evaluate_while,
+    ast.Import: evaluate_import_statement,
+    ast.ImportFrom: evaluate_import_statement,
+    ast.ClassDef: evaluate_class_def,
+    ast.Try: evaluate_try,
+    ast.Raise: evaluate_raise,
+    ast.Assert: evaluate_assert,
+    ast.With: evaluate_with,
+    ast.Set: evaluate_set,
+    ast.Return: evaluate_return,
+    ast.Pass: evaluate_pass,
+    ast.Delete: evaluate_delete,
+}
 
+if hasattr(ast, "Index"):
+    EVALUATORS[ast.Index] = evaluate_expr
+
+# The operations counter of the current run. Outside of a run, as when `evaluate_ast` is called directly, operations
+# are counted without limit.
+_UNLIMITED_OPERATIONS_COUNTER = OperationsCounter(max_operations=math.inf)
+_OPERATIONS_COUNTER: ContextVar[OperationsCounter] = ContextVar(
+    "operations_counter", default=_UNLIMITED_OPERATIONS_COUNTER
+)
+
+
+# A compiled node is a closure with its children already resolved, called with the same evaluation parameters
+# as `evaluate_ast`: (state, static_tools, custom_tools, authorized_imports).
+CompiledNode = Callable[[dict[str, Any], dict[str, Callable], dict[str, Callable], list[str]], Any]
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.FloorDiv: operator.floordiv,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+}
 
-class LocalPythonExecutor(PythonExecutor):
+INPLACE_OPERATORS = {
+    ast.Add: operator.iadd,
+    ast.Sub: operator.isub,
+    ast.Mult: operator.imul,
+    ast.Div: operator.itruediv,
+    ast.Mod: operator.imod,
+    ast.Pow: operator.ipow,
+    ast.FloorDiv: operator.ifloordiv,
+    ast.BitAnd: operator.iand,
+    ast.BitOr: operator.ior,
+    ast.BitXor: operator.ixor,
+    ast.LShift: operator.ilshift,
+    ast.RShift: operator.irshift,
+}
+
+COMPARISON_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+    ast.In: lambda left, right: left in right,
+    ast.NotIn: lambda left, right: left not in right,
+}
+
+
+def count_operation() -> None:
+    """Count an operation in the operations counter of the current run, see `OperationsCounter`."""
+    counter = _OPERATIONS_COUNTER.get()
+    counter.count += 1
+    if counter.count >= counter.next_check:
+        counter.check()
+
+
+def compile_ast(node: ast.AST) -> CompiledNode:
     """
-    Executor of Python code in a local environment.
+    Translate an AST node once into a closure that can then be run many times without re-dispatching on node types.
 
-    This executor evaluates Python code with restricted access to imports and built-in functions,
-    making it suitable for running untrusted code. It maintains state between executions,
-    allows for custom tools and functions to be made available to the code, and captures
-    print outputs separately from return values.
+    Children are compiled ahead of time and bound into the closure of their parent. Nodes that the compiler does not
+    handle are wrapped in a closure that falls back to the tree-walking `evaluate_ast`, so they keep their exact
+    behaviour, including the errors raised for unsupported syntax.
+
+    Unlike `evaluate_ast`, which counts every node towards `MAX_OPERATIONS`, compiled code counts one operation per
+    executed statement, function call and comprehension element.
 
     Args:
-        additional_authorized_imports (`list[str]`):
-            Additional authorized imports for the executor.
-        max_print_outputs_length (`int`, defaults to `DEFAULT_MAX_LEN_OUTPUT=50_000`):
-            Maximum length of the print outputs.
-        additional_functions (`dict[str, Callable]`, *optional*):
-            Additional Python functions to be added to the executor.
+        node (`ast.AST`): The node to compile.
+
+    Returns:
+        `CompiledNode`: A callable taking `(state, static_tools, custom_tools, authorized_imports)`.
     """
+    compiler = _NODE_COMPILERS.get(type(node))
+    compiled = compiler(node) if compiler is not None else None
+    if compiled is None:
+        return _compile_fallback(node)
+    if _PROFILED_COMPILATION.get():
+        return _compile_profiled(node, compiled)
+    return compiled
 
-    def __init__(
-        self,
-        additional_authorized_imports: list[str],
-        max_print_outputs_length: int | None = None,
-        additional_functions: dict[str, Callable] | None = None,
-    ):
-        self.custom_tools = {}
-        self.state = {"__name__": "__main__"}
-        self.max_print_outputs_length = max_print_outputs_length
-        if max_print_outputs_length is None:
-            self.max_print_outputs_length = DEFAULT_MAX_LEN_OUTPUT
-        self.additional_authorized_imports = additional_authorized_imports
-        self.authorized_imports = list(set(BASE_BUILTIN_MODULES) | set(self.additional_authorized_imports))
-        # TODO: assert self.authorized imports are all installed locally
-        self.static_tools = None
-        self.additional_functions = additional_functions or {}
 
-    def __call__(self, code_action: str) -> tuple[Any, str, bool]:
-        output, is_final_answer = evaluate_python_code(
-            code_action,
-            static_tools=self.static_tools,
-            custom_tools=self.custom_tools,
-            state=self.state,
-            authorized_imports=self.authorized_imports,
-            max_print_outputs_length=self.max_print_outputs_length,
-        )
-        logs = str(self.state["_print_outputs"])
-        return output, logs, is_final_answer
+def _compile_fallback(node: ast.AST) -> CompiledNode:
+    def run(state, static_tools, custom_tools, authorized_imports):
+        return evaluate_ast(node, state, static_tools, custom_tools, authorized_imports)
 
-    def send_variables(self, variables: dict):
-        self.state.update(variables)
+    return run
+
+
+def _compile_checked(run: CompiledNode) -> CompiledNode:
+    """Apply the `safer_eval` checks to the result of a compiled node producing a new value."""
+
+    def checked_run(state, static_tools, custom_tools, authorized_imports):
+        result = run(state, static_tools, custom_tools, authorized_imports)
+        if type(result) not in SAFE_RESULT_TYPES:
+            check_safe_result(result, static_tools, authorized_imports)
+        return result
+
+    return checked_run
+
+
+# Whether `compile_ast` wraps the nodes it compiles for profiling, see `ParsedCode.profiled_compiled_body`
+_PROFILED_COMPILATION: ContextVar[bool] = ContextVar("profiled_compilation", default=False)
+
+
+def _compile_profiled(node: ast.AST, run: CompiledNode) -> CompiledNode:
+    """Wrap a compiled node to record its evaluations in the active `ExecutionProfiler`, if any."""
+
+    def profiled_run(state, static_tools, custom_tools, authorized_imports):
+        profiler = _OPERATIONS_COUNTER.get().profiler
+        if profiler is None:
+            return run(state, static_tools, custom_tools, authorized_imports)
+        return profiler.measure(node, run, state, static_tools, custom_tools, authorized_imports)
+
+    return profiled_run
+
+
+def _compile_body(statements: list[ast.stmt], keep_last_non_none: bool = True) -> CompiledNode:
+    """
+    Compile a block of statements. The block returns the result of its last statement, or the last non-None result
+    if `keep_last_non_none` is set, matching the tree-walking evaluation of the different block types.
+    """
+    compiled_statements = tuple(compile_ast(statement) for statement in statements)
+
+    def run_body(state, static_tools, custom_tools, authorized_imports):
+        result = None
+        for statement in compiled_statements:
+            count_operation()
+            line_result = statement(state, static_tools, custom_tools, authorized_imports)
+            if line_result is not None or not keep_last_non_none:
+                result = line_result
+        return result
+
+    return run_body
+
+
+def _compile_constant(node: ast.Constant) -> CompiledNode:
+    value = node.value
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        return value
+
+    return run
+
+
+def _compile_name(node: ast.Name) -> CompiledNode:
+    name = node.id
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        if name in state:
+            return state[name]
+        elif name in static_tools:
+            return static_tools[name]
+        elif name in custom_tools:
+            return custom_tools[name]
+        elif name in ERRORS:
+            return ERRORS[name]
+        return evaluate_name(node, state, static_tools, custom_tools, authorized_imports)
+
+    return _compile_checked(run)
+
+
+def _compile_attribute(node: ast.Attribute) -> CompiledNode:
+    attribute = node.attr
+    if attribute.startswith("__") and attribute.endswith("__"):
+
+        def run_forbidden(state, static_tools, custom_tools, authorized_imports):
+            raise InterpreterError(f"Forbidden access to dunder attribute: {attribute}")
+
+        return run_forbidden
+    value = compile_ast(node.value)
+    if attribute in FORBIDDEN_ATTRIBUTES:
+
+        def run_forbidden_attribute(state, static_tools, custom_tools, authorized_imports):
+            value(state, static_tools, custom_tools, authorized_imports)
+            raise InterpreterError(f"Forbidden access to attribute: {attribute}")
+
+        return _compile_checked(run_forbidden_attribute)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        return getattr(value(state, static_tools, custom_tools, authorized_imports), attribute)
+
+    return _compile_checked(run)
+
+
+def _compile_subscript(node: ast.Subscript) -> CompiledNode:
+    index_node = compile_ast(node.slice)
+    value_node = compile_ast(node.value)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        index = index_node(state, static_tools, custom_tools, authorized_imports)
+        value = value_node(state, static_tools, custom_tools, authorized_imports)
+        try:
+            return value[index]
+        except (KeyError, IndexError, TypeError) as e:
+            raise subscript_error(value, index, e) from e
+
+    return _compile_checked(run)
+
+
+def _compile_slice(node: ast.Slice) -> CompiledNode:
+    lower = compile_ast(node.lower) if node.lower is not None else None
+    upper = compile_ast(node.upper) if node.upper is not None else None
+    step = compile_ast(node.step) if node.step is not None else None
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        params = (state, static_tools, custom_tools, authorized_imports)
+        return slice(
+            lower(*params) if lower is not None else None,
+            upper(*params) if upper is not None else None,
+            step(*params) if step is not None else None,
+        )
+
+    return run
+
+
+def _compile_binop(node: ast.BinOp) -> CompiledNode | None:
+    operation = BINARY_OPERATORS.get(type(node.op))
+    if operation is None:
+        return None
+    left = compile_ast(node.left)
+    right = compile_ast(node.right)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        return operation(
+            left(state, static_tools, custom_tools, authorized_imports),
+            right(state, static_tools, custom_tools, authorized_imports),
+        )
+
+    return _compile_checked(run)
+
+
+def _compile_unaryop(node: ast.UnaryOp) -> CompiledNode | None:
+    operand = compile_ast(node.operand)
+    if isinstance(node.op, ast.USub):
+        operation = operator.neg
+    elif isinstance(node.op, ast.UAdd):
+        return operand
+    elif isinstance(node.op, ast.Not):
+        operation = operator.not_
+    elif isinstance(node.op, ast.Invert):
+        operation = operator.invert
+    else:
+        return None
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        return operation(operand(state, static_tools, custom_tools, authorized_imports))
+
+    return _compile_checked(run)
+
+
+def _compile_boolop(node: ast.BoolOp) -> CompiledNode:
+    values = tuple(compile_ast(value) for value in node.values)
+    is_and = isinstance(node.op, ast.And)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        for value in values:
+            result = value(state, static_tools, custom_tools, authorized_imports)
+            # Short-circuit: 'and' returns the first falsy value, 'or' the first truthy one
+            if is_and != bool(result):
+                return result
+        return result
+
+    return run
+
+
+def _compile_compare(node: ast.Compare) -> CompiledNode | None:
+    operations = tuple(COMPARISON_OPERATORS.get(type(op)) for op in node.ops)
+    if None in operations:
+        return None
+    left_node = compile_ast(node.left)
+    comparators = tuple(zip(operations, (compile_ast(comparator) for comparator in node.comparators)))
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        result = True
+        left = left_node(state, static_tools, custom_tools, authorized_imports)
+        for i, (operation, comparator) in enumerate(comparators):
+            right = comparator(state, static_tools, custom_tools, authorized_imports)
+            current_result = operation(left, right)
+            if current_result is False:
+                return False
+            result = current_result if i == 0 else (result and current_result)
+            left = right
+        return result
+
+    return _compile_checked(run)
+
+
+def _compile_ifexp(node: ast.IfExp) -> CompiledNode:
+    test = compile_ast(node.test)
+    body = compile_ast(node.body)
+    orelse = compile_ast(node.orelse)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        if test(state, static_tools, custom_tools, authorized_imports):
+            return body(state, static_tools, custom_tools, authorized_imports)
+        return orelse(state, static_tools, custom_tools, authorized_imports)
+
+    return run
+
+
+def _compile_sequence(node: ast.List | ast.Tuple | ast.Set) -> CompiledNode:
+    elements = tuple(compile_ast(element) for element in node.elts)
+    container = {ast.List: list, ast.Tuple: tuple, ast.Set: set}[type(node)]
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        return container([element(state, static_tools, custom_tools, authorized_imports) for element in elements])
+
+    return run
+
+
+def _compile_dict(node: ast.Dict) -> CompiledNode | None:
+    if any(key is None for key in node.keys):
+        return None
+    items = tuple((compile_ast(key), compile_ast(value)) for key, value in zip(node.keys, node.values))
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        params = (state, static_tools, custom_tools, authorized_imports)
+        return {key(*params): value(*params) for key, value in items}
+
+    return run
+
+
+def _compile_joinedstr(node: ast.JoinedStr) -> CompiledNode:
+    values = tuple(compile_ast(value) for value in node.values)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        return "".join([str(value(state, static_tools, custom_tools, authorized_imports)) for value in values])
+
+    return run
+
+
+def _compile_formattedvalue(node: ast.FormattedValue) -> CompiledNode:
+    value_node = compile_ast(node.value)
+    if not node.format_spec:
+        return value_node
+    format_spec = compile_ast(node.format_spec)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        value = value_node(state, static_tools, custom_tools, authorized_imports)
+        return format(value, format_spec(state, static_tools, custom_tools, authorized_imports))
+
+    return run
+
+
+def _compile_starred(node: ast.Starred) -> CompiledNode:
+    return compile_ast(node.value)
+
+
+def _compile_expr(node: ast.Expr) -> CompiledNode:
+    return compile_ast(node.value)
+
+
+def _compile_call(node: ast.Call) -> CompiledNode | None:
+    func_node = node.func
+    if not isinstance(func_node, (ast.Call, ast.Lambda, ast.Attribute, ast.Name, ast.Subscript)):
+        return None
+    if any(keyword.arg is None for keyword in node.keywords):
+        return None
+    arguments = tuple((isinstance(arg, ast.Starred), compile_ast(arg)) for arg in node.args)
+    keywords = tuple((keyword.arg, compile_ast(keyword.value)) for keyword in node.keywords)
+
+    if isinstance(func_node, ast.Name):
+        func_name = func_node.id
+
+        def get_func(state, static_tools, custom_tools, authorized_imports):
+            if func_name in state:
+                return state[func_name]
+            elif func_name in static_tools:
+                return static_tools[func_name]
+            elif func_name in custom_tools:
+                return custom_tools[func_name]
+            elif func_name in ERRORS:
+                return ERRORS[func_name]
+            raise InterpreterError(
+                f"Forbidden function evaluation: '{func_name}' is not among the explicitly allowed tools or defined/imported in the preceding code"
+            )
+
+    elif isinstance(func_node, ast.Attribute):
+        func_name = func_node.attr
+        obj_node = compile_ast(func_node.value)
+
+        def get_func(state, static_tools, custom_tools, authorized_imports):
+            obj = obj_node(state, static_tools, custom_tools, authorized_imports)
+            func = getattr(obj, func_name, _MISSING)
+            if func is _MISSING:
+                raise InterpreterError(f"Object {obj} has no attribute {func_name}")
+            return func
+
+    elif isinstance(func_node, ast.Subscript):
+        func_name = None
+        subscript_node = compile_ast(func_node)
+
+        def get_func(state, static_tools, custom_tools, authorized_imports):
+            func = subscript_node(state, static_tools, custom_tools, authorized_imports)
+            if not callable(func):
+                raise InterpreterError(f"This is not a correct function: {func_node}).")
+            return func
+
+    else:
+        func_name = None
+        get_func = compile_ast(func_node)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        func = get_func(state, static_tools, custom_tools, authorized_imports)
+        args = []
+        for is_starred, arg in arguments:
+            if is_starred:
+                args.extend(arg(state, static_tools, custom_tools, authorized_imports))
+            else:
+                args.append(arg(state, static_tools, custom_tools, authorized_imports))
+        kwargs = {name: value(state, static_tools, custom_tools, authorized_imports) for name, value in keywords}
+
+        if func_name == "super":
+            return evaluate_super(args, state)
+        elif func_name == "print":
+            state["_print_outputs"] += " ".join(map(str, args)) + "\n"
+            return None
+        if inspect.isbuiltin(func) and (inspect.getmodule(func) == builtins) and (func not in static_tools.values()):
+            raise InterpreterError(
+                f"Invoking a builtin function that has not been explicitly added as a tool is not allowed ({func_name})."
+            )
+        return func(*args, **kwargs)
+
+    return _compile_checked(run)
+
+
+def _compile_target(target: ast.AST) -> Callable:
+    """Compile an assignment target into a setter `(value, state, static_tools, custom_tools, authorized_imports)`."""
+    if isinstance(target, ast.Name):
+        name = target.id
+
+        def set_name(value, state, static_tools, custom_tools, authorized_imports):
+            if name in static_tools:
+                raise InterpreterError(f"Cannot assign to name '{name}': doing this would erase the existing tool!")
+            state[name] = value
+
+        return set_name
+    elif isinstance(target, ast.Tuple):
+        setters = tuple(_compile_target(element) for element in target.elts)
+
+        def set_tuple(value, state, static_tools, custom_tools, authorized_imports):
+            if not isinstance(value, tuple):
+                if hasattr(value, "__iter__") and not isinstance(value, (str, bytes)):
+                    value = tuple(value)
+                else:
+                    raise InterpreterError("Cannot unpack non-tuple value")
+            if len(setters) != len(value):
+                raise InterpreterError("Cannot unpack tuple of wrong size")
+            for setter, element in zip(setters, value):
+                setter(element, state, static_tools, custom_tools, authorized_imports)
+
+        return set_tuple
+    elif isinstance(target, ast.Subscript):
+        obj_node = compile_ast(target.value)
+        key_node = compile_ast(target.slice)
+
+        def set_subscript(value, state, static_tools, custom_tools, authorized_imports):
+            obj = obj_node(state, static_tools, custom_tools, authorized_imports)
+            obj[key_node(state, static_tools, custom_tools, authorized_imports)] = value
+
+        return set_subscript
+    elif isinstance(target, ast.Attribute):
+        obj_node = compile_ast(target.value)
+        attribute = target.attr
+
+        def set_attribute(value, state, static_tools, custom_tools, authorized_imports):
+            setattr(obj_node(state, static_tools, custom_tools, authorized_imports), attribute, value)
+
+        return set_attribute
+
+    def set_other(value, state, static_tools, custom_tools, authorized_imports):
+        set_value(target, value, state, static_tools, custom_tools, authorized_imports)
+
+    return set_other
+
+
+def _compile_assign(node: ast.Assign) -> CompiledNode:
+    value_node = compile_ast(node.value)
+    setters = tuple((isinstance(target, ast.Starred), _compile_target(target)) for target in node.targets)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        result = value_node(state, static_tools, custom_tools, authorized_imports)
+        if len(setters) == 1:
+            setters[0][1](result, state, static_tools, custom_tools, authorized_imports)
+        else:
+            expanded_values = []
+            for is_starred, _ in setters:
+                if is_starred:
+                    expanded_values.extend(result)
+                else:
+                    expanded_values.append(result)
+            for (_, setter), value in zip(setters, expanded_values):
+                setter(value, state, static_tools, custom_tools, authorized_imports)
+        return result
+
+    return run
+
+
+def _compile_annassign(node: ast.AnnAssign) -> CompiledNode:
+    if not node.value:
+        return _compile_constant(ast.Constant(value=None))
+    value_node = compile_ast(node.value)
+    setter = _compile_target(node.target)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        value = value_node(state, static_tools, custom_tools, authorized_imports)
+        setter(value, state, static_tools, custom_tools, authorized_imports)
+        return value
+
+    return run
+
+
+def _compile_augassign(node: ast.AugAssign) -> CompiledNode | None:
+    operation = INPLACE_OPERATORS.get(type(node.op))
+    target = node.target
+    if operation is None or not isinstance(target, (ast.Name, ast.Subscript, ast.Attribute)):
+        return None
+    value_node = compile_ast(node.value)
+    setter = _compile_target(target)
+    if isinstance(target, ast.Name):
+        name = target.id
+
+        def get_current_value(state, static_tools, custom_tools, authorized_imports):
+            return state.get(name, 0)
+
+    elif isinstance(target, ast.Subscript):
+        obj_node = compile_ast(target.value)
+        key_node = compile_ast(target.slice)
+
+        def get_current_value(state, static_tools, custom_tools, authorized_imports):
+            obj = obj_node(state, static_tools, custom_tools, authorized_imports)
+            return obj[key_node(state, static_tools, custom_tools, authorized_imports)]
+
+    else:
+        obj_node = compile_ast(target.value)
+        attribute = target.attr
+
+        def get_current_value(state, static_tools, custom_tools, authorized_imports):
+            return getattr(obj_node(state, static_tools, custom_tools, authorized_imports), attribute)
+
+    is_add = isinstance(node.op, ast.Add)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        current_value = get_current_value(state, static_tools, custom_tools, authorized_imports)
+        value_to_add = value_node(state, static_tools, custom_tools, authorized_imports)
+        if is_add and isinstance(current_value, list) and not isinstance(value_to_add, list):
+            raise InterpreterError(f"Cannot add non-list value {value_to_add} to a list.")
+        current_value = operation(current_value, value_to_add)
+        setter(current_value, state, static_tools, custom_tools, authorized_imports)
+        return current_value
+
+    return run
+
+
+def _compile_if(node: ast.If) -> CompiledNode:
+    test = compile_ast(node.test)
+    body = _compile_body(node.body)
+    orelse = _compile_body(node.orelse)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        if test(state, static_tools, custom_tools, authorized_imports):
+            return body(state, static_tools, custom_tools, authorized_imports)
+        return orelse(state, static_tools, custom_tools, authorized_imports)
+
+    return run
+
+
+def _compile_for(node: ast.For) -> CompiledNode | None:
+    if node.orelse:
+        return None
+    iterator_node = compile_ast(node.iter)
+    setter = _compile_target(node.target)
+    body = tuple(compile_ast(statement) for statement in node.body)
+    vectorized_loop = find_vectorized_loop(node)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        iterable = iterator_node(state, static_tools, custom_tools, authorized_imports)
+        if vectorized_loop is not None and _VECTORIZE_LOOPS.get():
+            result = run_vectorized_loop(
+                vectorized_loop, iterable, state, static_tools, custom_tools, authorized_imports
+            )
+            if result is not _MISSING:
+                return result
+        result = None
+        for counter in iterable:
+            setter(counter, state, static_tools, custom_tools, authorized_imports)
+            try:
+                for statement in body:
+                    count_operation()
+                    line_result = statement(state, static_tools, custom_tools, authorized_imports)
+                    if line_result is not None:
+                        result = line_result
+            except BreakException:
+                break
+            except ContinueException:
+                continue
+        return result
+
+    return run
+
+
+def _compile_while(node: ast.While) -> CompiledNode | None:
+    if node.orelse:
+        return None
+    test = compile_ast(node.test)
+    body = tuple(compile_ast(statement) for statement in node.body)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        iterations = 0
+        while test(state, static_tools, custom_tools, authorized_imports):
+            try:
+                for statement in body:
+                    count_operation()
+                    statement(state, static_tools, custom_tools, authorized_imports)
+            except BreakException:
+                return None
+            except ContinueException:
+                pass
+            iterations += 1
+            if iterations > MAX_WHILE_ITERATIONS:
+                raise InterpreterError(f"Maximum number of {MAX_WHILE_ITERATIONS} iterations in While loop exceeded")
+        return None
+
+    return run
+
+
+def _compile_break(node: ast.Break) -> CompiledNode:
+    def run(state, static_tools, custom_tools, authorized_imports):
+        raise BreakException()
+
+    return run
+
+
+def _compile_continue(node: ast.Continue) -> CompiledNode:
+    def run(state, static_tools, custom_tools, authorized_imports):
+        raise ContinueException()
+
+    return run
+
+
+def _compile_pass(node: ast.Pass) -> CompiledNode:
+    def run(state, static_tools, custom_tools, authorized_imports):
+        return None
+
+    return run
+
+
+def _compile_return(node: ast.Return) -> CompiledNode:
+    value_node = compile_ast(node.value) if node.value else None
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        raise ReturnException(
+            value_node(state, static_tools, custom_tools, authorized_imports) if value_node is not None else None
+        )
+
+    return run
+
+
+def _compile_comprehension(generators: list[ast.comprehension]) -> Callable:
+    """
+    Compile the generators of a comprehension into a runner `(first_iterable, scope, static_tools, custom_tools,
+    authorized_imports)` binding the loop variables in `scope` and yielding once per element, like
+    `iterate_comprehension`. Each element counts as one operation.
+    """
+    compiled_generators = tuple(
+        (compile_ast(generator.iter), _compile_target(generator.target), tuple(compile_ast(i) for i in generator.ifs))
+        for generator in generators
+    )
+    last_index = len(compiled_generators) - 1
+
+    def iterate(index, iterable, scope, static_tools, custom_tools, authorized_imports):
+        _, setter, ifs = compiled_generators[index]
+        if index < last_index:
+            next_iter_node = compiled_generators[index + 1][0]
+        for value in iterable:
+            count_operation()
+            setter(value, scope, static_tools, custom_tools, authorized_imports)
+            if all(if_clause(scope, static_tools, custom_tools, authorized_imports) for if_clause in ifs):
+                if index == last_index:
+                    yield
+                else:
+                    yield from iterate(
+                        index + 1,
+                        next_iter_node(scope, static_tools, custom_tools, authorized_imports),
+                        scope,
+                        static_tools,
+                        custom_tools,
+                        authorized_imports,
+                    )
+
+    first_iter_node = compiled_generators[0][0]
+
+    def run_comprehension(state, static_tools, custom_tools, authorized_imports, first_iterable=_MISSING):
+        if first_iterable is _MISSING:
+            first_iterable = first_iter_node(state, static_tools, custom_tools, authorized_imports)
+        scope = Scope(state)
+        return scope, iterate(0, first_iterable, scope, static_tools, custom_tools, authorized_imports)
+
+    return run_comprehension
+
+
+def _compile_listcomp(node: ast.ListComp | ast.SetComp) -> CompiledNode:
+    element_node = compile_ast(node.elt)
+    run_comprehension = _compile_comprehension(node.generators)
+    result_type = set if isinstance(node, ast.SetComp) else list
+    vectorized_loop = find_vectorized_loop(node) if isinstance(node, ast.ListComp) else None
+    first_iter_node = compile_ast(node.generators[0].iter) if vectorized_loop is not None else None
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        first_iterable = _MISSING
+        if vectorized_loop is not None and _VECTORIZE_LOOPS.get():
+            first_iterable = first_iter_node(state, static_tools, custom_tools, authorized_imports)
+            result = run_vectorized_loop(
+                vectorized_loop, first_iterable, state, static_tools, custom_tools, authorized_imports
+            )
+            if result is not _MISSING:
+                return result
+        scope, elements = run_comprehension(state, static_tools, custom_tools, authorized_imports, first_iterable)
+        return result_type(element_node(scope, static_tools, custom_tools, authorized_imports) for _ in elements)
+
+    return run
+
+
+def _compile_generatorexp(node: ast.GeneratorExp) -> CompiledNode:
+    element_node = compile_ast(node.elt)
+    run_comprehension = _compile_comprehension(node.generators)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        scope, elements = run_comprehension(state, static_tools, custom_tools, authorized_imports)
+
+        def generate():
+            scope.refresh()
+            for _ in elements:
+                yield element_node(scope, static_tools, custom_tools, authorized_imports)
+                scope.refresh()
+
+        return GeneratorExpression(generate())
+
+    return run
+
+
+def _compile_dictcomp(node: ast.DictComp) -> CompiledNode:
+    key_node = compile_ast(node.key)
+    value_node = compile_ast(node.value)
+    run_comprehension = _compile_comprehension(node.generators)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        scope, elements = run_comprehension(state, static_tools, custom_tools, authorized_imports)
+        result = {}
+        for _ in elements:
+            key = key_node(scope, static_tools, custom_tools, authorized_imports)
+            result[key] = value_node(scope, static_tools, custom_tools, authorized_imports)
+        return result
+
+    return run
+
+
+def _compile_lambda(node: ast.Lambda) -> CompiledNode:
+    arg_names = tuple(arg.arg for arg in node.args.args)
+    body = compile_ast(node.body)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        def lambda_func(*values: Any) -> Any:
+            count_operation()
+            new_state = Scope(state)
+            for arg, value in zip(arg_names, values):
+                new_state[arg] = value
+            return body(new_state, static_tools, custom_tools, authorized_imports)
+
+        return lambda_func
+
+    return run
+
+
+def _compile_function(func_def: ast.FunctionDef) -> Callable:
+    """
+    Compile a function definition into a factory `(state, static_tools, custom_tools, authorized_imports)` creating
+    the function object, with the same call semantics as `create_function`.
+    """
+    source_code = get_function_source(func_def)
+    body = _compile_body(func_def.body, keep_last_non_none=False)
+    default_nodes = tuple(compile_ast(default) for default in func_def.args.defaults)
+    arg_names = [arg.arg for arg in func_def.args.args]
+    vararg_name = func_def.args.vararg.arg if func_def.args.vararg else None
+    kwarg_name = func_def.args.kwarg.arg if func_def.args.kwarg else None
+    is_method = bool(arg_names) and arg_names[0] == "self"
+    is_init = func_def.name == "__init__"
+
+    def make_function(state, static_tools, custom_tools, authorized_imports):
+        def new_func(*args: Any, **kwargs: Any) -> Any:
+            count_operation()
+            func_state = Scope(state)
+            default_values = [
+                default(state, static_tools, custom_tools, authorized_imports) for default in default_nodes
+            ]
+            defaults = dict(zip(arg_names[-len(default_values) :], default_values))
+            for name, value in zip(arg_names, args):
+                func_state[name] = value
+            func_state.update(kwargs)
+            if vararg_name:
+                func_state[vararg_name] = args
+            if kwarg_name:
+                func_state[kwarg_name] = kwargs
+            for name, value in defaults.items():
+                if not func_state.has_local(name):
+                    func_state[name] = value
+            if is_method and args:
+                func_state["self"] = args[0]
+                func_state["__class__"] = args[0].__class__
+
+            try:
+                result = body(func_state, static_tools, custom_tools, authorized_imports)
+            except ReturnException as e:
+                result = e.value
+            if is_init:
+                return None
+            return result
+
+        new_func.__ast__ = func_def
+        new_func.__source__ = source_code
+        new_func.__name__ = func_def.name
+        return new_func
+
+    return make_function
+
+
+def _compile_function_def(node: ast.FunctionDef) -> CompiledNode:
+    make_function = _compile_function(node)
+    name = node.name
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        custom_tools[name] = make_function(state, static_tools, custom_tools, authorized_imports)
+        return custom_tools[name]
+
+    return run
+
+
+def _compile_class_def(node: ast.ClassDef) -> CompiledNode | None:
+    bases = tuple(compile_ast(base) for base in node.bases)
+    members = []
+    for stmt in node.body:
+        if isinstance(stmt, ast.FunctionDef):
+            members.append((stmt.name, _compile_function_def(stmt)))
+        elif isinstance(stmt, ast.Assign):
+            value_node = compile_ast(stmt.value)
+            for target in stmt.targets:
+                if isinstance(target, ast.Name):
+                    members.append((target.id, value_node))
+                elif isinstance(target, ast.Attribute):
+                    members.append((target.attr, value_node))
+        elif (
+            isinstance(stmt, ast.Expr)
+            and stmt == node.body[0]
+            and isinstance(stmt.value, ast.Constant)
+            and isinstance(stmt.value.value, str)
+        ):
+            members.append(("__doc__", _compile_constant(stmt.value)))
+        else:
+            # Unsupported class bodies are left to the tree-walker, which raises the appropriate error
+            return None
+    class_name = node.name
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        params = (state, static_tools, custom_tools, authorized_imports)
+        class_bases = tuple(base(*params) for base in bases)
+        class_dict = {name: member(*params) for name, member in members}
+        new_class = type(class_name, class_bases, class_dict)
+        state[class_name] = new_class
+        return new_class
+
+    return run
+
+
+def _compile_try(node: ast.Try) -> CompiledNode:
+    body = _compile_body(node.body)
+    handlers = tuple(
+        (compile_ast(handler.type) if handler.type is not None else None, handler.name, _compile_body(handler.body))
+        for handler in node.handlers
+    )
+    orelse = _compile_body(node.orelse) if node.orelse else None
+    finalbody = _compile_body(node.finalbody) if node.finalbody else None
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        params = (state, static_tools, custom_tools, authorized_imports)
+        try:
+            body(*params)
+        except Exception as e:
+            for handler_type, handler_name, handler_body in handlers:
+                if handler_type is None or isinstance(e, handler_type(*params)):
+                    if handler_name:
+                        state[handler_name] = e
+                    handler_body(*params)
+                    break
+            else:
+                raise e
+        else:
+            if orelse is not None:
+                orelse(*params)
+        finally:
+            if finalbody is not None:
+                finalbody(*params)
+
+    return run
+
+
+def _compile_raise(node: ast.Raise) -> CompiledNode:
+    exc_node = compile_ast(node.exc) if node.exc is not None else None
+    cause_node = compile_ast(node.cause) if node.cause is not None else None
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        params = (state, static_tools, custom_tools, authorized_imports)
+        exc = exc_node(*params) if exc_node is not None else None
+        cause = cause_node(*params) if cause_node is not None else None
+        if exc is None:
+            raise InterpreterError("Re-raise is not supported without an active exception")
+        if cause is not None:
+            raise exc from cause
+        raise exc
+
+    return run
+
+
+def _compile_assert(node: ast.Assert) -> CompiledNode:
+    test = compile_ast(node.test)
+    msg = compile_ast(node.msg) if node.msg else None
+    test_code = ast.unparse(node.test)
+
+    def run(state, static_tools, custom_tools, authorized_imports):
+        if not test(state, static_tools, custom_tools, authorized_imports):
+            if msg is not None:
+                raise AssertionError(msg(state, static_tools, custom_tools, authorized_imports))
+            raise AssertionError(f"Assertion failed: {test_code}")
+
+    return run
+
+
+_MISSING = object()
+
+_NODE_COMPILERS: dict[type, Callable[[Any], CompiledNode | None]] = {
+    ast.Constant: _compile_constant,
+    ast.Name: _compile_name,
+    ast.Attribute: _compile_attribute,
+    ast.Subscript: _compile_subscript,
+    ast.Slice: _compile_slice,
+    ast.BinOp: _compile_binop,
+    ast.UnaryOp: _compile_unaryop,
+    ast.BoolOp: _compile_boolop,
+    ast.Compare: _compile_compare,
+    ast.IfExp: _compile_ifexp,
+    ast.List: _compile_sequence,
+    ast.Tuple: _compile_sequence,
+    ast.Set: _compile_sequence,
+    ast.Dict: _compile_dict,
+    ast.JoinedStr: _compile_joinedstr,
+    ast.FormattedValue: _compile_formattedvalue,
+    ast.Starred: _compile_starred,
+    ast.Call: _compile_call,
+    ast.Lambda: _compile_lambda,
+    ast.ListComp: _compile_listcomp,
+    ast.GeneratorExp: _compile_generatorexp,
+    ast.SetComp: _compile_listcomp,
+    ast.DictComp: _compile_dictcomp,
+    ast.Expr: _compile_expr,
+    ast.Assign: _compile_assign,
+    ast.AnnAssign: _compile_annassign,
+    ast.AugAssign: _compile_augassign,
+    ast.If: _compile_if,
+    ast.For: _compile_for,
+    ast.While: _compile_while,
+    ast.Break: _compile_break,
+    ast.Continue: _compile_continue,
+    ast.Pass: _compile_pass,
+    ast.Return: _compile_return,
+    ast.FunctionDef: _compile_function_def,
+    ast.ClassDef: _compile_class_def,
+    ast.Try: _compile_try,
+    ast.Raise: _compile_raise,
+    ast.Assert: _compile_assert,
+}
+
+
+class FinalAnswerException(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
+# Polling period of the watchdog thread, and delay it leaves to the cooperative check before interrupting the run
+WATCHDOG_POLL_SECONDS = 0.05
+WATCHDOG_GRACE_SECONDS = 0.2
+
+
+def get_memory_usage_mb() -> float | None:
+    """
+    Return the memory used by the current process in MiB: the resident set size where it can be read, else the peak
+    resident set size. Returns `None` if it cannot be measured on this platform.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on other platforms
+    return max_rss / 2**20 if os.uname().sysname == "Darwin" else max_rss / 2**10
+
+
+# Number of runs of the interpreter in progress per thread of this process, including nested runs, to detect runs
+# sharing the memory of the process concurrently
+_RUNS_PER_THREAD: dict[int, int] = {}
+_RUNS_PER_THREAD_LOCK = threading.Lock()
+
+
+def _enter_run() -> None:
+    thread_id = threading.get_ident()
+    with _RUNS_PER_THREAD_LOCK:
+        _RUNS_PER_THREAD[thread_id] = _RUNS_PER_THREAD.get(thread_id, 0) + 1
+
+
+def _exit_run() -> None:
+    thread_id = threading.get_ident()
+    with _RUNS_PER_THREAD_LOCK:
+        runs = _RUNS_PER_THREAD.pop(thread_id) - 1
+        if runs:
+            _RUNS_PER_THREAD[thread_id] = runs
+
+
+def count_concurrent_runs() -> int:
+    """Return the number of other threads of this process running the interpreter, see [`ExecutionLimits`]."""
+    return len(_RUNS_PER_THREAD) - (threading.get_ident() in _RUNS_PER_THREAD)
+
+
+class ExecutionLimitExceeded(BaseException):
+    """
+    Raised inside a run that exceeded its execution limits.
+
+    It derives from `BaseException` so that `try`/`except` blocks of the interpreted code, as well as the libraries it
+    calls, do not catch it: `evaluate_python_code` turns it into an `InterpreterError`.
+    """
+
+
+class ExecutionLimits:
+    """
+    Wall-clock and memory limits of one run of the interpreter.
+
+    Limits are enforced at two levels. Cooperatively, the interpreter calls `check` every `LIMITS_CHECK_INTERVAL`
+    operations and stops at the next operation once a limit is exceeded. Preemptively, a watchdog thread polls the
+    limits while the run is in progress: if the run does not stop by itself within `WATCHDOG_GRACE_SECONDS`, e.g.
+    because it is stuck in a long call to a library, the watchdog raises `ExecutionLimitExceeded` asynchronously in
+    the running thread. Calls to C code, like sorting a huge list or matching a pathological regex, can only be
+    interrupted once they return.
+
+    The memory limit is measured on the whole process, as Python cannot attribute allocations to a thread: it is only
+    reliable when the run is alone in its process, like in the worker of a [`ProcessPythonExecutor`]. Runs in other
+    threads, like the parallel tool calls of an agent or concurrent agents in a server, count towards the limit of
+    this run and may make it fail instead of them, so a warning is logged when they overlap.
+
+    Args:
+        timeout_seconds (`float`, *optional*): Maximum duration of the run.
+        max_memory_mb (`float`, *optional*): Maximum growth of the memory used by the process during the run, in MiB.
+    """
+
+    def __init__(self, timeout_seconds: float | None = None, max_memory_mb: float | None = None):
+        self.timeout_seconds = timeout_seconds
+        self.max_memory_mb = max_memory_mb
+        self.deadline = None
+        self.memory_baseline_mb = None
+        self.exceeded: str | None = None
+        self._thread_id = None
+        self._interrupted = False
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        self._watchdog = None
+
+    def start(self) -> None:
+        """Start the clock and the watchdog thread, for a run in the current thread."""
+        if self.timeout_seconds is not None:
+            self.deadline = time.monotonic() + self.timeout_seconds
+        if self.max_memory_mb is not None:
+            self.memory_baseline_mb = get_memory_usage_mb()
+            if self.memory_baseline_mb is None:
+                logger.warning("The memory usage cannot be measured on this platform: max_memory_mb is ignored.")
+            elif count_concurrent_runs():
+                logger.warning(
+                    "max_memory_mb measures the memory of the whole process, where other code runs concurrently: "
+                    "its allocations count towards the limit of this run. Use a ProcessPythonExecutor to run the code "
+                    "in a process of its own."
+                )
+        self._thread_id = threading.get_ident()
+        self._watchdog = threading.Thread(target=self._watch, name="smolagents-execution-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Stop the watchdog, discarding an interruption it may have sent that was not raised yet."""
+        with self._lock:
+            self._finished.set()
+            if self._interrupted:
+                pythonapi.PyThreadState_SetAsyncExc(c_ulong(self._thread_id), None)
+
+    def _find_exceeded_limit(self) -> str | None:
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return f"Execution time limit of {self.timeout_seconds} seconds exceeded."
+        if self.memory_baseline_mb is not None:
+            memory_usage_mb = get_memory_usage_mb() - self.memory_baseline_mb
+            if memory_usage_mb > self.max_memory_mb:
+                shared = ", including the runs in other threads of this process" if count_concurrent_runs() else ""
+                return (
+                    f"Memory limit of {self.max_memory_mb} MB exceeded: the execution used {memory_usage_mb:.0f} MB"
+                    f"{shared}."
+                )
+        return None
+
+    def check(self) -> None:
+        """Raise `ExecutionLimitExceeded` if the deadline has passed or the watchdog found a limit exceeded."""
+        if self.exceeded is None and self.deadline is not None and time.monotonic() > self.deadline:
+            self.exceeded = self._find_exceeded_limit()
+        if self.exceeded is not None:
+            raise ExecutionLimitExceeded(self.exceeded)
+
+    def _watch(self) -> None:
+        exceeded_at = None
+        while not self._finished.wait(WATCHDOG_POLL_SECONDS):
+            if self.exceeded is None:
+                self.exceeded = self._find_exceeded_limit()
+            if self.exceeded is None:
+                continue
+            now = time.monotonic()
+            if exceeded_at is None:
+                exceeded_at = now
+            elif now - exceeded_at >= WATCHDOG_GRACE_SECONDS:
+                with self._lock:
+                    if self._finished.is_set():
+                        return
+                    pythonapi.PyThreadState_SetAsyncExc(c_ulong(self._thread_id), py_object(ExecutionLimitExceeded))
+                    self._interrupted = True
+                exceeded_at = now
+
+
+# Limits of the run in progress, see `evaluate_python_code`
+_EXECUTION_LIMITS: ContextVar[ExecutionLimits | None] = ContextVar("execution_limits", default=None)
+
+
+def check_execution_limits() -> None:
+    """Check the limits of the run in progress, if any."""
+    limits = _EXECUTION_LIMITS.get()
+    if limits is not None:
+        limits.check()
+
+
+@dataclass
+class ProfileEntry:
+    """
+    Measurements of one node type, source line or tool in an [`ExecutionProfile`].
+
+    Args:
+        count (`int`): Number of evaluations of the node type, of statements run on the line, or of calls to the tool.
+        total_time (`float`): Time spent in the evaluations, including the nested ones, in seconds. Nested evaluations
+            of the same node type or line are only counted once, in the outermost one.
+        self_time (`float`): Time spent in the evaluations, excluding the nested nodes evaluated by the interpreter.
+    """
+
+    count: int = 0
+    total_time: float = 0.0
+    self_time: float = 0.0
+
+
+@dataclass
+class ExecutionProfile:
+    """
+    Profile of one run of the interpreter, recorded by an [`ExecutionProfiler`].
+
+    Args:
+        total_time (`float`): Duration of the run, in seconds.
+        node_types (`dict[str, ProfileEntry]`): Measurements by AST node type name, e.g. `"Call"` or `"For"`.
+        lines (`dict[int, ProfileEntry]`): Measurements by line number in the code snippet. The self time of every
+            node is attributed to its line, so that the self times of all lines add up to the time of the run.
+        tools (`dict[str, ProfileEntry]`): Measurements of the calls to static and custom tools, by name: their total
+            time excludes the evaluation of their arguments, and their self time also excludes the code they run in
+            the interpreter, like the body of a function defined in a previous snippet.
+    """
+
+    total_time: float = 0.0
+    node_types: dict[str, ProfileEntry] = field(default_factory=dict)
+    lines: dict[int, ProfileEntry] = field(default_factory=dict)
+    tools: dict[str, ProfileEntry] = field(default_factory=dict)
+
+    def dict(self) -> dict[str, Any]:
+        return {
+            "total_time": self.total_time,
+            "node_types": {name: asdict(entry) for name, entry in self.node_types.items()},
+            "lines": {line: asdict(entry) for line, entry in sorted(self.lines.items())},
+            "tools": {name: asdict(entry) for name, entry in self.tools.items()},
+        }
+
+    def summary(self, max_rows: int = 10) -> str:
+        """Return a text report of the node types, lines and tools that took the most time."""
+        sections = [f"Total time: {self.total_time:.6f}s"]
+        for title, entries in (("Node type", self.node_types), ("Line", self.lines), ("Tool", self.tools)):
+            if not entries:
+                continue
+            rows = sorted(entries.items(), key=lambda item: item[1].self_time, reverse=True)[:max_rows]
+            sections.append(
+                "\n".join(
+                    [f"{title:<20} {'Count':>10} {'Total (s)':>12} {'Self (s)':>12}"]
+                    + [
+                        f"{str(key):<20} {entry.count:>10} {entry.total_time:>12.6f} {entry.self_time:>12.6f}"
+                        for key, entry in rows
+                    ]
+                )
+            )
+        return "\n\n".join(sections)
+
+
+class ExecutionProfiler:
+    """
+    Profiler of the interpreter, recording the time spent per AST node type, per source line and per tool call.
+
+    A profiler is attached to the operations counter of the run it profiles, so that it never affects the other runs.
+    With the `"ast"` engine, it swaps the evaluators of the counter, which `evaluate_ast` reads instead of
+    `EVALUATORS`, for wrappers measuring them: names and constants, which `evaluate_ast` evaluates inline, are not
+    measured on their own. With the `"compiled"` engine, the code is compiled a second time with each node wrapped,
+    see [`ParsedCode.profiled_compiled_body`]. Functions defined by compiled code that was not profiled are measured as
+    a whole, as tools.
+
+    Timings include the overhead of the measurement itself, so they are best used to compare the parts of a run.
+
+    Attributes:
+        profile (`ExecutionProfile`): The profile recorded so far.
+    """
+
+    def __init__(self):
+        self.profile = ExecutionProfile()
+        # Stack of the nodes being evaluated: [time in nested nodes, time in call arguments, ids of call arguments]
+        self._frames: list[list] = []
+        self._active_node_types: dict[str, int] = {}
+        self._active_lines: dict[int, int] = {}
+        self.evaluators = {
+            node_type: self._profiled_evaluator(evaluator) for node_type, evaluator in EVALUATORS.items()
+        }
+
+    def _profiled_evaluator(self, evaluator: Callable) -> Callable:
+        def profiled_evaluator(expression, state, static_tools, custom_tools, authorized_imports):
+            return self.measure(
+                expression, partial(evaluator, expression), state, static_tools, custom_tools, authorized_imports
+            )
+
+        return profiled_evaluator
+
+    @contextmanager
+    def activate(self) -> Generator[None, None, None]:
+        """Record the evaluations run in the current context within this block into `profile`."""
+        counter = _OPERATIONS_COUNTER.get()
+        counter_token = None
+        if counter is _UNLIMITED_OPERATIONS_COUNTER:
+            # Outside of a run, give this context its own counter rather than profiling on the one shared by default
+            counter = OperationsCounter(max_operations=math.inf)
+            counter_token = _OPERATIONS_COUNTER.set(counter)
+        previous_evaluators, previous_profiler = counter.evaluators, counter.profiler
+        counter.evaluators, counter.profiler = self.evaluators, self
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.profile.total_time += time.perf_counter() - start
+            counter.evaluators, counter.profiler = previous_evaluators, previous_profiler
+            if counter_token is not None:
+                _OPERATIONS_COUNTER.reset(counter_token)
+
+    def measure(
+        self,
+        node: ast.AST,
+        run: CompiledNode,
+        state: dict[str, Any],
+        static_tools: dict[str, Callable],
+        custom_tools: dict[str, Callable],
+        authorized_imports: list[str],
+    ) -> Any:
+        """Run the evaluation of a node with `run(state, static_tools, custom_tools, authorized_imports)` and record it."""
+        node_type = type(node).__name__
+        tool_name = argument_ids = None
+        if node_type == "Call" and type(node.func) is ast.Name:
+            name = node.func.id
+            if name not in state and (name in static_tools or name in custom_tools):
+                tool_name = name
+                argument_ids = {id(arg.value if isinstance(arg, ast.Starred) else arg) for arg in node.args}
+                argument_ids.update(id(keyword.value) for keyword in node.keywords)
+        line = getattr(node, "lineno", None) if isinstance(node, (ast.stmt, ast.expr)) else None
+        is_statement = isinstance(node, ast.stmt)
+        active_node_types, active_lines = self._active_node_types, self._active_lines
+        active_node_types[node_type] = active_node_types.get(node_type, 0) + 1
+        if is_statement:
+            active_lines[line] = active_lines.get(line, 0) + 1
+        frame = [0.0, 0.0, argument_ids]
+        frames = self._frames
+        frames.append(frame)
+        start = time.perf_counter()
+        try:
+            return run(state, static_tools, custom_tools, authorized_imports)
+        finally:
+            elapsed = time.perf_counter() - start
+            frames.pop()
+            if frames:
+                parent = frames[-1]
+                parent[0] += elapsed
+                if parent[2] is not None and id(node) in parent[2]:
+                    parent[1] += elapsed
+            self_time = elapsed - frame[0]
+
+            active_node_types[node_type] -= 1
+            entry = self.profile.node_types.get(node_type)
+            if entry is None:
+                entry = self.profile.node_types[node_type] = ProfileEntry()
+            entry.count += 1
+            entry.self_time += self_time
+            if not active_node_types[node_type]:
+                entry.total_time += elapsed
+
+            if line is not None:
+                entry = self.profile.lines.get(line)
+                if entry is None:
+                    entry = self.profile.lines[line] = ProfileEntry()
+                entry.self_time += self_time
+                if is_statement:
+                    entry.count += 1
+                    active_lines[line] -= 1
+                    if not active_lines[line]:
+                        entry.total_time += elapsed
+
+            if tool_name is not None:
+                entry = self.profile.tools.get(tool_name)
+                if entry is None:
+                    entry = self.profile.tools[tool_name] = ProfileEntry()
+                entry.count += 1
+                entry.total_time += elapsed - frame[1]
+                entry.self_time += self_time
+
+
+def parse_code(code: str) -> ast.Module:
+    """Parse a code snippet, turning syntax errors into an `InterpreterError`."""
+    try:
+        return ast.parse(code)
+    except SyntaxError as e:
+        raise InterpreterError(
+            f"Code parsing failed on line {e.lineno} due to: {type(e).__name__}\n"
+            f"{e.text}"
+            f"{' ' * (e.offset or 0)}^\n"
+            f"Error: {str(e)}"
+        )
+
+
+# Node types of the arguments of a tool call that can be evaluated ahead of the preceding statements of its group:
+# they read variables but cannot call code
+_SIMPLE_ARGUMENT_NODES = (
+    ast.Constant,
+    ast.Name,
+    ast.JoinedStr,
+    ast.FormattedValue,
+    ast.List,
+    ast.Tuple,
+    ast.Set,
+    ast.Dict,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.BoolOp,
+    ast.Compare,
+    ast.Subscript,
+    ast.Slice,
+    ast.Starred,
+    ast.operator,
+    ast.unaryop,
+    ast.boolop,
+    ast.cmpop,
+    ast.expr_context,
+)
+
+
+@dataclass
+class ToolCallStatement:
+    """
+    A top-level statement consisting of a single call to a tool, whose result is possibly assigned to variables.
+
+    Args:
+        index (`int`): Position of the statement in the module.
+        node (`ast.stmt`): The statement.
+        call (`ast.Call`): The tool call.
+        target (`ast.AST`, *optional*): The assignment target, a name or a tuple of names.
+        read_names (`frozenset[str]`): Names read by the statement, including the name of the tool.
+        written_names (`frozenset[str]`): Names assigned by the statement.
+    """
+
+    index: int
+    node: ast.stmt
+    call: ast.Call
+    target: ast.AST | None
+    read_names: frozenset[str]
+    written_names: frozenset[str]
+
+    @classmethod
+    def from_node(cls, index: int, node: ast.stmt) -> "ToolCallStatement | None":
+        """Return the statement if it has the form `tool(...)` or `target = tool(...)` with simple arguments."""
+        if isinstance(node, ast.Expr):
+            call, target, written_names = node.value, None, frozenset()
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1:
+            call, target = node.value, node.targets[0]
+            names = target.elts if isinstance(target, ast.Tuple) else [target]
+            if not all(isinstance(name, ast.Name) for name in names):
+                return None
+            written_names = frozenset(name.id for name in names)
+        else:
+            return None
+        if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Name):
+            return None
+        arguments = [*call.args, *(keyword.value for keyword in call.keywords)]
+        if any(keyword.arg is None for keyword in call.keywords):
+            return None
+        read_names = {call.func.id}
+        for argument in arguments:
+            for child in ast.walk(argument):
+                if not isinstance(child, _SIMPLE_ARGUMENT_NODES):
+                    return None
+                if isinstance(child, ast.Name):
+                    read_names.add(child.id)
+        return cls(index, node, call, target, frozenset(read_names), written_names)
+
+
+@dataclass
+class ParallelToolCalls:
+    """
+    Consecutive top-level statements calling tools independently of each other: no statement reads a variable
+    assigned by a previous one. If all the tools are flagged as `side_effect_free`, the calls can run concurrently,
+    then their results are assigned in program order, as if the statements had run one after the other.
+
+    Args:
+        statements (`list[ToolCallStatement]`): The statements, in program order.
+    """
+
+    statements: list[ToolCallStatement]
+
+    def is_runnable(self, state: dict[str, Any], static_tools: dict[str, Callable]) -> bool:
+        """Whether all the calls are to static tools flagged as `side_effect_free`, not shadowed by variables."""
+        for statement in self.statements:
+            tool_name = statement.call.func.id
+            if tool_name in state or not getattr(static_tools.get(tool_name), "side_effect_free", False):
+                return False
+        return True
+
+    def run(
+        self,
+        state: dict[str, Any],
+        static_tools: dict[str, Callable],
+        custom_tools: dict[str, Callable],
+        authorized_imports: list[str],
+        max_workers: int,
+    ) -> list[tuple[bool, Any]]:
+        """
+        Evaluate the arguments of the calls in program order, then run the calls concurrently.
+
+        Returns:
+            `list[tuple[bool, Any]]`: For the statements in program order, up to the first one that failed, whether
+            its call succeeded and its result or error.
+        """
+        calls = []
+        error = None
+        for statement in self.statements:
+            count_operation()
+            try:
+                args = []
+                for arg in statement.call.args:
+                    if isinstance(arg, ast.Starred):
+                        args.extend(evaluate_ast(arg.value, state, static_tools, custom_tools, authorized_imports))
+                    else:
+                        args.append(evaluate_ast(arg, state, static_tools, custom_tools, authorized_imports))
+                kwargs = {
+                    keyword.arg: evaluate_ast(keyword.value, state, static_tools, custom_tools, authorized_imports)
+                    for keyword in statement.call.keywords
+                }
+            except Exception as e:
+                error = e
+                break
+            calls.append((static_tools[statement.call.func.id], args, kwargs))
+
+        outcomes = []
+        pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls))), thread_name_prefix="tool-call")
+        try:
+            futures = [pool.submit(copy_context().run, tool, *args, **kwargs) for tool, args, kwargs in calls]
+            for future in futures:
+                try:
+                    result = future.result()
+                    check_safe_result(result, static_tools, authorized_imports)
+                except Exception as e:
+                    outcomes.append((False, e))
+                    return outcomes
+                outcomes.append((True, result))
+        finally:
+            # Calls made after a failed one are not waited for: their tools have no side effects
+            pool.shutdown(wait=False, cancel_futures=True)
+        if error is not None:
+            outcomes.append((False, error))
+        return outcomes
+
+
+def find_parallel_tool_calls(module: ast.Module) -> dict[int, ParallelToolCalls]:
+    """
+    Find the groups of consecutive top-level tool calls of a module that do not depend on each other.
+
+    Args:
+        module (`ast.Module`): The parsed code.
+
+    Returns:
+        `dict[int, ParallelToolCalls]`: The groups of at least two statements, by index of their first statement.
+    """
+    groups = {}
+    group, written_names = [], set()
+    for index, node in enumerate(module.body):
+        statement = ToolCallStatement.from_node(index, node)
+        if statement is None or statement.read_names & written_names:
+            if len(group) > 1:
+                groups[group[0].index] = ParallelToolCalls(group)
+            group, written_names = [], set()
+        if statement is not None:
+            group.append(statement)
+            written_names |= statement.written_names
+    if len(group) > 1:
+        groups[group[0].index] = ParallelToolCalls(group)
+    return groups
+
+
+# Statement and expression node types that the interpreter can evaluate
+SUPPORTED_NODE_TYPES = frozenset(EVALUATORS)
+# Names of the functions of `DANGEROUS_FUNCTIONS`, which the code may only reference if they are passed as tools
+DANGEROUS_FUNCTION_NAMES = frozenset(name.rsplit(".", 1)[1] for name in DANGEROUS_FUNCTIONS)
+# Exception types of the `except` clauses catching an `InterpreterError`
+INTERPRETER_ERROR_BASES = frozenset({"BaseException", "Exception", "ValueError", "InterpreterError"})
+
+
+def _catches_interpreter_error(node: ast.Try) -> bool:
+    """Return whether a `try` statement has an `except` clause that would catch an `InterpreterError`."""
+    for handler in node.handlers:
+        types = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+        if any(
+            type_ is None or (isinstance(type_, ast.Name) and type_.id in INTERPRETER_ERROR_BASES) for type_ in types
+        ):
+            return True
+    return False
+
+
+@dataclass
+class CodeAnalysis:
+    """
+    The potential problems of a code snippet, found by a static pass over its syntax tree before running it.
+
+    The problems that depend on the context of a run (the authorized imports, the tools and the state) are only
+    resolved by [`CodeAnalysis.check`], so that the analysis can be computed once per snippet and cached.
+
+    Args:
+        problems (`list[tuple[ast.AST, str]]`): The nodes that the interpreter always refuses, with the error message.
+        imports (`list[tuple[ast.AST, str, str]]`): The imports, with the imported module and the error message if it
+            is not authorized.
+        dangerous_references (`list[tuple[ast.AST, str, bool]]`): The references to functions of `DANGEROUS_FUNCTIONS`,
+            with the function name and whether it is a built-in function referenced by its bare name.
+        bound_names (`set[str]`): The names bound anywhere in the snippet.
+    """
+
+    problems: list[tuple[ast.AST, str]] = field(default_factory=list)
+    imports: list[tuple[ast.AST, str, str]] = field(default_factory=list)
+    dangerous_references: list[tuple[ast.AST, str, bool]] = field(default_factory=list)
+    bound_names: set[str] = field(default_factory=set)
+
+    def check(
+        self,
+        authorized_imports: list[str],
+        static_tools: dict[str, Callable],
+        custom_tools: dict[str, Callable],
+        state: dict[str, Any],
+    ) -> list[tuple[ast.AST, str]]:
+        """
+        Return the problems of the snippet for a run in the given context, sorted by position in the code.
+
+        Args:
+            authorized_imports (`list[str]`): The authorized imports.
+            static_tools (`dict[str, Callable]`): The static tools: dangerous functions passed as tools are allowed.
+            custom_tools (`dict[str, Callable]`): The custom tools.
+            state (`dict[str, Any]`): The state the snippet would run with.
+
+        Returns:
+            `list[tuple[ast.AST, str]]`: The nodes with a problem, with the error message.
+        """
+        problems = list(self.problems)
+        for node, module_name, message in self.imports:
+            if not check_import_authorized(module_name, authorized_imports):
+                problems.append((node, message))
+        for node, function_name, is_builtin in self.dangerous_references:
+            if function_name in static_tools:
+                continue
+            if not is_builtin:
+                problems.append((node, f"Forbidden access to function: {function_name}"))
+            elif function_name not in custom_tools and function_name not in state:
+                problems.append(
+                    (
+                        node,
+                        f"Forbidden function evaluation: '{function_name}' is not among the explicitly allowed tools "
+                        "or defined/imported in the preceding code",
+                    )
+                )
+        return sorted(problems, key=lambda problem: (problem[0].lineno, problem[0].col_offset))
+
+
+def analyze_code(module: ast.Module) -> CodeAnalysis:
+    """
+    Find the potential problems of a code snippet in a single pass over its syntax tree: unsupported syntax, imports,
+    access to dunder attributes, and references to dangerous functions.
+
+    The checks mirror the ones made by the interpreter when it reaches each node, so that a snippet passing them only
+    fails for reasons that depend on the values computed at runtime. Problems in the body of a `try` statement whose
+    `except` clauses would catch the error of the interpreter are ignored, since the code may handle them.
+
+    Args:
+        module (`ast.Module`): The parsed snippet.
+
+    Returns:
+        `CodeAnalysis`: The analysis of the snippet.
+    """
+    analysis = CodeAnalysis()
+    # Ids of the called attribute nodes: calling a dunder method like `x.__len__()` is allowed
+    called_functions = set()
+    imported_names = {}  # Names bound by imports, to the qualified name they refer to
+    candidates = []  # References that may be to dangerous functions, depending on the imports
+    # Nodes to visit, with whether they are in the body of a `try` statement catching the errors of the interpreter
+    stack = [(module, False)]
+    while stack:
+        node, guarded = stack.pop()
+        node_type = type(node)
+        problems = [] if guarded else analysis.problems
+        if isinstance(node, (ast.stmt, ast.expr)) and node_type not in SUPPORTED_NODE_TYPES:
+            problems.append((node, f"{node_type.__name__} is not supported."))
+        if node_type is ast.Name:
+            if type(node.ctx) is ast.Load:
+                if not guarded and (node.id in DANGEROUS_FUNCTION_NAMES or node.id in imported_names):
+                    candidates.append((node, node.id, None))
+            else:
+                analysis.bound_names.add(node.id)
+        elif node_type is ast.Attribute:
+            if node.attr.startswith("__") and node.attr.endswith("__"):
+                if type(node.ctx) is ast.Load and id(node) not in called_functions:
+                    problems.append((node, f"Forbidden access to dunder attribute: {node.attr}"))
+            elif not guarded and node.attr in DANGEROUS_FUNCTION_NAMES and type(node.value) is ast.Name:
+                candidates.append((node, node.attr, node.value.id))
+        elif node_type is ast.Call:
+            called_functions.add(id(node.func))
+        elif node_type is ast.Import:
+            for alias in node.names:
+                if not guarded:
+                    analysis.imports.append((node, alias.name, f"Import of {alias.name} is not allowed."))
+                bound_name = alias.asname or alias.name.split(".")[0]
+                analysis.bound_names.add(bound_name)
+                imported_names[bound_name] = alias.name if alias.asname else bound_name
+        elif node_type is ast.ImportFrom:
+            if node.level or node.module is None:
+                problems.append((node, "Relative imports are not supported."))
+            elif not guarded:
+                analysis.imports.append((node, node.module, f"Import from {node.module} is not allowed."))
+            for alias in node.names:
+                analysis.bound_names.add(alias.asname or alias.name)
+                imported_names[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+        elif node_type in (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef):
+            analysis.bound_names.add(node.name)
+        elif node_type is ast.arg:
+            analysis.bound_names.add(node.arg)
+        elif node_type is ast.ExceptHandler and node.name:
+            analysis.bound_names.add(node.name)
+        # Children are pushed in reverse to visit the tree in source order, with imports seen before the names they bind
+        if node_type is ast.Try and _catches_interpreter_error(node):
+            body = set(map(id, node.body))
+            children = [(child, guarded or id(child) in body) for child in ast.iter_child_nodes(node)]
+        else:
+            children = [(child, guarded) for child in ast.iter_child_nodes(node)]
+        stack.extend(reversed(children))
+    # Imports are only all known once the whole tree was visited
+    for node, name, module_name in candidates:
+        if module_name is None:
+            if name in DANGEROUS_FUNCTION_NAMES and name not in analysis.bound_names:
+                analysis.dangerous_references.append((node, name, True))
+            elif imported_names.get(name) in DANGEROUS_FUNCTIONS:
+                analysis.dangerous_references.append((node, imported_names[name].rsplit(".", 1)[1], False))
+        elif f"{imported_names.get(module_name)}.{name}" in DANGEROUS_FUNCTIONS:
+            analysis.dangerous_references.append((node, name, False))
+    return analysis
+
+
+def find_code_problems(
+    code: str,
+    authorized_imports: list[str] = BASE_BUILTIN_MODULES,
+    static_tools: dict[str, Callable] | None = None,
+    custom_tools: dict[str, Callable] | None = None,
+    state: dict[str, Any] | None = None,
+) -> list[str]:
+    """
+    Statically check a code snippet before running it, and return all the problems that would make the interpreter
+    refuse it: unsupported syntax, unauthorized imports, access to dunder attributes and references to dangerous
+    functions. The snippet is not run.
+
+    Args:
+        code (`str`): The code to check.
+        authorized_imports (`list[str]`): The authorized imports.
+        static_tools (`dict[str, Callable]`, *optional*): The static tools the code would run with.
+        custom_tools (`dict[str, Callable]`, *optional*): The custom tools the code would run with.
+        state (`dict[str, Any]`, *optional*): The state the code would run with.
+
+    Returns:
+        `list[str]`: The problems, in order of position in the code, each prefixed with its line.
+    """
+    parsed_code = PARSED_CODE_CACHE.get(code, authorized_imports)
+    problems = parsed_code.analysis.check(authorized_imports, static_tools or {}, custom_tools or {}, state or {})
+    return [format_code_problem(code, node, message) for node, message in problems]
+
+
+def format_code_problem(code: str, node: ast.AST, message: str) -> str:
+    segment = (ast.get_source_segment(code, node) or "").split("\n", 1)[0]
+    return f"Line {node.lineno} '{segment}': {message}"
+
+
+# File name of the code objects compiled by the fast path, to find their frames in the tracebacks of errors
+FAST_PATH_FILENAME = "<code action>"
+# Hidden names bound in the globals of the fast path: user code can never refer to them, since dunder names are refused
+FAST_PATH_RESULT_NAME = "__smolagents_result__"
+FAST_PATH_LINE_RESULT_NAME = "__smolagents_line_result__"
+FAST_PATH_COUNT_NAME = "__smolagents_count__"
+FAST_PATH_ITERATE_NAME = "__smolagents_iterate__"
+FAST_PATH_IMPORT_NAME = "__smolagents_import__"
+# Syntax that the fast path runs natively. Function and class definitions, `try` and `with` statements, `await` and
+# starred expressions are left to the interpreter, whose semantics for them differ from the ones of Python, and so are
+# assignment expressions, which it does not support. Generator expressions are left to the interpreter too, which
+# wraps them in a `GeneratorExpression`: the native generator would keep the frame of the fast path reachable.
+FAST_PATH_NODE_TYPES = (
+    ast.Module,
+    ast.Expr,
+    ast.Assign,
+    ast.AugAssign,
+    ast.For,
+    ast.While,
+    ast.If,
+    ast.Break,
+    ast.Continue,
+    ast.Pass,
+    ast.Delete,
+    ast.Import,
+    ast.ImportFrom,
+    ast.Assert,
+    ast.Raise,
+    ast.BoolOp,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.IfExp,
+    ast.Dict,
+    ast.Set,
+    ast.ListComp,
+    ast.SetComp,
+    ast.DictComp,
+    ast.Compare,
+    ast.Call,
+    ast.FormattedValue,
+    ast.JoinedStr,
+    ast.Constant,
+    ast.Attribute,
+    ast.Subscript,
+    ast.Name,
+    ast.List,
+    ast.Tuple,
+    ast.Slice,
+    ast.comprehension,
+    ast.keyword,
+    ast.alias,
+    ast.expr_context,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+    ast.boolop,
+)
+# Names the fast path refuses on top of dunder names: functions reading attributes by name, which would bypass the
+# checks of the attribute names, and the dangerous functions
+FAST_PATH_FORBIDDEN_NAMES = frozenset({"getattr", "setattr", "delattr", "vars", "dir"}) | DANGEROUS_FUNCTION_NAMES
+# Attributes the fast path refuses on top of `FORBIDDEN_ATTRIBUTES`: the other attributes of generators, frames,
+# tracebacks and code objects, which lead to the globals of the Python code running the fast path
+FAST_PATH_FORBIDDEN_ATTRIBUTES = FORBIDDEN_ATTRIBUTES | {
+    "gi_yieldfrom",
+    "cr_code",
+    "cr_await",
+    "ag_code",
+    "ag_await",
+    "tb_next",
+    "f_builtins",
+    "f_code",
+}
+# Statements whose result is always `None` for the interpreter
+FAST_PATH_NONE_STATEMENTS = (
+    ast.Pass,
+    ast.Delete,
+    ast.Import,
+    ast.ImportFrom,
+    ast.Assert,
+    ast.Raise,
+    ast.While,
+    ast.Break,
+    ast.Continue,
+)
+
+
+class ToolProxy:
+    """
+    Callable proxy of a tool handed to the code run by the fast path: the code can call the tool, but not reach its
+    attributes. Each call counts as an operation.
+    """
+
+    __slots__ = ("__tool__",)
+
+    def __init__(self, tool: Callable):
+        self.__tool__ = tool
+
+    def __call__(self, *args, **kwargs):
+        count_operation()
+        return self.__tool__(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return repr(self.__tool__)
+
+
+def count_iterations(iterable: Iterable) -> Generator:
+    """Iterate over an iterable, counting each item as an operation: the fast path wraps the iterables of loops in it."""
+    for item in iterable:
+        count_operation()
+        yield item
+
+
+class _FastPathTransformer(ast.NodeTransformer):
+    """Instrument a verified snippet for the fast path: count the loop iterations and run the imports through the
+    interpreter."""
+
+    def __init__(self):
+        self.imports = []
+
+    def _call(self, name: str, args: list[ast.expr], node: ast.AST) -> ast.Call:
+        return ast.copy_location(ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=args, keywords=[]), node)
+
+    def visit_For(self, node: ast.For) -> ast.For:
+        self.generic_visit(node)
+        node.iter = self._call(FAST_PATH_ITERATE_NAME, [node.iter], node.iter)
+        return node
+
+    def visit_comprehension(self, node: ast.comprehension) -> ast.comprehension:
+        self.generic_visit(node)
+        node.iter = self._call(FAST_PATH_ITERATE_NAME, [node.iter], node.iter)
+        return node
+
+    def visit_While(self, node: ast.While) -> ast.While:
+        self.generic_visit(node)
+        node.body.insert(0, ast.copy_location(ast.Expr(value=self._call(FAST_PATH_COUNT_NAME, [], node)), node))
+        return node
+
+    def visit_Import(self, node: ast.Import | ast.ImportFrom) -> ast.Expr:
+        self.imports.append(node)
+        index = ast.copy_location(ast.Constant(value=len(self.imports) - 1), node)
+        return ast.copy_location(ast.Expr(value=self._call(FAST_PATH_IMPORT_NAME, [index], node)), node)
+
+    visit_ImportFrom = visit_Import
+
+
+@dataclass
+class FastPathCode:
+    """
+    A code snippet verified to only use the subset of Python that the fast path runs natively, compiled to bytecode.
+
+    Args:
+        module (`ast.Module`): The parsed snippet, to locate the statement where an error happened.
+        code (`types.CodeType`): The instrumented snippet compiled with `compile`.
+        free_names (`frozenset[str]`): The names the snippet reads without binding them anywhere, which must be
+            defined in the state, the tools or the built-in exceptions.
+        bound_names (`frozenset[str]`): The names the snippet binds or deletes, written back to the state after a run.
+        attribute_owners (`frozenset[str]`): The names whose attributes the snippet accesses, which must not be tools
+            since the code only gets proxies of the tools.
+        imports (`tuple[ast.Import | ast.ImportFrom, ...]`): The imports, run by the interpreter.
+    """
+
+    module: ast.Module
+    code: Any
+    free_names: frozenset[str]
+    bound_names: frozenset[str]
+    attribute_owners: frozenset[str]
+    imports: tuple[ast.Import | ast.ImportFrom, ...]
+
+    def is_runnable(
+        self,
+        state: dict[str, Any],
+        static_tools: dict[str, Callable],
+        custom_tools: dict[str, Callable],
+        authorized_imports: list[str],
+    ) -> bool:
+        """
+        Return whether the snippet can run on the fast path in the given context: all the names it reads are defined,
+        it does not assign to a static tool nor access the attributes of a tool, and all of its imports are authorized.
+        Otherwise, the interpreter runs it
+        and reports the error it finds, if any.
+        """
+        if any(name in static_tools for name in self.bound_names):
+            return False
+        for name in self.attribute_owners:
+            if name not in state and not isinstance(static_tools.get(name), (type(None), type, BuiltinFunctionType)):
+                return False
+        if not all(
+            name in state or name in static_tools or name in custom_tools or name in ERRORS for name in self.free_names
+        ):
+            return False
+        for node in self.imports:
+            module_names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module]
+            if not all(check_import_authorized(name, authorized_imports) for name in module_names):
+                return False
+        return True
+
+    def run(
+        self,
+        state: dict[str, Any],
+        static_tools: dict[str, Callable],
+        custom_tools: dict[str, Callable],
+        authorized_imports: list[str],
+    ) -> Any:
+        """
+        Run the snippet natively on the given state and return its result, like the interpreter would.
+
+        The code runs with empty built-ins, its globals only holding the variables and tools it refers to. Tools are
+        wrapped in a [`ToolProxy`], and the variables it binds or deletes are written back to the state after the run,
+        even if it fails.
+        """
+        print_outputs = state["_print_outputs"]
+
+        def print_to_outputs(*args, **kwargs):
+            print_outputs.append(" ".join(map(str, args)) + "\n")
+
+        namespace = {"__builtins__": {}}
+        for name in self.free_names | self.bound_names:
+            if name in state:
+                namespace[name] = state[name]
+            elif name == "print" and name in static_tools:
+                namespace[name] = print_to_outputs
+            elif name in static_tools:
+                tool = static_tools[name]
+                namespace[name] = tool if isinstance(tool, (type, BuiltinFunctionType)) else ToolProxy(tool)
+            elif name in custom_tools:
+                namespace[name] = custom_tools[name]
+            elif name in ERRORS:
+                namespace[name] = ERRORS[name]
+        initial_values = dict(namespace)
+        namespace[FAST_PATH_COUNT_NAME] = count_operation
+        namespace[FAST_PATH_ITERATE_NAME] = count_iterations
+        namespace[FAST_PATH_IMPORT_NAME] = lambda index: evaluate_import(
+            self.imports[index], namespace, authorized_imports
+        )
+        try:
+            exec(self.code, namespace)
+        finally:
+            for name in self.bound_names:
+                if name in namespace:
+                    if initial_values.get(name, _MISSING) is not namespace[name]:
+                        state[name] = namespace[name]
+                elif name in initial_values and name in state:
+                    del state[name]
+        return namespace.get(FAST_PATH_RESULT_NAME)
+
+    def failed_statement(self, error: BaseException) -> ast.stmt | None:
+        """Return the top-level statement of the snippet that was running when the error was raised."""
+        line = None
+        traceback = error.__traceback__
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == FAST_PATH_FILENAME:
+                line = traceback.tb_lineno
+            traceback = traceback.tb_next
+        if line is None:
+            return None
+        return next((node for node in self.module.body if node.lineno <= line <= node.end_lineno), None)
+
+
+def _record_result(statement: ast.stmt, skip_none: bool) -> list[ast.stmt] | None:
+    """
+    Return statements running a statement and storing its result as computed by the interpreter in the variable
+    `FAST_PATH_RESULT_NAME`, or `None` if it cannot be computed natively. With `skip_none`, a `None` result is not
+    stored: the result of a `for` loop or an `if` statement is the last result of the statements of its body that is
+    not `None`.
+    """
+    if isinstance(statement, FAST_PATH_NONE_STATEMENTS):
+        return [statement]
+    if isinstance(statement, (ast.For, ast.If)):
+        for body in (statement.body, statement.orelse):
+            recorded_body = []
+            for line in body:
+                recorded_line = _record_result(line, skip_none=True)
+                if recorded_line is None:
+                    return None
+                recorded_body.extend(recorded_line)
+            body[:] = recorded_body
+        return [statement]
+    name = FAST_PATH_LINE_RESULT_NAME if skip_none else FAST_PATH_RESULT_NAME
+    target = ast.Name(id=name, ctx=ast.Store())
+    if isinstance(statement, ast.Expr):
+        statements = [ast.Assign(targets=[target], value=statement.value)]
+    elif isinstance(statement, ast.Assign):
+        statement.targets.insert(0, target)
+        statements = [statement]
+    elif isinstance(statement, ast.AugAssign) and isinstance(statement.target, ast.Name):
+        statements = [statement, ast.Assign(targets=[target], value=ast.Name(id=statement.target.id, ctx=ast.Load()))]
+    else:
+        return None
+    if skip_none:
+        is_not_none = ast.Compare(
+            left=ast.Name(id=name, ctx=ast.Load()), ops=[ast.IsNot()], comparators=[ast.Constant(value=None)]
+        )
+        store_result = ast.Assign(
+            targets=[ast.Name(id=FAST_PATH_RESULT_NAME, ctx=ast.Store())], value=ast.Name(id=name, ctx=ast.Load())
+        )
+        statements.append(ast.If(test=is_not_none, body=[store_result], orelse=[]))
+    return [ast.copy_location(new_statement, statement) for new_statement in statements]
+
+
+def compile_fast_path(module: ast.Module) -> FastPathCode | None:
+    """
+    Verify that a snippet only uses the subset of Python that the fast path runs natively, and compile it.
+
+    The snippet is refused if it uses syntax outside of `FAST_PATH_NODE_TYPES`, dunder names or attributes, the names
+    of `FAST_PATH_FORBIDDEN_NAMES`, the attributes of `FAST_PATH_FORBIDDEN_ATTRIBUTES`, conversions in f-strings or
+    relative or star imports, or
+    if its last statement has a result that only the interpreter computes, like a `for` loop. The checks that depend on
+    the context of a run are made by [`FastPathCode.is_runnable`].
+
+    Before being compiled, the snippet is instrumented so that each loop iteration counts as an operation, keeping the
+    execution limits enforced, and so that imports go through the interpreter, which hands out module proxies.
+
+    Args:
+        module (`ast.Module`): The parsed snippet.
+
+    Returns:
+        `FastPathCode | None`: The compiled snippet, or `None` if it must be run by the interpreter.
+    """
+    loaded_names, bound_names, attribute_owners = set(), set(), set()
+    for node in ast.walk(module):
+        if not isinstance(node, FAST_PATH_NODE_TYPES):
+            return None
+        node_type = type(node)
+        if node_type is ast.Name:
+            if node.id.startswith("__") or node.id in FAST_PATH_FORBIDDEN_NAMES:
+                return None
+            (loaded_names if type(node.ctx) is ast.Load else bound_names).add(node.id)
+        elif node_type is ast.Attribute:
+            if node.attr.startswith("__") or node.attr in FAST_PATH_FORBIDDEN_ATTRIBUTES:
+                return None
+            if type(node.value) is ast.Name:
+                attribute_owners.add(node.value.id)
+        elif node_type in (ast.For, ast.While) and node.orelse:  # The interpreter ignores the `else` clause of loops
+            return None
+        elif node_type is ast.FormattedValue and node.conversion != -1:  # The interpreter ignores `!r`, `!s` and `!a`
+            return None
+        elif node_type is ast.AugAssign and type(node.target) is ast.Name:
+            loaded_names.add(node.target.id)
+        elif node_type is ast.Import:
+            bound_names.update(alias.asname or alias.name.split(".")[0] for alias in node.names)
+        elif node_type is ast.ImportFrom:
+            if node.level or node.module is None or any(alias.name == "*" for alias in node.names):
+                return None
+            bound_names.update(alias.asname or alias.name for alias in node.names)
+    original_module, module = module, copy.deepcopy(module)
+    if module.body:
+        # The result of the code is the one of its last statement
+        last_statement = _record_result(module.body.pop(), skip_none=False)
+        if last_statement is None:
+            return None
+        module.body.extend(last_statement)
+    transformer = _FastPathTransformer()
+    instrumented = ast.fix_missing_locations(transformer.visit(module))
+    return FastPathCode(
+        module=original_module,
+        code=compile(instrumented, FAST_PATH_FILENAME, "exec", dont_inherit=True),
+        free_names=frozenset(loaded_names - bound_names),
+        bound_names=frozenset(bound_names),
+        attribute_owners=frozenset(attribute_owners),
+        imports=tuple(transformer.imports),
+    )
+
+
+@dataclass
+class ParsedCode:
+    """
+    A parsed code snippet, together with the analyses derived from it.
+
+    Analyses are computed lazily the first time they are needed, then kept for subsequent runs of the same snippet.
+
+    Args:
+        module (`ast.Module`): The parsed module.
+    """
+
+    module: ast.Module
+    _compiled_body: list[CompiledNode] | None = field(default=None, repr=False)
+    _profiled_compiled_body: list[CompiledNode] | None = field(default=None, repr=False)
+    _parallel_tool_calls: dict[int, ParallelToolCalls] | None = field(default=None, repr=False)
+    _analysis: CodeAnalysis | None = field(default=None, repr=False)
+    _fast_path_code: FastPathCode | None = field(default=_MISSING, repr=False)
+
+    @property
+    def compiled_body(self) -> list[CompiledNode]:
+        """The top-level statements of the module, compiled with `compile_ast`."""
+        if self._compiled_body is None:
+            self._compiled_body = [compile_ast(node) for node in self.module.body]
+        return self._compiled_body
+
+    @property
+    def profiled_compiled_body(self) -> list[CompiledNode]:
+        """The top-level statements of the module, compiled with each node recording itself in an `ExecutionProfiler`."""
+        if self._profiled_compiled_body is None:
+            token = _PROFILED_COMPILATION.set(True)
+            try:
+                self._profiled_compiled_body = [compile_ast(node) for node in self.module.body]
+            finally:
+                _PROFILED_COMPILATION.reset(token)
+        return self._profiled_compiled_body
+
+    @property
+    def parallel_tool_calls(self) -> dict[int, ParallelToolCalls]:
+        """The groups of independent top-level tool calls, see `find_parallel_tool_calls`."""
+        if self._parallel_tool_calls is None:
+            self._parallel_tool_calls = find_parallel_tool_calls(self.module)
+        return self._parallel_tool_calls
+
+    @property
+    def analysis(self) -> CodeAnalysis:
+        """The static analysis of the module, see `analyze_code`."""
+        if self._analysis is None:
+            self._analysis = analyze_code(self.module)
+        return self._analysis
+
+    @property
+    def fast_path_code(self) -> FastPathCode | None:
+        """The module compiled for the fast path, or `None` if it must be run by the interpreter, see
+        `compile_fast_path`."""
+        if self._fast_path_code is _MISSING:
+            self._fast_path_code = compile_fast_path(self.module)
+        return self._fast_path_code
+
+
+class ParsedCodeCache:
+    """
+    Thread-safe LRU cache of [`ParsedCode`] objects, keyed by a hash of the code and the set of authorized imports.
+
+    A single instance, `PARSED_CODE_CACHE`, is shared by all executors of the process, so that code that is run again,
+    for instance when an agent retries a snippet or redefines the same helper functions at each step, is neither
+    parsed nor analyzed again.
+
+    Args:
+        max_entries (`int`, default `256`): Maximum number of cached snippets.
+        max_total_length (`int`, default `2_000_000`): Maximum total length of the cached snippets, in characters,
+            used to bound the memory taken by their syntax trees. Longer snippets are never cached.
+    """
+
+    def __init__(self, max_entries: int = 256, max_total_length: int = 2_000_000):
+        self.max_entries = max_entries
+        self.max_total_length = max_total_length
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[bytes, frozenset[str]], tuple[ParsedCode, int]] = OrderedDict()
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def get(self, code: str, authorized_imports: list[str]) -> ParsedCode:
+        """Return the parsed code for the given snippet, parsing it on a cache miss."""
+        key = (hashlib.sha256(code.encode("utf-8", "surrogatepass")).digest(), frozenset(authorized_imports))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        parsed_code = ParsedCode(module=parse_code(code))
+        if len(code) <= self.max_total_length:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = (parsed_code, len(code))
+                    self._total_length += len(code)
+                while self._entries and (
+                    len(self._entries) > self.max_entries or self._total_length > self.max_total_length
+                ):
+                    _, (_, length) = self._entries.popitem(last=False)
+                    self._total_length -= length
+        return parsed_code
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._total_length = 0
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self) -> dict[str, int]:
+        """Return the hit and miss counters and the current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "total_length": self._total_length,
+                "max_entries": self.max_entries,
+                "max_total_length": self.max_total_length,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+PARSED_CODE_CACHE = ParsedCodeCache()
+
+
+def validate_execution_limits(timeout_seconds: float | None, max_memory_mb: float | None) -> None:
+    if timeout_seconds is not None and timeout_seconds <= 0:
+        raise ValueError(f"timeout_seconds must be a positive number, got {timeout_seconds}")
+    if max_memory_mb is not None and max_memory_mb <= 0:
+        raise ValueError(f"max_memory_mb must be a positive number, got {max_memory_mb}")
+
+
+def evaluate_python_code(
+    code: str,
+    static_tools: dict[str, Callable] | None = None,
+    custom_tools: dict[str, Callable] | None = None,
+    state: dict[str, Any] | None = None,
+    authorized_imports: list[str] = BASE_BUILTIN_MODULES,
+    max_print_outputs_length: int = DEFAULT_MAX_LEN_OUTPUT,
+    engine: str = "ast",
+    use_parsed_code_cache: bool = True,
+    safe_modules: dict[int, SafeModule] | None = None,
+    timeout_seconds: float | None = None,
+    max_memory_mb: float | None = None,
+    profiler: ExecutionProfiler | None = None,
+    print_callback: Callable[[str], None] | None = None,
+    max_parallel_tool_calls: int = 1,
+    validate_code: bool = False,
+    operations_counter: OperationsCounter | None = None,
+    name_index: NameIndex | None = None,
+    event_loop: EventLoopThread | None = None,
+    vectorize_loops: bool = False,
+    fast_path: bool = False,
+):
+    """
+    Evaluate a python expression using the content of the variables stored in a state and only evaluating a given set
+    of functions.
+
+    This function will recurse through the nodes of the tree provided.
+
+    Args:
+        code (`str`):
+            The code to evaluate.
+        static_tools (`Dict[str, Callable]`):
+            The functions that may be called during the evaluation. These can also be agents in a multiagent setting.
+            These tools cannot be overwritten in the code: any assignment to their name will raise an error.
+        custom_tools (`Dict[str, Callable]`):
+            The functions that may be called during the evaluation.
+            These tools can be overwritten in the code: any assignment to their name will overwrite them.
+        state (`Dict[str, Any]`):
+            A dictionary mapping variable names to values. The `state` should contain the initial inputs but will be
+            updated by this function to contain all variables as they are evaluated.
+            The print outputs will be stored in the state under the key "_print_outputs".
+        authorized_imports (`list[str]`):
+            The list of modules that can be imported by the code.
+        max_print_outputs_length (`int`, defaults to `DEFAULT_MAX_LEN_OUTPUT=50_000`):
+            Maximum length of the print outputs. Longer outputs are truncated in the middle as they are printed.
+        engine (`str`, defaults to `"ast"`):
+            The execution engine: `"ast"` walks the syntax tree node by node, `"compiled"` first translates it into
+            closures with `compile_ast` and then runs them.
+        use_parsed_code_cache (`bool`, defaults to `True`):
+            Whether to look the code up in the process-wide `PARSED_CODE_CACHE` instead of parsing and analyzing it
+            again.
+        safe_modules (`dict[int, SafeModule]`, *optional*):
+            Cache of the module proxies handed to the code, by id of the wrapped module. Pass the same dictionary
+            across evaluations to make repeated imports reuse the same proxies. Defaults to a new cache per call.
+        timeout_seconds (`float`, *optional*):
+            Maximum wall-clock duration of the evaluation, enforced as described in [`ExecutionLimits`].
+        max_memory_mb (`float`, *optional*):
+            Maximum growth of the memory used by the process during the evaluation, in MiB. Only reliable when no other
+            code runs concurrently in the process, see [`ExecutionLimits`].
+        profiler (`ExecutionProfiler`, *optional*):
+            Profiler recording the time spent per node type, line and tool during the evaluation.
+        print_callback (`Callable[[str], None]`, *optional*):
+            Function called with each chunk of print outputs as soon as it is printed.
+        max_parallel_tool_calls (`int`, defaults to `1`):
+            Maximum number of tool calls run concurrently. Above 1, consecutive top-level statements calling tools
+            flagged as `side_effect_free`, e.g. `a = web_search(q1)` then `b = web_search(q2)`, run concurrently when
+            their arguments do not depend on each other, see [`find_parallel_tool_calls`]. Their results are assigned
+            in program order, and the first error stops the code as if the calls had run one after the other.
+        validate_code (`bool`, defaults to `False`):
+            Whether to statically check the code before running it, see [`find_code_problems`]. Code with problems
+            fails without being run, with an `InterpreterError` listing all of them. The checks also cover the branches
+            that would not run, so that some code running without it is rejected.
+        operations_counter (`OperationsCounter`, *optional*):
+            Counter of the operations evaluated, to read their number after the evaluation. Defaults to a new counter
+            limited to `MAX_OPERATIONS`.
+        name_index (`NameIndex`, *optional*):
+            Index of the variable names of the state, used to suggest the close matches of the undefined names of the
+            code in their error messages. Pass the same index across evaluations on the same state to keep it up to
+            date incrementally, or a strict one to raise without suggestions. Defaults to a new non-strict index.
+        event_loop (`EventLoopThread`, *optional*):
+            Event loop on which the code awaits coroutines, like the ones returned by tools with an `async def forward`
+            or by the async functions it defines. Awaited values are evaluated in the loop, so that the code can run
+            coroutines concurrently with `asyncio.gather` if `asyncio` is authorized. Defaults to a new loop, stopped at
+            the end of the evaluation.
+        vectorize_loops (`bool`, defaults to `False`):
+            Whether to run the simple loops and list comprehensions over numbers as vectorized numpy operations, if
+            numpy is installed and an authorized import, see [`find_vectorized_loop`]. Their results are identical to
+            the ones of the interpreter, and each of them counts as one operation.
+        fast_path (`bool`, defaults to `False`):
+            Whether to run the code natively, compiled to Python bytecode, when it is verified to stay within the subset
+            of Python that is safe to run this way, see [`compile_fast_path`]. Other code, and code run with a profiler
+            or with tool calls to run concurrently, is run by the interpreter. On the fast path, each loop iteration and
+            each tool call counts as one operation.
+    """
+    if engine not in EXECUTION_ENGINES:
+        raise ValueError(f"Unsupported engine: {engine}. Supported engines are: {EXECUTION_ENGINES}")
+    validate_execution_limits(timeout_seconds, max_memory_mb)
+    if max_parallel_tool_calls < 1:
+        raise ValueError(f"max_parallel_tool_calls must be at least 1, got {max_parallel_tool_calls}")
+    if use_parsed_code_cache:
+        parsed_code = PARSED_CODE_CACHE.get(code, authorized_imports)
+    else:
+        parsed_code = ParsedCode(module=parse_code(code))
+    expression = parsed_code.module
+
+    if state is None:
+        state = {}
+    static_tools = static_tools.copy() if static_tools is not None else {}
+    custom_tools = custom_tools if custom_tools is not None else {}
+    result = None
+    state["_print_outputs"] = PrintContainer(max_length=max_print_outputs_length, callback=print_callback)
+
+    if "final_answer" in static_tools:
+        previous_final_answer = static_tools["final_answer"]
+
+        def final_answer(answer):  # Using 'answer' as the argument like in the original function
+            raise FinalAnswerException(previous_final_answer(answer))
+
+        static_tools["final_answer"] = final_answer
+
+    if validate_code:
+        problems = parsed_code.analysis.check(authorized_imports, static_tools, custom_tools, state)
+        if problems:
+            report = "\n".join(f"- {format_code_problem(code, node, message)}" for node, message in problems)
+            if any(isinstance(node, (ast.Import, ast.ImportFrom)) for node, _ in problems):
+                report += f"\nAuthorized imports are: {str(authorized_imports)}"
+            raise InterpreterError(f"Code validation failed, the code was not run:\n{report}")
+
+    if timeout_seconds is not None or max_memory_mb is not None:
+        limits = ExecutionLimits(timeout_seconds=timeout_seconds, max_memory_mb=max_memory_mb)
+    else:
+        limits = None
+    safe_modules_token = _SAFE_MODULES.set(safe_modules if safe_modules is not None else {})
+    limits_token = _EXECUTION_LIMITS.set(limits)
+    counter_token = _OPERATIONS_COUNTER.set(
+        operations_counter if operations_counter is not None else OperationsCounter()
+    )
+    if name_index is None:
+        name_index = NameIndex()
+    name_index.track(parsed_code, state)
+    name_index_token = _NAME_INDEX.set(name_index)
+    vectorize_loops_token = _VECTORIZE_LOOPS.set(
+        vectorize_loops and check_import_authorized("numpy", authorized_imports) and _is_package_available("numpy")
+    )
+    owns_event_loop = event_loop is None
+    event_loop_token = _EVENT_LOOP.set(EventLoopThread() if owns_event_loop else event_loop)
+    node = None
+    fast_path_code = None
+    if fast_path and profiler is None:
+        fast_path_code = parsed_code.fast_path_code
+        if fast_path_code is not None and (
+            not fast_path_code.is_runnable(state, static_tools, custom_tools, authorized_imports)
+            or (max_parallel_tool_calls > 1 and parsed_code.parallel_tool_calls)
+        ):
+            fast_path_code = None
+    try:
+        if limits is not None:
+            limits.start()
+        _enter_run()
+        try:
+            if fast_path_code is not None:
+                result = fast_path_code.run(state, static_tools, custom_tools, authorized_imports)
+            else:
+                with profiler.activate() if profiler is not None else nullcontext():
+                    if engine == "compiled":
+                        compiled_body = (
+                            parsed_code.profiled_compiled_body if profiler is not None else parsed_code.compiled_body
+                        )
+                    parallel_tool_calls = parsed_code.parallel_tool_calls if max_parallel_tool_calls > 1 else {}
+                    index = 0
+                    while index < len(expression.body):
+                        group = parallel_tool_calls.get(index)
+                        if group is not None and group.is_runnable(state, static_tools):
+                            outcomes = group.run(
+                                state, static_tools, custom_tools, authorized_imports, max_parallel_tool_calls
+                            )
+                            # Assign the results in program order, stopping at the first failed statement
+                            for statement, (succeeded, value) in zip(group.statements, outcomes):
+                                node = statement.node
+                                if not succeeded:
+                                    raise value
+                                if statement.target is not None:
+                                    set_value(
+                                        statement.target, value, state, static_tools, custom_tools, authorized_imports
+                                    )
+                                result = value
+                            index += len(group.statements)
+                            continue
+                        node = expression.body[index]
+                        if engine == "compiled":
+                            count_operation()
+                            result = compiled_body[index](state, static_tools, custom_tools, authorized_imports)
+                        else:
+                            result = evaluate_ast(node, state, static_tools, custom_tools, authorized_imports)
+                        index += 1
+        finally:
+            if limits is not None:
+                limits.stop()
+            _exit_run()
+        is_final_answer = False
+        return result, is_final_answer
+    except FinalAnswerException as e:
+        is_final_answer = True
+        return e.value, is_final_answer
+    except ExecutionLimitExceeded as e:
+        if fast_path_code is not None:
+            node = fast_path_code.failed_statement(e)
+        line = f" at line '{ast.get_source_segment(code, node)}'" if node is not None else ""
+        raise InterpreterError(f"Code execution interrupted{line}: {str(e) or limits.exceeded}")
+    except Exception as e:
+        if fast_path_code is not None:
+            node = fast_path_code.failed_statement(e)
+        raise InterpreterError(
+            f"Code execution failed at line '{ast.get_source_segment(code, node)}' due to: {type(e).__name__}: {e}"
+        )
+    finally:
+        if owns_event_loop:
+            _EVENT_LOOP.get().close()
+        _EVENT_LOOP.reset(event_loop_token)
+        _VECTORIZE_LOOPS.reset(vectorize_loops_token)
+        _NAME_INDEX.reset(name_index_token)
+        name_index.track(None, state)
+        _OPERATIONS_COUNTER.reset(counter_token)
+        _EXECUTION_LIMITS.reset(limits_token)
+        _SAFE_MODULES.reset(safe_modules_token)
+
+
+class StateSnapshot:
+    """
+    Snapshot of the variables of an executor state, to restore them when a code action fails midway.
+
+    Taking a snapshot copies the references to the values, never the values themselves, so that large objects like
+    DataFrames cost nothing to snapshot. Restoring it only touches the variables changed since it was taken: variables
+    that were reassigned or deleted get back the objects they referenced, and new variables are removed. Objects
+    modified in place, like a list that was appended to, are not restored.
+
+    Args:
+        state (`dict[str, Any]`): The state to snapshot.
+    """
+
+    # Interpreter bookkeeping of the current run, which describes the failed run and must survive the rollback
+    BOOKKEEPING_NAMES = frozenset({"_print_outputs"})
+
+    def __init__(self, state: dict[str, Any]):
+        self.state = state
+        self.bindings = dict(state)
+        # Variables of a lazily rehydrated state not loaded yet: they can only change by being loaded, then reassigned
+        # or deleted, which is told apart from a mere load by comparing them to the values loaded since the snapshot.
+        self.pending = set(state.pending) if isinstance(state, LazyState) else set()
+        if isinstance(state, LazyState):
+            state.loaded.clear()
+
+    def changed_names(self) -> list[str]:
+        """Return the names of the variables assigned, deleted or added since the snapshot was taken."""
+        bindings, state, pending = self.bindings, self.state, self.pending
+        missing = object()
+        changed = [
+            name
+            for name, value in state.items()
+            if (state.loaded if name in pending else bindings).get(name, missing) is not value
+        ]
+        changed += [name for name in bindings if name not in state]
+        changed += [name for name in pending if name not in state]
+        return [name for name in changed if name not in self.BOOKKEEPING_NAMES]
+
+    def restore(self) -> list[str]:
+        """
+        Restore the variables changed since the snapshot was taken.
+
+        Returns:
+            `list[str]`: The names of the restored variables.
+        """
+        changed = self.changed_names()
+        for name in changed:
+            if name in self.bindings:
+                self.state[name] = self.bindings[name]
+            elif name in self.pending:
+                self.state.unload(name)
+            else:
+                del self.state[name]
+        return changed
+
+
+class PythonExecutor:
+    pass
+
+
+class LocalPythonExecutor(PythonExecutor):
+    """
+    Executor of Python code in a local environment.
+
+    This executor evaluates Python code with restricted access to imports and built-in functions,
+    making it suitable for running untrusted code. It maintains state between executions,
+    allows for custom tools and functions to be made available to the code, and captures
+    print outputs separately from return values.
+
+    Args:
+        additional_authorized_imports (`list[str]`):
+            Additional authorized imports for the executor.
+        max_print_outputs_length (`int`, defaults to `DEFAULT_MAX_LEN_OUTPUT=50_000`):
+            Maximum length of the print outputs.
+        additional_functions (`dict[str, Callable]`, *optional*):
+            Additional Python functions to be added to the executor.
+        engine (`str`, defaults to `"ast"`):
+            Execution engine: `"ast"` for the tree-walking interpreter, or `"compiled"` to translate each code action
+            once into pre-bound closures before running it, which is faster on loops and function calls.
+        use_parsed_code_cache (`bool`, defaults to `True`):
+            Whether to reuse the parsed and analyzed code of snippets that were already run in this process.
+        timeout_seconds (`float`, *optional*):
+            Maximum wall-clock duration of each call. A call exceeding it fails with an `InterpreterError`, keeping the
+            variables set so far in the state unless `rollback_on_error` is set.
+        max_memory_mb (`float`, *optional*):
+            Maximum growth of the memory used by the process during each call, in MiB. A call exceeding it fails with
+            an `InterpreterError`, keeping the variables set so far in the state unless `rollback_on_error` is set.
+            Since the whole process is measured, the limit is only reliable when the executor runs alone in its
+            process, like in a [`ProcessPythonExecutor`]: a warning is logged when other code runs concurrently.
+        max_parallel_tool_calls (`int`, defaults to `1`):
+            Maximum number of independent calls to tools flagged as `side_effect_free`, like the default web search,
+            webpage and Wikipedia tools, run concurrently, see [`evaluate_python_code`]. By default, tool calls run one
+            after the other: set it above 1 to run the independent ones concurrently, e.g. with
+            `CodeAgent(..., executor_kwargs={"max_parallel_tool_calls": 4})`.
+        profile (`bool`, defaults to `False`):
+            Whether to profile each call, recording the time spent per AST node type, per line and per tool call into
+            `last_profile`. Runs without profiling only check that no profiler is attached to them.
+        rollback_on_error (`bool`, defaults to `False`):
+            Whether to undo the variable assignments of a call failing with an `InterpreterError`, so that the next call
+            starts from the state preceding the failed one rather than from a partially updated state. The rollback is
+            based on a [`StateSnapshot`] taken at the start of each call: it restores the variables that were
+            reassigned, deleted or added, but not the objects modified in place. The error message lists the restored
+            variables.
+        state_store ([`StateStore`], *optional*):
+            Store persisting the variables of the state, like a [`DiskStateStore`]. The state is rehydrated from it
+            lazily, each stored variable being loaded on first access, and the variables changed by each call are
+            saved to it after the call. An executor created on the store of a crashed one resumes from its variables,
+            except those that cannot be pickled like imported modules and functions defined by the code.
+        validate_code (`bool`, defaults to `False`):
+            Whether to statically check each code action before running it, see [`find_code_problems`]: a code action
+            with unsupported syntax, unauthorized imports, dunder attribute accesses or references to dangerous
+            functions then fails with all of its problems listed, before any of it runs, e.g. before a slow tool call.
+            Since the checks also cover the branches that would not run, some code actions running without them are
+            rejected.
+        strict_names (`bool`, defaults to `False`):
+            Whether undefined variables raise an error right away, without looking for their close matches in the
+            state. By default, the error message suggests the variables with a close name, like the intended one of a
+            typo.
+        vectorize_loops (`bool`, defaults to `False`):
+            Whether to run the simple loops and list comprehensions over numbers, like `for x in data: total += x * x`,
+            as vectorized numpy operations when numpy is an authorized import, with identical results. This makes
+            numeric loops over large lists orders of magnitude faster, and each of them counts as a single operation
+            towards `MAX_OPERATIONS`.
+        fast_path (`bool`, defaults to `False`):
+            Whether to run the code actions verified to stay within a safe subset of Python natively, compiled to Python
+            bytecode, instead of interpreting them, see [`compile_fast_path`]. The subset excludes dunder names and
+            attributes, forbidden functions, unauthorized imports, and function and class definitions: the code
+            actions outside of it, which would fail or behave differently, are interpreted as usual. Loops on the fast
+            path run an order of magnitude faster.
+
+    Attributes:
+        import_authorizer (`ImportAuthorizer`):
+            The import authorization trie of this executor, with the verdicts memoized so far per module name.
+        safe_modules (`dict[int, SafeModule]`):
+            The module proxies created for the code run by this executor, reused when a module is imported again.
+        name_index (`NameIndex`):
+            The index of the variable names of the state, kept up to date incrementally across calls.
+        event_loop (`EventLoopThread`):
+            The event loop on which the code awaits coroutines, started on the first await and shared across calls, so
+            that coroutines created by a call can be awaited by a later one. It is stopped by `cleanup`.
+        last_profile (`ExecutionProfile` or `None`):
+            The profile of the last call, if profiling is enabled.
+    """
+
+    def __init__(
+        self,
+        additional_authorized_imports: list[str],
+        max_print_outputs_length: int | None = None,
+        additional_functions: dict[str, Callable] | None = None,
+        engine: str = "ast",
+        use_parsed_code_cache: bool = True,
+        timeout_seconds: float | None = None,
+        max_memory_mb: float | None = None,
+        max_parallel_tool_calls: int = 1,
+        profile: bool = False,
+        rollback_on_error: bool = False,
+        state_store: StateStore | None = None,
+        validate_code: bool = False,
+        strict_names: bool = False,
+        vectorize_loops: bool = False,
+        fast_path: bool = False,
+    ):
+        if engine not in EXECUTION_ENGINES:
+            raise ValueError(f"Unsupported engine: {engine}. Supported engines are: {EXECUTION_ENGINES}")
+        validate_execution_limits(timeout_seconds, max_memory_mb)
+        if max_parallel_tool_calls < 1:
+            raise ValueError(f"max_parallel_tool_calls must be at least 1, got {max_parallel_tool_calls}")
+        self.custom_tools = {}
+        self.state_store = state_store
+        self.state = {"__name__": "__main__"}
+        if state_store is not None:
+            self.state = state_store.lazy_state(self.state)
+        self.max_print_outputs_length = max_print_outputs_length
+        if max_print_outputs_length is None:
+            self.max_print_outputs_length = DEFAULT_MAX_LEN_OUTPUT
+        self.additional_authorized_imports = additional_authorized_imports
+        self.authorized_imports = list(set(BASE_BUILTIN_MODULES) | set(self.additional_authorized_imports))
+        self.import_authorizer = get_import_authorizer(tuple(self.authorized_imports))
+        # TODO: assert self.authorized imports are all installed locally
+        self.static_tools = None
+        self.additional_functions = additional_functions or {}
+        self.engine = engine
+        self.use_parsed_code_cache = use_parsed_code_cache
+        self.safe_modules = {}
+        self.timeout_seconds = timeout_seconds
+        self.max_memory_mb = max_memory_mb
+        self.max_parallel_tool_calls = max_parallel_tool_calls
+        self.profile = profile
+        self.last_profile = None
+        self.rollback_on_error = rollback_on_error
+        self.validate_code = validate_code
+        self.name_index = NameIndex(strict=strict_names)
+        self.event_loop = EventLoopThread()
+        self.vectorize_loops = vectorize_loops
+        self.fast_path = fast_path
+
+    def __call__(self, code_action: str) -> tuple[Any, str, bool]:
+        return self._run(code_action)
+
+    def cleanup(self):
+        """Stop the event loop of the executor and its thread, if the code ever awaited."""
+        self.event_loop.close()
+
+    def __del__(self):
+        """Ensure cleanup on deletion."""
+        if hasattr(self, "event_loop"):
+            self.cleanup()
+
+    def stream(self, code_action: str) -> Generator[ExecutionLogsStreamDelta, None, tuple[Any, str, bool]]:
+        """
+        Run a code action like a call to the executor, yielding its print outputs as they are printed.
+
+        The code runs in a separate thread while the generator yields the outputs, then the generator returns the
+        result of the call, which can be retrieved with `output, logs, is_final_answer = yield from executor.stream(code)`.
+        Errors of the code are raised by the generator.
+
+        Args:
+            code_action (`str`): The code to run.
+
+        Yields:
+            `ExecutionLogsStreamDelta`: The outputs printed since the previous chunk.
+        """
+        chunks = queue.SimpleQueue()
+        outcome = {}
+
+        def run():
+            try:
+                outcome["result"] = self._run(code_action, print_callback=chunks.put)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                chunks.put(None)
+
+        thread = threading.Thread(target=run, name="smolagents-code-action", daemon=True)
+        thread.start()
+        finished = False
+        while not finished:
+            content = [chunks.get()]
+            while not chunks.empty():
+                content.append(chunks.get())
+            if content[-1] is None:
+                content.pop()
+                finished = True
+            if content:
+                yield ExecutionLogsStreamDelta(content="".join(content))
+        thread.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def _run(self, code_action: str, print_callback: Callable[[str], None] | None = None) -> tuple[Any, str, bool]:
+        profiler = ExecutionProfiler() if self.profile else None
+        if profiler is not None:
+            self.last_profile = profiler.profile
+        snapshot = StateSnapshot(self.state) if self.rollback_on_error else None
+        try:
+            output, is_final_answer = evaluate_python_code(
+                code_action,
+                static_tools=self.static_tools,
+                custom_tools=self.custom_tools,
+                state=self.state,
+                authorized_imports=self.authorized_imports,
+                max_print_outputs_length=self.max_print_outputs_length,
+                engine=self.engine,
+                use_parsed_code_cache=self.use_parsed_code_cache,
+                safe_modules=self.safe_modules,
+                timeout_seconds=self.timeout_seconds,
+                max_memory_mb=self.max_memory_mb,
+                profiler=profiler,
+                print_callback=print_callback,
+                max_parallel_tool_calls=self.max_parallel_tool_calls,
+                validate_code=self.validate_code,
+                name_index=self.name_index,
+                event_loop=self.event_loop,
+                vectorize_loops=self.vectorize_loops,
+                fast_path=self.fast_path,
+            )
+        except InterpreterError as e:
+            restored = snapshot.restore() if snapshot is not None else []
+            self.name_index.sync(restored, self.state)
+            if restored:
+                raise InterpreterError(
+                    f"{e}\nThe variables changed by this code were restored to their values before it ran: "
+                    f"{', '.join(restored)}."
+                ) from e
+            raise
+        finally:
+            if self.state_store is not None:
+                self.state_store.save(self.state)
+        logs = str(self.state["_print_outputs"])
+        return output, logs, is_final_answer
+
+    def send_variables(self, variables: dict):
+        self.state.update(variables)
+        self.name_index.sync(variables, self.state)
+
+    def is_import_authorized(self, import_to_check: str) -> bool:
+        """Return whether code run by this executor may import or access the given dotted module name."""
+        return self.import_authorizer.is_authorized(import_to_check)
 
     def send_tools(self, tools: dict[str, Tool]):
         # Combine agent tools, base Python tools, and additional Python functions
         self.static_tools = {**tools, **BASE_PYTHON_TOOLS.copy(), **self.additional_functions}
 
 
-__all__ = ["evaluate_python_code", "LocalPythonExecutor"]
+__all__ = ["evaluate_python_code", "ExecutionLogsStreamDelta", "LocalPythonExecutor"]
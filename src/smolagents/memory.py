@@ -1,21 +1,26 @@
-from dataclasses import asdict, dataclass
+import json
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
 from logging import getLogger
 from typing import TYPE_CHECKING, Any, TypedDict
 
 from smolagents.models import ChatMessage, MessageRole
 from smolagents.monitoring import AgentLogger, LogLevel
-from smolagents.utils import AgentError, make_json_serializable
+from smolagents.utils import AgentError, make_json_serializable, truncate_content
 
 
 if TYPE_CHECKING:
     import PIL.Image
 
-    from smolagents.models import ChatMessage
+    from smolagents.local_python_executor import ExecutionProfile
+    from smolagents.models import ChatMessage, Model
     from smolagents.monitoring import AgentLogger
 
 
 logger = getLogger(__name__)
 
+_UNSET = object()
+
 
 class Message(TypedDict):
     role: MessageRole
@@ -41,12 +46,38 @@ class ToolCall:
 
 @dataclass
 class MemoryStep:
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Assigning a new value to a field makes the messages rendered from the step outdated
+        if self.__dict__.get(name, _UNSET) is not value:
+            self.__dict__.pop("_rendered_messages", None)
+        super().__setattr__(name, value)
+
     def dict(self):
         return asdict(self)
 
     def to_messages(self, summary_mode: bool = False) -> list[Message]:
         raise NotImplementedError
 
+    def rendering_fingerprint(self) -> Any:
+        """
+        Return a cheap fingerprint of the mutable values that the messages of the step are rendered from, like lists
+        that callbacks may modify in place. The cached messages are rendered again when it changes.
+        """
+        return None
+
+    def render_messages(self, summary_mode: bool = False) -> list[Message]:
+        """
+        Return the messages of the step like `to_messages`, rendered once then cached until a field of the step is
+        reassigned or its `rendering_fingerprint` changes. The returned messages are shared: they must not be modified
+        in place.
+        """
+        rendered_messages = self.__dict__.setdefault("_rendered_messages", {})
+        fingerprint = self.rendering_fingerprint()
+        cached = rendered_messages.get(summary_mode)
+        if cached is None or cached[0] != fingerprint:
+            cached = rendered_messages[summary_mode] = (fingerprint, self.to_messages(summary_mode=summary_mode))
+        return cached[1]
+
 
 @dataclass
 class ActionStep(MemoryStep):
@@ -62,6 +93,7 @@ class ActionStep(MemoryStep):
     observations: str | None = None
     observations_images: list["PIL.Image.Image"] | None = None
     action_output: Any = None
+    execution_profile: "ExecutionProfile | None" = None
 
     def dict(self):
         # We overwrite the method to parse the tool_calls and action_output manually
@@ -77,8 +109,18 @@ class ActionStep(MemoryStep):
             "model_output": self.model_output,
             "observations": self.observations,
             "action_output": make_json_serializable(self.action_output),
+            "execution_profile": self.execution_profile.dict() if self.execution_profile else None,
         }
 
+    def rendering_fingerprint(self) -> Any:
+        return (
+            [(tool_call.name, tool_call.id, repr(tool_call.arguments)) for tool_call in self.tool_calls]
+            if self.tool_calls is not None
+            else None,
+            list(map(id, self.observations_images)) if self.observations_images else None,
+            str(self.error) if self.error is not None else None,
+        )
+
     def to_messages(self, summary_mode: bool = False) -> list[Message]:
         messages = []
         if self.model_output is not None and not summary_mode:
@@ -93,7 +135,8 @@ class ActionStep(MemoryStep):
                     content=[
                         {
                             "type": "text",
-                            "text": "Calling tools:\n" + str([tc.dict() for tc in self.tool_calls]),
+                            "text": "Calling tools:\n"
+                            + json.dumps([tc.dict() for tc in self.tool_calls], ensure_ascii=False),
                         }
                     ],
                 )
@@ -131,7 +174,11 @@ class ActionStep(MemoryStep):
                 + str(self.error)
                 + "\nNow let's retry: take care not to repeat previous errors! If you have retried several times, try a completely different approach.\n"
             )
-            message_content = f"Call id: {self.tool_calls[0].id}\n" if self.tool_calls else ""
+            # With several tool calls, the error message already names the failed call, see
+            # `ToolCallingAgent._process_tool_outcomes`
+            message_content = (
+                f"Call id: {self.tool_calls[0].id}\n" if self.tool_calls and len(self.tool_calls) == 1 else ""
+            )
             message_content += error_message
             messages.append(
                 Message(role=MessageRole.TOOL_RESPONSE, content=[{"type": "text", "text": message_content}])
@@ -161,6 +208,9 @@ class TaskStep(MemoryStep):
     task: str
     task_images: list["PIL.Image.Image"] | None = None
 
+    def rendering_fingerprint(self) -> Any:
+        return list(map(id, self.task_images)) if self.task_images else None
+
     def to_messages(self, summary_mode: bool = False) -> list[Message]:
         content = [{"type": "text", "text": f"New task:\n{self.task}"}]
         if self.task_images:
@@ -180,18 +230,233 @@ class SystemPromptStep(MemoryStep):
         return [Message(role=MessageRole.SYSTEM, content=[{"type": "text", "text": self.system_prompt}])]
 
 
+@dataclass
+class SummaryStep(MemoryStep):
+    """Summary written by the model of the steps it replaced in the memory when compacting it."""
+
+    summary: str
+    step_numbers: list[int] = field(default_factory=list)
+
+    def to_messages(self, summary_mode: bool = False) -> list[Message]:
+        return [
+            Message(
+                role=MessageRole.ASSISTANT,
+                content=[{"type": "text", "text": f"Summary of my previous steps:\n{self.summary.strip()}"}],
+            )
+        ]
+
+
 @dataclass
 class FinalAnswerStep(MemoryStep):
     final_answer: Any
 
 
+# Rough number of characters per token of text, and flat number of tokens per image, to estimate token counts
+CHARACTERS_PER_TOKEN = 4
+TOKENS_PER_IMAGE = 1000
+
+DEFAULT_SUMMARY_PROMPT = """You are compacting the memory of an agent solving a task: the agent steps below will be replaced with your summary.
+Summarize them concisely, keeping the facts found, the results obtained, the variables defined, the errors to avoid, and what remains to be done."""
+
+
+def estimate_token_count(messages: list[Message]) -> int:
+    """Roughly estimate the number of tokens of chat messages, from the length of their text and their images."""
+    token_count = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            token_count += len(content) // CHARACTERS_PER_TOKEN
+            continue
+        for element in content:
+            if element["type"] == "text":
+                token_count += len(element["text"]) // CHARACTERS_PER_TOKEN
+            else:
+                token_count += TOKENS_PER_IMAGE
+    return token_count
+
+
+class MemoryCompaction:
+    """
+    Policy compacting the memory of an agent when its rendered messages exceed a token budget, checked before each
+    step.
+
+    Only the steps older than the last `keep_last_steps` ones are compacted: the system prompt and the task steps are
+    always kept. The enabled strategies are applied in this order, until the memory fits in the budget:
+    1. truncate the observations of the old steps,
+    2. drop the images of the old steps,
+    3. replace each range of consecutive old steps with a [`SummaryStep`] written by the model.
+
+    The compaction edits the memory: the steps it compacted are not restored afterwards.
+
+    Args:
+        max_tokens (`int`): Token budget of the rendered memory.
+        keep_last_steps (`int`, default `3`): Number of most recent steps, other than task steps, left untouched.
+        max_observation_length (`int`, *optional*): Number of characters to truncate the observations of old steps to.
+            If not set, observations are not truncated.
+        drop_images (`bool`, default `True`): Whether to drop the observation images of old steps.
+        summarize (`bool`, default `False`): Whether to replace old steps with a summary written by the model.
+        summary_prompt (`str`, *optional*): System prompt asking the model to summarize steps.
+        token_counter (`Callable[[list[Message]], int]`, *optional*): Function counting the tokens of chat messages.
+            Defaults to [`estimate_token_count`].
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        keep_last_steps: int = 3,
+        max_observation_length: int | None = None,
+        drop_images: bool = True,
+        summarize: bool = False,
+        summary_prompt: str = DEFAULT_SUMMARY_PROMPT,
+        token_counter: Callable[[list[Message]], int] | None = None,
+    ):
+        if max_observation_length is None and not drop_images and not summarize:
+            raise ValueError("MemoryCompaction needs at least one of its strategies to be enabled")
+        self.max_tokens = max_tokens
+        self.keep_last_steps = keep_last_steps
+        self.max_observation_length = max_observation_length
+        self.drop_images = drop_images
+        self.summarize = summarize
+        self.summary_prompt = summary_prompt
+        self.token_counter = token_counter or estimate_token_count
+
+    def compact(self, memory: "AgentMemory", model: "Model") -> tuple[int, int] | None:
+        """
+        Compact the memory if it exceeds the token budget.
+
+        Args:
+            memory (`AgentMemory`): The memory to compact.
+            model (`Model`): The model writing the summaries.
+
+        Returns:
+            `tuple[int, int] | None`: The token counts of the memory before and after compaction, or None if it fits in
+            the budget.
+        """
+        initial_token_count = self.token_counter(memory.to_messages())
+        if initial_token_count <= self.max_tokens:
+            return None
+        token_count = self._shrink_old_steps(memory)
+        if token_count > self.max_tokens and self.summarize:
+            for first, last in reversed(self._old_step_ranges(memory)):
+                summary = model.generate(self._summary_messages(memory, first, last)).content
+                self._replace_with_summary(memory, first, last, summary)
+            token_count = self.token_counter(memory.to_messages())
+        return initial_token_count, token_count
+
+    async def acompact(self, memory: "AgentMemory", model: "Model") -> tuple[int, int] | None:
+        """Asynchronous version of [`~MemoryCompaction.compact`], writing the summaries with `Model.agenerate`."""
+        initial_token_count = self.token_counter(memory.to_messages())
+        if initial_token_count <= self.max_tokens:
+            return None
+        token_count = self._shrink_old_steps(memory)
+        if token_count > self.max_tokens and self.summarize:
+            for first, last in reversed(self._old_step_ranges(memory)):
+                summary = (await model.agenerate(self._summary_messages(memory, first, last))).content
+                self._replace_with_summary(memory, first, last, summary)
+            token_count = self.token_counter(memory.to_messages())
+        return initial_token_count, token_count
+
+    def _old_step_indices(self, memory: "AgentMemory") -> list[int]:
+        compactable_indices = [i for i, step in enumerate(memory.steps) if not isinstance(step, TaskStep)]
+        return compactable_indices[: max(len(compactable_indices) - self.keep_last_steps, 0)]
+
+    def _shrink_old_steps(self, memory: "AgentMemory") -> int:
+        """Truncate the observations then drop the images of the old steps while needed, returning the token count."""
+        old_steps = [memory.steps[i] for i in self._old_step_indices(memory)]
+        old_action_steps = [step for step in old_steps if isinstance(step, ActionStep)]
+        token_count = self.token_counter(memory.to_messages())
+        if token_count > self.max_tokens and self.max_observation_length is not None:
+            for step in old_action_steps:
+                if step.observations is not None and len(step.observations) > self.max_observation_length:
+                    step.observations = truncate_content(step.observations, max_length=self.max_observation_length)
+            token_count = self.token_counter(memory.to_messages())
+        if token_count > self.max_tokens and self.drop_images:
+            for step in old_action_steps:
+                if step.observations_images:
+                    step.observations_images = None
+            token_count = self.token_counter(memory.to_messages())
+        return token_count
+
+    def _old_step_ranges(self, memory: "AgentMemory") -> list[tuple[int, int]]:
+        """Return the first and last indices of the ranges of consecutive old steps worth summarizing."""
+        ranges = []
+        for i in self._old_step_indices(memory):
+            if ranges and ranges[-1][1] == i - 1:
+                ranges[-1][1] = i
+            else:
+                ranges.append([i, i])
+        # A range holding a single summary cannot be summarized further
+        return [
+            (first, last)
+            for first, last in ranges
+            if not (first == last and isinstance(memory.steps[first], SummaryStep))
+        ]
+
+    def _summary_messages(self, memory: "AgentMemory", first: int, last: int) -> list[Message]:
+        messages = [Message(role=MessageRole.SYSTEM, content=[{"type": "text", "text": self.summary_prompt}])]
+        task_steps = [step for step in memory.steps[:first] if isinstance(step, TaskStep)]
+        if task_steps:
+            messages.append(
+                Message(role=MessageRole.USER, content=[{"type": "text", "text": f"Task:\n{task_steps[-1].task}"}])
+            )
+        for step in memory.steps[first : last + 1]:
+            messages.extend(step.render_messages())
+        messages.append(
+            Message(role=MessageRole.USER, content=[{"type": "text", "text": "Now write the summary of these steps."}])
+        )
+        return messages
+
+    def _replace_with_summary(self, memory: "AgentMemory", first: int, last: int, summary: str) -> None:
+        step_numbers = []
+        for step in memory.steps[first : last + 1]:
+            if isinstance(step, SummaryStep):
+                step_numbers.extend(step.step_numbers)
+            elif isinstance(step, ActionStep) and step.step_number is not None:
+                step_numbers.append(step.step_number)
+        memory.steps[first : last + 1] = [SummaryStep(summary=summary, step_numbers=step_numbers)]
+
+
 class AgentMemory:
-    def __init__(self, system_prompt: str):
+    def __init__(self, system_prompt: str, compaction: MemoryCompaction | None = None):
         self.system_prompt = SystemPromptStep(system_prompt=system_prompt)
-        self.steps: list[TaskStep | ActionStep | PlanningStep] = []
+        self.steps: list[TaskStep | ActionStep | PlanningStep | SummaryStep] = []
+        self.compaction = compaction
+        # For each summary mode, the steps last rendered, their messages, and the concatenation of these messages
+        self._rendered_prefixes: dict[bool, tuple[list[MemoryStep], list[list[Message]], list[Message]]] = {}
 
     def reset(self):
         self.steps = []
+        self._rendered_prefixes.clear()
+
+    def to_messages(self, summary_mode: bool = False) -> list[Message]:
+        """
+        Render the system prompt and the steps as a list of chat messages.
+
+        The messages of the steps rendered by the previous call are reused up to the first step that was replaced or
+        changed since, see [`MemoryStep.render_messages`], so that rendering the memory after each new step only renders the new steps.
+        The returned messages are shared: they must not be modified in place.
+
+        Args:
+            summary_mode (`bool`, default `False`): Whether to render the steps in summary mode, leaving out the system
+                prompt and the model outputs.
+        """
+        steps = [self.system_prompt, *self.steps]
+        rendered_steps, rendered_step_messages, messages = self._rendered_prefixes.setdefault(
+            summary_mode, ([], [], [])
+        )
+        unchanged_steps_count = 0
+        for step, rendered_step, step_messages in zip(steps, rendered_steps, rendered_step_messages):
+            if step is not rendered_step or step.render_messages(summary_mode) is not step_messages:
+                break
+            unchanged_steps_count += 1
+        del messages[len(messages) - sum(map(len, rendered_step_messages[unchanged_steps_count:])) :]
+        del rendered_steps[unchanged_steps_count:], rendered_step_messages[unchanged_steps_count:]
+        for step in steps[unchanged_steps_count:]:
+            step_messages = step.render_messages(summary_mode)
+            rendered_steps.append(step)
+            rendered_step_messages.append(step_messages)
+            messages.extend(step_messages)
+        return list(messages)
 
     def get_succinct_steps(self) -> list[dict]:
         return [
@@ -226,6 +491,9 @@ class AgentMemory:
                 if detailed and step.model_input_messages is not None:
                     logger.log_messages(step.model_input_messages, level=LogLevel.ERROR)
                 logger.log_markdown(title="Agent output:", content=step.plan, level=LogLevel.ERROR)
+            elif isinstance(step, SummaryStep):
+                logger.log_rule("Summary of previous steps", level=LogLevel.ERROR)
+                logger.log_markdown(title="Summary:", content=step.summary, level=LogLevel.ERROR)
 
 
-__all__ = ["AgentMemory"]
+__all__ = ["AgentMemory", "MemoryCompaction"]
@@ -11,21 +11,22 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import json
 import logging
 import os
 import re
 import uuid
 import warnings
-from collections.abc import Generator
-from copy import deepcopy
+from collections.abc import AsyncGenerator, Generator
+from copy import copy, deepcopy
 from dataclasses import asdict, dataclass
 from enum import Enum
 from threading import Thread
 from typing import TYPE_CHECKING, Any
 
 from .tools import Tool
-from .utils import _is_package_available, encode_image_base64, make_image_url, parse_json_blob
+from .utils import _is_package_available, encode_image_base64, iterate_in_thread, make_image_url, parse_json_blob
 
 
 if TYPE_CHECKING:
@@ -93,18 +94,28 @@ class ChatMessageToolCall:
         return cls(**asdict(tool_call))
 
 
+@dataclass
+class TokenUsage:
+    """Token counts of a single model call, including the input tokens read from the provider's prompt cache."""
+
+    input_tokens: int
+    output_tokens: int
+    cached_input_tokens: int = 0
+
+
 @dataclass
 class ChatMessage:
     role: str
     content: str | None = None
     tool_calls: list[ChatMessageToolCall] | None = None
     raw: Any | None = None  # Stores the raw output from the API
+    token_usage: TokenUsage | None = None
 
     def model_dump_json(self):
         return json.dumps(get_dict_from_nested_dataclasses(self, ignore_key="raw"))
 
     @classmethod
-    def from_dict(cls, data: dict, raw: Any | None = None) -> "ChatMessage":
+    def from_dict(cls, data: dict, raw: Any | None = None, token_usage: TokenUsage | None = None) -> "ChatMessage":
         if data.get("tool_calls"):
             tool_calls = [
                 ChatMessageToolCall(
@@ -113,7 +124,13 @@ class ChatMessage:
                 for tc in data["tool_calls"]
             ]
             data["tool_calls"] = tool_calls
-        return cls(role=data["role"], content=data.get("content"), tool_calls=data.get("tool_calls"), raw=raw)
+        return cls(
+            role=data["role"],
+            content=data.get("content"),
+            tool_calls=data.get("tool_calls"),
+            raw=raw,
+            token_usage=token_usage,
+        )
 
     def dict(self):
         return json.dumps(get_dict_from_nested_dataclasses(self))
@@ -142,6 +159,15 @@ def parse_json_if_needed(arguments: str | dict) -> str | dict:
 class ChatMessageStreamDelta:
     content: str | None = None
     tool_calls: list[ChatMessageToolCall] | None = None
+    token_usage: TokenUsage | None = None
+
+
+def add_stream_delta(message: ChatMessage, delta: ChatMessageStreamDelta) -> None:
+    """Append the content of a streamed delta to a message, and set its token usage once the stream reports it."""
+    if delta.content is not None:
+        message.content = (message.content or "") + delta.content
+    if delta.token_usage is not None:
+        message.token_usage = delta.token_usage
 
 
 class MessageRole(str, Enum):
@@ -208,8 +234,12 @@ def get_clean_message_list(
         flatten_messages_as_text (`bool`, default `False`): Whether to flatten messages as text.
     """
     output_message_list: list[dict[str, str | list[dict]]] = []
-    message_list = deepcopy(message_list)  # Avoid modifying the original list
     for message in message_list:
+        # Copy the messages and their content elements, which are modified below, but not the images they contain
+        if isinstance(message["content"], list):
+            message = {**message, "content": [copy(element) for element in message["content"]]}
+        else:
+            message = dict(message)
         role = message["role"]
         if role not in MessageRole.roles():
             raise ValueError(f"Incorrect role {role}, only {MessageRole.roles()} are supported for now.")
@@ -303,6 +333,7 @@ class Model:
         self.kwargs = kwargs
         self.last_input_token_count: int | None = None
         self.last_output_token_count: int | None = None
+        self.last_cached_input_token_count: int | None = None
         self.model_id: str | None = model_id
 
     def _prepare_completion_kwargs(
@@ -394,6 +425,34 @@ class Model:
         """
         raise NotImplementedError("This method must be implemented in child classes")
 
+    async def agenerate(self, *args, **kwargs) -> ChatMessage:
+        """Asynchronous version of [`~Model.generate`], taking the same parameters.
+
+        Models with an asynchronous client override it to await their requests. By default, [`~Model.generate`] runs
+        in a worker thread, so that the event loop keeps running other tasks meanwhile. Since concurrent calls share
+        the `last_*_token_count` attributes of the model, read the token counts of each call from the `token_usage`
+        of its message.
+
+        Returns:
+            `ChatMessage`: A chat message object containing the model's response.
+        """
+        return await asyncio.to_thread(self.generate, *args, **kwargs)
+
+    async def agenerate_stream(self, *args, **kwargs) -> AsyncGenerator[ChatMessageStreamDelta]:
+        """Asynchronous version of `generate_stream`, taking the same parameters.
+
+        Models with an asynchronous client override it to await their requests. By default, each delta of
+        `generate_stream` is computed in a worker thread, so that the event loop keeps running other tasks meanwhile.
+        Models reporting their token counts send them in the `token_usage` of the last delta.
+
+        Yields:
+            `ChatMessageStreamDelta`: The deltas of the model's response.
+        """
+        if not hasattr(self, "generate_stream"):
+            raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+        async for delta in iterate_in_thread(self.generate_stream(*args, **kwargs)):
+            yield delta
+
     def __call__(self, *args, **kwargs):
         return self.generate(*args, **kwargs)
 
@@ -432,6 +491,7 @@ class Model:
             "organization",
             "project",
             "azure_endpoint",
+            "cache_breakpoints",
         ]:
             if hasattr(self, attribute):
                 model_dictionary[attribute] = getattr(self, attribute)
@@ -554,12 +614,16 @@ class VLLMModel(Model):
             sampling_params=sampling_params,
         )
         output_text = out[0].outputs[0].text
-        self.last_input_token_count = len(out[0].prompt_token_ids)
-        self.last_output_token_count = len(out[0].outputs[0].token_ids)
+        token_usage = TokenUsage(
+            input_tokens=len(out[0].prompt_token_ids), output_tokens=len(out[0].outputs[0].token_ids)
+        )
+        self.last_input_token_count = token_usage.input_tokens
+        self.last_output_token_count = token_usage.output_tokens
         return ChatMessage(
             role=MessageRole.ASSISTANT,
             content=output_text,
             raw={"out": output_text, "completion_kwargs": completion_kwargs},
+            token_usage=token_usage,
         )
 
 
@@ -651,18 +715,22 @@ class MLXModel(Model):
             add_generation_prompt=True,
         )
 
-        self.last_input_token_count = len(prompt_ids)
-        self.last_output_token_count = 0
+        token_usage = TokenUsage(input_tokens=len(prompt_ids), output_tokens=0)
         text = ""
         for response in self.stream_generate(self.model, self.tokenizer, prompt=prompt_ids, **completion_kwargs):
-            self.last_output_token_count += 1
+            token_usage.output_tokens += 1
             text += response.text
             if any((stop_index := text.rfind(stop)) != -1 for stop in stops):
                 text = text[:stop_index]
                 break
+        self.last_input_token_count = token_usage.input_tokens
+        self.last_output_token_count = token_usage.output_tokens
 
         return ChatMessage(
-            role=MessageRole.ASSISTANT, content=text, raw={"out": text, "completion_kwargs": completion_kwargs}
+            role=MessageRole.ASSISTANT,
+            content=text,
+            raw={"out": text, "completion_kwargs": completion_kwargs},
+            token_usage=token_usage,
         )
 
 
@@ -870,8 +938,9 @@ class TransformersModel(Model):
             output_text = self.processor.decode(generated_tokens, skip_special_tokens=True)
         else:
             output_text = self.tokenizer.decode(generated_tokens, skip_special_tokens=True)
-        self.last_input_token_count = count_prompt_tokens
-        self.last_output_token_count = len(generated_tokens)
+        token_usage = TokenUsage(input_tokens=count_prompt_tokens, output_tokens=len(generated_tokens))
+        self.last_input_token_count = token_usage.input_tokens
+        self.last_output_token_count = token_usage.output_tokens
 
         if stop_sequences is not None:
             output_text = remove_stop_sequences(output_text, stop_sequences)
@@ -883,6 +952,7 @@ class TransformersModel(Model):
                 "out": output_text,
                 "completion_kwargs": {key: value for key, value in generation_kwargs.items() if key != "inputs"},
             },
+            token_usage=token_usage,
         )
 
     def generate_stream(
@@ -905,15 +975,20 @@ class TransformersModel(Model):
         thread = Thread(target=self.model.generate, kwargs={"streamer": self.streamer, **generation_kwargs})
         thread.start()
 
+        count_generated_tokens = 0
         self.last_output_token_count = 0
 
         # Generate with streaming
         for new_text in self.streamer:
             yield ChatMessageStreamDelta(content=new_text, tool_calls=None)
-            self.last_output_token_count += 1
+            count_generated_tokens += 1
+            self.last_output_token_count = count_generated_tokens
 
         self.last_input_token_count = count_prompt_tokens
         thread.join()
+        yield ChatMessageStreamDelta(
+            content="", token_usage=TokenUsage(input_tokens=count_prompt_tokens, output_tokens=count_generated_tokens)
+        )
 
 
 class ApiModel(Model):
@@ -931,20 +1006,86 @@ class ApiModel(Model):
             Mapping to convert  between internal role names and API-specific role names. Defaults to None.
         client (`Any`, **optional**):
             Pre-configured API client instance. If not provided, a default client will be created. Defaults to None.
+        cache_breakpoints (`bool`, default `False`):
+            Whether to mark the end of the first and of the last input messages as prompt cache breakpoints, for the
+            providers that only cache the prompt prefixes explicitly marked in the request.
         **kwargs: Additional keyword arguments to pass to the parent class.
     """
 
     def __init__(
-        self, model_id: str, custom_role_conversions: dict[str, str] | None = None, client: Any | None = None, **kwargs
+        self,
+        model_id: str,
+        custom_role_conversions: dict[str, str] | None = None,
+        client: Any | None = None,
+        cache_breakpoints: bool = False,
+        **kwargs,
     ):
         super().__init__(model_id=model_id, **kwargs)
         self.custom_role_conversions = custom_role_conversions or {}
+        self.cache_breakpoints = cache_breakpoints
         self.client = client or self.create_client()
+        self._async_client = None
+
+    def _prepare_completion_kwargs(self, *args, **kwargs) -> dict[str, Any]:
+        completion_kwargs = super()._prepare_completion_kwargs(*args, **kwargs)
+        if self.cache_breakpoints and completion_kwargs["messages"]:
+            messages = completion_kwargs["messages"]
+            # The first message ends with the system prompt, the last one with the whole history of this request
+            for message in {id(message): message for message in (messages[0], messages[-1])}.values():
+                if isinstance(message["content"], list) and message["content"]:
+                    self._add_cache_breakpoint(message["content"])
+        return completion_kwargs
+
+    def _add_cache_breakpoint(self, content: list[dict]) -> None:
+        """Mark the end of a message content as a prompt cache breakpoint, with an Anthropic-style `cache_control`."""
+        content[-1]["cache_control"] = {"type": "ephemeral"}
+
+    def _record_token_usage(self, usage) -> TokenUsage:
+        """Record and return the token counts of an OpenAI-style `usage`, including the input tokens read from the prompt cache."""
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+        if not isinstance(cached_tokens, int):
+            # LiteLLM reports the cache reads of Anthropic models separately
+            cached_tokens = getattr(usage, "cache_read_input_tokens", None)
+        token_usage = TokenUsage(
+            input_tokens=usage.prompt_tokens,
+            output_tokens=usage.completion_tokens,
+            cached_input_tokens=cached_tokens if isinstance(cached_tokens, int) else 0,
+        )
+        self.last_input_token_count = token_usage.input_tokens
+        self.last_output_token_count = token_usage.output_tokens
+        self.last_cached_input_token_count = token_usage.cached_input_tokens
+        return token_usage
 
     def create_client(self):
         """Create the API client for the specific service."""
         raise NotImplementedError("Subclasses must implement this method to create a client")
 
+    def create_async_client(self):
+        """Create the asynchronous API client for the specific service, used by `agenerate` and `agenerate_stream`."""
+        raise NotImplementedError("Subclasses must implement this method to create an asynchronous client")
+
+    @property
+    def async_client(self):
+        """Asynchronous API client, created on first use."""
+        if self._async_client is None:
+            self._async_client = self.create_async_client()
+        return self._async_client
+
+    def _process_stream_event(self, event) -> ChatMessageStreamDelta | None:
+        """Return the delta of a streamed completion chunk, carrying the token counts of the last chunk."""
+        delta = None
+        if event.choices:
+            if event.choices[0].delta is None:
+                if not getattr(event.choices[0], "finish_reason", None):
+                    raise ValueError(f"No content or tool calls in event: {event}")
+            else:
+                delta = ChatMessageStreamDelta(content=event.choices[0].delta.content)
+        if getattr(event, "usage", None):
+            # The last chunk may carry no choices: its delta has an empty content, for consumers concatenating them
+            delta = delta or ChatMessageStreamDelta(content="")
+            delta.token_usage = self._record_token_usage(event.usage)
+        return delta
+
 
 class LiteLLMModel(ApiModel):
     """Model to use [LiteLLM Python SDK](https://docs.litellm.ai/docs/#litellm-python-sdk) to access hundreds of LLMs.
@@ -1030,11 +1171,11 @@ class LiteLLMModel(ApiModel):
 
         response = self.client.completion(**completion_kwargs)
 
-        self.last_input_token_count = response.usage.prompt_tokens
-        self.last_output_token_count = response.usage.completion_tokens
+        token_usage = self._record_token_usage(response.usage)
         return ChatMessage.from_dict(
             response.choices[0].message.model_dump(include={"role", "content", "tool_calls"}),
             raw=response,
+            token_usage=token_usage,
         )
 
     def generate_stream(
@@ -1058,17 +1199,68 @@ class LiteLLMModel(ApiModel):
             **kwargs,
         )
         for event in self.client.completion(**completion_kwargs, stream=True, stream_options={"include_usage": True}):
-            if event.choices:
-                if event.choices[0].delta is None:
-                    if not getattr(event.choices[0], "finish_reason", None):
-                        raise ValueError(f"No content or tool calls in event: {event}")
-                else:
-                    yield ChatMessageStreamDelta(
-                        content=event.choices[0].delta.content,
-                    )
-            if getattr(event, "usage", None):
-                self.last_input_token_count = event.usage.prompt_tokens
-                self.last_output_token_count = event.usage.completion_tokens
+            if (delta := self._process_stream_event(event)) is not None:
+                yield delta
+
+    def create_async_client(self):
+        """The LiteLLM client also provides the asynchronous completion."""
+        return self.client
+
+    async def agenerate(
+        self,
+        messages: list[dict[str, str | list[dict]]],
+        stop_sequences: list[str] | None = None,
+        grammar: str | None = None,
+        tools_to_call_from: list[Tool] | None = None,
+        **kwargs,
+    ) -> ChatMessage:
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            tools_to_call_from=tools_to_call_from,
+            model=self.model_id,
+            api_base=self.api_base,
+            api_key=self.api_key,
+            convert_images_to_image_urls=True,
+            custom_role_conversions=self.custom_role_conversions,
+            **kwargs,
+        )
+
+        response = await self.async_client.acompletion(**completion_kwargs)
+
+        token_usage = self._record_token_usage(response.usage)
+        return ChatMessage.from_dict(
+            response.choices[0].message.model_dump(include={"role", "content", "tool_calls"}),
+            raw=response,
+            token_usage=token_usage,
+        )
+
+    async def agenerate_stream(
+        self,
+        messages: list[dict[str, str | list[dict]]],
+        stop_sequences: list[str] | None = None,
+        grammar: str | None = None,
+        tools_to_call_from: list[Tool] | None = None,
+        **kwargs,
+    ) -> AsyncGenerator[ChatMessageStreamDelta]:
+        if tools_to_call_from:
+            raise NotImplementedError("Streaming is not yet supported for tool calling")
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            tools_to_call_from=tools_to_call_from,
+            model=self.model_id,
+            custom_role_conversions=self.custom_role_conversions,
+            convert_images_to_image_urls=True,
+            **kwargs,
+        )
+        async for event in await self.async_client.acompletion(
+            **completion_kwargs, stream=True, stream_options={"include_usage": True}
+        ):
+            if (delta := self._process_stream_event(event)) is not None:
+                yield delta
 
 
 class LiteLLMRouterModel(LiteLLMModel):
@@ -1280,9 +1472,8 @@ class InferenceClientModel(ApiModel):
         )
         response = self.client.chat_completion(**completion_kwargs)
 
-        self.last_input_token_count = response.usage.prompt_tokens
-        self.last_output_token_count = response.usage.completion_tokens
-        return ChatMessage.from_dict(asdict(response.choices[0].message), raw=response)
+        token_usage = self._record_token_usage(response.usage)
+        return ChatMessage.from_dict(asdict(response.choices[0].message), raw=response, token_usage=token_usage)
 
     def generate_stream(
         self,
@@ -1307,17 +1498,62 @@ class InferenceClientModel(ApiModel):
         for event in self.client.chat.completions.create(
             **completion_kwargs, stream=True, stream_options={"include_usage": True}
         ):
-            if event.choices:
-                if event.choices[0].delta is None:
-                    if not getattr(event.choices[0], "finish_reason", None):
-                        raise ValueError(f"No content or tool calls in event: {event}")
-                else:
-                    yield ChatMessageStreamDelta(
-                        content=event.choices[0].delta.content,
-                    )
-            if getattr(event, "usage", None):
-                self.last_input_token_count = event.usage.prompt_tokens
-                self.last_output_token_count = event.usage.completion_tokens
+            if (delta := self._process_stream_event(event)) is not None:
+                yield delta
+
+    def create_async_client(self):
+        """Create the asynchronous Hugging Face client."""
+        from huggingface_hub import AsyncInferenceClient
+
+        return AsyncInferenceClient(**self.client_kwargs)
+
+    async def agenerate(
+        self,
+        messages: list[dict[str, str | list[dict]]],
+        stop_sequences: list[str] | None = None,
+        grammar: str | None = None,
+        tools_to_call_from: list[Tool] | None = None,
+        **kwargs,
+    ) -> ChatMessage:
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            tools_to_call_from=tools_to_call_from,
+            convert_images_to_image_urls=True,
+            custom_role_conversions=self.custom_role_conversions,
+            **kwargs,
+        )
+        response = await self.async_client.chat_completion(**completion_kwargs)
+
+        token_usage = self._record_token_usage(response.usage)
+        return ChatMessage.from_dict(asdict(response.choices[0].message), raw=response, token_usage=token_usage)
+
+    async def agenerate_stream(
+        self,
+        messages: list[dict[str, str | list[dict]]],
+        stop_sequences: list[str] | None = None,
+        grammar: str | None = None,
+        tools_to_call_from: list[Tool] | None = None,
+        **kwargs,
+    ) -> AsyncGenerator[ChatMessageStreamDelta]:
+        if tools_to_call_from:
+            raise NotImplementedError("Streaming is not yet supported for tool calling")
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            tools_to_call_from=tools_to_call_from,
+            model=self.model_id,
+            custom_role_conversions=self.custom_role_conversions,
+            convert_images_to_image_urls=True,
+            **kwargs,
+        )
+        async for event in await self.async_client.chat.completions.create(
+            **completion_kwargs, stream=True, stream_options={"include_usage": True}
+        ):
+            if (delta := self._process_stream_event(event)) is not None:
+                yield delta
 
 
 class HfApiModel(InferenceClientModel):
@@ -1390,6 +1626,11 @@ class OpenAIServerModel(ApiModel):
 
         return openai.OpenAI(**self.client_kwargs)
 
+    def create_async_client(self):
+        import openai
+
+        return openai.AsyncOpenAI(**self.client_kwargs)
+
     def generate_stream(
         self,
         messages: list[dict[str, str | list[dict]]],
@@ -1413,17 +1654,8 @@ class OpenAIServerModel(ApiModel):
         for event in self.client.chat.completions.create(
             **completion_kwargs, stream=True, stream_options={"include_usage": True}
         ):
-            if event.choices:
-                if event.choices[0].delta is None:
-                    if not getattr(event.choices[0], "finish_reason", None):
-                        raise ValueError(f"No content or tool calls in event: {event}")
-                else:
-                    yield ChatMessageStreamDelta(
-                        content=event.choices[0].delta.content,
-                    )
-            if getattr(event, "usage", None):
-                self.last_input_token_count = event.usage.prompt_tokens
-                self.last_output_token_count = event.usage.completion_tokens
+            if (delta := self._process_stream_event(event)) is not None:
+                yield delta
 
     def generate(
         self,
@@ -1444,12 +1676,65 @@ class OpenAIServerModel(ApiModel):
             **kwargs,
         )
         response = self.client.chat.completions.create(**completion_kwargs)
-        self.last_input_token_count = response.usage.prompt_tokens
-        self.last_output_token_count = response.usage.completion_tokens
+        token_usage = self._record_token_usage(response.usage)
+
+        return ChatMessage.from_dict(
+            response.choices[0].message.model_dump(include={"role", "content", "tool_calls"}),
+            raw=response,
+            token_usage=token_usage,
+        )
+
+    async def agenerate_stream(
+        self,
+        messages: list[dict[str, str | list[dict]]],
+        stop_sequences: list[str] | None = None,
+        grammar: str | None = None,
+        tools_to_call_from: list[Tool] | None = None,
+        **kwargs,
+    ) -> AsyncGenerator[ChatMessageStreamDelta]:
+        if tools_to_call_from:
+            raise NotImplementedError("Streaming is not yet supported for tool calling")
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            tools_to_call_from=tools_to_call_from,
+            model=self.model_id,
+            custom_role_conversions=self.custom_role_conversions,
+            convert_images_to_image_urls=True,
+            **kwargs,
+        )
+        async for event in await self.async_client.chat.completions.create(
+            **completion_kwargs, stream=True, stream_options={"include_usage": True}
+        ):
+            if (delta := self._process_stream_event(event)) is not None:
+                yield delta
+
+    async def agenerate(
+        self,
+        messages: list[dict[str, str | list[dict]]],
+        stop_sequences: list[str] | None = None,
+        grammar: str | None = None,
+        tools_to_call_from: list[Tool] | None = None,
+        **kwargs,
+    ) -> ChatMessage:
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            tools_to_call_from=tools_to_call_from,
+            model=self.model_id,
+            custom_role_conversions=self.custom_role_conversions,
+            convert_images_to_image_urls=True,
+            **kwargs,
+        )
+        response = await self.async_client.chat.completions.create(**completion_kwargs)
+        token_usage = self._record_token_usage(response.usage)
 
         return ChatMessage.from_dict(
             response.choices[0].message.model_dump(include={"role", "content", "tool_calls"}),
             raw=response,
+            token_usage=token_usage,
         )
 
 
@@ -1509,6 +1794,11 @@ class AzureOpenAIServerModel(OpenAIServerModel):
 
         return openai.AzureOpenAI(**self.client_kwargs)
 
+    def create_async_client(self):
+        import openai
+
+        return openai.AsyncAzureOpenAI(**self.client_kwargs)
+
 
 class AmazonBedrockServerModel(ApiModel):
     """
@@ -1642,6 +1932,10 @@ class AmazonBedrockServerModel(ApiModel):
             **completion_kwargs,
         }
 
+    def _add_cache_breakpoint(self, content: list[dict]) -> None:
+        """Mark the end of a message content as a prompt cache breakpoint, with a Bedrock `cachePoint` block."""
+        content.append({"cachePoint": {"type": "default"}})
+
     def create_client(self):
         try:
             import boto3  # type: ignore
@@ -1672,12 +1966,18 @@ class AmazonBedrockServerModel(ApiModel):
         response = self.client.converse(**completion_kwargs)
 
         # Get usage
-        self.last_input_token_count = response["usage"]["inputTokens"]
-        self.last_output_token_count = response["usage"]["outputTokens"]
+        token_usage = TokenUsage(
+            input_tokens=response["usage"]["inputTokens"],
+            output_tokens=response["usage"]["outputTokens"],
+            cached_input_tokens=response["usage"].get("cacheReadInputTokens", 0),
+        )
+        self.last_input_token_count = token_usage.input_tokens
+        self.last_output_token_count = token_usage.output_tokens
+        self.last_cached_input_token_count = token_usage.cached_input_tokens
 
         # Get first message
         response["output"]["message"]["content"] = response["output"]["message"]["content"][0]["text"]
-        return ChatMessage.from_dict(response["output"]["message"], raw=response)
+        return ChatMessage.from_dict(response["output"]["message"], raw=response, token_usage=token_usage)
 
 
 __all__ = [
@@ -1697,4 +1997,5 @@ __all__ = [
     "AzureOpenAIServerModel",
     "AmazonBedrockServerModel",
     "ChatMessage",
+    "TokenUsage",
 ]
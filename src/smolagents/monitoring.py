@@ -26,6 +26,7 @@ from rich.table import Table
 from rich.text import Text
 from rich.tree import Tree
 
+from smolagents.models import TokenUsage
 from smolagents.utils import escape_code_brackets
 
 
@@ -37,20 +38,22 @@ class Monitor:
         self.step_durations = []
         self.tracked_model = tracked_model
         self.logger = logger
-        if getattr(self.tracked_model, "last_input_token_count", "Not found") != "Not found":
-            self.total_input_token_count = 0
-            self.total_output_token_count = 0
+        self.total_input_token_count = 0
+        self.total_output_token_count = 0
+        self.total_cached_input_token_count = 0
 
     def get_total_token_counts(self):
         return {
             "input": self.total_input_token_count,
             "output": self.total_output_token_count,
+            "cached_input": self.total_cached_input_token_count,
         }
 
     def reset(self):
         self.step_durations = []
         self.total_input_token_count = 0
         self.total_output_token_count = 0
+        self.total_cached_input_token_count = 0
 
     def update_metrics(self, step_log):
         """Update the metrics of the monitor.
@@ -62,12 +65,30 @@ class Monitor:
         self.step_durations.append(step_duration)
         console_outputs = f"[Step {len(self.step_durations)}: Duration {step_duration:.2f} seconds"
 
-        if getattr(self.tracked_model, "last_input_token_count", None) is not None:
-            self.total_input_token_count += self.tracked_model.last_input_token_count
-            self.total_output_token_count += self.tracked_model.last_output_token_count
+        # Prefer the token usage returned with the step's output: the last token counts of a model shared by
+        # concurrent runs may belong to another run
+        token_usage = getattr(getattr(step_log, "model_output_message", None), "token_usage", None)
+        if isinstance(token_usage, TokenUsage):
+            token_counts = (token_usage.input_tokens, token_usage.output_tokens, token_usage.cached_input_tokens)
+        elif getattr(self.tracked_model, "last_input_token_count", None) is not None:
+            # Only some models report the input tokens read from the provider's prompt cache
+            cached_input_token_count = getattr(self.tracked_model, "last_cached_input_token_count", None)
+            token_counts = (
+                self.tracked_model.last_input_token_count,
+                self.tracked_model.last_output_token_count,
+                cached_input_token_count if isinstance(cached_input_token_count, int) else 0,
+            )
+        else:
+            token_counts = None
+        if token_counts is not None:
+            self.total_input_token_count += token_counts[0]
+            self.total_output_token_count += token_counts[1]
+            self.total_cached_input_token_count += token_counts[2]
             console_outputs += (
                 f"| Input tokens: {self.total_input_token_count:,} | Output tokens: {self.total_output_token_count:,}"
             )
+            if self.total_cached_input_token_count:
+                console_outputs += f" | Cached input tokens: {self.total_cached_input_token_count:,}"
         console_outputs += "]"
         self.logger.log(Text(console_outputs, style="dim"), level=1)
 
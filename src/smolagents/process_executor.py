@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+# Copyright 2024 The HuggingFace Inc. team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import inspect
+import logging
+import multiprocessing
+import os
+import pickle
+import struct
+import threading
+import weakref
+from collections.abc import Callable
+from importlib import import_module
+from multiprocessing.connection import Connection
+from typing import Any
+
+from .local_python_executor import InterpreterError, LocalPythonExecutor, PrintContainer, PythonExecutor
+from .tools import Tool
+from .utils import run_awaitable
+
+
+__all__ = ["ProcessPythonExecutor", "WorkerPool"]
+
+logger = logging.getLogger(__name__)
+
+# Modules imported by the workers before they are handed to an executor, if installed
+DEFAULT_PRELOAD_MODULES = ["numpy", "pandas"]
+# Delay given to a worker past its own timeout to stop by itself, before it is killed
+WORKER_KILL_GRACE_SECONDS = 2.0
+
+
+def send_message(connection: Connection, message: Any) -> None:
+    """
+    Send a message through a connection, pickled with protocol 5: large binary buffers, like the data of numpy arrays,
+    are sent out-of-band as separate frames instead of being copied into the pickle.
+    """
+    buffers = []
+    data = pickle.dumps(message, protocol=5, buffer_callback=buffers.append)
+    try:
+        raw_buffers = [buffer.raw() for buffer in buffers]
+    except BufferError:  # Non-contiguous buffers cannot be sent out-of-band
+        data, raw_buffers = pickle.dumps(message, protocol=5), []
+    connection.send_bytes(struct.pack(f"<I{len(raw_buffers)}Q", len(raw_buffers), *(b.nbytes for b in raw_buffers)))
+    connection.send_bytes(data)
+    for raw_buffer in raw_buffers:
+        connection.send_bytes(raw_buffer)
+
+
+def receive_message(connection: Connection) -> Any:
+    """Receive a message sent with `send_message`, reading out-of-band buffers into writable memory."""
+    header = connection.recv_bytes()
+    (buffers_count,) = struct.unpack_from("<I", header)
+    buffer_sizes = struct.unpack_from(f"<{buffers_count}Q", header, 4)
+    data = connection.recv_bytes()
+    buffers = []
+    for size in buffer_sizes:
+        buffer = bytearray(size)
+        connection.recv_bytes_into(buffer)
+        buffers.append(buffer)
+    return pickle.loads(data, buffers=buffers)
+
+
+class _ToolProxy:
+    """
+    Tool of a worker process, forwarding its calls to the executor that runs the actual tool in the main process.
+
+    The proxy of an asynchronous tool returns a coroutine like the tool, making its call when awaited.
+    """
+
+    def __init__(self, connection: Connection, name: str, is_async: bool = False):
+        self.connection = connection
+        self.name = name
+        self.is_async = is_async
+
+    def __call__(self, *args, **kwargs):
+        if self.is_async:
+            return self._acall(*args, **kwargs)
+        return self._call(*args, **kwargs)
+
+    def _call(self, *args, **kwargs):
+        send_message(self.connection, ("call_tool", self.name, args, kwargs))
+        kind, value = receive_message(self.connection)
+        if kind == "tool_error":
+            raise value
+        return value
+
+    async def _acall(self, *args, **kwargs):
+        return self._call(*args, **kwargs)
+
+
+def _is_async_tool(tool: Callable) -> bool:
+    is_async = getattr(tool, "is_async", None)
+    return is_async if isinstance(is_async, bool) else inspect.iscoroutinefunction(tool)
+
+
+def _worker_main(connection: Connection, preload_modules: list[str]) -> None:
+    """Main loop of a worker process: serves the requests of one `ProcessPythonExecutor` with a `LocalPythonExecutor`."""
+    for module_name in preload_modules:
+        try:
+            import_module(module_name)
+        except ImportError:
+            pass
+    executor = None
+    while True:
+        try:
+            kind, *args = receive_message(connection)
+        except (EOFError, OSError):
+            return
+        try:
+            reply = None
+            if kind == "close":
+                return
+            elif kind == "init":
+                additional_authorized_imports, executor_kwargs = args
+                executor = LocalPythonExecutor(additional_authorized_imports, **executor_kwargs)
+            elif kind == "send_tools":
+                executor.send_tools(
+                    {name: _ToolProxy(connection, name, is_async) for name, is_async in args[0].items()}
+                )
+            elif kind == "send_variables":
+                executor.send_variables(args[0])
+            elif kind == "run":
+                reply = executor(args[0])
+            elif kind == "get_profile":
+                reply = executor.last_profile
+            else:
+                raise ValueError(f"Unknown request: {kind}")
+        except Exception as e:
+            error_message = str(e) if isinstance(e, InterpreterError) else f"{type(e).__name__}: {e}"
+            logs = str(executor.state.get("_print_outputs", "")) if executor is not None else ""
+            send_message(connection, ("error", error_message, logs))
+            continue
+        try:
+            send_message(connection, ("ok", reply))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # The output of the code cannot be sent back: send its representation instead
+            output, logs, is_final_answer = reply
+            send_message(connection, ("ok", (repr(output), logs, is_final_answer)))
+
+
+class _Worker:
+    """A worker process and the connection to it."""
+
+    def __init__(self, context: multiprocessing.context.BaseContext, preload_modules: list[str]):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_connection, preload_modules),
+            name="smolagents-python-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+
+    def terminate(self) -> None:
+        if self.process.is_alive():
+            try:
+                send_message(self.connection, ("close",))
+            except OSError:
+                pass
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.connection.close()
+
+
+class WorkerPool:
+    """
+    Pool of warm worker processes for [`ProcessPythonExecutor`].
+
+    The pool keeps `size` idle workers started in advance, with heavy modules already imported, so that an executor
+    can start using one right away. Each executor takes a worker for its own use, to keep its state across calls, and
+    the pool starts a new one in the background to replace it.
+
+    On platforms supporting it, workers are forked from a server process that imports the preloaded modules once,
+    so that starting a worker does not import them again.
+
+    Args:
+        size (`int`, *optional*): Number of idle workers to keep ready. Defaults to the number of CPUs, up to 4.
+        preload_modules (`list[str]`, *optional*): Modules to import in the workers in advance, if installed.
+            Defaults to `DEFAULT_PRELOAD_MODULES`.
+        start_method (`str`, *optional*): The `multiprocessing` start method. Defaults to `"forkserver"` where it is
+            available, else `"spawn"`.
+    """
+
+    def __init__(
+        self, size: int | None = None, preload_modules: list[str] | None = None, start_method: str | None = None
+    ):
+        self.size = size if size is not None else min(4, os.cpu_count() or 1)
+        self.preload_modules = list(preload_modules) if preload_modules is not None else DEFAULT_PRELOAD_MODULES
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            self.context.set_forkserver_preload([__name__, *self.preload_modules])
+        self._idle_workers: list[_Worker] = []
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._closed = False
+        self._refill_in_background()
+
+    def acquire(self) -> _Worker:
+        """Take a worker out of the pool, starting one if none is ready."""
+        if self._closed:
+            raise RuntimeError("The worker pool is shut down.")
+        worker = None
+        with self._lock:
+            while self._idle_workers and worker is None:
+                candidate = self._idle_workers.pop()
+                if candidate.process.is_alive():
+                    worker = candidate
+        if worker is None:
+            worker = _Worker(self.context, self.preload_modules)
+        self._refill_in_background()
+        return worker
+
+    def shutdown(self) -> None:
+        """Stop the idle workers. Workers in use are stopped by their executors."""
+        with self._lock:
+            self._closed = True
+            idle_workers, self._idle_workers = self._idle_workers, []
+        for worker in idle_workers:
+            worker.terminate()
+
+    def _refill_in_background(self) -> None:
+        with self._lock:
+            if self._refilling or self._closed or len(self._idle_workers) >= self.size:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill, name="smolagents-worker-pool", daemon=True).start()
+
+    def _refill(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if self._closed or len(self._idle_workers) >= self.size:
+                        return
+                worker = _Worker(self.context, self.preload_modules)
+                with self._lock:
+                    self._idle_workers.append(worker)
+        finally:
+            with self._lock:
+                self._refilling = False
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_worker_pool() -> WorkerPool:
+    """Return the worker pool shared by the executors that are not given one, creating it on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = WorkerPool()
+        return _default_pool
+
+
+class ProcessPythonExecutor(PythonExecutor):
+    """
+    Executor of Python code in a separate worker process, running the [`LocalPythonExecutor`] interpreter.
+
+    Each executor has a dedicated worker, taken from a [`WorkerPool`] of warm processes, that keeps the state of the
+    code across calls: concurrent agents in a same server thus run their code on all cores, and a crash of one worker
+    does not affect the others. Tools are called back in the main process, so that they do not need to be sent to the
+    worker. Data is exchanged with pickle protocol 5, sending large buffers like numpy arrays out-of-band.
+
+    If the worker crashes, or does not stop within `timeout_seconds` (plus a grace delay) and has to be killed, the
+    call fails with an `InterpreterError` and the next call runs in a new worker: the tools and the variables sent to
+    the executor are sent again, but the variables defined by the code are lost.
+
+    Args:
+        additional_authorized_imports (`list[str]`):
+            Additional authorized imports for the executor.
+        max_print_outputs_length (`int`, *optional*):
+            Maximum length of the print outputs.
+        additional_functions (`dict[str, Callable]`, *optional*):
+            Additional Python functions to be added to the executor. They must be picklable.
+        pool (`WorkerPool`, *optional*):
+            Pool to take the worker from. Defaults to a pool shared by all executors.
+        **kwargs:
+            Additional arguments for the `LocalPythonExecutor` of the worker, like `engine`, `timeout_seconds`,
+            `max_memory_mb` or `profile`. The profile of the last call is then available as `last_profile`.
+    """
+
+    def __init__(
+        self,
+        additional_authorized_imports: list[str],
+        max_print_outputs_length: int | None = None,
+        additional_functions: dict[str, Callable] | None = None,
+        pool: WorkerPool | None = None,
+        **kwargs,
+    ):
+        self.additional_authorized_imports = additional_authorized_imports
+        self.executor_kwargs = {
+            "max_print_outputs_length": max_print_outputs_length,
+            "additional_functions": additional_functions or {},
+            **kwargs,
+        }
+        self.timeout_seconds = kwargs.get("timeout_seconds")
+        self.profile = kwargs.get("profile", False)
+        self.last_profile = None
+        self.pool = pool or get_default_worker_pool()
+        # Print outputs of the last call, the variables themselves live in the worker
+        self.state = {"_print_outputs": PrintContainer()}
+        self.tools: dict[str, Tool] = {}
+        self.variables: dict[str, Any] = {}
+        self._worker = None
+        self._finalizer = None
+        self._lock = threading.RLock()
+        self._start_worker()
+
+    def __call__(self, code_action: str) -> tuple[Any, str, bool]:
+        try:
+            output, logs, is_final_answer = self._request(("run", code_action))
+        finally:
+            if self.profile and self._worker is not None:
+                self.last_profile = self._request(("get_profile",))
+        self._set_print_outputs(logs)
+        return output, logs, is_final_answer
+
+    def send_tools(self, tools: dict[str, Tool]):
+        self.tools = dict(tools)
+        self._request(("send_tools", self._tool_kinds()))
+
+    def send_variables(self, variables: dict):
+        self.variables.update(variables)
+        self._request(("send_variables", variables))
+
+    def cleanup(self):
+        """Stop the worker process of the executor."""
+        with self._lock:
+            if self._finalizer is not None:
+                self._finalizer()
+            self._worker = self._finalizer = None
+
+    def _start_worker(self) -> None:
+        worker = self.pool.acquire()
+        self._worker = worker
+        self._finalizer = weakref.finalize(self, worker.terminate)
+        self._request(("init", self.additional_authorized_imports, self.executor_kwargs))
+        if self.tools:
+            self._request(("send_tools", self._tool_kinds()))
+        if self.variables:
+            self._request(("send_variables", self.variables))
+
+    def _request(self, message: tuple) -> Any:
+        with self._lock:
+            if self._worker is None:
+                self._start_worker()
+            worker = self._worker
+            try:
+                send_message(worker.connection, message)
+                while True:
+                    kind, *args = self._receive(worker)
+                    if kind == "call_tool":
+                        self._call_tool(worker.connection, *args)
+                    elif kind == "ok":
+                        return args[0]
+                    else:
+                        error_message, logs = args
+                        self._set_print_outputs(logs)
+                        raise InterpreterError(error_message)
+            except (EOFError, OSError):
+                worker.process.join(timeout=1)
+                self.cleanup()
+                raise InterpreterError(
+                    f"The worker process executing the code exited unexpectedly (exit code {worker.process.exitcode})."
+                    " The variables defined by the previous code actions are lost."
+                )
+
+    def _receive(self, worker: _Worker) -> tuple:
+        if self.timeout_seconds is not None:
+            if not worker.connection.poll(self.timeout_seconds + WORKER_KILL_GRACE_SECONDS):
+                worker.process.kill()
+                self.cleanup()
+                raise InterpreterError(
+                    f"Code execution did not stop after the time limit of {self.timeout_seconds} seconds: its worker"
+                    " process was killed. The variables defined by the previous code actions are lost."
+                )
+        return receive_message(worker.connection)
+
+    def _tool_kinds(self) -> dict[str, bool]:
+        """Return whether each tool is asynchronous, for the worker to expose it alike."""
+        return {name: _is_async_tool(tool) for name, tool in self.tools.items()}
+
+    def _call_tool(self, connection: Connection, name: str, args: tuple, kwargs: dict) -> None:
+        try:
+            result = self.tools[name](*args, **kwargs)
+            if inspect.isawaitable(result):
+                # Coroutines cannot be sent to the worker: the proxy of the tool returns one wrapping the result instead
+                result = run_awaitable(result)
+            reply = ("tool_result", result)
+        except Exception as error:
+            try:
+                # Not every exception can be unpickled, e.g. if its constructor takes several arguments
+                pickle.loads(pickle.dumps(error, protocol=5))
+            except Exception:
+                error = RuntimeError(f"{type(error).__name__}: {error}")
+            reply = ("tool_error", error)
+        try:
+            send_message(connection, reply)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            error = RuntimeError(f"The output of tool '{name}' cannot be sent to the executor: {e}")
+            send_message(connection, ("tool_error", error))
+
+    def _set_print_outputs(self, logs: str) -> None:
+        self.state["_print_outputs"] = PrintContainer()
+        self.state["_print_outputs"] += logs
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+# Copyright 2024 The HuggingFace Inc. team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+
+__all__ = ["DiskStateStore", "LazyState", "StateStore"]
+
+logger = logging.getLogger(__name__)
+
+# Variables of the executor state that are never persisted: interpreter bookkeeping of the current run
+NON_PERSISTED_NAMES = frozenset({"__name__", "_print_outputs"})
+# Immutable types whose values can be compared by identity to know whether a variable changed since it was saved
+IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes)
+
+
+class StateStore:
+    """
+    Base class of the stores persisting the variables of an executor state, so that an executor created after a
+    restart can resume from the variables computed so far.
+
+    A [`LocalPythonExecutor`] given a store rehydrates its state from it lazily, loading each variable on first access,
+    then calls [`StateStore.save`] after each code action.
+    """
+
+    def names(self) -> set[str]:
+        """Return the names of the stored variables."""
+        raise NotImplementedError
+
+    def load(self, name: str) -> Any:
+        """
+        Load a stored variable.
+
+        Args:
+            name (`str`): Name of the variable.
+
+        Returns:
+            `Any`: The value of the variable.
+        """
+        raise NotImplementedError
+
+    def save(self, state: dict[str, Any]) -> list[str]:
+        """
+        Persist the variables of a state that changed since the last save, and forget the ones deleted from it.
+        Variables that cannot be pickled, like modules or functions defined by the code, are not persisted.
+
+        Args:
+            state (`dict[str, Any]`): The state to save. If it is a [`LazyState`], its variables not loaded yet are
+                left untouched.
+
+        Returns:
+            `list[str]`: The names of the variables written.
+        """
+        raise NotImplementedError
+
+    def lazy_state(self, variables: dict[str, Any] | None = None) -> "LazyState":
+        """
+        Return an executor state rehydrated from the store, whose stored variables are loaded on first access.
+
+        Args:
+            variables (`dict[str, Any]`, *optional*): Variables of the state, taking precedence over the stored ones.
+        """
+        return LazyState(self, variables or {})
+
+
+class LazyState(dict):
+    """
+    Executor state rehydrated from a [`StateStore`], loading each stored variable only when it is first accessed.
+
+    Args:
+        store (`StateStore`): The store to load the variables from.
+        variables (`dict[str, Any]`): Variables of the state, taking precedence over the stored ones.
+
+    Attributes:
+        pending (`set[str]`): Names of the stored variables not loaded yet.
+        loaded (`dict[str, Any]`): Variables loaded from the store since the last call to `loaded.clear()`, used to
+            tell whether a variable was reassigned after being loaded.
+    """
+
+    def __init__(self, store: StateStore, variables: dict[str, Any]):
+        super().__init__(variables)
+        self.store = store
+        self.pending = store.names() - set(variables)
+        self.loaded = {}
+
+    def __missing__(self, key: str) -> Any:
+        if key not in self.pending:
+            raise KeyError(key)
+        value = self.store.load(key)
+        self.pending.discard(key)
+        self.loaded[key] = value
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return dict.__contains__(self, key) or key in self.pending
+
+    def __delitem__(self, key: str) -> None:
+        if key in self.pending:
+            self.pending.discard(key)
+            dict.pop(self, key, None)
+        else:
+            dict.__delitem__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self.pending:
+            self[key]
+        return dict.pop(self, key, *default)
+
+    def unload(self, key: str) -> None:
+        """Drop the value of a stored variable, so that it is loaded again from the store on next access."""
+        dict.pop(self, key, None)
+        self.loaded.pop(key, None)
+        self.pending.add(key)
+
+
+class DiskStateStore(StateStore):
+    """
+    Store of the variables of an executor state in a local directory.
+
+    Each variable is pickled with protocol 5, its large binary buffers (like the data of numpy arrays or pandas
+    DataFrames) written out-of-band to separate files. Loading a variable maps these files in memory instead of reading
+    them, so that the arrays are only paged in when used. The maps are copy-on-write: modifying a loaded array never
+    modifies the store.
+
+    A variable is only written again if its pickle changed since it was last saved, and files are replaced atomically
+    so that a crash during a save leaves the previous version of the variable readable.
+
+    Args:
+        path (`str` or `Path`): Directory of the store, created if needed. A store created on the directory of a
+            previous one resumes from its variables.
+        min_out_of_band_bytes (`int`, defaults to `65536`): Minimum size of a binary buffer to write it to a separate
+            file, smaller buffers being kept in the pickle of their variable.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, path: str | Path, min_out_of_band_bytes: int = 64 * 1024):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.min_out_of_band_bytes = min_out_of_band_bytes
+        index_path = self.path / self.INDEX_FILE
+        # Digest and files of each stored variable
+        self.index: dict[str, dict[str, Any]] = json.loads(index_path.read_text()) if index_path.exists() else {}
+        # Immutable values saved by this store, to skip pickling them again when they were not reassigned
+        self._saved_values: dict[str, Any] = {}
+
+    def names(self) -> set[str]:
+        return set(self.index)
+
+    def load(self, name: str) -> Any:
+        entry = self.index[name]
+        data = (self.path / entry["file"]).read_bytes()
+        buffers = [self._map(self.path / buffer_file) for buffer_file in entry["buffers"]]
+        return pickle.loads(data, buffers=buffers)
+
+    @staticmethod
+    def _map(path: Path) -> mmap.mmap | bytes:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:  # Empty files cannot be mapped
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    def save(self, state: dict[str, Any]) -> list[str]:
+        pending = state.pending if isinstance(state, LazyState) else set()
+        written, obsolete_entries = [], []
+        for name, value in list(state.items()):
+            if name in NON_PERSISTED_NAMES:
+                continue
+            if isinstance(value, IMMUTABLE_TYPES) and name in self.index and self._saved_values.get(name) is value:
+                continue
+            previous = self.index.get(name)
+            try:
+                written_now = self._write(name, value)
+            except Exception as e:
+                logger.debug(f"Variable {name!r} of the state is not persisted: {type(e).__name__}: {e}")
+                self.index.pop(name, None)
+                self._saved_values.pop(name, None)
+                written_now = False
+            if previous is not None and self.index.get(name) is not previous:
+                obsolete_entries.append(previous)
+            if written_now:
+                written.append(name)
+        for name in list(self.index):
+            if name not in state and name not in pending:
+                obsolete_entries.append(self.index.pop(name))
+                self._saved_values.pop(name, None)
+        if written or obsolete_entries:
+            self._write_index()
+        # The files of the previous versions are only deleted once the new index no longer refers to them
+        for entry in obsolete_entries:
+            for file_name in [entry["file"], *entry["buffers"]]:
+                try:
+                    (self.path / file_name).unlink()
+                except FileNotFoundError:
+                    pass
+        return written
+
+    def _write(self, name: str, value: Any) -> bool:
+        """Write a variable if its pickle changed since it was last saved, and return whether it was written."""
+        buffers = []
+
+        def keep_in_band(buffer: pickle.PickleBuffer) -> bool:
+            if buffer.raw().nbytes < self.min_out_of_band_bytes:
+                return True
+            buffers.append(buffer)
+            return False
+
+        try:
+            data = pickle.dumps(value, protocol=5, buffer_callback=keep_in_band)
+            raw_buffers = [buffer.raw() for buffer in buffers]
+        except BufferError:  # Non-contiguous buffers cannot be written out-of-band
+            data, raw_buffers = pickle.dumps(value, protocol=5), []
+        digest = hashlib.blake2b(data, digest_size=16)
+        for raw_buffer in raw_buffers:
+            digest.update(raw_buffer)
+        digest = digest.hexdigest()
+        if isinstance(value, IMMUTABLE_TYPES):
+            self._saved_values[name] = value
+        else:
+            self._saved_values.pop(name, None)
+        previous = self.index.get(name)
+        if previous is not None and previous["digest"] == digest:
+            return False
+        # Files are named after the digest, so that the files of the previous version stay valid until replaced
+        prefix = f"{quote(name, safe='')}.{digest}"
+        buffer_files = []
+        for i, raw_buffer in enumerate(raw_buffers):
+            buffer_files.append(f"{prefix}.{i}.buf")
+            self._write_file(buffer_files[-1], raw_buffer)
+        self._write_file(f"{prefix}.pkl", data)
+        self.index[name] = {"digest": digest, "file": f"{prefix}.pkl", "buffers": buffer_files}
+        return True
+
+    def _write_file(self, file_name: str, content: bytes | memoryview) -> None:
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as f:
+                f.write(content)
+            os.replace(temporary_path, self.path / file_name)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def _write_index(self) -> None:
+        self._write_file(self.INDEX_FILE, json.dumps(self.index).encode())
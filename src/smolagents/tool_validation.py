@@ -179,6 +179,8 @@ def validate_tool_attributes(cls, check_imports: bool = True) -> None:
             self.generic_visit(node)
             self.in_method = old_context
 
+        visit_AsyncFunctionDef = visit_FunctionDef
+
         def visit_Assign(self, node):
             if self.in_method:
                 return
@@ -248,7 +250,7 @@ def validate_tool_attributes(cls, check_imports: bool = True) -> None:
 
     # Run checks on all methods
     for node in class_node.body:
-        if isinstance(node, ast.FunctionDef):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
             method_checker = MethodChecker(class_level_checker.class_attributes, check_imports=check_imports)
             method_checker.visit(node)
             errors += [f"- {node.name}: {error}" for error in method_checker.errors]
@@ -103,6 +103,10 @@ class Tool:
     - **output_type** (`type`) -- The type of the tool output. This is used by `launch_gradio_demo`
       or to make a nice space from your tool, and also can be used in the generated description for your tool.
 
+    You can also set the class attribute **side_effect_free** (`bool`, defaults to `False`) to `True` if calling your
+    tool only retrieves data, like a web search: the local Python executor may then run independent calls to it
+    concurrently, and in any order.
+
     You can also override the method [`~Tool.setup`] if your tool has an expensive operation to perform before being
     usable (such as loading a model). [`~Tool.setup`] will be called the first time you use your tool, but not at
     instantiation.
@@ -112,6 +116,7 @@ class Tool:
     description: str
     inputs: dict[str, dict[str, str | type | bool]]
     output_type: str
+    side_effect_free: bool = False
 
     def __init__(self, *args, **kwargs):
         self.is_initialized = False
@@ -204,9 +209,19 @@ class Tool:
             args, kwargs = handle_agent_input_types(*args, **kwargs)
         outputs = self.forward(*args, **kwargs)
         if sanitize_inputs_outputs:
+            if inspect.isawaitable(outputs):
+                return self._handle_awaited_output_types(outputs)
             outputs = handle_agent_output_types(outputs, self.output_type)
         return outputs
 
+    async def _handle_awaited_output_types(self, outputs):
+        return handle_agent_output_types(await outputs, self.output_type)
+
+    @property
+    def is_async(self) -> bool:
+        """Whether the tool has an `async def forward`: calling it then returns a coroutine, to be awaited."""
+        return inspect.iscoroutinefunction(self.forward)
+
     def setup(self):
         """
         Overwrite this method here for any operation that is expensive and needs to be executed before you start using
@@ -932,9 +947,17 @@ def tool(tool_function: Callable) -> Tool:
     SimpleTool.inputs = tool_json_schema["parameters"]["properties"]
     SimpleTool.output_type = tool_json_schema["return"]["type"]
 
-    @wraps(tool_function)
-    def wrapped_function(*args, **kwargs):
-        return tool_function(*args, **kwargs)
+    if inspect.iscoroutinefunction(tool_function):
+
+        @wraps(tool_function)
+        async def wrapped_function(*args, **kwargs):
+            return await tool_function(*args, **kwargs)
+
+    else:
+
+        @wraps(tool_function)
+        def wrapped_function(*args, **kwargs):
+            return tool_function(*args, **kwargs)
 
     # Bind the copied function to the forward method
     SimpleTool.forward = staticmethod(wrapped_function)
@@ -957,6 +980,8 @@ def tool(tool_function: Callable) -> Tool:
     tool_source_body = textwrap.dedent(tool_source_body)
     # - Create the forward method source, including def line and indentation
     forward_method_source = f"def forward{str(new_sig)}:\n{textwrap.indent(tool_source_body, '    ')}"
+    if inspect.iscoroutinefunction(tool_function):
+        forward_method_source = f"async {forward_method_source}"
     # - Create the class source
     class_source = (
         textwrap.dedent(f"""
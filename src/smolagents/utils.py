@@ -15,6 +15,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import ast
+import asyncio
 import base64
 import importlib.metadata
 import importlib.util
@@ -24,6 +25,8 @@ import keyword
 import os
 import re
 import types
+from collections.abc import AsyncGenerator, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
@@ -454,3 +457,31 @@ def make_init_file(folder: str | Path):
 
 def is_valid_name(name: str) -> bool:
     return name.isidentifier() and not keyword.iskeyword(name) if isinstance(name, str) else False
+
+
+def run_awaitable(awaitable: Any) -> Any:
+    """
+    Run an awaitable to completion from synchronous code and return its result, like the coroutine returned by a tool
+    with an `async def forward`. It runs in a new event loop, in a separate thread if the current one already runs a
+    loop.
+    """
+
+    async def wait() -> Any:
+        return await awaitable
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(wait())
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, wait()).result()
+
+
+async def iterate_in_thread(iterator: Iterator[Any]) -> AsyncGenerator[Any]:
+    """
+    Iterate over a synchronous iterator from asynchronous code, computing each item in a worker thread so that the
+    event loop keeps running other tasks meanwhile.
+    """
+    end = object()
+    while (item := await asyncio.to_thread(next, iterator, end)) is not end:
+        yield item
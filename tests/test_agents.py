@@ -12,9 +12,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import io
 import os
 import tempfile
+import threading
+import time
 import uuid
 from collections.abc import Generator
 from contextlib import nullcontext as does_not_raise
@@ -41,9 +44,11 @@ from smolagents.agents import (
     populate_template,
 )
 from smolagents.default_tools import DuckDuckGoSearchTool, FinalAnswerTool, PythonInterpreterTool, VisitWebpageTool
-from smolagents.memory import ActionStep, PlanningStep
+from smolagents.local_python_executor import ExecutionLogsStreamDelta
+from smolagents.memory import ActionStep, MemoryCompaction, PlanningStep
 from smolagents.models import (
     ChatMessage,
+    ChatMessageStreamDelta,
     ChatMessageToolCall,
     ChatMessageToolCallDefinition,
     InferenceClientModel,
@@ -649,6 +654,52 @@ class TestMultiStepAgent:
         assert "final_answer" in agent.tools
         assert isinstance(agent.tools["final_answer"], expected_final_answer_tool)
 
+    def test_memory_compaction_runs_before_each_step(self):
+        compaction = MemoryCompaction(max_tokens=1, keep_last_steps=0, max_observation_length=10, drop_images=False)
+        agent = CodeAgent(tools=[], model=FakeCodeModel(), memory_compaction=compaction)
+        assert agent.run("What is 2 multiplied by 3.6452?") == 7.2904
+        assert agent.memory.compaction is compaction
+        # The observations of the first step were truncated before the second step
+        first_step_observations = agent.memory.steps[1].observations
+        assert "truncated to stay below 10 characters" in first_step_observations
+        last_input_message = agent.memory.steps[2].model_input_messages[-1]
+        assert last_input_message["content"][0]["text"] == f"Observation:\n{first_step_observations}"
+
+    @pytest.mark.parametrize("stable_prompt_prefix", [True, False])
+    def test_stable_prompt_prefix(self, stable_prompt_prefix):
+        @tool
+        def weather(city: str) -> str:
+            """Gets the weather.
+
+            Args:
+                city: Name of the city.
+            """
+            return "Sunny"
+
+        @tool
+        def add(a: int, b: int) -> int:
+            """Adds two numbers.
+
+            Args:
+                a: First number.
+                b: Second number.
+            """
+            return a + b
+
+        agent = CodeAgent(tools=[weather, add], model=FakeCodeModel(), stable_prompt_prefix=stable_prompt_prefix)
+        expected_tools = (
+            ["add", "final_answer", "weather"] if stable_prompt_prefix else ["weather", "add", "final_answer"]
+        )
+        assert list(agent.tools) == expected_tools
+        assert sorted(expected_tools, key=lambda name: agent.system_prompt.index(f"def {name}(")) == expected_tools
+
+        agent.run("What is 2 multiplied by 3.6452?")
+        system_prompt_step = agent.memory.system_prompt
+        agent.run("What is 2 multiplied by 3.6452?", reset=False)
+        # The rendered system prompt is reused when its text is unchanged
+        assert (agent.memory.system_prompt is system_prompt_step) is stable_prompt_prefix
+        assert agent.to_dict()["stable_prompt_prefix"] is stable_prompt_prefix
+
     def test_logs_display_thoughts_even_if_error(self):
         class FakeJsonModelNoCall(Model):
             def generate(self, messages, stop_sequences=None, tools_to_call_from=None):
@@ -1090,6 +1141,216 @@ class TestToolCallingAgent:
         answer = agent.run("Fake task.")
         assert answer == "2CUSTOM"
 
+    @staticmethod
+    def make_tool_calls_model(*steps):
+        """Return a model whose successive outputs call the given tools, each step being a list of (name, arguments)."""
+
+        class FakeToolCallsModel(Model):
+            def generate(self, messages, tools_to_call_from=None, stop_sequences=None, grammar=None):
+                calls = steps[sum(message["role"] == MessageRole.TOOL_CALL for message in messages)]
+                return ChatMessage(
+                    role="assistant",
+                    content="",
+                    tool_calls=[
+                        ChatMessageToolCall(
+                            id=f"call_{i}",
+                            type="function",
+                            function=ChatMessageToolCallDefinition(name=name, arguments=arguments),
+                        )
+                        for i, (name, arguments) in enumerate(calls)
+                    ],
+                )
+
+        return FakeToolCallsModel()
+
+    @pytest.mark.parametrize("max_tool_threads", [None, 1])
+    def test_all_tool_calls_are_executed(self, max_tool_threads):
+        barrier = threading.Barrier(3, timeout=5)
+
+        @tool
+        def search(query: str) -> str:
+            """
+            Searches the web.
+            Args:
+                query: the query
+            """
+            if max_tool_threads is None:
+                barrier.wait()  # Only returns once the three calls are running concurrently
+            return f"results for {query}"
+
+        search.side_effect_free = True
+
+        model = self.make_tool_calls_model(
+            [("search", {"query": query}) for query in ["a", "b", "c"]],
+            [("final_answer", {"answer": "done"})],
+        )
+        agent = ToolCallingAgent(tools=[search], model=model, max_tool_threads=max_tool_threads)
+        assert agent.run("Search a, b and c.") == "done"
+        step = agent.memory.steps[1]
+        assert [tool_call.id for tool_call in step.tool_calls] == ["call_0", "call_1", "call_2"]
+        assert step.observations == (
+            "Call id: call_0\nresults for a\n\nCall id: call_1\nresults for b\n\nCall id: call_2\nresults for c"
+        )
+        assert len(agent.memory.steps) == 3
+
+    @pytest.mark.parametrize("use_arun", [False, True])
+    def test_only_side_effect_free_tool_calls_run_concurrently(self, use_arun):
+        barrier = threading.Barrier(2, timeout=5)
+        running, max_running = [], []
+
+        @tool
+        def search(query: str) -> str:
+            """
+            Searches the web.
+            Args:
+                query: the query
+            """
+            barrier.wait()  # Only returns once both searches are running concurrently
+            return f"results for {query}"
+
+        search.side_effect_free = True
+
+        @tool
+        def work(task: str) -> str:
+            """
+            Works on a task.
+            Args:
+                task: the task
+            """
+            running.append(task)
+            max_running.append(len(running))
+            time.sleep(0.05)
+            running.remove(task)
+            return f"worked on {task}"
+
+        managed_agent = ToolCallingAgent(
+            tools=[work],
+            model=self.make_tool_calls_model([("work", {"task": "x"})], [("final_answer", {"answer": "worked"})]),
+            name="worker",
+            description="Works on tasks.",
+        )
+        model = self.make_tool_calls_model(
+            [
+                ("worker", {"task": "a"}),
+                ("search", {"query": "a"}),
+                ("worker", {"task": "b"}),
+                ("search", {"query": "b"}),
+            ],
+            [("final_answer", {"answer": "done"})],
+        )
+        agent = ToolCallingAgent(tools=[search], model=model, managed_agents=[managed_agent])
+        answer = asyncio.run(agent.arun("Work on a and b.")) if use_arun else agent.run("Work on a and b.")
+        assert answer == "done"
+        # The two calls to the managed agent ran one after the other, while the searches ran concurrently
+        assert max_running == [1, 1]
+        assert "Call id: call_1\nresults for a" in agent.memory.steps[1].observations
+        assert agent.memory.steps[1].observations.count("worked") == 2
+
+    def test_final_answer_alongside_other_calls(self):
+        calls = []
+
+        @tool
+        def save(value: str) -> str:
+            """
+            Saves a value.
+            Args:
+                value: the value
+            """
+            calls.append(value)
+            return "saved"
+
+        model = self.make_tool_calls_model([("final_answer", {"answer": "done"}), ("save", {"value": "x"})])
+        agent = ToolCallingAgent(tools=[save], model=model)
+        assert agent.run("Save x.") == "done"
+        assert calls == ["x"]
+        assert agent.memory.steps[1].observations == "Call id: call_1\nsaved"
+        assert agent.memory.steps[1].action_output == "done"
+
+        model = self.make_tool_calls_model(
+            [("final_answer", {"answer": "a"}), ("final_answer", {"answer": "b"})], [("final_answer", {"answer": "c"})]
+        )
+        agent = ToolCallingAgent(tools=[], model=model)
+        assert agent.run("Answer.") == "c"
+        assert "called 2 times in the same step" in str(agent.memory.steps[1].error)
+
+    def test_failed_tool_call_keeps_other_observations(self):
+        @tool
+        def divide(a: int, b: int) -> float:
+            """
+            Divides two numbers.
+            Args:
+                a: the dividend
+                b: the divisor
+            """
+            return a / b
+
+        model = self.make_tool_calls_model(
+            [("divide", {"a": 1, "b": 0}), ("divide", {"a": 1, "b": 2})], [("final_answer", {"answer": "0.5"})]
+        )
+        agent = ToolCallingAgent(tools=[divide], model=model)
+        agent.run("Divide 1 by 0 and by 2.")
+        step = agent.memory.steps[1]
+        assert step.observations == "Call id: call_1\n0.5"
+        assert "ZeroDivisionError" in str(step.error)
+        assert step.to_messages()[-1]["content"][0]["text"].startswith("Error:\nCall id: call_0\n")
+
+    def test_arun_drives_concurrent_runs_on_one_event_loop(self):
+        threads = {}
+
+        @tool
+        async def fetch(url: str) -> str:
+            """
+            Fetches a page.
+            Args:
+                url: the url
+            """
+            threads["fetch"] = threading.get_ident()
+            await asyncio.sleep(0.2)
+            return f"content of {url}"
+
+        @tool
+        def count(text: str) -> int:
+            """
+            Counts the characters of a text.
+            Args:
+                text: the text
+            """
+            threads["count"] = threading.get_ident()
+            return len(text)
+
+        class FakeAsyncModel(Model):
+            async def agenerate(self, messages, tools_to_call_from=None, stop_sequences=None, grammar=None):
+                await asyncio.sleep(0.2)
+                if sum(message["role"] == MessageRole.TOOL_CALL for message in messages) == 0:
+                    calls = [("fetch", {"url": "a"}), ("count", {"text": "abc"})]
+                else:
+                    calls = [("final_answer", {"answer": "done"})]
+                return ChatMessage(
+                    role="assistant",
+                    content="",
+                    tool_calls=[
+                        ChatMessageToolCall(
+                            id=f"call_{i}",
+                            type="function",
+                            function=ChatMessageToolCallDefinition(name=name, arguments=arguments),
+                        )
+                        for i, (name, arguments) in enumerate(calls)
+                    ],
+                )
+
+        async def run_agents():
+            threads["loop"] = threading.get_ident()
+            agents = [ToolCallingAgent(tools=[fetch, count], model=FakeAsyncModel()) for _ in range(50)]
+            return agents, await asyncio.gather(*(agent.arun("Fetch a.") for agent in agents))
+
+        start_time = time.time()
+        agents, answers = asyncio.run(run_agents())
+        # Each run waits 0.6s: they only fit in this time if they are all in flight at once
+        assert time.time() - start_time < 3
+        assert answers == ["done"] * 50
+        assert agents[0].memory.steps[1].observations == "Call id: call_0\ncontent of a\n\nCall id: call_1\n3"
+        assert threads["fetch"] == threads["loop"] != threads["count"]
+
 
 class TestCodeAgent:
     @pytest.mark.parametrize("provide_run_summary", [False, True])
@@ -1208,6 +1469,68 @@ class TestCodeAgent:
         agent.run("Test run")
         assert "open" in agent.python_executor.static_tools
 
+    def test_stream_execution_logs(self):
+        class FakeStreamingCodeModel(Model):
+            def generate_stream(self, messages, stop_sequences=None):
+                yield ChatMessageStreamDelta(
+                    content="Thought: I print then answer.\nCode:\n```py\nprint('working')\nfinal_answer(2)\n```<end_code>"
+                )
+
+        agent = CodeAgent(tools=[], model=FakeStreamingCodeModel(), stream_outputs=True)
+        events = list(agent.run("Fake task.", stream=True))
+        logs_deltas = [event for event in events if isinstance(event, ExecutionLogsStreamDelta)]
+        assert [delta.content for delta in logs_deltas] == ["working\n"]
+        assert events[-1].final_answer == 2
+
+    @pytest.mark.parametrize("stream_outputs", [False, True])
+    def test_astream_yields_the_steps_of_run(self, stream_outputs):
+        class FakeStreamingCodeModel(FakeCodeModel):
+            def generate_stream(self, messages, stop_sequences=None):
+                yield ChatMessageStreamDelta(content=self.generate(messages).content)
+
+        async def astream(agent):
+            return [event async for event in agent.astream("Fake task.")]
+
+        agent = CodeAgent(tools=[], model=FakeStreamingCodeModel(), stream_outputs=stream_outputs, planning_interval=2)
+        events = list(agent.run("Fake task.", stream=True))
+        memory_messages = agent.write_memory_to_messages()
+        async_events = asyncio.run(astream(agent))
+        assert [type(event) for event in async_events] == [type(event) for event in events]
+        assert async_events[-1].final_answer == events[-1].final_answer == 7.2904
+        assert agent.write_memory_to_messages() == memory_messages
+        assert asyncio.run(agent.arun("Fake task.")) == 7.2904
+
+    def test_astream_matches_run_on_errors_and_max_steps(self):
+        class FakeMalformedModel(Model):
+            def generate(self, messages, stop_sequences=None):
+                return ChatMessage(role="assistant", content="Malformed answer")
+
+        async def astream(agent):
+            return [event async for event in agent.astream("Fake task.", max_steps=2)]
+
+        agent = CodeAgent(tools=[], model=FakeMalformedModel(), planning_interval=1)
+        events = list(agent.run("Fake task.", stream=True, max_steps=2))
+
+        def summarize(steps):
+            return [
+                (type(step), getattr(step, "step_number", None), type(getattr(step, "error", None))) for step in steps
+            ]
+
+        steps = summarize(agent.memory.steps[1:])
+        async_events = asyncio.run(astream(agent))
+        assert [type(event) for event in async_events] == [type(event) for event in events]
+        assert summarize(agent.memory.steps[1:]) == steps
+        assert steps[-1] == (ActionStep, 3, AgentMaxStepsError)
+
+    def test_execution_profile(self):
+        agent = CodeAgent(tools=[], model=FakeCodeModel(), executor_kwargs={"profile": True})
+        agent.run("Fake task.")
+        action_steps = [step for step in agent.memory.steps if isinstance(step, ActionStep)]
+        assert all(step.execution_profile is not None for step in action_steps)
+        assert action_steps[0].execution_profile.node_types["BinOp"].count == 1
+        assert action_steps[-1].execution_profile.tools["final_answer"].count == 1
+        assert action_steps[0].dict()["execution_profile"]["lines"]
+
     @pytest.mark.parametrize("agent_dict_version", ["v1.9", "v1.10"])
     def test_from_folder(self, agent_dict_version, get_agent_dict):
         agent_dict = get_agent_dict(agent_dict_version)
@@ -1536,6 +1859,21 @@ def test_tool_calling_agents_raises_tool_call_error_being_invoked_with_wrong_arg
         agent.execute_tool_call(_sample_tool.name, arguments)
 
 
+def test_tool_calling_agents_awaits_async_tools():
+    @tool
+    async def _sample_tool(prompt: str) -> str:
+        """Tool that returns same string
+
+        Args:
+            prompt: The string to return
+        """
+        await asyncio.sleep(0)
+        return prompt
+
+    agent = ToolCallingAgent(model=FakeToolCallModel(), tools=[_sample_tool])
+    assert agent.execute_tool_call(_sample_tool.name, {"prompt": "sample"}) == "sample"
+
+
 def test_tool_calling_agents_raises_agent_execution_error_when_tool_raises():
     @tool
     def _sample_tool(_: str) -> float:
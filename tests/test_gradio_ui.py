@@ -23,6 +23,7 @@ import pytest
 
 from smolagents.agent_types import AgentAudio, AgentImage, AgentText
 from smolagents.gradio_ui import GradioUI, pull_messages_from_step, stream_to_gradio
+from smolagents.local_python_executor import ExecutionLogsStreamDelta
 from smolagents.memory import ActionStep, FinalAnswerStep, PlanningStep, ToolCall
 from smolagents.models import ChatMessageStreamDelta
 
@@ -180,6 +181,19 @@ class TestStreamToGradio:
         # Verify that the content was accumulated and yielded
         assert result == ["Hello", "Hello world"]
 
+    def test_stream_to_gradio_execution_logs(self):
+        """Test streaming ExecutionLogsStreamDeltas after the model output"""
+        mock_agent = Mock()
+        mock_agent.run = Mock(
+            return_value=[
+                ChatMessageStreamDelta(content="Code"),
+                ExecutionLogsStreamDelta(content="1\n"),
+                ExecutionLogsStreamDelta(content="2\n"),
+            ]
+        )
+        result = list(stream_to_gradio(mock_agent, "test task"))
+        assert result[-1] == "Code\n\n📝 Execution logs:\n```bash\n1\n2\n\n```"
+
     @pytest.mark.parametrize(
         "task,task_images,reset_memory,additional_args",
         [
@@ -14,6 +14,10 @@
 # limitations under the License.
 
 import ast
+import asyncio
+import gc
+import threading
+import time
 import types
 import unittest
 from contextlib import nullcontext as does_not_raise
@@ -24,22 +28,42 @@ import numpy as np
 import pandas as pd
 import pytest
 
+import smolagents.local_python_executor as local_python_executor
 from smolagents.default_tools import BASE_PYTHON_TOOLS, FinalAnswerTool
 from smolagents.local_python_executor import (
     DANGEROUS_FUNCTIONS,
     DANGEROUS_MODULES,
+    ExecutionLogsStreamDelta,
+    ExecutionProfiler,
+    GeneratorExpression,
+    ImportAuthorizer,
     InterpreterError,
     LocalPythonExecutor,
+    NameIndex,
+    OperationsCounter,
+    ParsedCodeCache,
     PrintContainer,
+    SafeModule,
+    Scope,
     check_import_authorized,
+    compile_fast_path,
     evaluate_boolop,
     evaluate_condition,
     evaluate_delete,
     evaluate_python_code,
     evaluate_subscript,
+    find_code_problems,
+    find_parallel_tool_calls,
+    find_vectorized_loop,
     fix_final_answer_code,
+    get_function_source,
+    get_import_authorizer,
+    get_memory_usage_mb,
     get_safe_module,
+    subscript_error,
 )
+from smolagents.tools import Tool
+from smolagents.utils import truncate_content
 
 
 # Fake function we will use as tool
@@ -59,14 +83,14 @@ class PythonInterpreterTester(unittest.TestCase):
         state = {}
         result, _ = evaluate_python_code(code, {}, state=state)
         assert result == 3
-        self.assertDictEqualNoPrint(state, {"x": 3, "_operations_count": {"counter": 2}})
+        self.assertDictEqualNoPrint(state, {"x": 3})
 
         code = "x = y"
         state = {"y": 5}
         result, _ = evaluate_python_code(code, {}, state=state)
         # evaluate returns the value of the last assignment.
         assert result == 5
-        self.assertDictEqualNoPrint(state, {"x": 5, "y": 5, "_operations_count": {"counter": 2}})
+        self.assertDictEqualNoPrint(state, {"x": 5, "y": 5})
 
         code = "a=1;b=None"
         result, _ = evaluate_python_code(code, {}, state={})
@@ -92,7 +116,7 @@ class PythonInterpreterTester(unittest.TestCase):
         state = {"x": 3}
         result, _ = evaluate_python_code(code, {"add_two": add_two}, state=state)
         assert result == 5
-        self.assertDictEqualNoPrint(state, {"x": 3, "y": 5, "_operations_count": {"counter": 3}})
+        self.assertDictEqualNoPrint(state, {"x": 3, "y": 5})
 
         # Should not work without the tool
         with pytest.raises(InterpreterError, match="Forbidden function evaluation: 'add_two'"):
@@ -122,16 +146,14 @@ class PythonInterpreterTester(unittest.TestCase):
         state = {}
         result, _ = evaluate_python_code(code, {}, state=state)
         assert result == 3
-        self.assertDictEqualNoPrint(state, {"x": 3, "_operations_count": {"counter": 2}})
+        self.assertDictEqualNoPrint(state, {"x": 3})
 
     def test_evaluate_dict(self):
         code = "test_dict = {'x': x, 'y': add_two(x)}"
         state = {"x": 3}
         result, _ = evaluate_python_code(code, {"add_two": add_two}, state=state)
         self.assertDictEqual(result, {"x": 3, "y": 5})
-        self.assertDictEqualNoPrint(
-            state, {"x": 3, "test_dict": {"x": 3, "y": 5}, "_operations_count": {"counter": 7}}
-        )
+        self.assertDictEqualNoPrint(state, {"x": 3, "test_dict": {"x": 3, "y": 5}})
 
     def test_evaluate_expression(self):
         code = "x = 3\ny = 5"
@@ -139,7 +161,7 @@ class PythonInterpreterTester(unittest.TestCase):
         result, _ = evaluate_python_code(code, {}, state=state)
         # evaluate returns the value of the last assignment.
         assert result == 5
-        self.assertDictEqualNoPrint(state, {"x": 3, "y": 5, "_operations_count": {"counter": 4}})
+        self.assertDictEqualNoPrint(state, {"x": 3, "y": 5})
 
     def test_evaluate_f_string(self):
         code = "text = f'This is x: {x}.'"
@@ -147,16 +169,14 @@ class PythonInterpreterTester(unittest.TestCase):
         result, _ = evaluate_python_code(code, {}, state=state)
         # evaluate returns the value of the last assignment.
         assert result == "This is x: 3."
-        self.assertDictEqualNoPrint(state, {"x": 3, "text": "This is x: 3.", "_operations_count": {"counter": 6}})
+        self.assertDictEqualNoPrint(state, {"x": 3, "text": "This is x: 3."})
 
     def test_evaluate_f_string_with_format(self):
         code = "text = f'This is x: {x:.2f}.'"
         state = {"x": 3.336}
         result, _ = evaluate_python_code(code, {}, state=state)
         assert result == "This is x: 3.34."
-        self.assertDictEqualNoPrint(
-            state, {"x": 3.336, "text": "This is x: 3.34.", "_operations_count": {"counter": 8}}
-        )
+        self.assertDictEqualNoPrint(state, {"x": 3.336, "text": "This is x: 3.34."})
 
     def test_evaluate_f_string_with_complex_format(self):
         code = "text = f'This is x: {x:>{width}.{precision}f}.'"
@@ -170,7 +190,6 @@ class PythonInterpreterTester(unittest.TestCase):
                 "width": 10,
                 "precision": 2,
                 "text": "This is x:       3.34.",
-                "_operations_count": {"counter": 14},
             },
         )
 
@@ -180,42 +199,40 @@ class PythonInterpreterTester(unittest.TestCase):
         result, _ = evaluate_python_code(code, {}, state=state)
         # evaluate returns the value of the last assignment.
         assert result == 2
-        self.assertDictEqualNoPrint(state, {"x": 3, "y": 2, "_operations_count": {"counter": 6}})
+        self.assertDictEqualNoPrint(state, {"x": 3, "y": 2})
 
         state = {"x": 8}
         result, _ = evaluate_python_code(code, {}, state=state)
         # evaluate returns the value of the last assignment.
         assert result == 5
-        self.assertDictEqualNoPrint(state, {"x": 8, "y": 5, "_operations_count": {"counter": 6}})
+        self.assertDictEqualNoPrint(state, {"x": 8, "y": 5})
 
     def test_evaluate_list(self):
         code = "test_list = [x, add_two(x)]"
         state = {"x": 3}
         result, _ = evaluate_python_code(code, {"add_two": add_two}, state=state)
         self.assertListEqual(result, [3, 5])
-        self.assertDictEqualNoPrint(state, {"x": 3, "test_list": [3, 5], "_operations_count": {"counter": 5}})
+        self.assertDictEqualNoPrint(state, {"x": 3, "test_list": [3, 5]})
 
     def test_evaluate_name(self):
         code = "y = x"
         state = {"x": 3}
         result, _ = evaluate_python_code(code, {}, state=state)
         assert result == 3
-        self.assertDictEqualNoPrint(state, {"x": 3, "y": 3, "_operations_count": {"counter": 2}})
+        self.assertDictEqualNoPrint(state, {"x": 3, "y": 3})
 
     def test_evaluate_subscript(self):
         code = "test_list = [x, add_two(x)]\ntest_list[1]"
         state = {"x": 3}
         result, _ = evaluate_python_code(code, {"add_two": add_two}, state=state)
         assert result == 5
-        self.assertDictEqualNoPrint(state, {"x": 3, "test_list": [3, 5], "_operations_count": {"counter": 9}})
+        self.assertDictEqualNoPrint(state, {"x": 3, "test_list": [3, 5]})
 
         code = "test_dict = {'x': x, 'y': add_two(x)}\ntest_dict['y']"
         state = {"x": 3}
         result, _ = evaluate_python_code(code, {"add_two": add_two}, state=state)
         assert result == 5
-        self.assertDictEqualNoPrint(
-            state, {"x": 3, "test_dict": {"x": 3, "y": 5}, "_operations_count": {"counter": 11}}
-        )
+        self.assertDictEqualNoPrint(state, {"x": 3, "test_dict": {"x": 3, "y": 5}})
 
         code = "vendor = {'revenue': 31000, 'rent': 50312}; vendor['ratio'] = round(vendor['revenue'] / vendor['rent'], 2)"
         state = {}
@@ -239,14 +256,14 @@ for result in search_results:
         state = {}
         result, _ = evaluate_python_code(code, {"range": range}, state=state)
         assert result == 2
-        self.assertDictEqualNoPrint(state, {"x": 2, "i": 2, "_operations_count": {"counter": 11}})
+        self.assertDictEqualNoPrint(state, {"x": 2, "i": 2})
 
     def test_evaluate_binop(self):
         code = "y + x"
         state = {"x": 3, "y": 6}
         result, _ = evaluate_python_code(code, {}, state=state)
         assert result == 9
-        self.assertDictEqualNoPrint(state, {"x": 3, "y": 6, "_operations_count": {"counter": 4}})
+        self.assertDictEqualNoPrint(state, {"x": 3, "y": 6})
 
     def test_recursive_function(self):
         code = """
@@ -288,8 +305,11 @@ recur_fibo(6)"""
             """
         )
         state = {}
-        evaluate_python_code(code, {"range": range}, state=state)
-        assert state["_operations_count"]["counter"] == 5
+        operations_counter = OperationsCounter()
+        evaluate_python_code(code, {"range": range}, state=state, operations_counter=operations_counter)
+        assert operations_counter.count == 5
+        # The counter is kept out of the state of the code
+        assert "_operations_count" not in state
 
     def test_evaluate_string_methods(self):
         code = "'hello'.replace('h', 'o').split('e')"
@@ -749,8 +769,9 @@ food_items = {"apple": 2, "banana": 3, "orange": 1, "pear": 1}
 unique_food_items = [item for item, count in food_item_counts.items() if count == 1]
 """
         state = {}
-        result, is_final_answer = evaluate_python_code(code, {}, state=state)
-        assert result == ["orange", "pear"]
+        # The misspelled name is not resolved to its close match, only suggested
+        with pytest.raises(InterpreterError, match="`food_item_counts` is not defined. Did you mean `food_items`?"):
+            evaluate_python_code(code, {}, state=state)
 
     def test_nonsimple_augassign(self):
         code = """
@@ -1052,6 +1073,28 @@ shift_intervals
             evaluate_python_code(code)
         assert "Maybe you meant one of these indexes instead" in str(e) and "['Bhutan']" in str(e).replace("\\", "")
 
+    def test_subscript_error_message_is_built_when_rendered(self):
+        error = subscript_error({"Bhutan": "Thimphu"}, "Butan", KeyError("Butan"))
+        assert error.args[0]._message is None
+        assert str(error) == (
+            "Could not index {'Bhutan': 'Thimphu'} with 'Butan': KeyError: 'Butan'. "
+            "Maybe you meant one of these indexes instead: ['Bhutan']"
+        )
+
+    def test_close_matches_names(self):
+        code = "food_items = {'apple': 2}\nfood_item_count"
+        with pytest.raises(
+            InterpreterError, match="The variable `food_item_count` is not defined. Did you mean `food_items`?"
+        ):
+            evaluate_python_code(code, state={})
+        with pytest.raises(InterpreterError, match="The variable `unknown` is not defined.$"):
+            evaluate_python_code("unknown", state={})
+        # Strict mode raises right away, without looking for close matches
+        name_index = NameIndex(strict=True)
+        with pytest.raises(InterpreterError, match="The variable `food_item_count` is not defined.$"):
+            evaluate_python_code(code, state={}, name_index=name_index)
+        assert name_index._names is None
+
     def test_dangerous_builtins_calls_are_blocked(self):
         unsafe_code = "import os"
         dangerous_code = f"""
@@ -1342,7 +1385,6 @@ def test_evaluate_delete(code, state, expectation):
         assert str(expectation) in str(exception_info.value)
     else:
         evaluate_delete(delete_node, state, {}, {}, [])
-        _ = state.pop("_operations_count", None)
         assert state == expectation
 
 
@@ -1492,12 +1534,12 @@ def test_evaluate_condition_with_pandas_exceptions(condition, state, expected_ex
         ("tup[:]", {"tup": (1, 2, 3)}, (1, 2, 3)),
         ("tup[::2]", {"tup": (1, 2, 3, 4)}, (1, 3)),
         ("tup[::-1]", {"tup": (1, 2, 3)}, (3, 2, 1)),
-        ("st[1]", {"str": "abc"}, "b"),
-        ("st[-1]", {"str": "abc"}, "c"),
-        ("st[1:3]", {"str": "abcd"}, "bc"),
-        ("st[:]", {"str": "abc"}, "abc"),
-        ("st[::2]", {"str": "abcd"}, "ac"),
-        ("st[::-1]", {"str": "abc"}, "cba"),
+        ("st[1]", {"st": "abc"}, "b"),
+        ("st[-1]", {"st": "abc"}, "c"),
+        ("st[1:3]", {"st": "abcd"}, "bc"),
+        ("st[:]", {"st": "abc"}, "abc"),
+        ("st[::2]", {"st": "abcd"}, "ac"),
+        ("st[::-1]", {"st": "abc"}, "cba"),
         ("arr[1]", {"arr": np.array([1, 2, 3])}, 2),
         ("arr[1:3]", {"arr": np.array([1, 2, 3, 4])}, np.array([2, 3])),
         ("arr[:]", {"arr": np.array([1, 2, 3])}, np.array([1, 2, 3])),
@@ -1608,6 +1650,47 @@ def test_get_safe_module_handle_lazy_imports():
     assert getattr(safe_module, "non_lazy_attribute") == "ok"
 
 
+class TestSafeModule:
+    def test_repeated_imports_reuse_proxy(self):
+        executor = LocalPythonExecutor(["numpy.*"])
+        executor.send_tools({})
+        executor("import numpy as np")
+        first = executor.state["np"]
+        executor("import numpy as np2\nfrom numpy import linalg")
+        assert isinstance(first, SafeModule)
+        assert executor.state["np2"] is first
+        assert executor.state["linalg"] is first.linalg
+        assert executor.state["linalg"] is get_safe_module(np.linalg, [], executor.safe_modules)
+
+    def test_attributes_are_read_through(self):
+        safe_module = get_safe_module(np, ["numpy"], {})
+        assert safe_module.pi == np.pi
+        assert safe_module.__name__ == "numpy"
+        assert safe_module.__spec__ is np.__spec__
+        assert "array" in dir(safe_module)
+
+    def test_assignment_does_not_modify_module(self):
+        executor = LocalPythonExecutor([])
+        executor.send_tools({})
+        executor("import math\nmath.pi = 3")
+        assert executor("math.pi")[0] == 3
+        import math
+
+        assert math.pi != 3
+
+    def test_unauthorized_submodule_access(self):
+        safe_module = get_safe_module(np, ["numpy"], {})
+        with pytest.raises(InterpreterError, match="Forbidden access to module: numpy.linalg"):
+            safe_module.linalg
+
+    def test_star_import_skips_unauthorized_submodules(self):
+        executor = LocalPythonExecutor(["numpy"])
+        executor.send_tools({})
+        executor("from numpy import *")
+        assert "array" in executor.state
+        assert "linalg" not in executor.state
+
+
 def test_non_standard_comparisons():
     code = dedent("""\
         class NonStdEqualsResult:
@@ -1663,6 +1746,33 @@ class TestPrintContainer:
         pc.append("Hello")
         assert len(pc) == 5
 
+    @pytest.mark.parametrize("max_length", [1, 10, 11, 100])
+    def test_max_length(self, max_length):
+        pc = PrintContainer(max_length=max_length)
+        printed = ""
+        for i in range(1000):
+            text = f"line {i}\n" if i != 500 else "x" * 1000
+            pc += text
+            printed += text
+            if i in (0, 5, 999):
+                assert pc.value == truncate_content(printed, max_length=max_length)
+        assert sum(len(chunk) for chunk in pc._chunks) <= 2 * max_length + 2
+
+    def test_value_setter(self):
+        pc = PrintContainer(max_length=20)
+        pc += "a" * 100
+        pc.value = "Hello"
+        pc += " world"
+        assert pc.value == "Hello world"
+
+    def test_callback(self):
+        chunks = []
+        pc = PrintContainer(max_length=4, callback=chunks.append)
+        pc += "Hello"
+        pc += ""
+        pc += " world"
+        assert chunks == ["Hello", " world"]
+
 
 @pytest.mark.parametrize(
     "module,authorized_imports,expected",
@@ -1681,6 +1791,31 @@ def test_check_import_authorized(module: str, authorized_imports: list[str], exp
     assert check_import_authorized(module, authorized_imports) == expected
 
 
+class TestImportAuthorizer:
+    def test_verdicts_are_memoized(self):
+        authorizer = ImportAuthorizer(["numpy", "os.*"])
+        with patch.object(authorizer, "_walk", wraps=authorizer._walk) as walk:
+            assert authorizer.is_authorized("numpy")
+            assert authorizer.is_authorized("numpy")
+            assert not authorizer.is_authorized("pandas")
+            assert authorizer.is_authorized("os.path")
+            assert walk.call_count == 3
+        assert authorizer.verdicts == {"numpy": True, "pandas": False, "os.path": True}
+
+    def test_authorizer_is_shared_per_authorized_imports(self):
+        assert get_import_authorizer(("numpy", "math")) is get_import_authorizer(("numpy", "math"))
+        assert get_import_authorizer(("numpy",)) is not get_import_authorizer(("numpy", "math"))
+
+    def test_executor_import_authorizer(self):
+        executor = LocalPythonExecutor(["numpy.*"])
+        executor.send_tools({})
+        assert executor.import_authorizer.tree["numpy"] == {"*": {}}
+        assert executor.is_import_authorized("numpy")
+        assert not executor.is_import_authorized("os")
+        executor("import numpy as np\nx = np.linalg")
+        assert executor.import_authorizer.verdicts["numpy.linalg"] is True
+
+
 class TestLocalPythonExecutor:
     def test_state_name(self):
         executor = LocalPythonExecutor(additional_authorized_imports=[])
@@ -1736,6 +1871,99 @@ class TestLocalPythonExecutor:
         with pytest.raises(InterpreterError, match=".*Cannot unpack tuple of wrong size"):
             executor(code)
 
+    def test_print_outputs_are_truncated_while_printing(self):
+        executor = LocalPythonExecutor([], max_print_outputs_length=100)
+        executor.send_tools({})
+        _, logs, _ = executor("for i in range(10000):\n    print(i)")
+        printed = "".join(f"{i}\n" for i in range(10000))
+        assert logs == truncate_content(printed, max_length=100)
+
+    def test_stream(self):
+        executor = LocalPythonExecutor([])
+        executor.send_tools({"final_answer": FinalAnswerTool()})
+
+        def run_stream(code):
+            deltas = []
+
+            def consume():
+                result = yield from executor.stream(code)
+                return result
+
+            generator = consume()
+            try:
+                while True:
+                    deltas.append(next(generator))
+            except StopIteration as e:
+                return deltas, e.value
+
+        deltas, result = run_stream("print('a')\nprint('b')\nfinal_answer('c')")
+        assert all(isinstance(delta, ExecutionLogsStreamDelta) for delta in deltas)
+        assert "".join(delta.content for delta in deltas) == "a\nb\n"
+        assert result == ("c", "a\nb\n", True)
+
+        with pytest.raises(InterpreterError, match="ZeroDivisionError"):
+            run_stream("print('a')\n1 / 0")
+        assert str(executor.state["_print_outputs"]) == "a\n"
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_rollback_on_error(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, rollback_on_error=True)
+        executor.send_tools({})
+        executor("frame = [1, 2]\nkept = 'kept'\ncounter = 0\nremoved = 1")
+        frame = executor.state["frame"]
+        code = "counter += 1\nnew = 'new'\ndel removed\nframe.append(3)\nprint('before')\n1 / 0"
+        with pytest.raises(InterpreterError, match="ZeroDivisionError") as exc_info:
+            executor(code)
+        assert "restored to their values before it ran: counter, new, removed." in str(exc_info.value)
+        assert executor.state["counter"] == 0
+        assert executor.state["removed"] == 1
+        assert "new" not in executor.state
+        assert executor.state["kept"] == "kept"
+        # Objects are not copied: in-place modifications are kept
+        assert executor.state["frame"] is frame and frame == [1, 2, 3]
+        assert str(executor.state["_print_outputs"]) == "before\n"
+
+        with pytest.raises(InterpreterError) as exc_info:
+            executor("1 / 0")
+        assert "restored" not in str(exc_info.value)
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_name_suggestions(self, engine):
+        executor = LocalPythonExecutor([], engine=engine)
+        executor.send_tools({})
+        executor("total_count = 1")
+        with pytest.raises(InterpreterError, match="`total_cont` is not defined. Did you mean `total_count`"):
+            executor("total_cont")
+        # Variables added since the previous lookup are indexed, as well as the local variables of functions
+        executor("total_counts = 2")
+        with pytest.raises(InterpreterError, match="Did you mean `total_count`, `total_counts`"):
+            executor("total_cont")
+        with pytest.raises(InterpreterError, match="Did you mean `total_count`, `total_counts`, `local_count`"):
+            executor("def f(local_count):\n    return total_cont\nf(1)")
+        # Names bound earlier in the failing code are indexed, and deleted or sent names are kept up to date
+        with pytest.raises(InterpreterError, match="Did you mean `total_counted`, `total_count`, `total_counts`"):
+            executor("total_counted = 3\ntotal_counte")
+        executor.send_variables({"grand_total": 4})
+        executor("del total_counted")
+        with pytest.raises(InterpreterError, match="Did you mean `grand_total`?"):
+            executor("grand_totl")
+        assert "total_counted" not in executor.name_index._names
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_strict_names(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, strict_names=True)
+        executor.send_tools({})
+        executor("total_count = 1")
+        with pytest.raises(InterpreterError, match="`total_cont` is not defined.$"):
+            executor("total_cont")
+
+    def test_no_rollback_by_default(self):
+        executor = LocalPythonExecutor([])
+        executor.send_tools({})
+        with pytest.raises(InterpreterError):
+            executor("a = 1\n1 / 0")
+        assert executor.state["a"] == 1
+
 
 class TestLocalPythonExecutorSecurity:
     @pytest.mark.parametrize(
@@ -2161,3 +2389,964 @@ class TestLocalPythonExecutorSecurity:
         code = "a = (); b = getattr(a, '__class__')"
         with pytest.raises(InterpreterError, match="Forbidden function evaluation: 'getattr'"):
             executor(code)
+
+
+class TestCompiledEngine:
+    @pytest.mark.parametrize(
+        "code",
+        [
+            "x = 3; y = x * 2 + 1; y",
+            "a, b = c, d = 1, 2; (a, b, c, d)",
+            "x = [1, 2, 3]; x[1:] + [x[-1]]",
+            "d = {'a': 1}; d['b'] = 2; d['a'] += 5; d",
+            "x = 5; x //= 2; x **= 3; x",
+            "f'{3.14159:.2f} and {\"text\"}'",
+            "1 < 2 < 3 and not (2 > 3) or None",
+            "[x * y for x in range(3) for y in range(3) if x != y]",
+            "{x: x ** 2 for x in range(4) if x % 2}",
+            "{x % 3 for x in range(10)}",
+            "sum(x for x in range(10))",
+            "(lambda x, y: x - y)(5, 3)",
+            "r = []\nfor i in range(5):\n    if i == 1:\n        continue\n    if i == 3:\n        break\n    r.append(i)\nr",
+            "i = 0\nwhile i < 10:\n    i += 1\n    if i % 2:\n        continue\ni",
+            dedent(
+                """
+                def fib(n):
+                    if n < 2:
+                        return n
+                    return fib(n - 1) + fib(n - 2)
+                fib(10)
+                """
+            ),
+            dedent(
+                """
+                def f(a, b=2, *args, **kwargs):
+                    return a + b + sum(args) + sum(kwargs.values())
+                f(1), f(1, 3), f(1, 2, 3, 4, x=5)
+                """
+            ),
+            dedent(
+                """
+                class Animal:
+                    '''An animal.'''
+                    sound = "..."
+                    def __init__(self, name):
+                        self.name = name
+                    def speak(self):
+                        return f"{self.name} says {self.sound}"
+                class Dog(Animal):
+                    sound = "woof"
+                    def __init__(self, name):
+                        super().__init__(name.upper())
+                Dog("rex").speak()
+                """
+            ),
+            dedent(
+                """
+                try:
+                    1 / 0
+                except ZeroDivisionError as e:
+                    error = str(e)
+                else:
+                    error = None
+                finally:
+                    done = True
+                (error, done)
+                """
+            ),
+            "import math\nmath.sqrt(16)",
+            "x = [1, 2, 3]\ndel x[0]\nx",
+        ],
+    )
+    def test_compiled_engine_matches_ast_engine(self, code):
+        results = {}
+        for engine in ["ast", "compiled"]:
+            state = {}
+            result, _ = evaluate_python_code(code, {**BASE_PYTHON_TOOLS, "super": super}, state=state, engine=engine)
+            results[engine] = (
+                result,
+                {k: v for k, v in state.items() if k != "_print_outputs"},
+            )
+        assert str(results["compiled"]) == str(results["ast"])
+
+    def test_compiled_engine_print_outputs(self):
+        executor = LocalPythonExecutor([], engine="compiled")
+        executor.send_tools({})
+        _, logs, _ = executor("for i in range(3):\n    print(i, 'x')")
+        assert logs == "0 x\n1 x\n2 x\n"
+
+    def test_compiled_engine_final_answer(self):
+        executor = LocalPythonExecutor([], engine="compiled")
+        executor.send_tools({"final_answer": FinalAnswerTool()})
+        result, _, is_final_answer = executor("def f():\n    return 42\nfinal_answer(f())")
+        assert result == 42
+        assert is_final_answer
+
+    def test_compiled_engine_falls_back_for_unsupported_nodes(self):
+        code = "x = 2\nmatch x:\n    case 2:\n        y = 1"
+        with pytest.raises(InterpreterError, match="Match is not supported"):
+            evaluate_python_code(code, BASE_PYTHON_TOOLS, state={}, engine="compiled")
+
+    @pytest.mark.parametrize(
+        "code, expected_error",
+        [
+            ("import os", "Import of os is not allowed"),
+            ("import random; random._os.system(':')", "Forbidden access to module: os"),
+            ("a = (); b = a.__class__", "Forbidden access to dunder attribute: __class__"),
+            ("x = undefined_function(1)", "Forbidden function evaluation: 'undefined_function'"),
+            ("[c for c in ().__class__.__base__.__subclasses__()]", "Forbidden access to dunder attribute: __base__"),
+        ],
+    )
+    def test_compiled_engine_security(self, code, expected_error):
+        executor = LocalPythonExecutor([], engine="compiled")
+        executor.send_tools({})
+        with pytest.raises(InterpreterError, match=f".*{expected_error}"):
+            executor(code)
+
+    def test_compiled_engine_dangerous_functions(self):
+        executor = LocalPythonExecutor(["builtins"], engine="compiled")
+        executor.send_tools({})
+        with pytest.raises(InterpreterError, match="Forbidden access to function: exec"):
+            executor("import builtins; builtins.exec")
+
+    def test_compiled_engine_max_operations(self):
+        code = "while True:\n    x = 1"
+        with patch("smolagents.local_python_executor.MAX_OPERATIONS", 100):
+            with pytest.raises(InterpreterError, match="Reached the max number of operations"):
+                evaluate_python_code(code, BASE_PYTHON_TOOLS, state={}, engine="compiled")
+
+    def test_unsupported_engine(self):
+        with pytest.raises(ValueError, match="Unsupported engine"):
+            LocalPythonExecutor([], engine="jit")
+
+
+class TestParsedCodeCache:
+    def test_cache_hits_on_repeated_code(self):
+        cache = ParsedCodeCache()
+        first = cache.get("x = 1", [])
+        assert cache.get("x = 1", []) is first
+        assert cache.cache_info()["hits"] == 1
+        assert cache.cache_info()["misses"] == 1
+
+    def test_cache_keyed_by_authorized_imports(self):
+        cache = ParsedCodeCache()
+        first = cache.get("x = 1", ["math"])
+        assert cache.get("x = 1", ["numpy"]) is not first
+        assert cache.get("x = 1", ["math"]) is first
+        assert len(cache) == 2
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = ParsedCodeCache(max_entries=2)
+        first = cache.get("a = 1", [])
+        cache.get("b = 1", [])
+        cache.get("a = 1", [])
+        cache.get("c = 1", [])
+        assert len(cache) == 2
+        assert cache.get("a = 1", []) is first
+        assert cache.cache_info()["misses"] == 3
+        cache.get("b = 1", [])
+        assert cache.cache_info()["misses"] == 4
+
+    def test_cache_bounded_by_total_length(self):
+        cache = ParsedCodeCache(max_total_length=10)
+        cache.get("a = 111", [])
+        cache.get("b = 222", [])
+        assert cache.cache_info()["entries"] == 1
+        cache.get("c = 1" + " " * 20, [])
+        assert cache.cache_info()["total_length"] <= 10
+
+    def test_syntax_errors_are_not_cached(self):
+        cache = ParsedCodeCache()
+        with pytest.raises(InterpreterError, match="Code parsing failed"):
+            cache.get("x = (", [])
+        assert len(cache) == 0
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_executor_uses_shared_cache(self, engine):
+        code = "def f(x):\n    return x + 1\nresult = f(1)"
+        with patch("smolagents.local_python_executor.PARSED_CODE_CACHE", ParsedCodeCache()) as cache:
+            for _ in range(2):
+                executor = LocalPythonExecutor([], engine=engine)
+                executor.send_tools({})
+                assert executor(code)[0] == 2
+            assert cache.cache_info()["hits"] == 1
+            assert cache.cache_info()["misses"] == 1
+
+    def test_executor_cache_opt_out(self):
+        with patch("smolagents.local_python_executor.PARSED_CODE_CACHE", ParsedCodeCache()) as cache:
+            executor = LocalPythonExecutor([], use_parsed_code_cache=False)
+            executor.send_tools({})
+            executor("x = 1")
+            executor("x = 1")
+            assert cache.cache_info()["hits"] == cache.cache_info()["misses"] == 0
+
+    def test_function_source_is_memoized(self):
+        func_def = ast.parse("def f(x):\n    return x").body[0]
+        with patch("smolagents.local_python_executor.ast.unparse", wraps=ast.unparse) as unparse:
+            assert get_function_source(func_def) == "def f(x):\n    return x"
+            get_function_source(func_def)
+            assert unparse.call_count == 1
+
+
+class TestScope:
+    def test_reads_fall_back_to_parent(self):
+        scope = Scope({"x": 1, "y": 2}, y=3)
+        assert scope["x"] == 1
+        assert scope["y"] == 3
+        assert "x" in scope
+        assert scope.get("z", 4) == 4
+        with pytest.raises(KeyError):
+            scope["z"]
+
+    def test_writes_stay_local(self):
+        parent = {"x": 1}
+        scope = Scope(parent)
+        scope["x"] = 2
+        assert parent == {"x": 1}
+        assert scope.has_local("x")
+        child = scope.copy()
+        child["x"] = 3
+        assert scope["x"] == 2
+
+    def test_visible_names(self):
+        scope = Scope(Scope({"a": 1, "b": 2}, b=3), c=4)
+        assert scope.visible_names() == ["c", "b", "a"]
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_function_locals_do_not_leak(self, engine):
+        code = dedent("""\
+            def f(x):
+                y = x + 1
+                return locals_size(y)
+            result = f(1)
+        """)
+        state = {f"variable_{i}": i for i in range(100)}
+        result, _ = evaluate_python_code(
+            code,
+            {"locals_size": lambda y: y},
+            state=state,
+            engine=engine,
+        )
+        assert result == 2
+        assert "y" not in state and "x" not in state
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_function_sees_globals_defined_after_it(self, engine):
+        code = dedent("""\
+            def f():
+                return g() + offset
+            def g():
+                return 1
+            offset = 10
+            result = f()
+        """)
+        result, _ = evaluate_python_code(code, {}, state={}, engine=engine)
+        assert result == 11
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_default_argument_shadowing_global(self, engine):
+        code = dedent("""\
+            x = 1
+            def f(x=5):
+                return x
+            result = f()
+        """)
+        result, _ = evaluate_python_code(code, {}, state={}, engine=engine)
+        assert result == 5
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_nested_function_closure(self, engine):
+        code = dedent("""\
+            def outer(a):
+                def inner(b):
+                    return a + b
+                return inner(2)
+            result = outer(1)
+            print(result)
+        """)
+        state = {}
+        result, _ = evaluate_python_code(code, BASE_PYTHON_TOOLS, state=state, engine=engine)
+        assert result is None
+        assert state["result"] == 3
+        assert state["_print_outputs"].value == "3\n"
+
+
+@pytest.mark.parametrize("engine", ["ast", "compiled"])
+class TestComprehensions:
+    def test_generator_expression_is_lazy(self, engine):
+        code = dedent("""\
+            g = (x * x for x in range(10**12))
+            first = next(g)
+            second = next(g)
+        """)
+        state = {}
+        evaluate_python_code(code, BASE_PYTHON_TOOLS, state=state, engine=engine)
+        assert isinstance(state["g"], GeneratorExpression)
+        assert (state["first"], state["second"]) == (0, 1)
+
+    def test_generator_expression_respects_max_operations(self, engine):
+        with patch("smolagents.local_python_executor.MAX_OPERATIONS", 1000):
+            with pytest.raises(InterpreterError, match="Reached the max number of operations"):
+                evaluate_python_code("sum(x for x in range(10**12))", BASE_PYTHON_TOOLS, state={}, engine=engine)
+
+    def test_generator_expression_consumed_in_later_step(self, engine):
+        executor = LocalPythonExecutor([], engine=engine)
+        executor.send_tools({})
+        executor("g = (str(x) for x in range(3))")
+        assert executor("print(list(g))")[1] == "['0', '1', '2']\n"
+
+    def test_generator_internals_are_not_exposed(self, engine):
+        executor = LocalPythonExecutor([], engine=engine)
+        executor.send_tools({})
+        executor("g = (x for x in range(3))")
+        with pytest.raises(InterpreterError, match="Forbidden access to attribute: gi_frame"):
+            executor("g.gi_frame")
+        with pytest.raises(InterpreterError, match="Forbidden access to dunder attribute"):
+            executor("g.__generator__")
+
+    def test_loop_variables_do_not_leak(self, engine):
+        state = {"x": "outer"}
+        result, _ = evaluate_python_code("[x for x in range(3)]", {"range": range}, state=state, engine=engine)
+        assert result == [0, 1, 2]
+        assert state["x"] == "outer"
+
+    @pytest.mark.parametrize(
+        "code, expected",
+        [
+            ("{(a, b) for a in range(2) for b in range(a, 2)}", {(0, 0), (0, 1), (1, 1)}),
+            ("{a: b for a in range(2) for b in range(3) if b != 2}", {0: 1, 1: 1}),
+            ("[(a, b) for (a, (b, _)) in [(1, (2, 3))]]", [(1, 2)]),
+        ],
+    )
+    def test_nested_generators(self, engine, code, expected):
+        result, _ = evaluate_python_code(code, {"range": range}, state={}, engine=engine)
+        assert result == expected
+
+
+@pytest.mark.parametrize("engine", ["ast", "compiled"])
+class TestExecutionLimits:
+    def test_timeout_in_interpreted_loop(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, timeout_seconds=0.2)
+        executor.send_tools({})
+        code = dedent("""\
+            x = 1
+            while True:
+                try:
+                    y = 2
+                except Exception:
+                    pass
+        """)
+        with pytest.raises(InterpreterError, match="Execution time limit of 0.2 seconds exceeded"):
+            executor(code)
+        assert executor.state["x"] == 1
+        assert executor("x + 1")[0] == 2
+
+    def test_timeout_in_tool_call(self, engine):
+        def spin():
+            while True:
+                pass
+
+        executor = LocalPythonExecutor([], engine=engine, timeout_seconds=0.2)
+        executor.send_tools({"spin": spin})
+        start = time.monotonic()
+        with pytest.raises(InterpreterError, match="Code execution interrupted at line 'spin\\(\\)'"):
+            executor("spin()")
+        assert time.monotonic() - start < 2
+
+    def test_no_interruption_after_run(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, timeout_seconds=0.1)
+        executor.send_tools({})
+        assert executor("1 + 1")[0] == 2
+        time.sleep(0.5)
+
+    @pytest.mark.skipif(get_memory_usage_mb() is None, reason="Memory usage cannot be measured on this platform")
+    def test_memory_limit(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, max_memory_mb=50)
+        executor.send_tools({})
+        code = dedent("""\
+            chunks = []
+            for i in range(100000):
+                chunks.append("x" * 100000)
+        """)
+        with pytest.raises(InterpreterError, match="Memory limit of 50 MB exceeded"):
+            executor(code)
+        executor.state.pop("chunks")
+
+    @pytest.mark.skipif(get_memory_usage_mb() is None, reason="Memory usage cannot be measured on this platform")
+    def test_memory_limit_warns_about_concurrent_runs(self, engine, caplog):
+        started, release = threading.Event(), threading.Event()
+
+        def wait():
+            started.set()
+            release.wait(5)
+
+        other_executor = LocalPythonExecutor([], engine=engine, additional_functions={"wait": wait})
+        other_executor.send_tools({})
+        thread = threading.Thread(target=other_executor, args=("wait()",))
+        thread.start()
+        started.wait(5)
+        executor = LocalPythonExecutor([], engine=engine, max_memory_mb=50)
+        executor.send_tools({})
+        try:
+            with caplog.at_level("WARNING", logger="smolagents.local_python_executor"):
+                executor("1 + 1")
+        finally:
+            release.set()
+            thread.join()
+        assert "max_memory_mb measures the memory of the whole process" in caplog.text
+        # Once the other run is over, the run is alone in the process
+        caplog.clear()
+        with caplog.at_level("WARNING", logger="smolagents.local_python_executor"):
+            executor("1 + 1")
+        assert caplog.text == ""
+
+    def test_invalid_limits(self, engine):
+        with pytest.raises(ValueError, match="timeout_seconds must be a positive number"):
+            LocalPythonExecutor([], engine=engine, timeout_seconds=0)
+        with pytest.raises(ValueError, match="max_memory_mb must be a positive number"):
+            LocalPythonExecutor([], engine=engine, max_memory_mb=-1)
+
+
+@pytest.mark.parametrize("engine", ["ast", "compiled"])
+class TestExecutionProfiler:
+    def test_profile(self, engine):
+        def sleepy_tool(duration):
+            time.sleep(duration)
+            return duration
+
+        executor = LocalPythonExecutor([], engine=engine, profile=True)
+        executor.send_tools({"sleepy_tool": sleepy_tool})
+        code = dedent("""\
+            def square(x):
+                return x * x
+            total = 0
+            for i in range(10):
+                total += square(i)
+            sleepy_tool(0.05)
+        """)
+        executor(code)
+        profile = executor.last_profile
+        assert profile.total_time >= 0.05
+        assert profile.node_types["For"].count == 1
+        assert profile.node_types["BinOp"].count == 10
+        assert profile.node_types["Call"].count == 12
+        assert profile.lines[5].count == 10
+        assert profile.lines[6].self_time >= 0.05
+        assert sum(entry.self_time for entry in profile.lines.values()) <= profile.total_time
+        assert profile.tools["sleepy_tool"].count == 1
+        assert profile.tools["sleepy_tool"].total_time >= 0.05
+        assert profile.tools["square"].count == 10
+        assert profile.tools["range"].count == 1
+        assert "sleepy_tool" in profile.summary()
+        assert profile.dict()["tools"]["square"]["count"] == 10
+
+    def test_tool_time_excludes_arguments(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, profile=True)
+        executor.send_tools({"sleepy_tool": time.sleep})
+        executor("sleepy_tool(sum([0.0 for _ in range(20000)]))")
+        profile = executor.last_profile
+        call_time = profile.node_types["Call"].total_time
+        assert profile.tools["sleepy_tool"].total_time < call_time - profile.node_types["ListComp"].total_time / 2
+
+    def test_profile_on_error(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, profile=True)
+        executor.send_tools({})
+        with pytest.raises(InterpreterError):
+            executor("x = 1\nx / 0")
+        assert executor.last_profile.node_types["BinOp"].count == 1
+        assert local_python_executor._OPERATIONS_COUNTER.get().profiler is None
+
+    def test_profiling_is_scoped_to_its_run(self, engine):
+        evaluate_ast = local_python_executor.evaluate_ast
+        profiled_executor = LocalPythonExecutor([], engine=engine, profile=True)
+        executor = LocalPythonExecutor([], engine=engine)
+        executor.send_tools({})
+        # A run nested in a profiled one, as from a tool, has its own operations counter and is not profiled
+        profiled_executor.send_tools({"run": lambda code: executor(code)[0]})
+        assert profiled_executor("run('[x * 2 for x in range(3)]')")[0] == [0, 2, 4]
+        assert "ListComp" not in profiled_executor.last_profile.node_types
+        assert executor.last_profile is None
+        profiler = ExecutionProfiler()
+        with profiler.activate():
+            assert local_python_executor.evaluate_ast is evaluate_ast
+            assert local_python_executor._OPERATIONS_COUNTER.get().profiler is profiler
+            assert local_python_executor._OPERATIONS_COUNTER.get().evaluators is profiler.evaluators
+        assert local_python_executor._OPERATIONS_COUNTER.get().profiler is None
+        assert local_python_executor._UNLIMITED_OPERATIONS_COUNTER.profiler is None
+        # Runs that are not profiled use the evaluators directly
+        assert local_python_executor._UNLIMITED_OPERATIONS_COUNTER.evaluators is local_python_executor.EVALUATORS
+
+
+class TestVectorizedLoops:
+    @pytest.mark.parametrize(
+        "code,is_vectorized",
+        [
+            ("for x in data:\n    total += x * x", True),
+            ("for x in data:\n    if 0 < x <= 5 or not x != 3:\n        total -= (x - c) / 2", True),
+            ("for x in data:\n    out.append(-x ** 2)", True),
+            ("[x * c for x in data if x > 0]", True),
+            ("for x in data:\n    total += total * x", False),
+            ("for x in data:\n    total += c", False),
+            ("for x in data:\n    total += x ** 0.5", False),
+            ("for x in data:\n    total += x % 2", False),
+            ("for x in data:\n    total += abs(x)", False),
+            ("for x in data:\n    if x:\n        total += x", False),
+            ("for x in data:\n    total += x\nelse:\n    pass", False),
+            ("for x, y in data:\n    total += x", False),
+            ("[x * y for x in data for y in data]", False),
+        ],
+    )
+    def test_find_vectorized_loop(self, code, is_vectorized):
+        assert (
+            find_vectorized_loop(ast.parse(code).body[0].value if code.startswith("[") else ast.parse(code).body[0])
+            is not None
+        ) is is_vectorized
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    @pytest.mark.parametrize(
+        "data",
+        [
+            [0.1 * i - 37.3 for i in range(1000)],
+            list(range(-500, 500)),
+            tuple(range(1000)),
+            np.linspace(-10, 10, 1000),
+        ],
+    )
+    @pytest.mark.parametrize(
+        "code",
+        [
+            "total = 0\nfor x in data:\n    total += x * x\ntotal",
+            "total = 0.5\nfor x in data:\n    if x > 0 and x < 300:\n        total -= x / 3 + c\n(total, x)",
+            "out = [None]\nfor x in data:\n    out.append(x ** 3 - 2 * x)\nout",
+            "[x * 0.5 + c for x in data if not x < -10]",
+            "product = 1\nfor x in data:\n    if 1 <= x < 1.5:\n        product *= x\nproduct",
+            "total = 0\nfor i in range(1000):\n    total += i * i\ntotal",
+        ],
+    )
+    def test_results_are_identical(self, engine, data, code):
+        results = []
+        for vectorize_loops in [False, True]:
+            counter = OperationsCounter()
+            result, _ = evaluate_python_code(
+                code,
+                BASE_PYTHON_TOOLS,
+                state={"data": data, "c": 3},
+                authorized_imports=["numpy"],
+                engine=engine,
+                vectorize_loops=vectorize_loops,
+                operations_counter=counter,
+            )
+            results.append((repr(result), repr(type(result)), counter.count))
+        assert results[1][:2] == results[0][:2]
+        assert results[1][2] < 100 < results[0][2]
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            [1, 2.5, 3],  # Mixed types
+            [True, False],
+            [2**40, 2**41],  # Products beyond the exact integers
+            [1.0, 0.0],  # Division by zero
+            np.arange(1, 4),  # Only float64 arrays are vectorized
+        ],
+    )
+    def test_unsupported_data_runs_in_the_interpreter(self, data):
+        code = "out = []\nfor x in data:\n    out.append(x * x * 1.0 / x)\nout"
+        outcomes = []
+        for vectorize_loops in [False, True]:
+            try:
+                result, _ = evaluate_python_code(
+                    code, state={"data": data}, authorized_imports=["numpy"], vectorize_loops=vectorize_loops
+                )
+                outcomes.append(repr(result))
+            except InterpreterError as e:
+                outcomes.append(str(e))
+        assert outcomes[0] == outcomes[1]
+
+    def test_requires_authorized_numpy(self):
+        code = "total = 0\nfor x in data:\n    total += x\ntotal"
+        executor = LocalPythonExecutor([], vectorize_loops=True)
+        executor.send_tools({})
+        executor.send_variables({"data": [1.0] * 1000})
+        assert executor(code)[0] == 1000.0
+        with pytest.raises(InterpreterError, match="Reached the max number of operations"):
+            evaluate_python_code(
+                code,
+                state={"data": [1.0] * 5000},
+                vectorize_loops=True,
+                operations_counter=OperationsCounter(max_operations=10_000),
+            )
+        result, _ = evaluate_python_code(
+            code,
+            state={"data": [1.0] * 5000},
+            authorized_imports=["numpy"],
+            vectorize_loops=True,
+            operations_counter=OperationsCounter(max_operations=10_000),
+        )
+        assert result == 5000.0
+
+
+class TestFastPath:
+    @pytest.mark.parametrize(
+        "code,is_verified",
+        [
+            ("total = 0\nfor x in data:\n    total += x\ntotal", True),
+            ("import math\nfrom collections import Counter\n[math.sqrt(x) for x in data if x > 0]", True),
+            ("while i < 10:\n    i += 1\n    if i == 5:\n        break", True),
+            ("values = {k: v for k, v in pairs}\nprint(f'{len(values)} values')", True),
+            ("for x in data:\n    if x:\n        print(x)\n    else:\n        last = x", True),
+            ("x.__class__", False),
+            ("__name__", False),
+            ("getattr(x, 'gi_frame')", False),
+            ("(x for x in data).gi_frame", False),
+            ("total = sum(x for x in data)", False),
+            ("eval('1')", False),
+            ("def f():\n    pass", False),
+            ("f = lambda: 1", False),
+            ("try:\n    x = 1\nexcept Exception:\n    pass", False),
+            ("from math import *", False),
+            ("for x in data:\n    pass\nelse:\n    y = 1", False),
+            ("values[0] += 1", False),
+            ("await fetch(url)", False),
+            ("a, *b = data", False),
+            ("[*data, *data]", False),
+            ("print(*data)", False),
+            ("f'{x!r}'", False),
+            ("[(y := x) for x in data]", False),
+        ],
+    )
+    def test_compile_fast_path(self, code, is_verified):
+        assert (compile_fast_path(ast.parse(code)) is not None) is is_verified
+
+    @staticmethod
+    def _run_with_both_engines(code):
+        outcomes = []
+        for fast_path in [False, True]:
+            state = {"data": list(range(10))}
+            try:
+                result, _ = evaluate_python_code(code, BASE_PYTHON_TOOLS, state=state, fast_path=fast_path)
+                outcome = repr(result)
+            except InterpreterError as e:
+                outcome = str(e)
+            prints = str(state.pop("_print_outputs"))
+            outcomes.append((outcome, prints, {name: repr(value) for name, value in state.items()}))
+        return outcomes
+
+    @pytest.mark.parametrize(
+        "code",
+        [
+            "total = 0\nfor x in data:\n    if x % 3 == 0:\n        total += x\n    else:\n        total -= 1\ntotal",
+            "import math\nroots = [round(math.sqrt(x), 3) for x in data]\nprint('roots', roots[:3])\nroots[-1]",
+            "counts = {}\nfor x in data:\n    counts[x % 4] = counts.get(x % 4, 0) + 1\ncounts",
+            "for x in data:\n    if x > 5:\n        x * 2\n    elif x > 2:\n        None",
+            "i = 0\nwhile True:\n    i += 1\n    if i >= 7:\n        break\ndel data\ni",
+            "a, b = data[:2]\nb -= a\nc = [x for x in data if x % 2]\n(a, b, c, f'{a}-{b:03d}')",
+            "assert len(data) == 10, 'wrong length'\nsorted(data, key=abs)[::-1]",
+            "1 / data[0]",
+            "raise ValueError('invalid data')",
+        ],
+    )
+    def test_results_are_identical(self, code):
+        assert compile_fast_path(ast.parse(code)) is not None
+        outcomes = self._run_with_both_engines(code)
+        assert outcomes[1] == outcomes[0]
+
+    @pytest.mark.parametrize(
+        "code",
+        [
+            "a, *b = [1, 2, 3]\n(a, b)",
+            "f'{\"x\"!r}'",
+            "a = [1, 2]\n[*a, *a]",
+            "c = [(y := x) for x in data if x % 2]\ny",
+        ],
+    )
+    def test_results_are_identical_for_syntax_left_to_the_interpreter(self, code):
+        # The native semantics of these snippets differ from the ones of the interpreter, which runs them on both paths
+        assert compile_fast_path(ast.parse(code)) is None
+        outcomes = self._run_with_both_engines(code)
+        assert outcomes[1] == outcomes[0]
+
+    def test_tools_and_final_answer(self):
+        class LengthTool(Tool):
+            name = "length"
+            description = "Returns the length of a text."
+            inputs = {"text": {"type": "string", "description": "The text."}}
+            output_type = "integer"
+
+            def forward(self, text):
+                return len(text)
+
+        executor = LocalPythonExecutor([], fast_path=True)
+        executor.send_tools({"length": LengthTool(), "final_answer": FinalAnswerTool()})
+        assert executor("lengths = [length(word) for word in ['a', 'bcd']]\nlengths") == ([1, 3], "", False)
+        assert executor("final_answer(sum(lengths))") == (4, "", True)
+        # The code only gets proxies of the tools: accessing their attributes falls back to the interpreter
+        assert executor("length.name")[0] == "length"
+        with pytest.raises(InterpreterError, match="Cannot assign to name 'length'"):
+            executor("length = 1")
+
+    def test_fallback_to_the_interpreter(self):
+        executor = LocalPythonExecutor([], fast_path=True)
+        executor.send_tools({})
+        executor("total = 1")
+        # Undefined names fail in the interpreter with their close matches suggested
+        with pytest.raises(InterpreterError, match="Did you mean `total`"):
+            executor("totl + 1")
+        with pytest.raises(InterpreterError, match="Import of os is not allowed"):
+            executor("import os")
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_generators_stay_out_of_reach_of_later_steps(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, fast_path=True)
+        executor.send_tools({})
+        executor.send_variables({"native": (i for i in range(3))})
+        executor("g = (i for i in range(3))")
+        assert isinstance(executor.state["g"], GeneratorExpression)
+        # The frames of native generators lead to the interpreter: the interpreted steps cannot reach them either
+        for code in ["native.gi_frame", "getattr(native, 'gi_frame')", "g.gi_frame.f_back", "x = 1\nnative.gi_code"]:
+            with pytest.raises(InterpreterError, match="Forbidden access to attribute: gi_"):
+                executor(code)
+
+    def test_execution_limits_and_errors(self):
+        with pytest.raises(InterpreterError, match="Reached the max number of operations"):
+            evaluate_python_code(
+                "while True:\n    pass",
+                state={},
+                fast_path=True,
+                operations_counter=OperationsCounter(max_operations=10_000),
+            )
+        executor = LocalPythonExecutor([], fast_path=True, timeout_seconds=0.2)
+        executor.send_tools({})
+        with pytest.raises(InterpreterError, match="interrupted at line 'x = sum"):
+            executor("a = 1\nx = sum(i for i in range(10**12))")
+        # Variables set before an error are kept, like in the interpreter
+        with pytest.raises(InterpreterError, match="failed at line 'b = a / 0' due to: ZeroDivisionError"):
+            executor("a = 2\nb = a / 0")
+        assert executor.state["a"] == 2 and "b" not in executor.state
+
+
+@pytest.mark.parametrize("engine", ["ast", "compiled"])
+class TestAsyncCode:
+    @staticmethod
+    def make_fetch_tool(parties):
+        started = []
+
+        class FetchTool(Tool):
+            name = "fetch"
+            description = "Fetches a page."
+            inputs = {"url": {"type": "string", "description": "The url."}}
+            output_type = "string"
+
+            async def forward(self, url):
+                # Only returns once all the calls started, which requires them to run concurrently
+                started.append(url)
+                while len(started) < parties:
+                    await asyncio.sleep(0.01)
+                return f"page {url}"
+
+        return FetchTool()
+
+    def test_await_tools_concurrently(self, engine):
+        executor = LocalPythonExecutor(["asyncio"], engine=engine, timeout_seconds=5)
+        executor.send_tools({"fetch": self.make_fetch_tool(parties=3)})
+        code = "import asyncio\npages = await asyncio.gather(*[fetch(url) for url in 'abc'])\npages"
+        assert executor(code)[0] == ["page a", "page b", "page c"]
+        assert executor("await fetch('d')")[0] == "page d"
+
+    def test_async_function(self, engine):
+        executor = LocalPythonExecutor(["asyncio"], engine=engine, timeout_seconds=5)
+        executor.send_tools({"fetch": self.make_fetch_tool(parties=2)})
+        code = dedent(
+            """
+            import asyncio
+
+            async def fetch_twice(url):
+                page = await fetch(url)
+                return page + " " + await fetch(url + "!")
+
+            coroutines = [fetch_twice("a"), fetch_twice("b")]
+            await asyncio.gather(*coroutines)
+            """
+        )
+        assert executor(code)[0] == ["page a page a!", "page b page b!"]
+        with pytest.raises(InterpreterError, match="Forbidden access to dunder attribute: __coroutine__"):
+            executor("fetch_twice('c').__coroutine__")
+
+    def test_async_for(self, engine):
+        async def numbers(n):
+            for i in range(n):
+                await asyncio.sleep(0)
+                yield i
+
+        executor = LocalPythonExecutor([], engine=engine)
+        executor.send_tools({"numbers": numbers})
+        assert executor("total = 0\nasync for i in numbers(4):\n    total += i\ntotal")[0] == 6
+
+    def test_cleanup_stops_event_loop(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, timeout_seconds=5)
+        executor.send_tools({"fetch": self.make_fetch_tool(parties=1)})
+        assert executor("await fetch('a')")[0] == "page a"
+        thread = executor.event_loop._thread
+        assert thread.is_alive()
+        executor.cleanup()
+        assert not thread.is_alive()
+        # The event loop is started again if the code awaits after the cleanup
+        assert executor("await fetch('b')")[0] == "page b"
+        thread = executor.event_loop._thread
+        del executor
+        gc.collect()
+        assert not thread.is_alive()
+
+    def test_await_limits(self, engine):
+        executor = LocalPythonExecutor(["asyncio"], engine=engine, timeout_seconds=0.5)
+        executor.send_tools({"fetch": self.make_fetch_tool(parties=2)})
+        with pytest.raises(InterpreterError, match="Execution time limit of 0.5 seconds exceeded"):
+            executor("await fetch('a')")
+        with pytest.raises(InterpreterError, match="await it in a separate statement"):
+            executor("await fetch(await fetch('a'))")
+        with pytest.raises(InterpreterError, match="object int can't be used in 'await' expression"):
+            executor("await 1")
+
+
+class TestParallelToolCalls:
+    @pytest.mark.parametrize(
+        "code,expected_groups",
+        [
+            ("a = search('a')\nb = search('b')\nsearch('c')", {0: [0, 1, 2]}),
+            ("q = 'x'\na = search(q)\nb = search(f'{q}!', n=2)", {1: [1, 2]}),
+            ("a = search('a')\nb = search(a)\nc = search('c')", {1: [1, 2]}),
+            ("a = search('a')\nsearch = 1\nb = search('b')", {}),
+            ("a = search('a')\nb = search(len('b'))", {}),
+            ("a = search('a')\nb = search(x.attribute)", {}),
+            ("a = search('a')\nb = c = search('b')", {}),
+            ("a, b = search('a')\nc = search(b)\nd = search('d')", {1: [1, 2]}),
+        ],
+    )
+    def test_find_parallel_tool_calls(self, code, expected_groups):
+        groups = find_parallel_tool_calls(ast.parse(code))
+        assert {
+            start: [statement.index for statement in group.statements] for start, group in groups.items()
+        } == expected_groups
+
+    @staticmethod
+    def make_search_tool(side_effect_free=True, parties=2):
+        barrier = threading.Barrier(parties, timeout=5)
+
+        class SearchTool(Tool):
+            name = "search"
+            description = "Searches the web."
+            inputs = {"query": {"type": "string", "description": "The query."}}
+            output_type = "string"
+
+            def forward(self, query):
+                if query == "fail":
+                    raise ValueError("search failed")
+                if threading.current_thread() is not threading.main_thread():
+                    barrier.wait()
+                return f"results for {query}"
+
+        tool = SearchTool()
+        tool.side_effect_free = side_effect_free
+        return tool
+
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_calls_run_concurrently(self, engine):
+        executor = LocalPythonExecutor([], engine=engine, max_parallel_tool_calls=4)
+        executor.send_tools({"search": self.make_search_tool(parties=3)})
+        code = "q = 'b'\na = search('a')\nb = search(query=q)\nsearch('c')\nd = search(a)\nd"
+        assert executor(code)[0] == "results for results for a"
+        assert executor.state["b"] == "results for b"
+
+    def test_calls_are_serial_unless_enabled(self):
+        for executor, tool in [
+            (
+                LocalPythonExecutor([], max_parallel_tool_calls=4),
+                self.make_search_tool(side_effect_free=False, parties=1),
+            ),
+            (LocalPythonExecutor([]), self.make_search_tool(parties=1)),
+        ]:
+            executor.send_tools({"search": tool})
+            calling_threads = []
+            original_forward = tool.forward
+            tool.forward = lambda query: calling_threads.append(threading.current_thread()) or original_forward(query)
+            executor("a = search('a')\nb = search('b')")
+            assert calling_threads == [threading.main_thread()] * 2
+
+    def test_results_are_assigned_in_program_order(self):
+        executor = LocalPythonExecutor([], max_parallel_tool_calls=2)
+        executor.send_tools({"search": self.make_search_tool(parties=2)})
+        with pytest.raises(InterpreterError, match="Code execution failed at line 'b = search\\('fail'\\)'"):
+            executor("a = search('a')\nb = search('fail')\nc = search('c')")
+        assert executor.state["a"] == "results for a"
+        assert "b" not in executor.state and "c" not in executor.state
+
+    def test_invalid_max_parallel_tool_calls(self):
+        with pytest.raises(ValueError, match="max_parallel_tool_calls must be at least 1"):
+            LocalPythonExecutor([], max_parallel_tool_calls=0)
+
+
+class TestCodeValidation:
+    @pytest.mark.parametrize(
+        "code,expected_problems",
+        [
+            ("x = 1\nprint(x)", []),
+            ("import os", ["Line 1 'import os': Import of os is not allowed."]),
+            ("from os.path import join", ["Line 1 'from os.path import join': Import from os.path is not allowed."]),
+            ("from . import module", ["Line 1 'from . import module': Relative imports are not supported."]),
+            ("x = [].__class__", ["Line 1 '[].__class__': Forbidden access to dunder attribute: __class__"]),
+            ("x = [1].__len__()", []),
+            (
+                "eval('1')",
+                [
+                    "Line 1 'eval': Forbidden function evaluation: 'eval' is not among the explicitly allowed tools or "
+                    "defined/imported in the preceding code"
+                ],
+            ),
+            ("def eval(x):\n    return x\neval('1')", []),
+            ("global x", ["Line 1 'global x': Global is not supported."]),
+            ("if (n := 1):\n    pass", ["Line 1 'n := 1': NamedExpr is not supported."]),
+            ("try:\n    import os\nexcept Exception:\n    pass", []),
+            (
+                "try:\n    import os\nexcept ImportError:\n    pass",
+                ["Line 2 'import os': Import of os is not allowed."],
+            ),
+            (
+                "result = search('query')\nimport os\nx = os.__name__",
+                [
+                    "Line 2 'import os': Import of os is not allowed.",
+                    "Line 3 'os.__name__': Forbidden access to dunder attribute: __name__",
+                ],
+            ),
+        ],
+    )
+    def test_find_code_problems(self, code, expected_problems):
+        assert find_code_problems(code) == expected_problems
+
+    def test_dangerous_functions_of_authorized_modules(self):
+        assert find_code_problems("import os\nos.system('ls')", authorized_imports=["os"]) == [
+            "Line 2 'os.system': Forbidden access to function: system"
+        ]
+        assert find_code_problems("from os import popen as p\np('ls')", authorized_imports=["os"]) == [
+            "Line 2 'p': Forbidden access to function: popen"
+        ]
+        assert find_code_problems("eval('1')", static_tools={"eval": eval}) == []
+
+    def test_code_with_problems_is_not_run(self):
+        calls = []
+        executor = LocalPythonExecutor([], validate_code=True)
+        executor.send_tools({"search": lambda query: calls.append(query)})
+        with pytest.raises(InterpreterError) as exc_info:
+            executor("search('query')\nimport os\nimport sys")
+        message = str(exc_info.value)
+        assert message.startswith("Code validation failed, the code was not run:\n")
+        assert "Import of os is not allowed." in message and "Import of sys is not allowed." in message
+        assert "Authorized imports are:" in message
+        assert calls == []
+
+        # Validation is opt-in: by default, the code runs until its first error
+        executor = LocalPythonExecutor([])
+        executor.send_tools({"search": lambda query: calls.append(query)})
+        with pytest.raises(InterpreterError, match="Import of os is not allowed"):
+            executor("search('query')\nimport os\nimport sys")
+        assert calls == ["query"]
+        assert executor("'x' in locals() if False else 0")[0] == 0
@@ -1,17 +1,25 @@
+import asyncio
+import json
+
 import pytest
+from PIL import Image
 
 from smolagents.agents import ToolCall
 from smolagents.memory import (
     ActionStep,
     AgentMemory,
     ChatMessage,
+    MemoryCompaction,
     MemoryStep,
     Message,
     MessageRole,
     PlanningStep,
+    SummaryStep,
     SystemPromptStep,
     TaskStep,
+    estimate_token_count,
 )
+from smolagents.models import Model
 
 
 class TestAgentMemory:
@@ -21,6 +29,139 @@ class TestAgentMemory:
         assert memory.system_prompt.system_prompt == system_prompt
         assert memory.steps == []
 
+    def test_to_messages_reuses_unchanged_steps(self, monkeypatch):
+        memory = AgentMemory(system_prompt="This is a system prompt.")
+        memory.steps.append(TaskStep(task="Task"))
+        memory.steps += [ActionStep(step_number=i, model_output=f"Output {i}", observations=f"{i}") for i in range(3)]
+        rendered_steps = []
+        to_messages = ActionStep.to_messages
+
+        def counting_to_messages(self, summary_mode=False):
+            rendered_steps.append(self.step_number)
+            return to_messages(self, summary_mode=summary_mode)
+
+        monkeypatch.setattr(ActionStep, "to_messages", counting_to_messages)
+        messages = memory.to_messages()
+        assert rendered_steps == [0, 1, 2]
+        assert len(messages) == 8
+        assert messages[2:4] == to_messages(memory.steps[1])
+
+        memory.steps.append(ActionStep(step_number=3, model_output="Output 3"))
+        assert len(memory.to_messages()) == 9
+        assert rendered_steps == [0, 1, 2, 3]
+        # Reassigning a field of a step renders it again, but not the steps after it
+        memory.steps[2].observations = "new"
+        messages = memory.to_messages()
+        assert rendered_steps == [0, 1, 2, 3, 1]
+        assert messages[5]["content"][0]["text"] == "Observation:\nnew"
+        # Assigning its current value to a field keeps the rendered messages
+        memory.steps[1].observations_images = None
+        assert memory.to_messages() == messages
+        assert rendered_steps == [0, 1, 2, 3, 1]
+        assert len(memory.to_messages(summary_mode=True)) == 4
+        # The steps following removed ones are not rendered again
+        del memory.steps[1:3]
+        assert len(memory.to_messages()) == 5
+        assert rendered_steps == [0, 1, 2, 3, 1, 0, 1, 2, 3]
+
+    def test_to_messages_renders_steps_modified_in_place(self):
+        memory = AgentMemory(system_prompt="This is a system prompt.")
+        step = ActionStep(
+            step_number=1,
+            tool_calls=[ToolCall(name="search", arguments={"query": "a"}, id="call_1")],
+            observations_images=[],
+        )
+        memory.steps.append(step)
+        messages = memory.to_messages()
+        assert len(messages) == 2
+
+        def update_step(memory_step):
+            memory_step.observations_images.append(Image.new("RGB", (4, 4)))
+            memory_step.tool_calls[0].arguments["query"] = "b"
+
+        # A callback modifying the lists of the step in place makes its cached messages outdated
+        update_step(step)
+        messages = memory.to_messages()
+        assert len(messages) == 3
+        assert '"query": "b"' in messages[1]["content"][0]["text"]
+        assert messages[2]["content"][0]["image"] is step.observations_images[0]
+        assert step.render_messages() is step.render_messages()
+
+
+class TestMemoryCompaction:
+    @staticmethod
+    def make_memory(steps_count: int) -> AgentMemory:
+        memory = AgentMemory(system_prompt="System prompt.")
+        memory.steps.append(TaskStep(task="Task", task_images=[Image.new("RGB", (8, 8))]))
+        for i in range(steps_count):
+            memory.steps.append(
+                ActionStep(
+                    step_number=i + 1,
+                    model_output=f"Output {i + 1}",
+                    observations="x" * 400,
+                    observations_images=[Image.new("RGB", (8, 8))],
+                )
+            )
+        return memory
+
+    def test_memory_within_budget_is_untouched(self):
+        memory = self.make_memory(3)
+        assert MemoryCompaction(max_tokens=10_000).compact(memory, model=None) is None
+        assert all(step.observations_images for step in memory.steps[1:])
+
+    def test_truncate_observations_and_drop_images(self):
+        memory = self.make_memory(5)
+        compaction = MemoryCompaction(max_tokens=3500, keep_last_steps=2, max_observation_length=40)
+        before, after = compaction.compact(memory, model=None)
+        assert before > 6000
+        assert after == estimate_token_count(memory.to_messages()) <= 3500
+        old_steps, last_steps = memory.steps[1:4], memory.steps[4:]
+        assert all("truncated" in step.observations and step.observations_images is None for step in old_steps)
+        assert all(step.observations == "x" * 400 and step.observations_images for step in last_steps)
+        # The task is always kept
+        assert memory.steps[0].task_images
+
+        # Images are only dropped if truncating the observations is not enough
+        memory = self.make_memory(5)
+        MemoryCompaction(max_tokens=6400, keep_last_steps=2, max_observation_length=40).compact(memory, model=None)
+        assert "truncated" in memory.steps[1].observations
+        assert all(step.observations_images for step in memory.steps[1:])
+
+    def test_summarize_old_steps(self):
+        class FakeSummaryModel(Model):
+            def __init__(self):
+                super().__init__()
+                self.prompts = []
+
+            def generate(self, messages, stop_sequences=None):
+                self.prompts.append(messages)
+                return ChatMessage(role="assistant", content=f"Summary {len(self.prompts)}")
+
+            async def agenerate(self, messages, stop_sequences=None):
+                return self.generate(messages)
+
+        model = FakeSummaryModel()
+        memory = self.make_memory(4)
+        compaction = MemoryCompaction(max_tokens=500, keep_last_steps=1, drop_images=False, summarize=True)
+        compaction.compact(memory, model)
+        assert [type(step) for step in memory.steps] == [TaskStep, SummaryStep, ActionStep]
+        assert memory.steps[1] == SummaryStep(summary="Summary 1", step_numbers=[1, 2, 3])
+        assert memory.steps[1].to_messages()[0]["content"][0]["text"] == "Summary of my previous steps:\nSummary 1"
+        prompt = model.prompts[0]
+        assert prompt[0]["content"][0]["text"] == compaction.summary_prompt
+        assert prompt[1]["content"][0]["text"] == "Task:\nTask"
+        assert sum(message["role"] == MessageRole.ASSISTANT for message in prompt) == 3
+
+        # A previous summary is summarized again with the steps following it
+        memory.steps += self.make_memory(2).steps[1:]
+        asyncio.run(compaction.acompact(memory, model))
+        assert [type(step) for step in memory.steps] == [TaskStep, SummaryStep, ActionStep]
+        assert memory.steps[1] == SummaryStep(summary="Summary 2", step_numbers=[1, 2, 3, 4, 1])
+
+    def test_at_least_one_strategy_is_required(self):
+        with pytest.raises(ValueError, match="at least one of its strategies"):
+            MemoryCompaction(max_tokens=1000, drop_images=False)
+
 
 class TestMemoryStep:
     def test_initialization(self):
@@ -77,6 +218,11 @@ def test_action_step_to_messages():
     assert isinstance(text_content, dict)
     assert "type" in text_content
     assert "text" in text_content
+    # Tool calls are rendered as JSON, for a byte-stable history
+    assert text_content["text"].startswith("Calling tools:\n")
+    assert json.loads(text_content["text"].removeprefix("Calling tools:\n")) == [
+        {"id": "id", "type": "function", "function": {"name": "get_weather", "arguments": {"location": "Paris"}}}
+    ]
 
     image_message = messages[2]
     image_content = image_message["content"][0]
@@ -12,11 +12,13 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import json
 import sys
+import threading
 import unittest
 from contextlib import ExitStack
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from huggingface_hub import ChatCompletionOutputMessage
@@ -25,6 +27,7 @@ from smolagents.models import (
     AmazonBedrockServerModel,
     AzureOpenAIServerModel,
     ChatMessage,
+    ChatMessageStreamDelta,
     ChatMessageToolCall,
     HfApiModel,
     InferenceClientModel,
@@ -34,6 +37,7 @@ from smolagents.models import (
     MLXModel,
     Model,
     OpenAIServerModel,
+    TokenUsage,
     TransformersModel,
     get_clean_message_list,
     get_tool_call_from_text,
@@ -152,6 +156,27 @@ class TestModel:
             output_str += el.content
         assert output_str == "I am"
 
+    def test_agenerate_runs_generate_in_worker_thread(self):
+        class FakeModel(Model):
+            def generate(self, messages, stop_sequences=None):
+                return ChatMessage(role="assistant", content=f"{threading.get_ident()} {stop_sequences}")
+
+            def generate_stream(self, messages, stop_sequences=None):
+                for word in ["a", "b"]:
+                    yield ChatMessageStreamDelta(content=word)
+
+        async def generate():
+            model = FakeModel()
+            message = await model.agenerate([], stop_sequences=["stop"])
+            deltas = [delta.content async for delta in model.agenerate_stream([])]
+            return message, deltas
+
+        message, deltas = asyncio.run(generate())
+        thread_id, stop_sequences = message.content.split(" ", 1)
+        assert int(thread_id) != threading.get_ident()
+        assert stop_sequences == "['stop']"
+        assert deltas == ["a", "b"]
+
     def test_parse_json_if_needed(self):
         args = "abc"
         parsed_args = parse_json_if_needed(args)
@@ -265,6 +290,23 @@ class TestLiteLLMModel:
         model = LiteLLMModel(model_id="fal/llama-3.3-70b", flatten_messages_as_text=True)
         assert model.flatten_messages_as_text
 
+    def test_cache_breakpoints(self):
+        model = LiteLLMModel(model_id="anthropic/claude-3-5-sonnet-latest", cache_breakpoints=True)
+        messages = [
+            {"role": MessageRole.SYSTEM, "content": [{"type": "text", "text": "System prompt"}]},
+            {"role": MessageRole.USER, "content": [{"type": "text", "text": "Task"}]},
+            {"role": MessageRole.ASSISTANT, "content": [{"type": "text", "text": "Thought"}]},
+            {"role": MessageRole.USER, "content": [{"type": "text", "text": "Observation"}]},
+        ]
+        completion_kwargs = model._prepare_completion_kwargs(messages=messages)
+        breakpoints = [
+            "cache_control" in element for message in completion_kwargs["messages"] for element in message["content"]
+        ]
+        assert breakpoints == [True, False, False, True]
+        assert completion_kwargs["messages"][0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+        # The input messages are left untouched
+        assert all("cache_control" not in message["content"][0] for message in messages)
+
 
 class TestLiteLLMRouterModel:
     @pytest.mark.parametrize(
@@ -324,6 +366,53 @@ class TestOpenAIServerModel:
         )
         assert model.client == MockOpenAI.return_value
 
+    def test_agenerate_uses_async_client(self):
+        with patch("openai.OpenAI") as MockOpenAI, patch("openai.AsyncOpenAI") as MockAsyncOpenAI:
+            model = OpenAIServerModel(model_id="gpt-4o", api_key="test_api_key")
+            response = MagicMock()
+            response.usage.prompt_tokens = 10
+            response.usage.completion_tokens = 2
+            response.choices[0].message.model_dump.return_value = {"role": "assistant", "content": "Hello"}
+            MockAsyncOpenAI.return_value.chat.completions.create = AsyncMock(return_value=response)
+            message = asyncio.run(model.agenerate([{"role": "user", "content": "Hi"}]))
+        assert message.content == "Hello"
+        assert (model.last_input_token_count, model.last_output_token_count) == (10, 2)
+        MockAsyncOpenAI.assert_called_once_with(**model.client_kwargs)
+        MockOpenAI.return_value.chat.completions.create.assert_not_called()
+
+    def test_generate_records_cached_input_tokens(self):
+        with patch("openai.OpenAI") as MockOpenAI:
+            model = OpenAIServerModel(model_id="gpt-4o", api_key="test_api_key")
+        response = MagicMock()
+        response.usage.prompt_tokens = 1200
+        response.usage.completion_tokens = 10
+        response.usage.prompt_tokens_details.cached_tokens = 1024
+        response.choices[0].message.model_dump.return_value = {"role": "assistant", "content": "Hello"}
+        MockOpenAI.return_value.chat.completions.create.return_value = response
+        message = model.generate([{"role": "user", "content": "Hi"}])
+        assert (model.last_input_token_count, model.last_cached_input_token_count) == (1200, 1024)
+        assert message.token_usage == TokenUsage(input_tokens=1200, output_tokens=10, cached_input_tokens=1024)
+
+        response.usage.prompt_tokens_details = None
+        message = model.generate([{"role": "user", "content": "Hi"}])
+        assert model.last_cached_input_token_count == 0
+        assert message.token_usage.cached_input_tokens == 0
+
+    def test_generate_stream_returns_token_usage(self):
+        with patch("openai.OpenAI") as MockOpenAI:
+            model = OpenAIServerModel(model_id="gpt-4o", api_key="test_api_key")
+        content_event = MagicMock(usage=None)
+        content_event.choices[0].delta.content = "Hello"
+        usage_event = MagicMock(choices=[])
+        usage_event.usage.prompt_tokens = 1200
+        usage_event.usage.completion_tokens = 10
+        usage_event.usage.prompt_tokens_details.cached_tokens = 1024
+        MockOpenAI.return_value.chat.completions.create.return_value = [content_event, usage_event]
+        deltas = list(model.generate_stream([{"role": "user", "content": "Hi"}]))
+        assert [delta.content for delta in deltas] == ["Hello", ""]
+        assert deltas[0].token_usage is None
+        assert deltas[1].token_usage == TokenUsage(input_tokens=1200, output_tokens=10, cached_input_tokens=1024)
+
 
 class TestAmazonBedrockServerModel:
     def test_client_for_bedrock(self):
@@ -336,6 +425,25 @@ class TestAmazonBedrockServerModel:
 
         assert model.client == MockBoto3.return_value
 
+    def test_cache_breakpoints(self):
+        with patch("boto3.client") as MockBoto3:
+            model = AmazonBedrockServerModel(model_id="anthropic.claude-3-haiku-20240307-v1:0", cache_breakpoints=True)
+        MockBoto3.return_value.converse.return_value = {
+            "output": {"message": {"role": "assistant", "content": [{"text": "Hello"}]}},
+            "usage": {"inputTokens": 1200, "outputTokens": 10, "cacheReadInputTokens": 1024},
+        }
+        messages = [
+            {"role": MessageRole.SYSTEM, "content": [{"type": "text", "text": "System prompt"}]},
+            {"role": MessageRole.USER, "content": [{"type": "text", "text": "Task"}]},
+        ]
+        model.generate(messages)
+        # All roles are converted to "user" by default, so both messages are merged into one
+        sent_messages = MockBoto3.return_value.converse.call_args.kwargs["messages"]
+        assert sent_messages == [
+            {"role": "user", "content": [{"text": "System prompt\nTask"}, {"cachePoint": {"type": "default"}}]}
+        ]
+        assert model.last_cached_input_token_count == 1024
+
 
 class TestAzureOpenAIServerModel:
     def test_client_kwargs_passed_correctly(self):
@@ -25,9 +25,11 @@ from smolagents import (
 )
 from smolagents.models import (
     ChatMessage,
+    ChatMessageStreamDelta,
     ChatMessageToolCall,
     ChatMessageToolCallDefinition,
     Model,
+    TokenUsage,
 )
 
 
@@ -84,6 +86,44 @@ class MonitoringTester(unittest.TestCase):
         self.assertEqual(agent.monitor.total_input_token_count, 10)
         self.assertEqual(agent.monitor.total_output_token_count, 20)
 
+    def test_cached_input_token_metrics(self):
+        model = FakeLLMModel()
+        model.last_cached_input_token_count = 8
+        agent = ToolCallingAgent(tools=[], model=model, max_steps=1, verbosity_level=10)
+
+        with agent.logger.console.capture() as capture:
+            agent.run("Fake task")
+
+        self.assertEqual(agent.monitor.get_total_token_counts(), {"input": 10, "output": 20, "cached_input": 8})
+        self.assertIn("Cached input tokens: 8", " ".join(capture.get().split()))
+        agent.monitor.reset()
+        self.assertEqual(agent.monitor.total_cached_input_token_count, 0)
+
+    def test_token_usage_of_the_output_message(self):
+        class FakeLLMModelWithTokenUsage(FakeLLMModel):
+            def generate(self, prompt, tools_to_call_from=None, **kwargs):
+                message = super().generate(prompt, tools_to_call_from=tools_to_call_from, **kwargs)
+                # The last token counts of the model stand for a concurrent run sharing it
+                message.token_usage = TokenUsage(input_tokens=3, output_tokens=4, cached_input_tokens=2)
+                return message
+
+        agent = ToolCallingAgent(tools=[], model=FakeLLMModelWithTokenUsage(), max_steps=1)
+        agent.run("Fake task")
+
+        self.assertEqual(agent.monitor.get_total_token_counts(), {"input": 3, "output": 4, "cached_input": 2})
+
+    def test_token_usage_of_a_streamed_output(self):
+        class FakeLLMModelStream(FakeLLMModel):
+            def generate_stream(self, prompt, **kwargs):
+                yield ChatMessageStreamDelta(content=self.generate(prompt).content)
+                yield ChatMessageStreamDelta(content="", token_usage=TokenUsage(input_tokens=3, output_tokens=4))
+
+        agent = CodeAgent(tools=[], model=FakeLLMModelStream(), max_steps=1, stream_outputs=True)
+        agent.run("Fake task")
+
+        self.assertEqual(agent.memory.steps[1].model_output_message.token_usage, TokenUsage(3, 4))
+        self.assertEqual(agent.monitor.get_total_token_counts(), {"input": 3, "output": 4, "cached_input": 0})
+
     def test_code_agent_metrics_max_steps(self):
         class FakeLLMModelMalformedAnswer(Model):
             def __init__(self):
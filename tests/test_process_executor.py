@@ -0,0 +1,146 @@
+# coding=utf-8
+# Copyright 2024 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import multiprocessing
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from smolagents.agents import CodeAgent
+from smolagents.default_tools import FinalAnswerTool
+from smolagents.local_python_executor import InterpreterError
+from smolagents.process_executor import ProcessPythonExecutor, WorkerPool, receive_message, send_message
+from smolagents.tools import Tool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = WorkerPool(size=1, preload_modules=["numpy"])
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def executor(pool):
+    executor = ProcessPythonExecutor(["numpy"], pool=pool)
+    executor.send_tools({"final_answer": FinalAnswerTool()})
+    yield executor
+    executor.cleanup()
+
+
+def test_message_out_of_band_buffers():
+    sender, receiver = multiprocessing.Pipe()
+    array = np.arange(1000, dtype=np.float64)
+    send_message(sender, {"array": array, "text": "ok"})
+    message = receive_message(receiver)
+    assert message["text"] == "ok"
+    np.testing.assert_array_equal(message["array"], array)
+    message["array"][0] = 1.0  # Received arrays are writable
+
+
+class TestProcessPythonExecutor:
+    def test_state_persists_across_calls(self, executor):
+        output, logs, is_final_answer = executor("x = 2\nprint('x is', x)\nx * 3")
+        assert (output, logs, is_final_answer) == (6, "x is 2\n", False)
+        assert executor("x + 1")[0] == 3
+
+    def test_tools_run_in_main_process(self, executor):
+        calls = []
+
+        def search(query):
+            calls.append(query)
+            return f"results for {query}"
+
+        executor.send_tools({"search": search, "final_answer": FinalAnswerTool()})
+        assert executor("search('cats')")[0] == "results for cats"
+        assert calls == ["cats"]
+        assert executor("final_answer(search('dogs'))") == ("results for dogs", "", True)
+
+    def test_async_tools(self, executor):
+        class FetchTool(Tool):
+            name = "fetch"
+            description = "Fetches a page."
+            inputs = {"url": {"type": "string", "description": "The url."}}
+            output_type = "string"
+
+            async def forward(self, url):
+                await asyncio.sleep(0)
+                return f"page {url}"
+
+        async def double(x):
+            return 2 * x
+
+        executor.send_tools({"fetch": FetchTool(), "double": double})
+        assert executor("await fetch('a')")[0] == "page a"
+        assert executor("page = await fetch('b')\nawait double(page)")[0] == "page bpage b"
+
+    def test_tool_errors_are_raised_in_code(self, executor):
+        def failing_tool():
+            raise ValueError("tool failure")
+
+        executor.send_tools({"failing_tool": failing_tool})
+        code = "try:\n    failing_tool()\nexcept ValueError as e:\n    result = str(e)\nresult"
+        assert executor(code)[0] == "tool failure"
+
+    def test_variables_and_arrays(self, executor):
+        executor.send_variables({"array": np.arange(5)})
+        output = executor("array * 2")[0]
+        np.testing.assert_array_equal(output, np.arange(5) * 2)
+
+    def test_errors(self, executor):
+        with pytest.raises(InterpreterError, match="ZeroDivisionError"):
+            executor("print('before')\n1 / 0")
+        assert str(executor.state["_print_outputs"]) == "before\n"
+
+    def test_unpicklable_output_is_returned_as_repr(self, executor):
+        output = executor("(x for x in range(3))")[0]
+        assert output.startswith("<generator object <genexpr>")
+
+    def test_worker_crash(self, executor):
+        executor.send_variables({"y": 5})
+        executor("z = 1")
+        executor._worker.process.kill()
+        executor._worker.process.join()
+        with pytest.raises(InterpreterError, match="exited unexpectedly"):
+            executor("z")
+        assert executor("y")[0] == 5
+        with pytest.raises(InterpreterError, match="The variable `z` is not defined"):
+            executor("z")
+
+    def test_hanging_worker_is_killed(self, pool, monkeypatch):
+        monkeypatch.setattr("smolagents.process_executor.WORKER_KILL_GRACE_SECONDS", 0.5)
+        executor = ProcessPythonExecutor([], pool=pool, timeout_seconds=0.5)
+        executor.send_tools({})
+        start = time.monotonic()
+        with pytest.raises(InterpreterError, match="its worker process was killed"):
+            executor("import time\ntime.sleep(30)")
+        assert time.monotonic() - start < 10
+        assert executor("1 + 1")[0] == 2
+        executor.cleanup()
+
+    def test_profile(self, pool):
+        executor = ProcessPythonExecutor([], pool=pool, profile=True)
+        executor.send_tools({"double": lambda x: 2 * x})
+        assert executor("double(21)")[0] == 42
+        assert executor.last_profile.tools["double"].count == 1
+        executor.cleanup()
+
+
+def test_code_agent_process_executor(pool):
+    agent = CodeAgent(tools=[], model=MagicMock(), executor_type="process", executor_kwargs={"pool": pool})
+    assert isinstance(agent.python_executor, ProcessPythonExecutor)
+    agent.python_executor.cleanup()
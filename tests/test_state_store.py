@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from smolagents.local_python_executor import InterpreterError, LocalPythonExecutor
+from smolagents.state_store import DiskStateStore, LazyState
+
+
+class TestDiskStateStore:
+    def test_save_and_load(self, tmp_path):
+        store = DiskStateStore(tmp_path, min_out_of_band_bytes=1024)
+        state = {"__name__": "__main__", "array": np.arange(1000), "small_array": np.arange(10), "text": "hello"}
+        assert sorted(store.save(state)) == ["array", "small_array", "text"]
+
+        store = DiskStateStore(tmp_path)
+        assert store.names() == {"array", "small_array", "text"}
+        assert len(store.index["array"]["buffers"]) == 1
+        assert store.index["small_array"]["buffers"] == []
+        array = store.load("array")
+        np.testing.assert_array_equal(array, np.arange(1000))
+        # The buffer file is mapped copy-on-write: modifying the array does not modify the store
+        array[0] = 42
+        assert store.load("array")[0] == 0
+        assert store.load("text") == "hello"
+
+    def test_only_changed_variables_are_written(self, tmp_path):
+        store = DiskStateStore(tmp_path)
+        state = {"a": [1, 2], "b": "b", "c": 1}
+        store.save(state)
+        assert store.save(state) == []
+        state["a"].append(3)
+        state["b"] = "new"
+        assert sorted(store.save(state)) == ["a", "b"]
+        del state["c"]
+        assert store.save(state) == []
+        assert DiskStateStore(tmp_path).names() == {"a", "b"}
+        assert DiskStateStore(tmp_path).load("a") == [1, 2, 3]
+        # The files of previous versions are deleted
+        assert len(list(tmp_path.glob("*.pkl"))) == 2
+
+    def test_unpicklable_variables_are_skipped(self, tmp_path):
+        store = DiskStateStore(tmp_path)
+        state = {"function": lambda: 1, "generator": (x for x in range(2)), "value": 1}
+        assert store.save(state) == ["value"]
+        assert store.names() == {"value"}
+
+
+class TestLazyState:
+    def test_variables_are_loaded_on_first_access(self, tmp_path):
+        store = DiskStateStore(tmp_path)
+        store.save({"a": 1, "b": 2})
+        state = store.lazy_state({"b": 3})
+        assert isinstance(state, LazyState)
+        assert state.pending == {"a"}
+        assert dict(state) == {"b": 3}
+        assert "a" in state
+        assert state["a"] == 1
+        assert state.pending == set() and dict(state) == {"a": 1, "b": 3}
+        assert state.get("missing", 0) == 0
+        with pytest.raises(KeyError):
+            state["missing"]
+
+    def test_delete_pending_variable(self, tmp_path):
+        store = DiskStateStore(tmp_path)
+        store.save({"a": 1})
+        state = store.lazy_state()
+        del state["a"]
+        assert "a" not in state
+        store.save(state)
+        assert store.names() == set()
+
+
+class TestLocalPythonExecutorStateStore:
+    @pytest.mark.parametrize("engine", ["ast", "compiled"])
+    def test_resume_from_store(self, tmp_path, engine):
+        executor = LocalPythonExecutor([], engine=engine, state_store=DiskStateStore(tmp_path))
+        executor.send_tools({})
+        executor("values = [1, 2, 3]\ntotal = sum(values)\ndef double(x):\n    return 2 * x")
+
+        executor = LocalPythonExecutor([], engine=engine, state_store=DiskStateStore(tmp_path))
+        executor.send_tools({})
+        assert executor.state.pending == {"values", "total"}
+        output, _, _ = executor("values.append(4)\nvalues")
+        assert output == [1, 2, 3, 4]
+        assert executor.state.pending == {"total"}
+        assert DiskStateStore(tmp_path).load("values") == [1, 2, 3, 4]
+        with pytest.raises(InterpreterError, match="Forbidden function evaluation: .double."):
+            executor("double(1)")
+
+    def test_rollback_of_lazily_loaded_variables(self, tmp_path):
+        store = DiskStateStore(tmp_path)
+        store.save({"a": 1, "b": 2, "c": 3})
+        executor = LocalPythonExecutor([], rollback_on_error=True, state_store=DiskStateStore(tmp_path))
+        executor.send_tools({})
+        with pytest.raises(InterpreterError, match="restored to their values before it ran: a, c.$"):
+            executor("a = b + 10\ndel c\n1 / 0")
+        assert executor.state.pending == {"a", "c"}
+        assert executor("a + b + c")[0] == 6
@@ -12,6 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import inspect
 import os
 from textwrap import dedent
@@ -314,6 +315,32 @@ class TestTool:
         assert get_weather.inputs["celsius"]["nullable"]
         assert "nullable" not in get_weather.inputs["location"]
 
+    def test_async_tool(self):
+        class AsyncTool(Tool):
+            name = "async_tool"
+            description = "Returns its input in upper case"
+            inputs = {"text": {"type": "string", "description": "the text"}}
+            output_type = "string"
+
+            async def forward(self, text: str) -> str:
+                return text.upper()
+
+        @tool
+        async def async_function_tool(text: str) -> str:
+            """
+            Returns its input in upper case.
+
+            Args:
+                text: the text
+            """
+            return text.upper()
+
+        for async_tool in [AsyncTool(), async_function_tool]:
+            assert async_tool.is_async
+            assert inspect.iscoroutine(coroutine := async_tool("a", sanitize_inputs_outputs=True))
+            assert asyncio.run(coroutine) == "A"
+        assert "async def forward(self, text: str) -> str:" in async_function_tool.__source__
+
     def test_tool_mismatching_nullable_args_raises_error(self):
         with pytest.raises(Exception) as e:
 